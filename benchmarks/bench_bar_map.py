@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+BarMap 取K线的内存分配与耗时
+
+模拟 500 个交易对的全市场日线回测：每个交易日 update_dt 后在 handle_bar 中遍历 universe，取
+bar_dict[order_book_id] 并读取 close、volume。数据源与 CryptoDataSource.get_bar 相同，在缓存的结构化数组上
+searchsorted 定位。以 tracemalloc 统计每次 handle_bar 期间已分配内存相对调用前的峰值增量（调用期间释放的旧对象
+会抵消一部分，结果是分配量的下界），并给出每根K线的平均耗时。
+
+--hold 模拟策略在 context 中持有上一根K线引用的情况。
+
+用法: python benchmarks/bench_bar_map.py [--symbols 500] [--days 250] [--hold]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.const import EXECUTION_PHASE, INSTRUMENT_TYPE, TRADING_CALENDAR_TYPE
+from rqalpha.core.execution_context import ExecutionContext
+from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE
+from rqalpha.data.data_proxy import DataProxy
+from rqalpha.environment import Environment
+from rqalpha.interface import AbstractDataSource
+from rqalpha.model.bar import BarMap
+from rqalpha.utils import RqAttrDict
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+
+class _Instrument(object):
+    type = INSTRUMENT_TYPE.CRYPTO_SPOT
+
+    def __init__(self, order_book_id):
+        self.order_book_id = self.symbol = order_book_id
+
+
+class _DataSource(AbstractDataSource):
+    def __init__(self, bars_of, calendar):
+        self._bars_of = bars_of
+        self._calendar = calendar
+        self._instruments = {o: _Instrument(o) for o in bars_of}
+
+    def get_trading_calendars(self):
+        return {TRADING_CALENDAR_TYPE.CRYPTO: self._calendar}
+
+    def get_instruments(self, id_or_syms=None, types=None):
+        return [self._instruments[o] for o in id_or_syms if o in self._instruments]
+
+    def get_bar(self, instrument, dt, frequency):
+        bars = self._bars_of[instrument.order_book_id]
+        dt = np.uint64(convert_date_to_int(dt))
+        pos = bars['datetime'].searchsorted(dt)
+        if pos >= len(bars) or bars['datetime'][pos] != dt:
+            return None
+        return bars[pos]
+
+
+def make_bars(symbols, calendar):
+    rng = np.random.RandomState(0)
+    dates = np.array([convert_date_to_int(d) for d in calendar], dtype=np.int64)
+    bars_of = {}
+    for i in range(symbols):
+        bars = np.zeros(len(dates), dtype=CRYPTO_SPOT_DTYPE)
+        bars['datetime'] = dates
+        bars['open'] = bars['close'] = bars['high'] = bars['low'] = 100 + rng.standard_normal(len(dates)).cumsum()
+        bars['volume'] = 1
+        bars_of["SYM{:04d}USDT".format(i)] = bars
+    return bars_of
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--hold", action="store_true", help="策略在 context 中保留上一根K线的引用")
+    args = parser.parse_args()
+
+    calendar = pd.date_range("2023-01-01", periods=args.days)
+    bars_of = make_bars(args.symbols, calendar)
+    universe = list(bars_of)
+    env = Environment(RqAttrDict({"base": {"start_date": calendar[0].date(), "frequency": "1d"}}), False)
+    env.set_data_proxy(DataProxy(_DataSource(bars_of, calendar), None))
+    bar_map = BarMap(env.data_proxy, "1d")
+    held = {}
+
+    def handle_bar(bar_dict):
+        total = 0.
+        for order_book_id in universe:
+            bar = bar_dict[order_book_id]
+            total += bar.close * bar.volume
+            if args.hold:
+                held[order_book_id] = bar
+        return total
+
+    nbytes = 0
+    elapsed = 0.
+    gc.disable()
+    with ExecutionContext(EXECUTION_PHASE.ON_BAR):
+        tracemalloc.start()
+        for dt in calendar:
+            bar_map.update_dt(dt)
+            tracemalloc.reset_peak()
+            start_size = tracemalloc.get_traced_memory()[0]
+            handle_bar(bar_map)
+            nbytes += tracemalloc.get_traced_memory()[1] - start_size
+        tracemalloc.stop()
+
+        for dt in calendar:
+            bar_map.update_dt(dt)
+            start = time.perf_counter()
+            handle_bar(bar_map)
+            elapsed += time.perf_counter() - start
+    gc.enable()
+
+    print("symbols: {}, days: {}, hold: {}".format(args.symbols, args.days, args.hold))
+    print("bytes allocated per handle_bar: {:.0f}".format(nbytes / args.days))
+    print("bytes allocated per bar:        {:.1f}".format(nbytes / args.days / args.symbols))
+    print("time per bar:                   {:.2f}us".format(elapsed / args.days / args.symbols * 1e6))
+
+
+if __name__ == "__main__":
+    main()
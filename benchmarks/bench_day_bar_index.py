@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+日线 日期 -> 行号 定位性能对比
+
+searchsorted: 原 get_bar / history_bars 的做法，convert_date_to_int + np.uint64 + searchsorted
+index: DayBarIndex，连续序列直接由日期序数相减，有缺口的序列查 int32 表
+
+对 --symbols 个合约、逐个交易日各定位一次，分别测试无缺口的 7x24 日线（加密货币）与有缺口的工作日日线，
+给出每次定位的平均耗时。
+
+用法: python benchmarks/bench_day_bar_index.py [--symbols 500] [--days 1000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.day_bar_index import DayBarIndex
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+
+def searchsorted_position(datetimes, dt):
+    dt = np.uint64(convert_date_to_int(dt))
+    pos = datetimes.searchsorted(dt)
+    if pos >= len(datetimes) or datetimes[pos] != dt:
+        return -1
+    return pos
+
+
+def searchsorted_right(datetimes, dt):
+    return datetimes.searchsorted(np.uint64(convert_date_to_int(dt)), side='right')
+
+
+def run(label, dates, symbols):
+    datetimes = np.array([convert_date_to_int(d) for d in dates], dtype=np.uint64)
+    all_datetimes = [datetimes.copy() for _ in range(symbols)]
+    indexes = [DayBarIndex(d) for d in all_datetimes]
+    queries = list(pd.date_range(dates[0], dates[-1]).to_pydatetime())
+
+    results = {}
+    for name, func, targets in (
+        ("searchsorted get_bar", searchsorted_position, all_datetimes),
+        ("index get_bar", lambda index, dt: index.position(dt), indexes),
+        ("searchsorted history", searchsorted_right, all_datetimes),
+        ("index history", lambda index, dt: index.right(dt), indexes),
+    ):
+        start = time.perf_counter()
+        checksum = 0
+        for dt in queries:
+            for target in targets:
+                checksum += func(target, dt)
+        results[name] = (time.perf_counter() - start) / len(queries) / symbols, checksum
+
+    assert results["searchsorted get_bar"][1] == results["index get_bar"][1]
+    assert results["searchsorted history"][1] == results["index history"][1]
+    print("{} ({} bars, index {} bytes per symbol)".format(label, len(dates), indexes[0].nbytes))
+    for kind in ("get_bar", "history"):
+        old = results["searchsorted " + kind][0]
+        new = results["index " + kind][0]
+        print("  {:<10}{:>12.3f}us{:>10.3f}us{:>9.1f}x".format(kind, old * 1e6, new * 1e6, old / new))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("  {:<10}{:>14}{:>12}{:>10}".format("", "searchsorted", "index", "speed-up"))
+    run("gap-free", pd.date_range("2020-01-01", periods=args.days), args.symbols)
+    run("with gaps", pd.bdate_range("2020-01-01", periods=args.days), args.symbols)
+
+
+if __name__ == "__main__":
+    main()
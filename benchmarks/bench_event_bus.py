@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Executor 拆分发布 BAR 事件的耗时对比
+
+copy: 原 _split_and_publish 的做法，PRE_BAR、BAR、POST_BAR 各 copy 一次事件，EventBus 在 defaultdict 中查找处理函数
+fast path: 复用同一个事件对象、按事件类型预编译的处理函数元组，跳过没有处理函数的 PRE/POST 阶段
+
+处理函数与回测中 BAR 事件上注册的一致（Account._on_bar、SimulationBroker.on_bar、Scheduler.next_bar_、
+Strategy.handle_bar），均为空函数，结果为每根 bar 的事件分发开销。
+
+用法: python benchmarks/bench_event_bus.py [--bars 1000000]
+"""
+
+import argparse
+import time
+from collections import defaultdict
+from copy import copy
+from datetime import datetime
+from types import SimpleNamespace
+
+from rqalpha.core.events import EVENT, Event, EventBus
+from rqalpha.core.executor import Executor
+
+
+class CopyEventBus(object):
+    def __init__(self):
+        self._listeners = defaultdict(list)
+        self._user_listeners = defaultdict(list)
+
+    def add_listener(self, event_type, listener, user=False):
+        (self._user_listeners if user else self._listeners)[event_type].append(listener)
+
+    def publish_event(self, event):
+        for listener in self._listeners[event.event_type]:
+            if listener(event):
+                break
+        for listener in self._user_listeners[event.event_type]:
+            listener(event)
+
+
+def copy_split_and_publish(env, event):
+    if hasattr(event, "calendar_dt") and hasattr(event, "trading_dt"):
+        env.update_time(event.calendar_dt, event.trading_dt)
+    for event_type in Executor.EVENT_SPLIT_MAP[event.event_type]:
+        e = copy(event)
+        e.event_type = event_type
+        env.event_bus.publish_event(e)
+
+
+def make_env(event_bus):
+    def listener(_):
+        pass
+
+    for _ in range(3):
+        event_bus.add_listener(EVENT.BAR, listener)
+    event_bus.add_listener(EVENT.BAR, listener, user=True)
+    return SimpleNamespace(event_bus=event_bus, update_time=lambda calendar_dt, trading_dt: None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=1000000)
+    args = parser.parse_args()
+
+    dt = datetime(2024, 1, 1)
+    results = {}
+
+    env = make_env(CopyEventBus())
+    start = time.perf_counter()
+    for _ in range(args.bars):
+        copy_split_and_publish(env, Event(EVENT.BAR, calendar_dt=dt, trading_dt=dt, bar_dict=None))
+    results["copy"] = time.perf_counter() - start
+
+    env = make_env(EventBus())
+    executor = Executor(env)
+    start = time.perf_counter()
+    for _ in range(args.bars):
+        executor._split_and_publish(Event(EVENT.BAR, calendar_dt=dt, trading_dt=dt, bar_dict=None))
+    results["fast path"] = time.perf_counter() - start
+
+    print("bars: {}".format(args.bars))
+    for name, elapsed in results.items():
+        print("  {:<10}{:>10.3f}s{:>10.2f}us/bar".format(name, elapsed, elapsed / args.bars * 1e6))
+    print("  speed-up: {:.2f}x".format(results["copy"] / results["fast path"]))
+
+
+if __name__ == "__main__":
+    main()
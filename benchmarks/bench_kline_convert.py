@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+K线响应体 -> bundle 结构化数组 转换性能对比
+
+legacy: 原 gen_crypto_spot_data 的做法，response.json() + get_klines 的 DataFrame +
+        逐行 convert_date_to_int 与 np.array(list(zip(...)))
+vectorized: parse_klines 直接解析响应体 + klines_to_bars 整列运算
+
+分别给出 响应体 -> bundle 数组 的端到端耗时，以及其中 已解析的K线 -> bundle 数组 这一步的耗时。
+
+用法: python benchmarks/bench_kline_convert.py [--rows 1000000] [--repeat 3]
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.binance_api import KLINES_COLUMNS, parse_klines
+from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE, klines_to_bars
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+
+def make_body(rows):
+    start = 1500000000000
+    step = 60000
+    rng = np.random.RandomState(0)
+    close = 100 + rng.standard_normal(rows).cumsum()
+    payload = [
+        [start + i * step, "%.8f" % c, "%.8f" % (c + 1), "%.8f" % (c - 1), "%.8f" % c, "%.8f" % (i % 97 + 1),
+         start + (i + 1) * step - 1, "%.8f" % (c * 3), i % 1000, "0.5", "50.0", "0"]
+        for i, c in enumerate(close)
+    ]
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def legacy_parse(body):
+    df = pd.DataFrame(json.loads(body), columns=KLINES_COLUMNS)
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    for col in ['open', 'high', 'low', 'close', 'volume', 'quote_asset_volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def legacy_to_bars(df):
+    dates = [convert_date_to_int(d.date()) for d in df['open_time']]
+    opens = df['open'].values.astype(float)
+    closes = df['close'].values.astype(float)
+    highs = df['high'].values.astype(float)
+    lows = df['low'].values.astype(float)
+    volumes = df['volume'].values.astype(float)
+    prev_closes = np.roll(closes, 1)
+    prev_closes[0] = closes[0]
+    limit_ups = np.zeros_like(closes)
+    limit_downs = np.zeros_like(closes)
+    total_turnovers = volumes * closes
+    return np.array(list(zip(dates, opens, closes, highs, lows, prev_closes,
+                             limit_ups, limit_downs, volumes, total_turnovers)), dtype=CRYPTO_SPOT_DTYPE)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    body = make_body(args.rows)
+    legacy_parse_time, df = timed(legacy_parse, body)
+    legacy_convert_time, legacy = timed(legacy_to_bars, df)
+    del df
+
+    parse_time = convert_time = float("inf")
+    for _ in range(args.repeat):
+        t, klines = timed(parse_klines, body)
+        parse_time = min(parse_time, t)
+        t, vectorized = timed(klines_to_bars, klines, CRYPTO_SPOT_DTYPE)
+        convert_time = min(convert_time, t)
+
+    # legacy 以日期为粒度，分钟K线的 datetime 只比较日期部分
+    assert (legacy["datetime"] // 1000000 == vectorized["datetime"] // 1000000).all()
+    for field in ("open", "close", "high", "low", "prev_close", "volume", "total_turnover"):
+        np.testing.assert_allclose(legacy[field], vectorized[field])
+
+    legacy_time = legacy_parse_time + legacy_convert_time
+    vectorized_time = parse_time + convert_time
+    print("rows: {}".format(args.rows))
+    print("{:<24}{:>10}{:>12}{:>10}".format("", "legacy", "vectorized", "speed-up"))
+    for label, old, new in (
+        ("body -> bundle array", legacy_time, vectorized_time),
+        ("klines -> bundle array", legacy_convert_time, convert_time),
+    ):
+        print("{:<24}{:>9.3f}s{:>11.3f}s{:>9.1f}x".format(label, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main()
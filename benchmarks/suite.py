@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+标准回测性能基准
+
+离线生成合成的加密货币数据包（日线为 CryptoDayBarStore 格式的 crypto_spot.h5，分钟线为 CryptoMinuteBarStore
+格式的 crypto_spot_1m，合约信息为 crypto_instruments.h5 快照），在其上运行以下标准策略，每个策略在独立的子进程中运行：
+
+buy_and_hold: 日线，首根K线买入一个交易对并持有至结束
+rebalance_30: 日线，每天按 20 日动量选出 30 个交易对等权调仓
+minute_mean_reversion: 分钟线，对若干交易对按 20 分钟 z-score 均值回归交易
+minute_grid: 分钟线，每个交易对挂出买卖各 100 档限价单，价格偏离网格中心时撤单重挂，常驻上千笔未成交订单
+
+指标：
+startup_s: 子进程内调用 run_func 至第一个交易日开始（PRE_BEFORE_TRADING）的耗时，包括数据源构建、mod 加载和 init
+run_s: 第一个交易日开始至回测结束（POST_STRATEGY_RUN）的耗时
+events_per_s: run_s 内 EventBus 发布的事件数（含 PRE/POST 阶段及订单、成交事件）每秒
+bars_per_s: run_s 内回放的K线数每秒，即 BAR 事件数乘以数据包中的交易对数
+peak_rss_mb: 子进程的峰值常驻内存
+
+与基线比较时，events_per_s、bars_per_s 低于基线或 startup_s、run_s、peak_rss_mb 高于基线超过 --threshold
+（默认 0.2，即 20%）的视为退化，存在退化时以状态码 1 退出。基线与运行的机器相关，更换机器后应以 --save 重新生成。
+
+用法:
+    python benchmarks/suite.py                             # 运行全部策略并与 benchmarks/baseline.json 比较
+    python benchmarks/suite.py -s rebalance_30 --threshold 0.1
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --symbols 200 --days 2000 --minute-days 5 --bundle-dir /tmp/rqalpha_bench_bundle
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.const import POSITION_DIRECTION
+from rqalpha.core.events import EVENT
+from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE, CryptoDayBarStore
+from rqalpha.data.crypto_instrument_snapshot import SNAPSHOT_FILE, write_instrument_snapshot
+from rqalpha.data.crypto_minute_bar_store import CRYPTO_MINUTE_DTYPE, CryptoMinuteBarStore, crypto_minute_datetimes
+from rqalpha.interface import AbstractMod
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+START_DATE = "2020-01-01"
+ACCOUNT_CASH = 10000000
+# 指标及其方向：1 为越大越好，-1 为越小越好
+METRICS = (
+    ("events_per_s", 1), ("bars_per_s", 1), ("startup_s", -1), ("run_s", -1), ("peak_rss_mb", -1),
+)
+
+
+# ---------------------------------------------------------------------------
+# 合成数据包
+
+
+def _symbols(count):
+    return ["BENCH{:04d}USDT".format(i) for i in range(count)]
+
+
+def _random_walk(rng, count, start, sigma):
+    return start * np.exp(np.cumsum(rng.normal(0, sigma, count)))
+
+
+def generate_bundle(path, symbols, days, minute_symbols, minute_days, seed=0):
+    """在 path 下生成 symbols 个交易对 days 天的日线，及前 minute_symbols 个交易对 minute_days 天的分钟线"""
+    # minute_label 区分分钟线的标记方式，以开盘时刻标记的旧数据包会被重新生成
+    spec = {"symbols": symbols, "days": days, "minute_symbols": minute_symbols, "minute_days": minute_days,
+            "seed": seed, "start_date": START_DATE, "minute_label": "close"}
+    spec_file = os.path.join(path, "bench_spec.json")
+    if os.path.exists(spec_file):
+        with open(spec_file) as f:
+            if json.load(f) == spec:
+                if not os.path.exists(os.path.join(path, SNAPSHOT_FILE)):
+                    _write_instruments(path, symbols)
+                return False
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+    rng = np.random.RandomState(seed)
+    dates = pd.date_range(START_DATE, periods=days)
+    date_ints = np.array([convert_date_to_int(d) for d in dates], dtype=np.int64)
+    store = CryptoDayBarStore(os.path.join(path, "crypto_spot.h5"))
+    for order_book_id in _symbols(symbols):
+        close = _random_walk(rng, days, rng.uniform(1, 1000), 0.03)
+        bars = np.zeros(days, dtype=CRYPTO_SPOT_DTYPE)
+        bars["datetime"] = date_ints
+        bars["open"] = bars["prev_close"] = np.r_[close[0], close[:-1]]
+        bars["close"] = close
+        bars["high"] = np.maximum(bars["open"], close) * (1 + rng.uniform(0, 0.02, days))
+        bars["low"] = np.minimum(bars["open"], close) * (1 - rng.uniform(0, 0.02, days))
+        bars["limit_up"] = close * 100
+        bars["volume"] = rng.uniform(1e6, 1e7, days)
+        bars["total_turnover"] = bars["volume"] * close
+        store.store_bars(order_book_id, bars)
+
+    minute_store = CryptoMinuteBarStore(os.path.join(path, "crypto_spot_1m"))
+    minute_dts = np.concatenate([
+        crypto_minute_datetimes(convert_date_to_int(d)) for d in pd.date_range(START_DATE, periods=minute_days)
+    ])
+    for order_book_id in _symbols(minute_symbols):
+        close = _random_walk(rng, len(minute_dts), rng.uniform(1, 1000), 0.001)
+        bars = np.zeros(len(minute_dts), dtype=CRYPTO_MINUTE_DTYPE)
+        bars["datetime"] = minute_dts
+        bars["open"] = np.r_[close[0], close[:-1]]
+        bars["close"] = close
+        bars["high"] = np.maximum(bars["open"], close)
+        bars["low"] = np.minimum(bars["open"], close)
+        bars["volume"] = rng.uniform(1e4, 1e5, len(minute_dts))
+        bars["total_turnover"] = bars["volume"] * close
+        minute_store.append_bars(order_book_id, bars)
+
+    _write_instruments(path, symbols)
+    with open(spec_file, "w") as f:
+        json.dump(spec, f)
+    return True
+
+
+def _write_instruments(path, symbols):
+    """由数据包中的交易对生成合约快照，CryptoDataSource 启动时读取，不访问 Binance"""
+    write_instrument_snapshot(path, [{
+        "order_book_id": order_book_id, "underlying_symbol": order_book_id[:-4], "quote_currency": "USDT",
+        "tick_size": 0.0001, "lot_size": 0.0001, "listed_date": datetime(2017, 1, 1),
+    } for order_book_id in _symbols(symbols)], [])
+
+
+# ---------------------------------------------------------------------------
+# 标准策略
+
+
+def buy_and_hold_init(context):
+    context.order_book_id = context.universe_symbols[0]
+    context.fired = False
+
+
+def buy_and_hold_handle_bar(context, bar_dict):
+    from rqalpha.api import order_target_percent
+    if not context.fired:
+        order_target_percent(context.order_book_id, 0.95)
+        context.fired = True
+
+
+def rebalance_init(context):
+    context.basket_size = 30
+
+
+def rebalance_handle_bar(context, bar_dict):
+    from rqalpha.api import history_bars_many, order_target_percent
+    closes = history_bars_many(context.universe_symbols, 21, "1d", "close")
+    if len(closes) < 21:
+        return
+    momentum = np.nan_to_num(closes[-1] / closes[0] - 1, nan=-np.inf)
+    selected = {context.universe_symbols[i] for i in np.argsort(-momentum)[:context.basket_size]}
+    weight = 0.95 / context.basket_size
+    for order_book_id in context.universe_symbols:
+        if order_book_id in selected:
+            order_target_percent(order_book_id, weight)
+        elif context.portfolio.get_position(order_book_id, POSITION_DIRECTION.LONG).quantity > 0:
+            order_target_percent(order_book_id, 0)
+
+
+def mean_reversion_init(context):
+    context.window = 20
+
+
+def mean_reversion_handle_bar(context, bar_dict):
+    from rqalpha.api import history_bars, order_target_percent
+    weight = 0.9 / len(context.minute_symbols)
+    for order_book_id in context.minute_symbols:
+        closes = history_bars(order_book_id, context.window, "1m", "close")
+        if len(closes) < context.window:
+            continue
+        z = (closes[-1] - closes.mean()) / (closes.std() + 1e-12)
+        holding = context.portfolio.get_position(order_book_id, POSITION_DIRECTION.LONG).quantity > 0
+        if z < -1.5 and not holding:
+            order_target_percent(order_book_id, weight)
+        elif z > 0 and holding:
+            order_target_percent(order_book_id, 0)
+
+
+def grid_init(context):
+    context.levels = 100
+    context.step = 0.0005
+    context.centers = {}
+
+
+def grid_handle_bar(context, bar_dict):
+    from rqalpha.api import cancel_order, get_open_orders, order_shares
+    value = ACCOUNT_CASH * 0.9 / len(context.minute_symbols) / context.levels / 2
+    for order_book_id in context.minute_symbols:
+        price = bar_dict[order_book_id].close
+        center = context.centers.get(order_book_id)
+        if center is not None and abs(price / center - 1) < context.step * context.levels / 4:
+            continue
+        # 价格偏离网格中心时撤销该交易对的挂单，以当前价为中心重新挂出买卖各 levels 档限价单
+        for o in get_open_orders():
+            if o.order_book_id == order_book_id:
+                cancel_order(o)
+        context.centers[order_book_id] = price
+        quantity = value / price
+        closable = context.portfolio.get_position(order_book_id, POSITION_DIRECTION.LONG).closable
+        for i in range(1, context.levels + 1):
+            order_shares(order_book_id, quantity, price * (1 - context.step * i))
+            if closable >= quantity:
+                order_shares(order_book_id, -quantity, price * (1 + context.step * i))
+                closable -= quantity
+
+
+SCENARIOS = {
+    "buy_and_hold": ("1d", buy_and_hold_init, buy_and_hold_handle_bar),
+    "rebalance_30": ("1d", rebalance_init, rebalance_handle_bar),
+    "minute_mean_reversion": ("1m", mean_reversion_init, mean_reversion_handle_bar),
+    "minute_grid": ("1m", grid_init, grid_handle_bar),
+}
+
+
+# ---------------------------------------------------------------------------
+# 子进程：运行单个策略并计时
+
+
+class BenchMod(AbstractMod):
+    """开启事件计数并记录第一个交易日开始和回测结束的时刻"""
+
+    def __init__(self):
+        self.first_day = self.finished = None
+        self._env = None
+
+    def start_up(self, env, mod_config):
+        self._env = env
+        env.event_bus.enable_stats()
+        env.event_bus.add_listener(EVENT.PRE_BEFORE_TRADING, self._on_day)
+        env.event_bus.add_listener(EVENT.POST_STRATEGY_RUN, self._on_finish)
+
+    def _on_day(self, _):
+        if self.first_day is None:
+            self.first_day = time.perf_counter()
+
+    def _on_finish(self, _):
+        self.finished = time.perf_counter()
+        _result["stats"] = self._env.event_bus.dispatch_stats()
+
+    def tear_down(self, code, exception=None):
+        pass
+
+
+_mod = None
+_result = {}
+
+
+def load_mod():
+    global _mod
+    _mod = BenchMod()
+    return _mod
+
+
+def run_scenario(name, bundle_path, symbols, days, minute_symbols, minute_days):
+    from rqalpha import run_func
+
+    frequency, init, handle_bar = SCENARIOS[name]
+    if frequency == "1d":
+        end_date = pd.Timestamp(START_DATE) + pd.Timedelta(days=days - 1)
+    else:
+        end_date = pd.Timestamp(START_DATE) + pd.Timedelta(days=minute_days - 1)
+    config = {
+        "base": {
+            "start_date": START_DATE, "end_date": end_date.strftime("%Y-%m-%d"), "frequency": frequency,
+            "data_bundle_path": bundle_path, "accounts": {"CRYPTO": ACCOUNT_CASH},
+        },
+        "extra": {"log_level": "error", "context_vars": {
+            "universe_symbols": _symbols(symbols), "minute_symbols": _symbols(minute_symbols),
+        }},
+        "mod": {"bench": {"enabled": True, "lib": __name__}, "sys_analyser": {"enabled": True}},
+    }
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        result = run_func(init=init, handle_bar=handle_bar, config=config)
+    if not result or _mod.finished is None:
+        raise RuntimeError("scenario {} failed".format(name))
+
+    run_s = _mod.finished - _mod.first_day
+    events = sum(count for _, count, _ in _result["stats"])
+    bar_events = sum(count for event_type, count, _ in _result["stats"] if event_type == EVENT.BAR)
+    market_symbols = symbols if frequency == "1d" else minute_symbols
+    return {
+        "startup_s": _mod.first_day - start,
+        "run_s": run_s,
+        "events": events,
+        "bars": bar_events * market_symbols,
+        "events_per_s": events / run_s,
+        "bars_per_s": bar_events * market_symbols / run_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "trades": len(result["sys_analyser"]["trades"]),
+        "total_returns": result["sys_analyser"]["summary"]["total_returns"],
+    }
+
+
+# ---------------------------------------------------------------------------
+# 父进程：生成数据包、运行各策略、比较基线
+
+
+def _run_in_subprocess(name, args, bundle_path):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+    try:
+        cmd = [sys.executable, os.path.abspath(__file__), "--worker", name, "--bundle-dir", bundle_path,
+               "--symbols", str(args.symbols), "--days", str(args.days),
+               "--minute-symbols", str(args.minute_symbols), "--minute-days", str(args.minute_days),
+               "--output", output]
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        if proc.returncode != 0:
+            raise RuntimeError("scenario {} failed:\n{}".format(name, proc.stderr[-4000:]))
+        with open(output) as f:
+            return json.load(f)
+    finally:
+        os.remove(output)
+
+
+def compare(results, baseline, threshold):
+    """返回 (报告行, 是否存在退化)"""
+    lines = ["{:<24}{:<14}{:>14}{:>14}{:>10}".format("scenario", "metric", "baseline", "current", "change")]
+    regressed = False
+    for name, metrics in results.items():
+        base = baseline.get("results", {}).get(name)
+        for metric, direction in METRICS:
+            current = metrics[metric]
+            if not base or metric not in base or not base[metric]:
+                lines.append("{:<24}{:<14}{:>14}{:>14.4g}{:>10}".format(name, metric, "-", current, ""))
+                continue
+            change = current / base[metric] - 1
+            bad = change * direction < -threshold
+            regressed |= bad
+            lines.append("{:<24}{:<14}{:>14.4g}{:>14.4g}{:>+9.1%}{}".format(
+                name, metric, base[metric], current, change, "  REGRESSION" if bad else ""
+            ))
+    return lines, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenarios to run, all by default")
+    parser.add_argument("--symbols", type=int, default=100, help="symbols in the day bar bundle")
+    parser.add_argument("--days", type=int, default=730, help="days of day bars")
+    parser.add_argument("--minute-symbols", type=int, default=5, help="symbols with minute bars")
+    parser.add_argument("--minute-days", type=int, default=1, help="days of minute bars")
+    parser.add_argument("--bundle-dir", help="where to generate the synthetic bundle, reused if it matches")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline json to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative change treated as a regression")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a new baseline")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_scenario(args.worker, args.bundle_dir, args.symbols, args.days, args.minute_symbols,
+                              args.minute_days)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        return
+
+    bundle_path = args.bundle_dir or os.path.join(tempfile.gettempdir(), "rqalpha_bench_bundle")
+    start = time.perf_counter()
+    if generate_bundle(bundle_path, args.symbols, args.days, args.minute_symbols, args.minute_days):
+        print("generated bundle in {} ({:.1f}s)".format(bundle_path, time.perf_counter() - start))
+
+    results = {}
+    for name in args.scenario or sorted(SCENARIOS):
+        results[name] = _run_in_subprocess(name, args, bundle_path)
+        r = results[name]
+        print("{:<24}startup {:>7.2f}s  run {:>7.2f}s  {:>10.0f} events/s  {:>11.0f} bars/s  {:>7.1f} MB  "
+              "{} trades".format(name, r["startup_s"], r["run_s"], r["events_per_s"], r["bars_per_s"],
+                                 r["peak_rss_mb"], r["trades"]))
+
+    spec = {"symbols": args.symbols, "days": args.days, "minute_symbols": args.minute_symbols,
+            "minute_days": args.minute_days}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"spec": spec, "python": sys.version.split()[0], "results": results}, f, indent=2,
+                      sort_keys=True)
+        print("baseline written to {}".format(args.save))
+        return
+
+    if not os.path.exists(args.baseline):
+        print("no baseline at {}, run with --save to create one".format(args.baseline))
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("spec") != spec:
+        print("baseline was recorded with {}, current run uses {}; not comparing".format(baseline.get("spec"), spec))
+        return
+    lines, regressed = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
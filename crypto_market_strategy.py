@@ -242,31 +242,29 @@ def rebalance_portfolio(context, target_symbols, bar_dict):
         total_value = context.portfolio.total_value
         value_per_stock = total_value / len(target_symbols)
         
-        for symbol in to_buy:
-            # 使用 history_bars 获取当前价格
-            try:
-                hist = history_bars(symbol, 1, '1d', ['close'])
-                if len(hist) > 0:
-                    current_price = hist['close'][-1]
-                    if current_price > 0 and not np.isnan(current_price):
-                        shares_to_buy = int(value_per_stock / current_price)
-                        if shares_to_buy > 0:
-                            order_result = order_shares(symbol, shares_to_buy)
-                            log_trade_action("buy", symbol, quantity=shares_to_buy, price=current_price, value=value_per_stock, order_result=order_result)
-                            
-                            # 检查订单状态
-                            if order_result:
-                                log_strategy_event("info", f"订单提交成功: {symbol}, 数量: {shares_to_buy}, 订单ID: {order_result}")
-                            else:
-                                log_strategy_event("error", f"订单提交失败: {symbol}, 数量: {shares_to_buy}")
-                        else:
-                            log_strategy_event("warning", f"跳过买入 {symbol}: 计算数量为0 (价格: {current_price}, 分配价值: {value_per_stock})")
+        # 使用 history_panel 一次性获取所有待买入币种的最新收盘价
+        try:
+            closes = history_panel(to_buy, 1, 'close')
+        except Exception as e:
+            log_strategy_event("error", f"获取价格数据失败: {e}")
+            return
+        
+        for symbol, current_price in zip(to_buy, closes[-1] if len(closes) > 0 else [np.nan] * len(to_buy)):
+            if current_price > 0 and not np.isnan(current_price):
+                shares_to_buy = int(value_per_stock / current_price)
+                if shares_to_buy > 0:
+                    order_result = order_shares(symbol, shares_to_buy)
+                    log_trade_action("buy", symbol, quantity=shares_to_buy, price=current_price, value=value_per_stock, order_result=order_result)
+                    
+                    # 检查订单状态
+                    if order_result:
+                        log_strategy_event("info", f"订单提交成功: {symbol}, 数量: {shares_to_buy}, 订单ID: {order_result}")
                     else:
-                        log_strategy_event("warning", f"跳过买入 {symbol}: 价格无效 ({current_price})")
+                        log_strategy_event("error", f"订单提交失败: {symbol}, 数量: {shares_to_buy}")
                 else:
-                    log_strategy_event("warning", f"跳过买入 {symbol}: 无法获取历史数据")
-            except Exception as e:
-                log_strategy_event("error", f"获取 {symbol} 价格数据失败: {e}")
+                    log_strategy_event("warning", f"跳过买入 {symbol}: 计算数量为0 (价格: {current_price}, 分配价值: {value_per_stock})")
+            else:
+                log_strategy_event("warning", f"跳过买入 {symbol}: 价格无效 ({current_price})")
 
 
 def handle_bar(context, bar_dict):
@@ -29,6 +29,7 @@ from rqalpha.environment import Environment
 from rqalpha.core.execution_context import ExecutionContext
 from rqalpha.utils import is_valid_price
 from rqalpha.utils.exception import RQInvalidArgument
+from rqalpha.data.rolling_indicators import INDICATORS
 from rqalpha.utils.i18n import gettext as _
 from rqalpha.utils.arg_checker import apply_rules, verify_that
 from rqalpha.api import export_as_api
@@ -477,6 +478,26 @@ def history_bars(
     """
     order_book_id = assure_order_book_id(order_book_id)
     env = Environment.get_instance()
+    dt, include_now = _get_history_dt(env, frequency, include_now, adjust_type)
+
+    if fields is None:
+        fields = ["datetime", "open", "high", "low", "close", "volume"]
+
+    return env.data_proxy.history_bars(
+        order_book_id,
+        bar_count,
+        frequency,
+        fields,
+        dt,
+        skip_suspended=skip_suspended,
+        include_now=include_now,
+        adjust_type=adjust_type,
+        adjust_orig=env.trading_dt,
+    )
+
+
+def _get_history_dt(env, frequency, include_now, adjust_type):
+    # 根据当前阶段确定获取历史数据的截止时间，以及是否包含当前数据
     dt = env.calendar_dt
 
     if frequency[-1] == "m" and env.config.base.frequency == "1d":
@@ -501,12 +522,72 @@ def history_bars(
         if sys_frequency == "1d":
             # 日回测不支持 include_now
             include_now = False
+    return dt, include_now
+
+
+@export_as_api
+@ExecutionContext.enforce_phase(
+    EXECUTION_PHASE.BEFORE_TRADING,
+    EXECUTION_PHASE.OPEN_AUCTION,
+    EXECUTION_PHASE.ON_BAR,
+    EXECUTION_PHASE.ON_TICK,
+    EXECUTION_PHASE.AFTER_TRADING,
+    EXECUTION_PHASE.SCHEDULED,
+)
+@apply_rules(
+    verify_that("bar_count").is_instance_of(int).is_greater_than(0),
+    verify_that("frequency", pre_check=True).is_valid_frequency(),
+    verify_that("fields").are_valid_fields(
+        names.VALID_HISTORY_FIELDS, ignore_none=True
+    ),
+    verify_that("skip_suspended").is_instance_of(bool),
+    verify_that("include_now").is_instance_of(bool),
+    verify_that("adjust_type").is_in({"pre", "none", "post"}),
+)
+def history_bars_many(
+        order_book_ids,
+        bar_count,
+        frequency,
+        fields="close",
+        skip_suspended=True,
+        include_now=False,
+        adjust_type="pre",
+):
+    # type:(List[Union[str, Instrument]], int, str, Optional[Union[str, List[str]]], Optional[bool], Optional[bool], Optional[str]) -> Union[np.ndarray, pd.DataFrame]
+    """
+    批量获取多个合约的历史 k 线行情，各合约按时间对齐，无数据处为 NaN。参数与返回数据的时间范围同 history_bars。
+
+    合约的解析与字段校验只进行一次；加密货币日线等时间轴一致的数据直接共用同一次定位，
+    适合替代对全部合约逐个调用 history_bars 的循环。
+
+    :param order_book_ids: 合约代码列表
+    :param bar_count: 获取的历史数据数量，必填项
+    :param frequency: 获取数据什么样的频率进行。'1d'、'1m' 和 '1w' 分别表示每日、每分钟和每周，必填项
+    :param fields: 返回数据字段，单个字段返回形如 (bar_count, 合约数) 的二维 numpy 数组；
+        字段列表返回以 datetime 为索引、(字段, 合约代码) 为列的 pandas.DataFrame，默认为 close
+    :param skip_suspended: 是否跳过停牌数据
+    :param include_now: 是否包含当前数据
+    :param adjust_type: 复权类型，默认为前复权 pre；可选 pre, none, post
+
+    :example:
+
+    获取多个交易对最近 20 天的收盘价并计算动量:
+
+    ..  code-block:: python3
+        :linenos:
+
+        closes = history_bars_many(['BTCUSDT', 'ETHUSDT', 'BNBUSDT'], 20, '1d', 'close')
+        momentum = closes[-1] / closes[0] - 1
+    """
+    order_book_ids = [o.order_book_id if isinstance(o, Instrument) else o for o in order_book_ids]
+    env = Environment.get_instance()
+    dt, include_now = _get_history_dt(env, frequency, include_now, adjust_type)
 
     if fields is None:
-        fields = ["datetime", "open", "high", "low", "close", "volume"]
+        fields = ["open", "high", "low", "close", "volume"]
 
-    return env.data_proxy.history_bars(
-        order_book_id,
+    return env.data_proxy.history_bars_many(
+        order_book_ids,
         bar_count,
         frequency,
         fields,
@@ -518,6 +599,62 @@ def history_bars(
     )
 
 
+@export_as_api
+@ExecutionContext.enforce_phase(
+    EXECUTION_PHASE.BEFORE_TRADING,
+    EXECUTION_PHASE.OPEN_AUCTION,
+    EXECUTION_PHASE.ON_BAR,
+    EXECUTION_PHASE.ON_TICK,
+    EXECUTION_PHASE.AFTER_TRADING,
+    EXECUTION_PHASE.SCHEDULED,
+)
+@apply_rules(
+    verify_that("order_book_id", pre_check=True).is_listed_instrument(),
+    verify_that("name").is_in(INDICATORS),
+    verify_that("window").is_instance_of(int).is_greater_than(0),
+    verify_that("frequency", pre_check=True).is_valid_frequency(),
+    verify_that("field").is_instance_of(str),
+)
+def indicator(order_book_id, name, window, frequency="1d", field="close"):
+    # type: (str, str, int, str, str) -> float
+    """
+    获取指定合约的滚动指标，截止时间与 history_bars（include_now=False）一致。
+
+    日线指标由数据源预先计算的前缀和等结果得到，任意时刻的查询为 O(1)，适合对大量合约每日计算。
+
+    :param order_book_id: 合约代码
+    :param name: 指标名
+
+        =========================   ===================================================
+        name                        指标
+        =========================   ===================================================
+        mavg                        简单移动平均
+        vwap                        成交量加权平均价
+        std                         标准差（总体标准差）
+        max                         窗口内最大值
+        min                         窗口内最小值
+        ema                         指数移动平均（span 为 window）
+        =========================   ===================================================
+
+    :param window: 窗口长度（K线根数），对 ema 为周期
+    :param frequency: K线频率，默认为 1d
+    :param field: 计算所用的字段，默认为 close
+
+    :example:
+
+    ..  code-block:: python3
+        :linenos:
+
+        # 20 日均线与 20 日最高价
+        ma20 = indicator('BTCUSDT', 'mavg', 20)
+        high20 = indicator('BTCUSDT', 'max', 20, field='high')
+    """
+    order_book_id = assure_order_book_id(order_book_id)
+    env = Environment.get_instance()
+    dt, _ = _get_history_dt(env, frequency, False, "none")
+    return env.data_proxy.get_rolling_indicator(order_book_id, name, window, frequency, dt, field)
+
+
 @export_as_api
 @apply_rules(
     verify_that("order_book_id", pre_check=True).is_listed_instrument(),
@@ -133,6 +133,33 @@ def check_bundle(data_bundle_path):
     check_bundle_data(os.path.join(data_bundle_path, "bundle"))
 
 
+@cli.group(name="bundle-cache", help=_("Manage the shared-memory day bar cache of a bundle (under /dev/shm if available)"))
+def bundle_cache():
+    pass
+
+
+@bundle_cache.command(name="start", help=_("Build the shared day bar cache, backtests on this host will attach to it"))
+@click.option('-d', '--data-bundle-path', default=os.path.expanduser('~/.rqalpha/bundle'),
+              type=click.Path(exists=True, file_okay=False), help=_("bundle directory, same as `rqalpha run -d`"))
+def bundle_cache_start(data_bundle_path):
+    from rqalpha.data.base_data_source.bundle_cache import build_bundle_cache
+    files = build_bundle_cache(data_bundle_path)
+    if not files:
+        click.echo(_("no day bar file found in {}").format(data_bundle_path))
+        sys.exit(1)
+    for path, nbytes in files.items():
+        click.echo("{}: {:.1f} MB".format(path, nbytes / 1024 / 1024))
+
+
+@bundle_cache.command(name="stop", help=_("Remove the shared day bar cache"))
+@click.option('-d', '--data-bundle-path', default=os.path.expanduser('~/.rqalpha/bundle'),
+              type=click.Path(file_okay=False), help=_("bundle directory, same as `rqalpha run -d`"))
+def bundle_cache_stop(data_bundle_path):
+    from rqalpha.data.base_data_source.bundle_cache import remove_bundle_cache
+    if not remove_bundle_cache(data_bundle_path):
+        click.echo(_("bundle cache not found"))
+
+
 CDN_URL = 'http://bundle.assets.ricequant.com/bundles_v4/rqbundle_%04d%02d.tar.bz2'
 
 
@@ -39,6 +39,8 @@ from .entry import cli
 @click.option('-rt', '--run-type', 'base__run_type', type=click.Choice(['b', 'p', 'r']), default="b")
 @click.option('-rp', '--round-price', 'base__round_price', is_flag=True)
 @click.option('--source-code', 'base__source_code')
+@click.option('--bar-cache-size-mb', 'base__bar_cache_size_mb', type=click.FLOAT,
+              help="memory ceiling (MB) of cached bar arrays, unlimited by default")
 @click.option('--rqdatac', '--rqdatac-uri', 'base__rqdatac_uri', default=None,
               help='rqdatac uri, eg user:password or or license:xxxxxxx or tcp://user:password@ip:port')
 # -- Extra Configuration
@@ -48,6 +50,16 @@ from .entry import cli
 @click.option('--extra-vars', 'extra__context_vars', type=click.STRING, help="override context vars")
 @click.option("--enable-profiler", "extra__enable_profiler", is_flag=True, default=None,
               help="add line profiler to profile your strategy")
+@click.option("--enable-event-stats", "extra__enable_event_stats", is_flag=True, default=None,
+              help="count dispatches and listener time per event type")
+@click.option("--enable-event-loop-profiler", "extra__enable_event_loop_profiler", is_flag=True, default=None,
+              help="time every event listener and data source method")
+@click.option("--profiler-trace-file", "extra__profiler_trace_file", type=click.Path(dir_okay=False),
+              help="dump a chrome trace of one trading day to this file, used with --enable-event-loop-profiler")
+@click.option("--profiler-trace-date", "extra__profiler_trace_date", type=Date(),
+              help="trading day of the chrome trace, the first trading day by default")
+@click.option("--check-portfolio-aggregates", "extra__check_portfolio_aggregates", is_flag=True, default=None,
+              help="verify incrementally maintained account aggregates against a full recompute on every read")
 @click.option('--config', 'config_path', type=click.STRING, help="config file path")
 # -- Mod Configuration
 @click.option('-mc', '--mod-config', 'mod_configs', nargs=2, multiple=True, type=click.STRING, help="mod extra config")
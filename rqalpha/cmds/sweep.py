@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import click
+
+from rqalpha.utils.i18n import gettext as _
+from rqalpha.utils.click_helper import Date
+
+from .entry import cli
+
+
+def _parse_param(value):
+    # name=v1,v2,...，各取值按 JSON 解析，无法解析时作为字符串
+    name, sep, values = value.partition("=")
+    if not sep or not name:
+        raise click.BadParameter(_("expected name=value1,value2,..., got {}").format(value))
+
+    def parse(v):
+        try:
+            return json.loads(v)
+        except ValueError:
+            return v
+
+    return name.strip(), [parse(v.strip()) for v in values.split(",")]
+
+
+@cli.command(help=_("Run a strategy over a parameter grid in parallel"))
+@click.help_option('-h', '--help')
+@click.option('-f', '--strategy-file', type=click.Path(exists=True), required=True)
+@click.option('-p', '--param', 'params', multiple=True, required=True,
+              help=_("parameter values injected as context vars, e.g. -p fast=5,10,20 -p slow=30,60"))
+@click.option('-d', '--data-bundle-path', type=click.Path(exists=True))
+@click.option('-s', '--start-date', type=Date())
+@click.option('-e', '--end-date', type=Date())
+@click.option('-a', '--account', 'accounts', nargs=2, multiple=True,
+              help="set account type with starting cash, eg: -a stock 1000000 -a future 1000000")
+@click.option('-fq', '--frequency', type=click.Choice(['1d', '1m', 'tick']))
+@click.option('-j', '--processes', type=click.INT, default=None, help=_("number of worker processes, CPU count by default"))
+@click.option('--max-drawdown', type=click.FLOAT, default=None,
+              help=_("abort a run once its drawdown exceeds this ratio, e.g. 0.3"))
+@click.option('-o', '--output-file', type=click.Path(writable=True), help=_("save results as csv"))
+@click.option('--config', 'config_path', type=click.Path(exists=True), help="config file path")
+def sweep(strategy_file, params, data_bundle_path, start_date, end_date, accounts, frequency, processes, max_drawdown,
+          output_file, config_path):
+    import pandas as pd
+    from rqalpha.sweep import sweep as sweep_
+    from rqalpha.utils.config import load_yaml
+
+    config = load_yaml(os.path.abspath(config_path)) if config_path else {}
+    base = config.setdefault("base", {})
+    for key, value in (("data_bundle_path", data_bundle_path), ("start_date", start_date), ("end_date", end_date),
+                       ("frequency", frequency)):
+        if value is not None:
+            base[key] = value
+    if accounts:
+        base["accounts"] = {account_type: float(cash) for account_type, cash in accounts}
+
+    param_grid = dict(_parse_param(p) for p in params)
+    results = sweep_(param_grid, config, strategy_file=strategy_file, processes=processes, max_drawdown=max_drawdown)
+    if output_file:
+        results.to_csv(output_file)
+    columns = [c for c in list(param_grid) + ["aborted", "total_returns", "sharpe", "max_drawdown", "error"]
+               if c in results.columns]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        click.echo(results[columns])
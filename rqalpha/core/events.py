@@ -14,6 +14,7 @@
 
 from enum import Enum
 from collections import defaultdict
+from time import perf_counter
 
 
 class Event(object):
@@ -26,9 +27,18 @@ class Event(object):
 
 
 class EventBus(object):
+    """
+    事件总线
+    每个事件类型的处理函数在首次发布时编译为 (系统处理函数, 用户处理函数) 的元组，注册新的处理函数时失效重建；
+    enable_stats 后统计每个事件类型的发布次数和处理函数的累计耗时
+    """
+
     def __init__(self):
         self._listeners = defaultdict(list)
         self._user_listeners = defaultdict(list)
+        self._dispatch = {}
+        self._stats = None
+        self._listener_wrapper = None
 
     def add_listener(self, event_type, listener, user=False):
         """
@@ -36,19 +46,80 @@ class EventBus(object):
             注意！对于 Order/Trade/Position 等可能随时会被回收的对象，不应注册其绑定方法为事件处理函数
         """
         (self._user_listeners if user else self._listeners)[event_type].append(listener)
+        self._dispatch.pop(event_type, None)
 
     def prepend_listener(self, event_type, listener, user=False):
         (self._user_listeners if user else self._listeners)[event_type].insert(0, listener)
+        self._dispatch.pop(event_type, None)
+
+    def _compile(self, event_type):
+        listeners = self._listeners.get(event_type, ())
+        user_listeners = self._user_listeners.get(event_type, ())
+        wrapper = self._listener_wrapper
+        if wrapper is not None:
+            listeners = (wrapper(event_type, listener, False) for listener in listeners)
+            user_listeners = (wrapper(event_type, listener, True) for listener in user_listeners)
+        entry = self._dispatch[event_type] = (tuple(listeners), tuple(user_listeners))
+        return entry
+
+    def set_listener_wrapper(self, wrapper):
+        """
+        设置处理函数的包装，用于性能分析等；wrapper(event_type, listener, user) 返回实际调用的函数，None 为取消包装。
+        包装在编译时应用，对之后注册的处理函数同样生效
+        """
+        self._listener_wrapper = wrapper
+        self._dispatch.clear()
+
+    def has_listeners(self, event_type):
+        try:
+            listeners, user_listeners = self._dispatch[event_type]
+        except KeyError:
+            listeners, user_listeners = self._compile(event_type)
+        return bool(listeners or user_listeners)
 
     def publish_event(self, event):
-        for listener in self._listeners[event.event_type]:
+        try:
+            listeners, user_listeners = self._dispatch[event.event_type]
+        except KeyError:
+            listeners, user_listeners = self._compile(event.event_type)
+        if self._stats is not None:
+            return self._publish_with_stats(event, listeners, user_listeners)
+
+        for listener in listeners:
             # 如果返回 True ，那么消息不再传递下去
             if listener(event):
                 break
 
-        for listener in self._user_listeners[event.event_type]:
+        for listener in user_listeners:
             listener(event)
 
+    def _publish_with_stats(self, event, listeners, user_listeners):
+        event_type = event.event_type
+        start = perf_counter()
+        try:
+            for listener in listeners:
+                if listener(event):
+                    break
+            for listener in user_listeners:
+                listener(event)
+        finally:
+            stat = self._stats.get(event_type)
+            if stat is None:
+                stat = self._stats[event_type] = [0, 0.]
+            stat[0] += 1
+            stat[1] += perf_counter() - start
+
+    def enable_stats(self, enabled=True):
+        """开启或关闭发布次数与耗时的统计，开启时清空已有的统计"""
+        self._stats = {} if enabled else None
+
+    def dispatch_stats(self):
+        """
+        各事件类型的发布次数与处理函数的累计耗时（秒，包含嵌套发布的事件），按耗时降序
+        :return: [(event_type, count, seconds)]
+        """
+        return sorted(((t, c, s) for t, (c, s) in (self._stats or {}).items()), key=lambda i: i[2], reverse=True)
+
 
 class EVENT(Enum):
     # 系统初始化后触发
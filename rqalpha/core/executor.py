@@ -15,7 +15,6 @@
 #         在此前提下，对本软件的使用同样需要遵守 Apache 2.0 许可，Apache 2.0 许可与本许可冲突之处，以本许可为准。
 #         详细的授权流程，请联系 public@ricequant.com 获取。
 
-from copy import copy
 from datetime import datetime
 
 from rqalpha.core.events import EVENT, Event
@@ -93,7 +92,13 @@ class Executor(object):
     def _split_and_publish(self, event):
         if hasattr(event, "calendar_dt") and hasattr(event, "trading_dt"):
             self._env.update_time(event.calendar_dt, event.trading_dt)
-        for event_type in self.EVENT_SPLIT_MAP[event.event_type]:
-            e = copy(event)
-            e.event_type = event_type
-            self._env.event_bus.publish_event(e)
+        # 依次修改同一个事件对象的 event_type 发布 PRE/当前/POST 三个阶段，跳过没有处理函数的阶段
+        event_bus = self._env.event_bus
+        origin_event_type = event.event_type
+        try:
+            for event_type in self.EVENT_SPLIT_MAP[origin_event_type]:
+                if event_bus.has_listeners(event_type):
+                    event.event_type = event_type
+                    event_bus.publish_event(event)
+        finally:
+            event.event_type = origin_event_type
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+bundle 日线共享缓存
+将 bundle 中各日线 h5 文件的全部数据集展开为一个只读的平铺文件（文件头为各数据集的偏移索引），默认放在
+/dev/shm（POSIX 共享内存）下。同一台机器上的多个回测进程以内存映射方式打开同一个文件，各进程取到的K线数组
+均为指向同一份物理内存的零拷贝视图，不再各自从 h5 读取一份。
+
+缓存由 rqalpha bundle-cache start/stop 创建和删除；缓存不存在、格式不符或源 h5 文件已被修改时，
+日线存储自动退回读取 h5。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import h5py
+import numpy as np
+
+from rqalpha.data.base_data_source.storage_interface import AbstractDayBarStore
+from rqalpha.utils.logger import system_log
+
+# 可被缓存的日线文件
+DAY_BAR_FILES = ('crypto_spot.h5', 'crypto_futures.h5', 'stocks.h5', 'indexes.h5', 'futures.h5', 'funds.h5')
+
+MAGIC = b'RQBCACHE'
+_HEADER = struct.Struct('<8sQ')
+# 各数据集按 64 字节对齐，保证视图的起始地址对齐到缓存行
+_ALIGNMENT = 64
+_SHM_DIR = '/dev/shm'
+
+
+def default_cache_dir(bundle_path: str) -> str:
+    """bundle 对应的默认缓存目录，有 /dev/shm 时放在共享内存中，否则放在 bundle 目录下"""
+    bundle_path = os.path.abspath(os.path.expanduser(bundle_path))
+    if os.path.isdir(_SHM_DIR):
+        digest = hashlib.md5(bundle_path.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(_SHM_DIR, 'rqalpha_bundle_cache_{}'.format(digest))
+    return os.path.join(bundle_path, 'bundle_cache')
+
+
+def _cache_file(cache_dir: str, h5_name: str) -> str:
+    return os.path.join(cache_dir, os.path.splitext(h5_name)[0] + '.bars')
+
+
+def _source_signature(h5_path: str) -> Tuple[int, int]:
+    stat = os.stat(h5_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _align(n: int) -> int:
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+def write_cache_file(h5_path: str, cache_path: str) -> int:
+    """将 h5_path 中的全部数据集写入平铺的缓存文件，返回数据部分的字节数；先写临时文件再替换，读取方不会看到半成品"""
+    size, mtime_ns = _source_signature(h5_path)
+    with h5py.File(h5_path, 'r') as h5:
+        names = sorted(k for k in h5.keys() if isinstance(h5[k], h5py.Dataset))
+        dtypes = []  # type: List[str]
+        datasets = {}
+        offset = 0
+        for name in names:
+            dataset = h5[name]
+            descr = json.dumps(np.lib.format.dtype_to_descr(dataset.dtype))
+            if descr not in dtypes:
+                dtypes.append(descr)
+            datasets[name] = [offset, len(dataset), dtypes.index(descr)]
+            offset = _align(offset + dataset.dtype.itemsize * len(dataset))
+        header = json.dumps({
+            'source_size': size, 'source_mtime_ns': mtime_ns, 'dtypes': dtypes, 'datasets': datasets
+        }).encode('utf-8')
+        data_start = _align(_HEADER.size + len(header))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, len(header)))
+                f.write(header)
+                for name in names:
+                    f.seek(data_start + datasets[name][0])
+                    f.write(h5[name][:].tobytes())
+                f.truncate(data_start + offset)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return offset
+
+
+def build_bundle_cache(bundle_path: str, cache_dir: Optional[str] = None) -> Dict[str, int]:
+    """为 bundle 中存在的日线文件建立缓存，返回 {缓存文件路径: 字节数}"""
+    cache_dir = cache_dir or default_cache_dir(bundle_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    result = {}
+    for name in DAY_BAR_FILES:
+        h5_path = os.path.join(bundle_path, name)
+        if os.path.exists(h5_path):
+            cache_path = _cache_file(cache_dir, name)
+            result[cache_path] = write_cache_file(h5_path, cache_path)
+    return result
+
+
+def remove_bundle_cache(bundle_path: str, cache_dir: Optional[str] = None) -> bool:
+    """删除 bundle 的缓存目录；已经打开缓存的进程仍持有映射，直到进程退出"""
+    cache_dir = cache_dir or default_cache_dir(bundle_path)
+    if not os.path.isdir(cache_dir):
+        return False
+    shutil.rmtree(cache_dir)
+    return True
+
+
+class BundleCacheFile:
+    """以只读内存映射打开的缓存文件"""
+
+    def __init__(self, cache_path: str, h5_path: str):
+        self._h5_path = h5_path
+        with open(cache_path, 'rb') as f:
+            magic, header_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError('invalid bundle cache file: {}'.format(cache_path))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        self._signature = header['source_size'], header['source_mtime_ns']
+        self._data_start = _align(_HEADER.size + header_len)
+        self._dtypes = [np.lib.format.descr_to_dtype(_as_descr(json.loads(d))) for d in header['dtypes']]
+        self._datasets = header['datasets']  # type: Dict[str, List[int]]
+        self._mmap = np.memmap(cache_path, dtype=np.uint8, mode='r')
+
+    def is_fresh(self) -> bool:
+        """源 h5 文件自建立缓存后是否未被修改"""
+        try:
+            return _source_signature(self._h5_path) == self._signature
+        except OSError:
+            return False
+
+    def __contains__(self, order_book_id):
+        return order_book_id in self._datasets
+
+    def order_book_ids(self) -> List[str]:
+        return list(self._datasets)
+
+    def get(self, order_book_id: str) -> Optional[np.ndarray]:
+        """数据集的零拷贝只读视图，不存在时返回 None"""
+        try:
+            offset, length, dtype_index = self._datasets[order_book_id]
+        except KeyError:
+            return None
+        return np.ndarray(
+            shape=(length, ), dtype=self._dtypes[dtype_index], buffer=self._mmap, offset=self._data_start + offset
+        )
+
+
+def _as_descr(descr):
+    # json 将 dtype_to_descr 中的元组转为了列表
+    if isinstance(descr, list):
+        return [tuple(_as_descr(d) for d in field) if isinstance(field, list) else field for field in descr]
+    return descr
+
+
+class CachedDayBarStore(AbstractDayBarStore):
+    """
+    优先从共享缓存读取的日线存储，其余方法（写入等）转发给原存储
+
+    源 h5 文件被修改（如增量更新）后缓存即失效，此后全部退回原存储
+    """
+
+    def __init__(self, store: AbstractDayBarStore, cache: BundleCacheFile):
+        self._store = store
+        self._cache = cache
+
+    def __getattr__(self, item):
+        return getattr(self._store, item)
+
+    def _fresh_cache(self) -> Optional[BundleCacheFile]:
+        if self._cache is not None and not self._cache.is_fresh():
+            system_log.info("bundle cache is outdated, falling back to h5 files")
+            self._cache = None
+        return self._cache
+
+    def get_bars(self, order_book_id):
+        cache = self._fresh_cache()
+        if cache is not None:
+            bars = cache.get(order_book_id)
+            if bars is not None:
+                return bars
+        return self._store.get_bars(order_book_id)
+
+    def get_date_range(self, order_book_id):
+        cache = self._fresh_cache()
+        if cache is not None and order_book_id in cache:
+            bars = cache.get(order_book_id)
+            if len(bars) > 0:
+                return bars['datetime'][0], bars['datetime'][-1]
+        return self._store.get_date_range(order_book_id)
+
+    def get_order_book_ids(self):
+        cache = self._fresh_cache()
+        if cache is not None:
+            return cache.order_book_ids()
+        return self._store.get_order_book_ids()
+
+
+def with_bundle_cache(store: AbstractDayBarStore, h5_path: str, cache_dir: Optional[str] = None) -> AbstractDayBarStore:
+    """若 h5_path 存在有效的共享缓存，返回优先读取缓存的存储，否则原样返回 store"""
+    cache_dir = cache_dir or default_cache_dir(os.path.dirname(os.path.abspath(h5_path)))
+    cache_path = _cache_file(cache_dir, os.path.basename(h5_path))
+    if not os.path.exists(cache_path):
+        return store
+    try:
+        cache = BundleCacheFile(cache_path, h5_path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        system_log.warning("failed to open bundle cache {}: {}".format(cache_path, e))
+        return store
+    if not cache.is_fresh():
+        system_log.info("bundle cache {} is outdated, falling back to {}".format(cache_path, h5_path))
+        return store
+    return CachedDayBarStore(store, cache)
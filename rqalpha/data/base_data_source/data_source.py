@@ -27,12 +27,16 @@ from rqalpha.utils.i18n import gettext as _
 from rqalpha.const import INSTRUMENT_TYPE, TRADING_CALENDAR_TYPE
 from rqalpha.interface import AbstractDataSource
 from rqalpha.model.instrument import Instrument
-from rqalpha.utils.datetime_func import (convert_date_to_int, convert_int_to_date, convert_int_to_datetime)
+from rqalpha.utils.datetime_func import (convert_date_to_int, convert_int_to_date,
+                                         convert_int_to_epoch_ms)
 from rqalpha.utils.exception import RQInvalidArgument
-from rqalpha.utils.functools import lru_cache
+from rqalpha.utils.functools import lru_cache, nbytes_cache, nbytes_lru_cache
 from rqalpha.utils.typing import DateLike
 from rqalpha.environment import Environment
 from rqalpha.data.base_data_source.adjust import FIELDS_REQUIRE_ADJUSTMENT, adjust_bars
+from rqalpha.data.base_data_source.bundle_cache import with_bundle_cache
+from rqalpha.data.day_bar_index import DayBarIndex
+from rqalpha.data.rolling_indicators import RollingIndicators
 from rqalpha.data.base_data_source.storage_interface import (AbstractCalendarStore, AbstractDateSet,
                                 AbstractDayBarStore, AbstractDividendStore,
                                 AbstractInstrumentStore)
@@ -77,11 +81,12 @@ class BaseDataSource(AbstractDataSource):
         def _p(name):
             return os.path.join(path, name)
 
-        funds_day_bar_store = DayBarStore(_p('funds.h5'))
+        # 存在 rqalpha bundle-cache start 建立的共享缓存时直接映射缓存，否则读取 h5
+        funds_day_bar_store = with_bundle_cache(DayBarStore(_p('funds.h5')), _p('funds.h5'))
         self._day_bars = {
-            INSTRUMENT_TYPE.CS: DayBarStore(_p('stocks.h5')),
-            INSTRUMENT_TYPE.INDX: DayBarStore(_p('indexes.h5')),
-            INSTRUMENT_TYPE.FUTURE: FutureDayBarStore(_p('futures.h5')),
+            INSTRUMENT_TYPE.CS: with_bundle_cache(DayBarStore(_p('stocks.h5')), _p('stocks.h5')),
+            INSTRUMENT_TYPE.INDX: with_bundle_cache(DayBarStore(_p('indexes.h5')), _p('indexes.h5')),
+            INSTRUMENT_TYPE.FUTURE: with_bundle_cache(FutureDayBarStore(_p('futures.h5')), _p('futures.h5')),
             INSTRUMENT_TYPE.ETF: funds_day_bar_store,
             INSTRUMENT_TYPE.LOF: funds_day_bar_store,
             INSTRUMENT_TYPE.REITs: funds_day_bar_store
@@ -93,7 +98,6 @@ class BaseDataSource(AbstractDataSource):
         self._ins_id_or_sym_type_map = {}  # type: Dict[str, INSTRUMENT_TYPE]
         instruments = []
         
-        env = Environment.get_instance()
         with open(_p('instruments.pk'), 'rb') as f:
             for i in pickle.load(f):
                 if i["type"] == "Future" and Instrument.is_future_continuous_contract(i["order_book_id"]):
@@ -198,11 +202,29 @@ class BaseDataSource(AbstractDataSource):
         result = self._st_stock_days.contains(order_book_id, dates)
         return result if result is not None else [False] * len(dates)
 
-    @lru_cache(None)
+    @nbytes_lru_cache()
     def _all_day_bars_of(self, instrument):
         return self._day_bars[instrument.type].get_bars(instrument.order_book_id)
 
-    @lru_cache(None)
+    @nbytes_lru_cache()
+    def _day_bar_index(self, instrument, skip_suspended):
+        bars = self._filtered_day_bars(instrument) if skip_suspended else self._all_day_bars_of(instrument)
+        return DayBarIndex(bars['datetime'])
+
+    def _rolling_indicators(self, instrument):
+        # 中间结果在计算时计入共享的 nbytes_cache，与K线数组一同受 bar_cache_size_mb 限制
+        return RollingIndicators(self._all_day_bars_of(instrument), nbytes_cache, (self, instrument))
+
+    def get_rolling_indicator(self, instrument, name, window, frequency, dt, field='close'):
+        if frequency != '1d' or (
+                instrument.type not in {'Future', 'INDX'} and
+                self.get_ex_cum_factor(instrument.order_book_id) is not None
+        ):
+            # 前复权的价格随 dt 变化，无法预先计算
+            raise NotImplementedError
+        return self._rolling_indicators(instrument).value(name, window, convert_date_to_int(dt), field)
+
+    @nbytes_lru_cache()
     def _filtered_day_bars(self, instrument):
         bars = self._all_day_bars_of(instrument)
         return bars[bars['volume'] > 0]
@@ -215,9 +237,8 @@ class BaseDataSource(AbstractDataSource):
         bars = self._all_day_bars_of(instrument)
         if len(bars) <= 0:
             return
-        dt = np.uint64(convert_date_to_int(dt))
-        pos = bars['datetime'].searchsorted(dt)
-        if pos >= len(bars) or bars['datetime'][pos] != dt:
+        pos = self._day_bar_index(instrument, False).position(dt)
+        if pos < 0:
             return None
 
         return bars[pos]
@@ -261,23 +282,43 @@ class BaseDataSource(AbstractDataSource):
         return env.data_proxy.get_previous_trading_date(idx)
 
     def resample_week_bars(self, bars, bar_count, fields):
-        df_bars = pd.DataFrame(bars)
-        df_bars['datetime'] = df_bars.apply(lambda x: convert_int_to_datetime(x['datetime']), axis=1)
-        df_bars = df_bars.set_index('datetime')
-        nead_fields = fields
-        if isinstance(nead_fields, str):
-            nead_fields = [nead_fields]
-        hows = {field: BAR_RESAMPLE_FIELD_METHODS[field] for field in nead_fields if field in BAR_RESAMPLE_FIELD_METHODS}
-        df_bars = df_bars.resample('W-Fri').agg(hows)
-        df_bars.index = df_bars.index.map(self._update_weekly_trading_date_index)
-        df_bars = df_bars[~df_bars.index.duplicated(keep='first')]
-        df_bars.sort_index(inplace=True)
-        df_bars = df_bars[-bar_count:]
-        df_bars = df_bars.reset_index()
-        df_bars['datetime'] = df_bars.apply(lambda x: np.uint64(convert_date_to_int(x['datetime'].date())), axis=1)
-        df_bars = df_bars.set_index('datetime')
-        bars = df_bars.to_records()
-        return bars
+        """
+        以周六至周五为一周（与 pandas 的 W-Fri 一致）将日线聚合为周线，以当周最后一个交易日标记
+
+        周的边界由日期整数运算得到，各字段以 np.*.reduceat 整列聚合
+        """
+        if fields is None:
+            fields = [f for f in bars.dtype.names if f in BAR_RESAMPLE_FIELD_METHODS]
+        elif isinstance(fields, str):
+            fields = [fields]
+        fields = [f for f in fields if f in BAR_RESAMPLE_FIELD_METHODS]
+        result_dtype = np.dtype([('datetime', np.uint64)] + [(f, bars.dtype[f]) for f in fields])
+        if len(bars) == 0:
+            return np.empty(0, dtype=result_dtype)
+
+        # 1970-01-03 为周六，weeks 为各日线所属周的序号
+        weeks = (convert_int_to_epoch_ms(bars['datetime']) // 86400000 - 2) // 7
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(weeks)) + 1))[-bar_count:]
+        bars, weeks, starts = bars[starts[0]:], weeks[starts[0]:], starts - starts[0]
+        lasts = np.concatenate((starts[1:], [len(bars)])) - 1
+
+        result = np.empty(len(starts), dtype=result_dtype)
+        fridays = pd.to_datetime((weeks[starts] * 7 + 8).astype('datetime64[D]'))
+        result['datetime'] = [convert_date_to_int(self._update_weekly_trading_date_index(d)) for d in fridays]
+        for field in fields:
+            column = bars[field]
+            how = BAR_RESAMPLE_FIELD_METHODS[field]
+            if how == 'first':
+                result[field] = column[starts]
+            elif how == 'max':
+                result[field] = np.maximum.reduceat(column, starts)
+            elif how == 'min':
+                result[field] = np.minimum.reduceat(column, starts)
+            elif how == 'sum':
+                result[field] = np.add.reduceat(column, starts)
+            else:
+                result[field] = column[lasts]
+        return result
 
     def history_bars(self, instrument, bar_count, frequency, fields, dt,
                      skip_suspended=True, include_now=False,
@@ -286,7 +327,8 @@ class BaseDataSource(AbstractDataSource):
         if frequency != '1d' and frequency != '1w':
             raise NotImplementedError
 
-        if skip_suspended and instrument.type == 'CS':
+        skip_suspended = skip_suspended and instrument.type == 'CS'
+        if skip_suspended:
             bars = self._filtered_day_bars(instrument)
         else:
             bars = self._all_day_bars_of(instrument)
@@ -297,14 +339,12 @@ class BaseDataSource(AbstractDataSource):
         if len(bars) <= 0:
             return bars
 
+        index = self._day_bar_index(instrument, skip_suspended)
         if frequency == '1w':
             if include_now:
-                dt = np.uint64(convert_date_to_int(dt))
-                i = bars['datetime'].searchsorted(dt, side='right')
+                i = index.right(dt)
             else:
-                monday = dt - timedelta(days=dt.weekday())
-                monday = np.uint64(convert_date_to_int(monday))
-                i = bars['datetime'].searchsorted(monday, side='left')
+                i = index.left(dt - timedelta(days=dt.weekday()))
 
             left = i - bar_count * 5 if i >= bar_count * 5 else 0
             bars = bars[left:i]
@@ -322,8 +362,7 @@ class BaseDataSource(AbstractDataSource):
                                            fields, adjust_type, adjust_orig)
             adjust_week_bars = self.resample_week_bars(adjust_bars_date, bar_count, fields)
             return adjust_week_bars if fields is None else adjust_week_bars[fields]
-        dt = np.uint64(convert_date_to_int(dt))
-        i = bars['datetime'].searchsorted(dt, side='right')
+        i = index.right(dt)
         left = i - bar_count if i >= bar_count else 0
         bars = bars[left:i]
         if adjust_type == 'none' or instrument.type in {'Future', 'INDX'}:
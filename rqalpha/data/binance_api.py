@@ -4,24 +4,152 @@ Binance API 集成模块
 用于获取加密货币市场数据
 """
 
+import io
 import requests
 import pandas as pd
 import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Union
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple, Union
+import queue
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# 固定长度的K线周期（毫秒），用于预先划分分页区间；'1M' 等不定长周期按顺序翻页
+KLINE_INTERVAL_MS = {
+    '1s': 1000, '1m': 60000, '3m': 180000, '5m': 300000, '15m': 900000, '30m': 1800000,
+    '1h': 3600000, '2h': 7200000, '4h': 14400000, '6h': 21600000, '8h': 28800000, '12h': 43200000,
+    '1d': 86400000, '3d': 259200000, '1w': 604800000,
+}
+KLINES_PAGE_SIZE = 1000
+# exchangeInfo 中 onboardDate、deliveryDate 等毫秒时间戳的起点（UTC）
+_EPOCH = datetime(1970, 1, 1)
+KLINES_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+# parse_klines 解析的列，即 KLINES_COLUMNS 的前 7 列
+KLINE_DTYPE = np.dtype([
+    ('open_time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8'), ('volume', 'f8'),
+    ('close_time', 'i8')
+])
+
+
+def parse_klines(payload: Union[bytes, str, list]) -> np.ndarray:
+    """
+    将K线接口的响应解析为 KLINE_DTYPE 结构化数组
+
+    响应体（bytes/str）直接交由 pandas 的 C 解析器一次性读为定类型的列，不经过逐行的 JSON 对象；
+    已解析的列表则整体转换为对象数组后按列转换类型。
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if isinstance(payload, bytes):
+        body = payload.strip()
+        if b' ' in body:
+            body = body.replace(b' ', b'')
+        if len(body) <= 2:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        # 以 ']' 为行结束符、'[' 为转义符，将首个 '[' 替换为 ',' 后每行形如 ,[1500000000000,"1.0",...，首列恒为空
+        body = bytearray(body)
+        body[0] = ord(',')
+        df = pd.read_csv(
+            io.BytesIO(body), header=None, names=['_'] + KLINES_COLUMNS, lineterminator=']',
+            escapechar='[', usecols=list(KLINE_DTYPE.names), na_filter=False,
+            dtype={name: KLINE_DTYPE[name] for name in KLINE_DTYPE.names}
+        )
+        columns = [df[name].values for name in KLINE_DTYPE.names]
+    else:
+        if len(payload) == 0:
+            return np.empty(0, dtype=KLINE_DTYPE)
+        data = np.array(payload, dtype=object)
+        columns = [data[:, i] for i in range(len(KLINE_DTYPE.names))]
+    klines = np.empty(len(columns[0]), dtype=KLINE_DTYPE)
+    for name, column in zip(KLINE_DTYPE.names, columns):
+        klines[name] = column.astype(KLINE_DTYPE[name], copy=False)
+    return klines
+
+
+def klines_to_frame(klines: np.ndarray) -> pd.DataFrame:
+    """将 KLINE_DTYPE 数组转换为与 get_klines 相同格式的 DataFrame"""
+    df = pd.DataFrame(klines)
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    return df
+
+
+def to_milliseconds(t: Union[str, int, datetime]) -> int:
+    """将时间转换为毫秒时间戳，字符串按 UTC 解析"""
+    if isinstance(t, datetime):
+        return int(t.timestamp() * 1000)
+    if isinstance(t, str):
+        return int(pd.to_datetime(t).timestamp() * 1000)
+    return int(t)
+
+
+class WeightRateLimiter:
+    """
+    按请求权重限速的令牌桶
+
+    令牌以 weight_limit / interval 的速率补充，容量为 weight_limit；每次收到响应后以服务端
+    X-MBX-USED-WEIGHT 响应头报告的已用权重校正剩余令牌，多个线程共享同一个限速器。
+    """
+
+    def __init__(self, weight_limit: int, interval: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.weight_limit = weight_limit
+        self._rate = weight_limit / interval
+        self._tokens = float(weight_limit)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.weight_limit, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def acquire(self, weight: int = 1):
+        """取得 weight 个令牌，不足时阻塞等待"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= weight:
+                    self._tokens -= weight
+                    return
+                wait = (weight - self._tokens) / self._rate
+            self._sleep(wait)
+
+    def update(self, used_weight: int):
+        """以服务端报告的当前窗口已用权重校正剩余令牌"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, float(self.weight_limit - used_weight))
+
+
 class BinanceAPI:
     """Binance API 客户端"""
     
     BASE_URL = "https://api.binance.com"
     FUTURES_BASE_URL = "https://fapi.binance.com"
+
+    # 每分钟请求权重上限
+    WEIGHT_LIMIT = 6000
+    FUTURES_WEIGHT_LIMIT = 2400
+    USED_WEIGHT_HEADERS = ("X-MBX-USED-WEIGHT-1M", "X-MBX-USED-WEIGHT")
+    RETRY_STATUS = {418, 429, 500, 502, 503, 504}
     
-    def __init__(self, api_key: str = None, secret_key: str = None, testnet: bool = False):
+    def __init__(self, api_key: str = None, secret_key: str = None, testnet: bool = False,
+                 base_url: str = None, futures_base_url: str = None, max_retries: int = 5,
+                 backoff_factor: float = 0.5, pool_size: int = 16, timeout: float = 10):
         """
         初始化 Binance API 客户端
         
@@ -29,6 +157,12 @@ class BinanceAPI:
             api_key: API 密钥
             secret_key: 密钥
             testnet: 是否使用测试网
+            base_url: 现货接口地址，用于指向代理或本地测试服务
+            futures_base_url: 期货接口地址
+            max_retries: 请求失败（连接错误、429/418/5xx）时的最大重试次数
+            backoff_factor: 指数退避的基础等待秒数，第 n 次重试前等待 backoff_factor * 2 ** n 秒
+            pool_size: 连接池大小，应不小于并发下载的线程数
+            timeout: 单次请求超时秒数
         """
         self.api_key = api_key
         self.secret_key = secret_key
@@ -37,24 +171,83 @@ class BinanceAPI:
         if testnet:
             self.BASE_URL = "https://testnet.binance.vision"
             self.FUTURES_BASE_URL = "https://testnet.binancefuture.com"
+        if base_url:
+            self.BASE_URL = base_url
+        if futures_base_url:
+            self.FUTURES_BASE_URL = futures_base_url
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._limiters = {
+            False: WeightRateLimiter(self.WEIGHT_LIMIT),
+            True: WeightRateLimiter(self.FUTURES_WEIGHT_LIMIT),
+        }
+        self._sleep = time.sleep
+        # 并发下载时多个线程共用同一客户端
+        self._request_count_lock = threading.Lock()
+        self.request_count = 0
+
+    def _update_used_weight(self, response, futures):
+        for header in self.USED_WEIGHT_HEADERS:
+            used = response.headers.get(header)
+            if used is not None:
+                try:
+                    self._limiters[futures].update(int(used))
+                except ValueError:
+                    pass
+                return
+
+    def _retry_wait(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return self.backoff_factor * (2 ** attempt)
     
-    def _make_request(self, endpoint: str, params: Dict = None, futures: bool = False) -> Dict:
-        """发送 HTTP 请求"""
+    def _make_request(self, endpoint: str, params: Dict = None, futures: bool = False, weight: int = 1,
+                      raw: bool = False) -> Union[Dict, bytes]:
+        """发送 HTTP 请求：复用连接池，按权重限速，失败时指数退避重试；raw 为 True 时返回未解析的响应体"""
         base_url = self.FUTURES_BASE_URL if futures else self.BASE_URL
         url = f"{base_url}{endpoint}"
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Binance API request failed: {e}")
-            raise
+
+        attempt = 0
+        while True:
+            self._limiters[futures].acquire(weight)
+            response = None
+            try:
+                with self._request_count_lock:
+                    self.request_count += 1
+                response = self._session.get(url, params=params, timeout=self.timeout)
+                self._update_used_weight(response, futures)
+                if response.status_code in self.RETRY_STATUS and attempt < self.max_retries:
+                    logger.warning(f"Binance API returned {response.status_code} for {endpoint}, retrying")
+                else:
+                    response.raise_for_status()
+                    return response.content if raw else response.json()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Binance API request failed: {e}")
+                    raise
+                logger.warning(f"Binance API request failed: {e}, retrying")
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Binance API request failed: {e}")
+                raise
+            self._sleep(self._retry_wait(attempt, response))
+            attempt += 1
     
     def get_exchange_info(self, futures: bool = False) -> Dict:
         """获取交易所信息"""
         endpoint = "/fapi/v1/exchangeInfo" if futures else "/api/v3/exchangeInfo"
-        return self._make_request(endpoint, futures=futures)
+        # 现货 exchangeInfo 的权重为 20，期货为 1
+        return self._make_request(endpoint, futures=futures, weight=1 if futures else 20)
     
     def get_symbols(self, futures: bool = False) -> List[str]:
         """获取所有交易对符号"""
@@ -65,6 +258,29 @@ class BinanceAPI:
                 symbols.append(symbol_info['symbol'])
         return symbols
     
+    @staticmethod
+    def _klines_params(symbol, interval, start_time, end_time, limit, futures):
+        endpoint = "/fapi/v1/klines" if futures else "/api/v3/klines"
+        params = {
+            'symbol': symbol,
+            'interval': interval,
+            'limit': min(limit, KLINES_PAGE_SIZE)
+        }
+        # 时间范围超出 limit 条时 Binance 只返回自 startTime 起的 limit 条，更长的区间请使用 iter_klines 分页
+        if start_time is not None:
+            params['startTime'] = to_milliseconds(start_time)
+        if end_time is not None:
+            params['endTime'] = to_milliseconds(end_time)
+        return endpoint, params
+
+    def get_klines_array(self, symbol: str, interval: str, start_time: Union[str, int, datetime] = None,
+                         end_time: Union[str, int, datetime] = None, limit: int = 1000,
+                         futures: bool = False) -> np.ndarray:
+        """获取K线数据，直接由响应体解析为 KLINE_DTYPE 结构化数组，参数同 get_klines"""
+        endpoint, params = self._klines_params(symbol, interval, start_time, end_time, limit, futures)
+        return parse_klines(self._make_request(endpoint, params, futures=futures, weight=5 if futures else 2,
+                                               raw=True))
+
     def get_klines(self, symbol: str, interval: str, start_time: Union[str, int, datetime] = None, 
                    end_time: Union[str, int, datetime] = None, limit: int = 1000, futures: bool = False) -> pd.DataFrame:
         """
@@ -78,46 +294,11 @@ class BinanceAPI:
             limit: 限制条数，最大1000
             futures: 是否期货数据
         """
-        endpoint = "/fapi/v1/klines" if futures else "/api/v3/klines"
-        
-        params = {
-            'symbol': symbol,
-            'interval': interval,
-            'limit': min(limit, 1000)
-        }
-        
-        # 只有当start_time和end_time都存在时才添加时间参数
-        # 注意：Binance API对时间参数很敏感，建议只使用limit参数
-        if start_time and end_time:
-            # 检查时间范围是否合理（不超过1000条数据）
-            if isinstance(start_time, datetime):
-                start_ts = int(start_time.timestamp() * 1000)
-            elif isinstance(start_time, str):
-                start_ts = int(pd.to_datetime(start_time).timestamp() * 1000)
-            else:
-                start_ts = start_time
-                
-            if isinstance(end_time, datetime):
-                end_ts = int(end_time.timestamp() * 1000)
-            elif isinstance(end_time, str):
-                end_ts = int(pd.to_datetime(end_time).timestamp() * 1000)
-            else:
-                end_ts = end_time
-            
-            # 只有当时间范围合理时才添加时间参数
-            time_diff = end_ts - start_ts
-            if time_diff > 0 and time_diff < 1000 * 24 * 60 * 60 * 1000:  # 1000天的毫秒数
-                params['startTime'] = start_ts
-                params['endTime'] = end_ts
-        
-        data = self._make_request(endpoint, params, futures=futures)
+        endpoint, params = self._klines_params(symbol, interval, start_time, end_time, limit, futures)
+        data = self._make_request(endpoint, params, futures=futures, weight=5 if futures else 2)
         
         # 转换为 DataFrame
-        df = pd.DataFrame(data, columns=[
-            'open_time', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'number_of_trades',
-            'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-        ])
+        df = pd.DataFrame(data, columns=KLINES_COLUMNS)
         
         # 数据类型转换
         df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
@@ -163,7 +344,7 @@ class BinanceAPI:
         endpoint = "/fapi/v1/aggTrades" if futures else "/api/v3/aggTrades"
         params = {
             'symbol': symbol,
-            'limit': min(limit, 1000)
+            'limit': min(limit, KLINES_PAGE_SIZE)
         }
         
         return self._make_request(endpoint, params, futures=futures)
@@ -174,6 +355,125 @@ class BinanceAPI:
         return self._make_request(endpoint, futures=futures)
 
 
+def iter_klines(api, symbol: str, interval: str, start_time: Union[str, int, datetime],
+                end_time: Union[str, int, datetime], futures: bool = False,
+                max_in_flight: int = 4) -> Iterator[np.ndarray]:
+    """
+    按时间顺序分页获取 [start_time, end_time] 区间的K线，每次请求对应产出一页 KLINE_DTYPE 数组（可能为空）
+
+    首页自 start_time 起请求，Binance 从区间内第一根K线开始返回，从而跳过上市前的空白区间；
+    若首页已满 1000 条，其后的区间按固定周期预先划分为每页 1000 根，至多 max_in_flight 页同时请求，
+    并按时间顺序产出。与已产出K线重叠的行会被去除，内存中至多保留 max_in_flight 页。
+
+    :param api: 提供 get_klines_array 的对象，通常为 BinanceAPI
+    """
+    end_ms = to_milliseconds(end_time)
+    page = api.get_klines_array(symbol, interval, to_milliseconds(start_time), end_ms,
+                                limit=KLINES_PAGE_SIZE, futures=futures)
+    yield page
+    if len(page) < KLINES_PAGE_SIZE:
+        return
+    last_open = int(page['open_time'][-1])
+
+    def fetch(window):
+        return api.get_klines_array(symbol, interval, window[0], window[1], limit=KLINES_PAGE_SIZE, futures=futures)
+
+    step = KLINE_INTERVAL_MS.get(interval)
+    if step is None or max_in_flight <= 1:
+        while last_open < end_ms:
+            page = fetch((last_open + 1, end_ms))
+            page = page[page['open_time'] > last_open]
+            yield page
+            if len(page) < KLINES_PAGE_SIZE:
+                return
+            last_open = int(page['open_time'][-1])
+        return
+
+    windows = ((t, min(t + step * KLINES_PAGE_SIZE - 1, end_ms))
+               for t in range(last_open + step, end_ms + 1, step * KLINES_PAGE_SIZE))
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        pending = deque(executor.submit(fetch, w) for w in islice(windows, max_in_flight))
+        while pending:
+            page = pending.popleft().result()
+            for w in islice(windows, 1):
+                pending.append(executor.submit(fetch, w))
+            page = page[page['open_time'] > last_open]
+            if len(page) > 0:
+                last_open = int(page['open_time'][-1])
+            yield page
+
+
+def get_klines_range(api, symbol: str, interval: str, start_time: Union[str, int, datetime],
+                     end_time: Union[str, int, datetime], futures: bool = False,
+                     max_in_flight: int = 4) -> pd.DataFrame:
+    """获取 [start_time, end_time] 区间的全部K线，不受单次请求 1000 条的限制，返回格式同 get_klines"""
+    pages = list(iter_klines(api, symbol, interval, start_time, end_time, futures, max_in_flight))
+    return klines_to_frame(np.concatenate(pages))
+
+
+def fetch_streaming(func: Callable[[Any], Iterable[Any]], items: Iterable[Any], max_workers: int = 4,
+                    max_pending: int = None) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    以至多 max_workers 个线程并发迭代 func(item)，边产生边在调用方线程中产出
+
+    func(item) 产出的每个值 v 以 (item, v, None) 产出；item 迭代完毕时产出 (item, None, None)，
+    出错时产出 (item, None, exception)。尚未被消费的值至多 max_pending 个（默认为 2 * max_workers），
+    生产者在队列已满时阻塞，从而限制内存占用。调用方提前停止迭代时，尚未开始的 item 不再执行。
+    """
+    if max_workers <= 1:
+        for item in items:
+            try:
+                for value in func(item):
+                    yield item, value, None
+            except Exception as e:
+                yield item, None, e
+            else:
+                yield item, None, None
+        return
+
+    items = list(items)
+    q = queue.Queue(maxsize=max_pending or 2 * max_workers)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def worker(item):
+        if stop.is_set():
+            return
+        try:
+            for value in func(item):
+                if stop.is_set():
+                    return
+                put((item, value, None))
+        except Exception as e:
+            put((item, None, e))
+        else:
+            put((item, None, None))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = []
+    try:
+        for item in items:
+            futures.append(executor.submit(worker, item))
+        remaining = len(items)
+        while remaining:
+            entry = q.get()
+            if entry[1] is None:
+                remaining -= 1
+            yield entry
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
 class BinanceDataProvider:
     """Binance 数据提供者，适配 RQAlpha 数据接口"""
     
@@ -208,12 +508,8 @@ class BinanceDataProvider:
         if isinstance(end_date, str):
             end_date = pd.to_datetime(end_date)
         
-        # 限制数据范围，避免请求过多数据
-        if (end_date - start_date).days > 1000:
-            start_date = end_date - pd.Timedelta(days=1000)
-        
-        # 获取日线数据
-        df = self.api.get_klines(symbol, '1d', start_date, end_date, futures=futures)
+        # 获取日线数据，超过 1000 天的区间分页请求
+        df = get_klines_range(self.api, symbol, '1d', start_date, end_date, futures=futures)
         
         if df.empty:
             return df
@@ -226,8 +522,9 @@ class BinanceDataProvider:
             'low': 'low',
             'close': 'close',
             'volume': 'volume',
-            'quote_asset_volume': 'total_turnover'
         })
+        # 与 bundle 一致，成交额按 volume * close 计算
+        df['total_turnover'] = df['volume'] * df['close']
         
         # 添加缺失字段
         df['prev_close'] = df['close'].shift(1)
@@ -251,12 +548,20 @@ class BinanceDataProvider:
         return df
     
     def get_instruments_info(self, futures: bool = False) -> List[Dict]:
-        """获取合约信息"""
+        """
+        获取合约信息
+
+        lot_size、min_qty 为 LOT_SIZE 过滤器的下单数量步长及最小数量，min_notional 为最小下单金额；
+        期货的上市日期为 onboardDate，交割合约的退市日期为 deliveryDate，现货没有上市日期信息，使用默认值
+        """
         exchange_info = self.api.get_exchange_info(futures)
         instruments = []
         
         for symbol_info in exchange_info['symbols']:
             if symbol_info['status'] == 'TRADING':
+                filters = {f['filterType']: f for f in symbol_info.get('filters', ())}
+                lot = filters.get('LOT_SIZE', {})
+                notional = filters.get('NOTIONAL') or filters.get('MIN_NOTIONAL') or {}
                 instrument = {
                     'order_book_id': symbol_info['symbol'],
                     'symbol': symbol_info['symbol'],
@@ -265,11 +570,19 @@ class BinanceDataProvider:
                     'listed_date': datetime(2017, 1, 1),  # 默认上市日期
                     'de_listed_date': None,
                     'round_lot': 1,
-                    'tick_size': float(symbol_info['filters'][0]['tickSize']) if symbol_info['filters'] else 0.01,
+                    'tick_size': float(filters['PRICE_FILTER']['tickSize']) if 'PRICE_FILTER' in filters else 0.01,
+                    'lot_size': float(lot.get('stepSize', 1)),
+                    'min_qty': float(lot.get('minQty', 0)),
+                    # 现货为 minNotional，期货为 notional
+                    'min_notional': float(notional.get('minNotional', notional.get('notional', 0))),
                     'contract_multiplier': 1,
                     'underlying_symbol': symbol_info['baseAsset'],
                     'quote_currency': symbol_info['quoteAsset']
                 }
+                if symbol_info.get('onboardDate'):
+                    instrument['listed_date'] = _EPOCH + timedelta(milliseconds=symbol_info['onboardDate'])
+                if symbol_info.get('deliveryDate') and symbol_info.get('contractType', 'PERPETUAL') != 'PERPETUAL':
+                    instrument['de_listed_date'] = _EPOCH + timedelta(milliseconds=symbol_info['deliveryDate'])
                 instruments.append(instrument)
         
         return instruments
@@ -17,6 +17,7 @@ import json
 import os
 import pickle
 import re
+import shutil
 from itertools import chain
 from typing import Callable, Optional, Union, List
 from filelock import FileLock, Timeout
@@ -38,6 +39,10 @@ from rqalpha.model.instrument import Instrument
 
 START_DATE = 20050104
 END_DATE = 29991231
+# 加密货币日线回溯天数（近5年）
+CRYPTO_HISTORY_DAYS = 1825
+# 分钟线数据量大，默认只下载最近 30 天
+CRYPTO_MINUTE_HISTORY_DAYS = 30
 
 
 def gen_instruments(d):
@@ -143,26 +148,14 @@ def gen_share_transformation(d):
 
 
 def gen_crypto_instruments(d):
-    """生成加密货币合约信息"""
+    """生成加密货币合约信息快照（crypto_instruments.h5），CryptoDataSource 启动时由此加载合约，不访问网络"""
     from rqalpha.data.binance_api import get_binance_provider
-    
+    from rqalpha.data.crypto_instrument_snapshot import write_instrument_snapshot
+
     provider = get_binance_provider()
-    instruments = []
-    
-    # 现货合约
-    spot_instruments = provider.get_instruments_info(futures=False)
-    for info in spot_instruments:
-        info['type'] = 'CryptoSpot'
-        instruments.append(info)
-    
-    # 期货合约
-    futures_instruments = provider.get_instruments_info(futures=True)
-    for info in futures_instruments:
-        info['type'] = 'CryptoFuture'
-        instruments.append(info)
-    
-    with open(os.path.join(d, 'crypto_instruments.pk'), 'wb') as out:
-        pickle.dump(instruments, out, protocol=2)
+    write_instrument_snapshot(
+        d, provider.get_instruments_info(futures=False), provider.get_instruments_info(futures=True)
+    )
 
 
 def gen_crypto_trading_dates(d):
@@ -183,119 +176,33 @@ def gen_crypto_trading_dates(d):
     np.save(os.path.join(d, 'crypto_trading_dates.npy'), dates, allow_pickle=False)
 
 
-def gen_crypto_spot_data(d):
-    """生成加密货币现货数据 - 符合RQAlpha标准格式（近5年数据）"""
+def _crypto_usdt_symbols(futures):
     from rqalpha.data.binance_api import get_binance_provider
-    import pandas as pd
-    import numpy as np
-    
-    provider = get_binance_provider()
-    symbols = provider.get_all_symbols(futures=False)
-    
-    # 只获取主要交易对，避免数据量过大
-    major_symbols = [s for s in symbols if s.endswith('USDT')]  # 获取所有USDT交易对
-    
-    with h5py.File(os.path.join(d, 'crypto_spot.h5'), 'w') as h5:
-        for symbol in major_symbols:
-            try:
-                # 获取最近5年的数据（约1825天）
-                df = provider.api.get_klines(symbol, '1d', limit=1825, futures=False)
-                if not df.empty:
-                    # 提取数据
-                    dates = [convert_date_to_int(d.date()) for d in df['open_time']]
-                    opens = df['open'].values.astype(float)
-                    closes = df['close'].values.astype(float)
-                    highs = df['high'].values.astype(float)
-                    lows = df['low'].values.astype(float)
-                    volumes = df['volume'].values.astype(float)
-                    
-                    # 计算缺失字段
-                    prev_closes = np.roll(closes, 1)
-                    prev_closes[0] = closes[0]  # 第一天使用当天收盘价
-                    
-                    # 加密货币没有涨跌停限制，设置为0
-                    limit_ups = np.zeros_like(closes)
-                    limit_downs = np.zeros_like(closes)
-                    
-                    # 计算成交额 (volume * close)
-                    total_turnovers = volumes * closes
-                    
-                    # 创建符合RQAlpha标准的结构化数组
-                    # 字段顺序: datetime, open, close, high, low, prev_close, limit_up, limit_down, volume, total_turnover
-                    dtype = [('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('high', 'f8'), 
-                            ('low', 'f8'), ('prev_close', 'f8'), ('limit_up', 'f8'), ('limit_down', 'f8'),
-                            ('volume', 'f8'), ('total_turnover', 'f8')]
-                    
-                    data = np.array(list(zip(dates, opens, closes, highs, lows, prev_closes, 
-                                           limit_ups, limit_downs, volumes, total_turnovers)), dtype=dtype)
-                    
-                    h5.create_dataset(symbol, data=data)
-            except Exception as e:
-                system_log.error(f"Failed to generate data for {symbol}: {e}")
-                continue
+    return [s for s in get_binance_provider().get_all_symbols(futures=futures) if s.endswith('USDT')]
+
+
+def gen_crypto_spot_data(d, concurrency=1):
+    """生成加密货币现货数据 - 符合RQAlpha标准格式（近5年数据）"""
+    for _ in CryptoDayBarTask(_crypto_usdt_symbols(False), False, True, concurrency)(d):
+        pass
 
 
-def gen_crypto_futures_data(d):
+def gen_crypto_futures_data(d, concurrency=1):
     """生成加密货币期货数据 - 符合RQAlpha标准格式（近5年数据）"""
-    from rqalpha.data.binance_api import get_binance_provider
-    import pandas as pd
-    import numpy as np
-    
-    provider = get_binance_provider()
-    symbols = provider.get_all_symbols(futures=True)
-    
-    # 只获取主要交易对
-    major_symbols = [s for s in symbols if s.endswith('USDT')]  # 获取所有USDT交易对
-    
-    with h5py.File(os.path.join(d, 'crypto_futures.h5'), 'w') as h5:
-        for symbol in major_symbols:
-            try:
-                # 获取最近5年的数据（约1825天）
-                df = provider.api.get_klines(symbol, '1d', limit=1825, futures=True)
-                if not df.empty:
-                    # 提取数据
-                    dates = [convert_date_to_int(d.date()) for d in df['open_time']]
-                    opens = df['open'].values.astype(float)
-                    closes = df['close'].values.astype(float)
-                    highs = df['high'].values.astype(float)
-                    lows = df['low'].values.astype(float)
-                    volumes = df['volume'].values.astype(float)
-                    
-                    # 计算缺失字段
-                    prev_closes = np.roll(closes, 1)
-                    prev_closes[0] = closes[0]  # 第一天使用当天收盘价
-                    
-                    # 加密货币没有涨跌停限制，设置为0
-                    limit_ups = np.zeros_like(closes)
-                    limit_downs = np.zeros_like(closes)
-                    
-                    # 计算成交额 (volume * close)
-                    total_turnovers = volumes * closes
-                    
-                    # 期货特有字段
-                    settlements = closes  # 结算价使用收盘价
-                    prev_settlements = np.roll(settlements, 1)
-                    prev_settlements[0] = settlements[0]
-                    
-                    # 持仓量设置为0（加密货币期货数据中通常没有持仓量信息）
-                    open_interests = np.zeros_like(closes)
-                    
-                    # 创建符合RQAlpha标准的结构化数组
-                    # 字段顺序: datetime, open, close, high, low, prev_close, limit_up, limit_down, 
-                    #          volume, total_turnover, settlement, prev_settlement, open_interest
-                    dtype = [('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('high', 'f8'), 
-                            ('low', 'f8'), ('prev_close', 'f8'), ('limit_up', 'f8'), ('limit_down', 'f8'),
-                            ('volume', 'f8'), ('total_turnover', 'f8'), ('settlement', 'f8'), 
-                            ('prev_settlement', 'f8'), ('open_interest', 'f8')]
-                    
-                    data = np.array(list(zip(dates, opens, closes, highs, lows, prev_closes, 
-                                           limit_ups, limit_downs, volumes, total_turnovers,
-                                           settlements, prev_settlements, open_interests)), dtype=dtype)
-                    
-                    h5.create_dataset(symbol, data=data)
-            except Exception as e:
-                system_log.error(f"Failed to generate futures data for {symbol}: {e}")
-                continue
+    for _ in CryptoDayBarTask(_crypto_usdt_symbols(True), True, True, concurrency)(d):
+        pass
+
+
+def update_crypto_spot_data(d, concurrency=1):
+    """增量更新加密货币现货数据，只请求并追加每个交易对最后一根K线之后的数据"""
+    for _ in CryptoDayBarTask(_crypto_usdt_symbols(False), False, False, concurrency)(d):
+        pass
+
+
+def update_crypto_futures_data(d, concurrency=1):
+    """增量更新加密货币期货数据，只请求并追加每个交易对最后一根K线之后的数据"""
+    for _ in CryptoDayBarTask(_crypto_usdt_symbols(True), True, False, concurrency)(d):
+        pass
 
 
 def gen_future_info(d):
@@ -450,6 +357,77 @@ class GenerateFileTask(ProgressedTask):
         yield self._step
 
 
+class CryptoDayBarTask(ProgressedTask):
+    """
+    按交易对下载加密货币日线，每完成一个交易对推进一步进度
+
+    K线请求在 concurrency 个线程中并发执行，共享本进程内同一个 BinanceAPI 的连接池与权重限速器。
+    各任务在不同进程中运行，限速器不跨进程共享，进程间只通过响应头中按 IP 统计的已用权重校正剩余额度；
+    create 为 True 时重新生成整个文件，否则增量追加。
+    """
+
+    def __init__(self, symbols, futures, create, concurrency=1):
+        self._symbols = symbols
+        self._futures = futures
+        self._create = create
+        self._concurrency = concurrency
+
+    @property
+    def total_steps(self):
+        # type: () -> int
+        return len(self._symbols)
+
+    def __call__(self, d):
+        from rqalpha.data.binance_api import get_binance_provider
+        from rqalpha.data.crypto_data_source import CryptoDayBarStore, CryptoUpdateReport, iter_crypto_day_bar_updates
+
+        path = os.path.join(d, 'crypto_futures.h5' if self._futures else 'crypto_spot.h5')
+        if self._create:
+            h5py.File(path, 'w').close()
+        store = CryptoDayBarStore(path)
+        report = CryptoUpdateReport()
+        start_date = datetime.date.today() - datetime.timedelta(days=CRYPTO_HISTORY_DAYS)
+        for _ in iter_crypto_day_bar_updates(
+                store, get_binance_provider().api, self._symbols, self._futures, start_date, report=report,
+                concurrency=self._concurrency, create=self._create
+        ):
+            yield 1
+        system_log.info("{} updated: {}".format(os.path.basename(path), report))
+
+
+class CryptoMinuteBarTask(ProgressedTask):
+    """按交易对下载加密货币 1m 分钟线到按月分区的分钟线存储，每完成一个交易对推进一步进度"""
+
+    def __init__(self, symbols, futures, create, concurrency=1, days=CRYPTO_MINUTE_HISTORY_DAYS):
+        self._symbols = symbols
+        self._futures = futures
+        self._create = create
+        self._concurrency = concurrency
+        self._days = days
+
+    @property
+    def total_steps(self):
+        # type: () -> int
+        return len(self._symbols)
+
+    def __call__(self, d):
+        from rqalpha.data.binance_api import get_binance_provider
+        from rqalpha.data.crypto_data_source import CryptoUpdateReport, iter_crypto_minute_bar_updates
+        from rqalpha.data.crypto_minute_bar_store import CryptoMinuteBarStore
+
+        path = os.path.join(d, 'crypto_futures_1m' if self._futures else 'crypto_spot_1m')
+        if self._create and os.path.isdir(path):
+            shutil.rmtree(path)
+        report = CryptoUpdateReport()
+        start_date = datetime.date.today() - datetime.timedelta(days=self._days)
+        for _ in iter_crypto_minute_bar_updates(
+                CryptoMinuteBarStore(path), get_binance_provider().api, self._symbols, self._futures, start_date,
+                report=report, concurrency=self._concurrency
+        ):
+            yield 1
+        system_log.info("{} updated: {}".format(os.path.basename(path), report))
+
+
 STOCK_FIELDS = ['open', 'close', 'high', 'low', 'prev_close', 'limit_up', 'limit_down', 'volume', 'total_turnover']
 INDEX_FIELDS = ['open', 'close', 'high', 'low', 'prev_close', 'volume', 'total_turnover']
 FUTURES_FIELDS = STOCK_FIELDS + ['settlement', 'prev_settlement', 'open_interest']
@@ -591,20 +569,36 @@ def process_init(args: Optional[Synchronized] = None, kwargs = None):
         sval = args
 
 
-def update_crypto_bundle(path, create=True, enable_compression=False, concurrency=1, **kwargs):
-    """更新加密货币数据包"""
+def update_crypto_bundle(path, create=True, enable_compression=False, concurrency=1, minute_symbols=None,
+                         minute_days=CRYPTO_MINUTE_HISTORY_DAYS, **kwargs):
+    """
+    更新加密货币数据包
+
+    :param concurrency: 进程数；各K线任务均分 concurrency 作为各自的下载线程数
+    :param minute_symbols: 需要下载 1m 分钟线的交易对，默认不下载分钟线
+    :param minute_days: 尚无分钟线的交易对回溯下载的天数
+    """
     init_logger()
     
-    gen_crypto_funcs = (
-        gen_crypto_instruments, gen_crypto_trading_dates, gen_crypto_spot_data, gen_crypto_futures_data
-    )
-    
     succeed = multiprocessing.Value(c_bool, True)
     with ProgressedProcessPoolExecutor(
             max_workers=concurrency, initializer=process_init, initargs=(succeed, kwargs)
     ) as executor:
-        for func in gen_crypto_funcs:
+        for func in (gen_crypto_instruments, gen_crypto_trading_dates):
             executor.submit(GenerateFileTask(func), path)
+        day_symbols = {futures: _crypto_usdt_symbols(futures) for futures in (False, True)}
+        minute_symbols_of = {}
+        if minute_symbols:
+            for futures, symbols in day_symbols.items():
+                listed = set(symbols)
+                minute_symbols_of[futures] = [s for s in minute_symbols if s in listed]
+        # K线任务各占一个进程，按任务数均分 concurrency 作为各自的下载线程数，
+        # 同时在途的请求数不随进程数成倍增加
+        threads = max(concurrency // (len(day_symbols) + len(minute_symbols_of)), 1)
+        for futures, symbols in day_symbols.items():
+            executor.submit(CryptoDayBarTask(symbols, futures, create, threads), path)
+        for futures, symbols in minute_symbols_of.items():
+            executor.submit(CryptoMinuteBarTask(symbols, futures, create, threads, minute_days), path)
     
     return succeed.value
 
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+加密货币全市场日线面板
+将所有交易对的各字段按 日期 × 交易对 排列为稠密的二维浮点数组，横截面计算只需一次切片
+"""
+
+from typing import Dict, Iterable, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.utils.datetime_func import convert_date_to_int
+from rqalpha.utils.exception import RQInvalidArgument
+
+
+class CryptoBarPanel:
+    """
+    加密货币日线面板
+
+    数据存放于形如 (字段数, 日期数, 交易对数 + 1) 的 float64 数组中，每个字段对应其中一个二维切片；
+    最后一列恒为 NaN，用于承接面板中不存在的交易对。日期轴对齐 7x24 交易日历，
+    交易对上市前、数据缺失的日期均为 NaN。
+    """
+
+    FIELDS = ['open', 'close', 'high', 'low', 'prev_close', 'volume', 'total_turnover']
+    FUTURES_FIELDS = FIELDS + ['settlement', 'prev_settlement', 'open_interest']
+
+    def __init__(self, dates: np.ndarray, order_book_ids: Sequence[str], fields: Sequence[str], values: np.ndarray):
+        self._dates = dates
+        self._order_book_ids = list(order_book_ids)
+        self._fields = list(fields)
+        self._values = values
+        self._ob_index = {o: i for i, o in enumerate(self._order_book_ids)}
+        self._field_index = {f: i for i, f in enumerate(self._fields)}
+
+    @classmethod
+    def build(cls, bars_of: Dict[str, np.ndarray], calendar: pd.DatetimeIndex, fields: Sequence[str] = None):
+        # type: (Dict[str, np.ndarray], pd.DatetimeIndex, Sequence[str]) -> CryptoBarPanel
+        """
+        由各交易对的结构化日线数组构建面板
+
+        :param bars_of: order_book_id -> 日线结构化数组
+        :param calendar: 交易日历，面板日期轴取其与数据覆盖区间的交集
+        :param fields: 面板包含的字段，默认为 FIELDS
+        """
+        fields = list(fields or cls.FIELDS)
+        bars_of = {o: b for o, b in bars_of.items() if len(b) > 0 and b.dtype.names is not None}
+        dates = np.asarray(convert_date_to_int(calendar), dtype=np.int64)
+        if bars_of:
+            first = min(int(b['datetime'][0]) for b in bars_of.values())
+            last = max(int(b['datetime'][-1]) for b in bars_of.values())
+            dates = dates[dates.searchsorted(first):dates.searchsorted(last, side='right')]
+        else:
+            dates = dates[:0]
+
+        order_book_ids = sorted(bars_of)
+        values = np.full((len(fields), len(dates), len(order_book_ids) + 1), np.nan)
+        for j, order_book_id in enumerate(order_book_ids):
+            bars = bars_of[order_book_id]
+            bar_dates = bars['datetime'].astype(np.int64)
+            pos = dates.searchsorted(bar_dates)
+            matched = pos < len(dates)
+            matched[matched] = dates[pos[matched]] == bar_dates[matched]
+            pos = pos[matched]
+            for i, field in enumerate(fields):
+                if field in bars.dtype.names:
+                    values[i, pos, j] = bars[field][matched]
+        return cls(dates, order_book_ids, fields, values)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """面板日期轴，YYYYmmdd000000 形式的 int64 数组"""
+        return self._dates
+
+    @property
+    def order_book_ids(self) -> List[str]:
+        return self._order_book_ids
+
+    @property
+    def fields(self) -> List[str]:
+        return self._fields
+
+    def field(self, field: str) -> np.ndarray:
+        """获取单个字段的完整 日期 × 交易对 二维视图"""
+        try:
+            return self._values[self._field_index[field], :, :-1]
+        except KeyError:
+            raise RQInvalidArgument("invalid fields: {}".format(field))
+
+    def _columns(self, order_book_ids: Iterable[str]) -> np.ndarray:
+        missing = len(self._order_book_ids)
+        return np.fromiter((self._ob_index.get(o, missing) for o in order_book_ids), dtype=np.intp)
+
+    def _field_indexes(self, fields: Sequence[str]) -> List[int]:
+        try:
+            return [self._field_index[f] for f in fields]
+        except KeyError:
+            raise RQInvalidArgument("invalid fields: {}".format(fields))
+
+    def window(self, bar_count, dt=None):
+        # type: (int, Union[int, object]) -> slice
+        """截止到 dt（含）的 bar_count 个日期在日期轴上的切片，所有交易对共用"""
+        if dt is None:
+            i = len(self._dates)
+        else:
+            if not isinstance(dt, (int, np.integer)):
+                dt = convert_date_to_int(dt)
+            i = int(self._dates.searchsorted(dt, side='right'))
+        return slice(max(i - bar_count, 0), i)
+
+    def history_panel(self, order_book_ids, bar_count, fields=None, dt=None):
+        # type: (Sequence[str], int, Union[str, Sequence[str], None], Union[int, object]) -> np.ndarray
+        """
+        获取截止到 dt（含）的 bar_count 根日线
+
+        :param order_book_ids: 交易对列表，不在面板中的交易对返回全 NaN 列
+        :param bar_count: 日线数量，数据不足时返回的行数少于 bar_count
+        :param fields: 单个字段时返回形如 (bar_count, 交易对数) 的二维数组，
+            字段列表（默认为全部字段）时返回形如 (字段数, bar_count, 交易对数) 的三维数组
+        :param dt: 截止日期，默认为面板最后一天
+        """
+        rows = self.window(bar_count, dt)
+        left, i = rows.start, rows.stop
+        columns = self._columns(order_book_ids)
+        if isinstance(fields, str):
+            return self._values[self._field_indexes([fields])[0], left:i][:, columns]
+        field_indexes = self._field_indexes(self._fields if fields is None else fields)
+        return self._values[np.ix_(field_indexes, np.arange(left, i), columns)]
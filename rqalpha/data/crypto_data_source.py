@@ -6,9 +6,12 @@
 
 import os
 import pickle
+import shutil
+import weakref
 import h5py
 import numpy as np
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
 from typing import Dict, Iterable, List, Optional, Sequence, Union
 from itertools import groupby
@@ -16,11 +19,16 @@ from itertools import groupby
 from rqalpha.const import INSTRUMENT_TYPE, TRADING_CALENDAR_TYPE
 from rqalpha.interface import AbstractDataSource
 from rqalpha.model.instrument import Instrument
-from rqalpha.utils.datetime_func import convert_date_to_int, convert_int_to_date, convert_int_to_datetime
+from rqalpha.utils.datetime_func import (
+    convert_date_to_int, convert_dt_to_int, convert_epoch_ms_to_int, convert_int_to_date,
+    convert_int_to_epoch_ms
+)
 from rqalpha.utils.exception import RQInvalidArgument
-from rqalpha.utils.functools import lru_cache
+from rqalpha.utils.functools import cached_functions, lru_cache, nbytes_cache, nbytes_lru_cache
+from rqalpha.utils.logger import system_log
 from rqalpha.utils.typing import DateLike
 from rqalpha.environment import Environment
+from rqalpha.data.rolling_indicators import RollingIndicators
 from rqalpha.data.base_data_source.storage_interface import (
     AbstractCalendarStore, AbstractDateSet, AbstractDayBarStore, 
     AbstractDividendStore, AbstractInstrumentStore
@@ -28,14 +36,36 @@ from rqalpha.data.base_data_source.storage_interface import (
 from rqalpha.data.base_data_source.storages import (
     DateSet, DayBarStore, InstrumentStore, SimpleFactorStore
 )
-from rqalpha.data.binance_api import get_binance_provider
+from rqalpha.data.binance_api import (
+    KLINE_INTERVAL_MS, KLINES_PAGE_SIZE, fetch_streaming, get_binance_provider, iter_klines
+)
+from rqalpha.data.base_data_source.bundle_cache import with_bundle_cache
+from rqalpha.data.crypto_bar_panel import CryptoBarPanel
+from rqalpha.data.crypto_instrument_snapshot import (
+    SnapshotNotFoundError, read_instrument_snapshot, snapshot_to_instruments, write_instrument_snapshot
+)
+from rqalpha.data.crypto_minute_bar_store import CRYPTO_MINUTE_DTYPE, CryptoMinuteBarStore, crypto_minute_datetimes
+from rqalpha.data.crypto_resample import DAY_MS, parse_frequency, resample_bars
+from rqalpha.data.day_bar_index import DayBarIndex
 
 
 class CryptoDayBarStore(AbstractDayBarStore):
-    """加密货币日线数据存储"""
+    """
+    加密货币日线数据存储
+
+    keep_open 为 True 时，进程生命周期内只保留一个只读句柄；连续存储（未分块、未压缩）的数据集
+    会通过整个文件的内存映射直接返回零拷贝的只读 numpy 视图，其余数据集退化为一次读取。
+    已返回的视图仍映射着文件时，写入在文件副本上进行后再替换原文件，视图继续映射原来的文件内容，不会被改写。
+    """
     
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, keep_open: bool = False):
         self._file_path = file_path
+        self._keep_open = keep_open
+        self._h5 = None
+        self._mmap = None
+        # 指向最近一次建立的内存映射，映射仍存活说明仍有视图引用原文件
+        self._mmap_ref = None
+        self._stats = {"opens": 0, "mmaps": 0, "reads": 0, "views": 0, "copies": 0}
         self._ensure_file_exists()
     
     def _ensure_file_exists(self):
@@ -43,13 +73,100 @@ class CryptoDayBarStore(AbstractDayBarStore):
         if not os.path.exists(self._file_path):
             with h5py.File(self._file_path, 'w') as f:
                 pass  # 创建空文件
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        文件打开及读取计数：opens 为 h5 句柄打开次数，mmaps 为内存映射建立次数，
+        reads 为从 h5 拷贝读取数据集的次数，views 为返回零拷贝视图的次数，
+        copies 为写入时因仍有视图映射着文件而复制整个文件的次数
+        """
+        return dict(self._stats)
+
+    def _open(self):
+        self._stats["opens"] += 1
+        return h5py.File(self._file_path, 'r')
+
+    def _handle(self):
+        if self._h5 is None:
+            self._h5 = self._open()
+        return self._h5
+
+    def _view(self, dataset) -> Optional[np.ndarray]:
+        # 只有连续存储的数据集才能直接映射到文件中的一段字节
+        if dataset.chunks is not None or dataset.compression is not None or dataset.size == 0:
+            return None
+        offset = dataset.id.get_offset()
+        if offset is None:
+            return None
+        if self._mmap is None:
+            self._stats["mmaps"] += 1
+            self._mmap = np.memmap(self._file_path, dtype=np.uint8, mode='r')
+            self._mmap_ref = weakref.ref(self._mmap)
+        self._stats["views"] += 1
+        return np.ndarray(shape=dataset.shape, dtype=dataset.dtype, buffer=self._mmap, offset=offset)
+
+    def _read(self, dataset) -> np.ndarray:
+        self._stats["reads"] += 1
+        return dataset[:]
+
+    def close(self):
+        """关闭常驻句柄及内存映射，已返回的视图仍持有映射直至被回收"""
+        if self._h5 is not None:
+            self._h5.close()
+            self._h5 = None
+        self._mmap = None
+
+    def _views_alive(self) -> bool:
+        return self._mmap_ref is not None and self._mmap_ref() is not None
+
+    @contextmanager
+    def _writable(self):
+        """
+        以追加模式打开文件用于写入。HDF5 会复用删除数据集后释放的空间，若仍有视图映射着文件，原地写入会改写
+        调用方已持有的数据，因此此时复制一份文件写入后再以 os.replace 替换，旧视图继续映射原来的 inode。
+        """
+        self.close()
+        if not self._views_alive():
+            with h5py.File(self._file_path, 'a') as f:
+                yield f
+            return
+        tmp_path = self._file_path + '.write'
+        self._stats["copies"] += 1
+        shutil.copyfile(self._file_path, tmp_path)
+        try:
+            with h5py.File(tmp_path, 'a') as f:
+                yield f
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self._file_path)
+        # 新文件尚未被映射
+        self._mmap_ref = None
+
+    def get_order_book_ids(self) -> List[str]:
+        """获取文件中所有合约代码"""
+        try:
+            if self._keep_open:
+                return list(self._handle().keys())
+            with self._open() as f:
+                return list(f.keys())
+        except OSError:
+            return []
     
     def get_bars(self, order_book_id: str) -> np.ndarray:
         """获取指定合约的所有K线数据"""
         try:
-            with h5py.File(self._file_path, 'r') as f:
+            if self._keep_open:
+                h5 = self._handle()
+                if order_book_id not in h5:
+                    return np.array([])
+                dataset = h5[order_book_id]
+                bars = self._view(dataset)
+                return bars if bars is not None else self._read(dataset)
+            with self._open() as f:
                 if order_book_id in f:
-                    return f[order_book_id][:]
+                    return self._read(f[order_book_id])
                 else:
                     return np.array([])
         except (OSError, KeyError):
@@ -62,15 +179,280 @@ class CryptoDayBarStore(AbstractDayBarStore):
             return None, None
         return bars['datetime'][0], bars['datetime'][-1]
     
+    def get_tail(self, order_book_id: str, count: int) -> np.ndarray:
+        """获取指定合约最后 count 根K线，增量更新时据此确定起始日期而无需读取全部数据"""
+        try:
+            if self._keep_open:
+                h5 = self._handle()
+                return h5[order_book_id][-count:] if order_book_id in h5 else np.array([])
+            with self._open() as f:
+                return f[order_book_id][-count:] if order_book_id in f else np.array([])
+        except (OSError, KeyError, ValueError):
+            return np.array([])
+
+    def append_bars(self, order_book_id: str, bars: np.ndarray) -> int:
+        """
+        以追加方式写入K线，返回写入的字节数
+
+        数据集以可变长（分块、maxshape=None）方式存储；datetime 不早于 bars 首行的已有记录会被覆盖。
+        早期生成的定长连续数据集会在首次追加时一次性转换为可变长数据集。
+        """
+        if len(bars) == 0:
+            return 0
+        with self._writable() as f:
+            if order_book_id not in f:
+                f.create_dataset(order_book_id, data=bars, maxshape=(None,), chunks=True)
+                return bars.nbytes
+            dataset = f[order_book_id]
+            if dataset.maxshape[0] is not None:
+                data = dataset[:]
+                del f[order_book_id]
+                dataset = f.create_dataset(order_book_id, data=data, maxshape=(None,), chunks=True)
+            if bars.dtype != dataset.dtype:
+                bars = _cast_bars(bars, dataset.dtype)
+            pos = int(np.searchsorted(dataset['datetime'], bars['datetime'][0]))
+            dataset.resize((pos + len(bars),))
+            dataset[pos:] = bars
+            return bars.nbytes
+
+    def compact(self):
+        """将追加写入产生的分块数据集重写为连续存储，以便只读时以内存映射的方式访问"""
+        self.close()
+        if not os.path.exists(self._file_path):
+            return
+        with h5py.File(self._file_path, 'r') as f:
+            if all(f[k].chunks is None for k in f):
+                return
+        tmp_path = self._file_path + '.compact'
+        with h5py.File(self._file_path, 'r') as src, h5py.File(tmp_path, 'w') as dst:
+            for order_book_id in src:
+                dst.create_dataset(order_book_id, data=src[order_book_id][:])
+        os.replace(tmp_path, self._file_path)
+        self._mmap_ref = None
+
     def store_bars(self, order_book_id: str, bars: np.ndarray):
         """存储K线数据"""
-        with h5py.File(self._file_path, 'a') as f:
+        # 写入前释放只读句柄，下次读取时重新打开
+        with self._writable() as f:
             if order_book_id in f:
                 del f[order_book_id]
             if len(bars) > 0:
                 f.create_dataset(order_book_id, data=bars)
 
 
+def _cast_bars(bars: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """按字段名将K线转换为目标 dtype，缺失字段填 0"""
+    result = np.zeros(len(bars), dtype=dtype)
+    for name in dtype.names:
+        if name in bars.dtype.names:
+            result[name] = bars[name]
+    return result
+
+
+# 与 bundle 中 gen_crypto_spot_data/gen_crypto_futures_data 生成的数据格式一致
+CRYPTO_SPOT_DTYPE = np.dtype([
+    ('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('high', 'f8'), ('low', 'f8'), ('prev_close', 'f8'),
+    ('limit_up', 'f8'), ('limit_down', 'f8'), ('volume', 'f8'), ('total_turnover', 'f8')
+])
+CRYPTO_FUTURES_DTYPE = np.dtype(CRYPTO_SPOT_DTYPE.descr + [
+    ('settlement', 'f8'), ('prev_settlement', 'f8'), ('open_interest', 'f8')
+])
+
+class CryptoUpdateReport:
+    """
+    增量更新统计：api_calls_saved 为相对于全量重新下载同一区间所节省的请求数，
+    file_copies 为写入时因仍有视图映射着数据文件而复制整个文件的次数
+    """
+
+    def __init__(self):
+        self.symbols = 0
+        self.skipped = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.api_calls = 0
+        self.api_calls_saved = 0
+        self.file_copies = 0
+
+    def __repr__(self):
+        return "CryptoUpdateReport(symbols={}, skipped={}, rows_written={}, bytes_written={}, api_calls={}, " \
+               "api_calls_saved={}, file_copies={})".format(self.symbols, self.skipped, self.rows_written,
+                                                            self.bytes_written, self.api_calls,
+                                                            self.api_calls_saved, self.file_copies)
+
+
+def klines_to_bars(klines: np.ndarray, dtype: np.dtype, prev_bar: Optional[np.void] = None,
+                   offset_ms: int = 0) -> np.ndarray:
+    """
+    将 parse_klines 得到的 KLINE_DTYPE 数组以整列运算转换为 bundle 格式的结构化数组
+
+    datetime 由 open_time + offset_ms 计算为 YYYYmmddHHMMSS 整数，日线以开盘日期标记（offset_ms 为 0），
+    分钟线以收盘时刻标记（offset_ms 为周期长度）；prev_close/prev_settlement 为前一行的 close/settlement，
+    首行取自 prev_bar，无 prev_bar 时取当行的值。
+    """
+    bars = np.zeros(len(klines), dtype=dtype)
+    if len(klines) == 0:
+        return bars
+    bars['datetime'] = convert_epoch_ms_to_int(klines['open_time'] + offset_ms)
+    for field in ('open', 'close', 'high', 'low', 'volume'):
+        bars[field] = klines[field]
+    names = dtype.names
+    if 'total_turnover' in names:
+        bars['total_turnover'] = bars['volume'] * bars['close']
+    for field, source in (('prev_close', 'close'), ('settlement', None), ('prev_settlement', 'settlement')):
+        if field not in names:
+            continue
+        if source is None:
+            bars[field] = bars['close']
+            continue
+        bars[field][1:] = bars[source][:-1]
+        bars[field][0] = prev_bar[source] if prev_bar is not None and source in prev_bar.dtype.names \
+            else bars[source][0]
+    return bars
+
+
+def _to_ms(d: date) -> int:
+    return int(pd.Timestamp(d).value // 1000000)
+
+
+def iter_crypto_day_bar_updates(store: CryptoDayBarStore, api, symbols: Iterable[str], futures: bool,
+                                start_date: date, end_date: date = None, report: CryptoUpdateReport = None,
+                                concurrency: int = 1, create: bool = False, max_in_flight: int = 4) -> Iterable[str]:
+    """
+    增量更新日线数据：读取每个交易对已有的最后一根K线，只请求缺失区间并追加写入，每处理完一个交易对产出其代码
+
+    K线按 1000 根一页分页请求，每个交易对至多 max_in_flight 页同时在途，至多 concurrency 个交易对并发下载；
+    每页到达后即在调用方线程中追加写入 HDF5，内存中只保留尚未写入的若干页。
+
+    :param store: 日线存储
+    :param api: BinanceAPI 实例
+    :param symbols: 交易对列表
+    :param futures: 是否期货
+    :param start_date: 尚无数据的交易对的起始日期
+    :param end_date: 截止日期（含），默认为最近一个已收盘的 UTC 日
+    :param report: 累加统计结果的对象，默认新建
+    :param concurrency: 并发下载的交易对数
+    :param create: 为 True 时忽略已有数据，重新写入每个交易对；写入完毕后整理为连续存储
+    :param max_in_flight: 每个交易对同时请求的页数
+    """
+    report = report if report is not None else CryptoUpdateReport()
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    now_ms = int(now.value // 1000000)
+    last_closed = (now - pd.Timedelta(days=1)).date()
+    end_date = min(end_date or last_closed, last_closed)
+    full_calls = max(-(-((end_date - start_date).days + 1) // KLINES_PAGE_SIZE), 0)
+    default_dtype = CRYPTO_FUTURES_DTYPE if futures else CRYPTO_SPOT_DTYPE
+    end_ms = _to_ms(end_date + timedelta(days=1)) - 1
+
+    plans = {}
+    for symbol in symbols:
+        report.symbols += 1
+        tail = np.array([]) if create else store.get_tail(symbol, 2)
+        if len(tail) > 0:
+            # 从最后一天（含）开始请求，以便修正写入时尚未收盘的K线
+            start = convert_int_to_date(tail['datetime'][-1]).date()
+            if start >= end_date:
+                report.skipped += 1
+                report.api_calls_saved += full_calls
+                yield symbol
+                continue
+            plans[symbol] = (start, tail)
+        else:
+            plans[symbol] = (start_date, tail)
+
+    def pages(symbol):
+        return iter_klines(api, symbol, '1d', _to_ms(plans[symbol][0]), end_ms, futures, max_in_flight)
+
+    calls = {}
+    prev_bars = {}
+    failed = set()
+    copies = store.stats["copies"]
+    for symbol, klines, e in fetch_streaming(pages, list(plans), concurrency):
+        if e is not None:
+            system_log.error(f"Failed to update data for {symbol}: {e}")
+        if klines is None:
+            report.api_calls += calls.get(symbol, 0)
+            report.api_calls_saved += max(full_calls - calls.get(symbol, 0), 0)
+            yield symbol
+            continue
+        calls[symbol] = calls.get(symbol, 0) + 1
+        if symbol in failed:
+            continue
+        klines = klines[klines['close_time'] < now_ms]
+        if len(klines) == 0:
+            continue
+        try:
+            tail = plans[symbol][1]
+            dtype = tail.dtype if len(tail) > 0 else default_dtype
+            if symbol in prev_bars:
+                prev_bar = prev_bars[symbol]
+            elif len(tail) > 0:
+                overwrite_last = convert_epoch_ms_to_int(klines['open_time'][0]) == tail['datetime'][-1]
+                prev_bar = tail[-1] if not overwrite_last else (tail[-2] if len(tail) > 1 else None)
+            else:
+                prev_bar = None
+            bars = klines_to_bars(klines, dtype, prev_bar)
+            prev_bars[symbol] = bars[-1]
+            report.rows_written += len(bars)
+            report.bytes_written += store.append_bars(symbol, bars)
+        except Exception as e:
+            failed.add(symbol)
+            system_log.error(f"Failed to update data for {symbol}: {e}")
+    report.file_copies += store.stats["copies"] - copies
+    if create:
+        store.compact()
+
+
+def iter_crypto_minute_bar_updates(store: CryptoMinuteBarStore, api, symbols: Iterable[str], futures: bool,
+                                   start_date: date, report: CryptoUpdateReport = None, concurrency: int = 1,
+                                   max_in_flight: int = 4) -> Iterable[str]:
+    """
+    增量更新分钟线：自每个交易对最后一根分钟线之后（尚无数据时自 start_date 起）请求至今已收盘的分钟线，
+    逐页按月追加写入，每处理完一个交易对产出其代码
+
+    并发方式与 iter_crypto_day_bar_updates 相同。
+    """
+    report = report if report is not None else CryptoUpdateReport()
+    now_ms = int(pd.Timestamp.now(tz='UTC').value // 1000000)
+    minute_ms = KLINE_INTERVAL_MS['1m']
+    start_ms = {}
+    for symbol in symbols:
+        report.symbols += 1
+        last_dt = store.get_last_dt(symbol)
+        start_ms[symbol] = _to_ms(start_date) if last_dt is None else int(convert_int_to_epoch_ms(last_dt))
+
+    def pages(symbol):
+        return iter_klines(api, symbol, '1m', start_ms[symbol], now_ms - 1, futures, max_in_flight)
+
+    failed = set()
+    for symbol, klines, e in fetch_streaming(pages, list(start_ms), concurrency):
+        if e is not None:
+            system_log.error(f"Failed to update minute data for {symbol}: {e}")
+        if klines is None:
+            yield symbol
+            continue
+        report.api_calls += 1
+        klines = klines[klines['close_time'] < now_ms]
+        if symbol in failed or len(klines) == 0:
+            continue
+        try:
+            bars = klines_to_bars(klines, CRYPTO_MINUTE_DTYPE, offset_ms=minute_ms)
+            report.rows_written += len(bars)
+            report.bytes_written += store.append_bars(symbol, bars)
+        except Exception as e:
+            failed.add(symbol)
+            system_log.error(f"Failed to update minute data for {symbol}: {e}")
+
+
+def update_crypto_day_bars(store: CryptoDayBarStore, api, symbols: Iterable[str], futures: bool,
+                           start_date: date, end_date: date = None, report: CryptoUpdateReport = None,
+                           concurrency: int = 1) -> CryptoUpdateReport:
+    """增量更新日线数据并返回统计结果，参数同 iter_crypto_day_bar_updates"""
+    report = report if report is not None else CryptoUpdateReport()
+    for _ in iter_crypto_day_bar_updates(store, api, symbols, futures, start_date, end_date, report, concurrency):
+        pass
+    return report
+
+
 class CryptoTradingCalendarStore(AbstractCalendarStore):
     """加密货币交易日历存储（7x24小时）"""
     
@@ -94,8 +476,11 @@ class CryptoDataSource(AbstractDataSource):
     # 与RQAlpha标准格式保持一致
     CRYPTO_FIELDS = ['datetime', 'open', 'close', 'high', 'low', 'prev_close', 'volume', 'total_turnover']
     CRYPTO_FUTURES_FIELDS = CRYPTO_FIELDS + ['settlement', 'prev_settlement', 'open_interest']
+    # 每个 (合约, 频率) 缓存的已完成重采样K线的最大根数
+    RESAMPLE_CACHE_BARS = 4096
     
-    def __init__(self, path: str, api_key: str = None, secret_key: str = None, testnet: bool = False):
+    def __init__(self, path: str, api_key: str = None, secret_key: str = None, testnet: bool = False,
+                 fetch_missing_instruments: bool = False):
         """
         初始化加密货币数据源
         
@@ -104,6 +489,7 @@ class CryptoDataSource(AbstractDataSource):
             api_key: Binance API 密钥
             secret_key: Binance 密钥
             testnet: 是否使用测试网
+            fetch_missing_instruments: 数据包中没有合约快照时是否从 Binance 获取并写入快照，默认直接报错
         """
         # print(f"=== CryptoDataSource.__init__ 被调用 ===")
         # print(f"path: {path}")
@@ -114,10 +500,18 @@ class CryptoDataSource(AbstractDataSource):
         self._binance_provider = get_binance_provider(api_key, secret_key, testnet)
         
         # 初始化存储
+        # 存在 rqalpha bundle-cache start 建立的共享缓存时直接映射缓存，否则读取 h5
         self._day_bars = {
-            INSTRUMENT_TYPE.CRYPTO_SPOT: CryptoDayBarStore(os.path.join(path, 'crypto_spot.h5')),
-            INSTRUMENT_TYPE.CRYPTO_FUTURE: CryptoDayBarStore(os.path.join(path, 'crypto_futures.h5')),
+            ins_type: with_bundle_cache(CryptoDayBarStore(os.path.join(path, name), keep_open=True),
+                                        os.path.join(path, name))
+            for ins_type, name in ((INSTRUMENT_TYPE.CRYPTO_SPOT, 'crypto_spot.h5'),
+                                   (INSTRUMENT_TYPE.CRYPTO_FUTURE, 'crypto_futures.h5'))
         }
+        self._minute_bars = {
+            INSTRUMENT_TYPE.CRYPTO_SPOT: CryptoMinuteBarStore(os.path.join(path, 'crypto_spot_1m')),
+            INSTRUMENT_TYPE.CRYPTO_FUTURE: CryptoMinuteBarStore(os.path.join(path, 'crypto_futures_1m')),
+        }
+        self._fetch_missing_instruments = fetch_missing_instruments
         
         # 初始化合约信息
         self._instruments_stores = {}
@@ -137,23 +531,26 @@ class CryptoDataSource(AbstractDataSource):
         self._st_stock_days = DateSet(os.path.join(path, 'crypto_st_days.h5'))  # 空实现
     
     def _load_instruments(self):
-        """加载合约信息"""
-        instruments = []
-        
-        # 加载现货合约
-        spot_instruments = self._binance_provider.get_instruments_info(futures=False)
-        for info in spot_instruments:
-            info['type'] = INSTRUMENT_TYPE.CRYPTO_SPOT
-            instruments.append(Instrument(info))
-        
-        # 加载期货合约
-        futures_instruments = self._binance_provider.get_instruments_info(futures=True)
-        for info in futures_instruments:
-            info['type'] = INSTRUMENT_TYPE.CRYPTO_FUTURE
-            instruments.append(Instrument(info))
-        
-        # 注册合约存储
+        """
+        从数据包中的合约快照（由 update_crypto_bundle 生成）加载合约信息，启动时不访问网络，需要更新时重新运行
+        update_crypto_bundle；快照不存在时报错，显式传入 fetch_missing_instruments=True 时才从 Binance 获取并写入快照
+        """
+        snapshot = read_instrument_snapshot(self._path)
+        if snapshot is None:
+            if not self._fetch_missing_instruments:
+                raise SnapshotNotFoundError(
+                    "instrument snapshot not found in {}, please run update_crypto_bundle "
+                    "(rqalpha.data.bundle.update_crypto_bundle or scripts/download_crypto_data.py) to generate it, "
+                    "or pass fetch_missing_instruments=True to fetch instruments from Binance".format(self._path)
+                )
+            system_log.warning("instrument snapshot not found in {}, fetching instruments from Binance", self._path)
+            spot_infos = self._binance_provider.get_instruments_info(futures=False)
+            futures_infos = self._binance_provider.get_instruments_info(futures=True)
+            write_instrument_snapshot(self._path, spot_infos, futures_infos)
+            snapshot = read_instrument_snapshot(self._path)
+
         for ins_type in [INSTRUMENT_TYPE.CRYPTO_SPOT, INSTRUMENT_TYPE.CRYPTO_FUTURE]:
+            instruments = snapshot_to_instruments(snapshot[ins_type], ins_type)
             self.register_instruments_store(InstrumentStore(instruments, ins_type))
     
     def register_day_bar_store(self, instrument_type, store):
@@ -189,10 +586,8 @@ class CryptoDataSource(AbstractDataSource):
         return None
     
     def get_trading_minutes_for(self, order_book_id, trading_dt):
-        """获取交易分钟（加密货币7x24小时）"""
-        # 加密货币7x24小时交易，返回全天1440分钟
-        start_time = trading_dt.replace(hour=0, minute=0, second=0, microsecond=0)
-        return [start_time + timedelta(minutes=i) for i in range(1440)]
+        """获取交易分钟（加密货币7x24小时），全天 1440 根分钟线的收盘时刻，YYYYmmddHHMMSS 形式的 int64 数组"""
+        return crypto_minute_datetimes(convert_date_to_int(trading_dt))
     
     def get_trading_calendars(self):
         """获取交易日历"""
@@ -233,7 +628,7 @@ class CryptoDataSource(AbstractDataSource):
         if bar is None:
             return np.nan
         
-        return bar.get('close', np.nan)
+        return bar['close']
     
     def get_instruments(self, id_or_syms=None, types=None):
         """获取合约信息"""
@@ -333,36 +728,114 @@ class CryptoDataSource(AbstractDataSource):
         """是否ST股票（加密货币不需要）"""
         return [False] * len(dates)
     
-    @lru_cache(None)
+    @nbytes_lru_cache()
     def _all_day_bars_of(self, instrument):
         """获取合约的所有日线数据"""
         return self._day_bars[instrument.type].get_bars(instrument.order_book_id)
     
-    @lru_cache(None)
+    @nbytes_lru_cache()
+    def _day_bar_index(self, instrument):
+        return DayBarIndex(self._all_day_bars_of(instrument)['datetime'])
+
+    def _rolling_indicators(self, instrument):
+        # 中间结果在计算时计入共享的 nbytes_cache，与K线数组一同受 bar_cache_size_mb 限制
+        return RollingIndicators(self._all_day_bars_of(instrument), nbytes_cache, (self, instrument))
+
+    def get_rolling_indicator(self, instrument, name, window, frequency, dt, field='close'):
+        if frequency != '1d':
+            raise NotImplementedError
+        return self._rolling_indicators(instrument).value(name, window, convert_date_to_int(dt), field)
+
+    @nbytes_lru_cache()
     def _filtered_day_bars(self, instrument):
         """获取过滤后的日线数据"""
         bars = self._all_day_bars_of(instrument)
         return bars[bars['volume'] > 0]
     
+    @lru_cache(None)
+    def get_bar_panel(self, instrument_type=INSTRUMENT_TYPE.CRYPTO_SPOT):
+        # type: (INSTRUMENT_TYPE) -> CryptoBarPanel
+        """获取某类合约的全市场日线面板，首次调用时由数据文件一次性构建"""
+        store = self._day_bars[instrument_type]
+        if instrument_type == INSTRUMENT_TYPE.CRYPTO_FUTURE:
+            fields = CryptoBarPanel.FUTURES_FIELDS
+        else:
+            fields = CryptoBarPanel.FIELDS
+        bars_of = {o: store.get_bars(o) for o in store.get_order_book_ids()}
+        return CryptoBarPanel.build(bars_of, self.get_trading_calendar(TRADING_CALENDAR_TYPE.CRYPTO), fields)
+
+    def history_panel(self, order_book_ids, bar_count, fields, dt, instrument_type=INSTRUMENT_TYPE.CRYPTO_SPOT):
+        """
+        批量获取多个交易对的历史日线
+
+        单个字段返回 (bar_count, 交易对数) 的二维数组，字段列表返回 (字段数, bar_count, 交易对数) 的三维数组
+        """
+        return self.get_bar_panel(instrument_type).history_panel(order_book_ids, bar_count, fields, dt)
+
+    @staticmethod
+    def _parse_frequency(frequency):
+        """
+        解析 frequency 为 (周期毫秒数, 桶边界偏移毫秒数)
+
+        不足一天的频率（如 5m、4h）由 1m 分钟线重采样，整数天的频率（如 3d、1w）由日线重采样
+        """
+        period = parse_frequency(frequency)
+        if period is None or (period[0] > DAY_MS and period[0] % DAY_MS):
+            raise NotImplementedError("Unsupported frequency for crypto: {}".format(frequency))
+        return period
+
+    def history_bars_many(self, instruments, bar_count, frequency, fields, dt, skip_suspended=True,
+                          include_now=False, adjust_type='none', adjust_orig=None):
+        """
+        批量获取同类交易对的日线，直接切片全市场日线面板，所有交易对共用一次日期定位
+
+        其他频率、混合现货与期货或请求面板以外的字段（如 limit_up）时抛出 NotImplementedError，由 DataProxy 逐个获取
+        """
+        types = {ins.type for ins in instruments if ins is not None}
+        if frequency != '1d' or len(types) > 1:
+            raise NotImplementedError
+        panel = self.get_bar_panel(types.pop() if types else INSTRUMENT_TYPE.CRYPTO_SPOT)
+        requested = [fields] if isinstance(fields, str) else (fields or [])
+        if not set(requested) <= set(panel.fields):
+            raise NotImplementedError
+        rows = panel.window(bar_count, dt)
+        order_book_ids = [None if ins is None else ins.order_book_id for ins in instruments]
+        return panel.dates[rows], panel.history_panel(order_book_ids, bar_count, fields, dt)
+
     def get_bar(self, instrument, dt, frequency):
         """获取单根K线"""
-        if frequency != '1d':
-            raise NotImplementedError("Only daily bars are supported for crypto")
+        period_ms, offset_ms = self._parse_frequency(frequency)
+        if period_ms < DAY_MS:
+            return self._get_minute_bar(instrument, dt, period_ms, offset_ms)
+        if period_ms != DAY_MS:
+            raise NotImplementedError("Only daily and minute bars are supported for crypto")
         
         bars = self._all_day_bars_of(instrument)
         if len(bars) <= 0:
             return None
         
-        dt = np.uint64(convert_date_to_int(dt))
-        pos = bars['datetime'].searchsorted(dt)
-        if pos >= len(bars) or bars['datetime'][pos] != dt:
+        pos = self._day_bar_index(instrument).position(dt)
+        if pos < 0:
             return None
-        
-        bar = bars[pos]
-        # 转换为字典格式，与RQAlpha标准格式保持一致
-        bar_dict = {k: bar[k] if k in bar.dtype.names else np.nan for k in self.CRYPTO_FIELDS}
-        return bar_dict
+        # 直接返回结构化数组的一行（与缓存的数组共享内存），与 BaseDataSource 一致，不逐根转换为字典
+        return bars[pos]
     
+    def _get_minute_bar(self, instrument, dt, period_ms, offset_ms):
+        """获取以 dt 为收盘时刻的分钟级K线，dt 未对齐到该频率的周期时返回 None"""
+        store = self._minute_bars[instrument.type]
+        dt_int = convert_dt_to_int(dt)
+        if period_ms == 60000:
+            bars = store.get_bars(instrument.order_book_id, dt_int, dt_int)
+        else:
+            end_ms = int(convert_int_to_epoch_ms(dt_int))
+            if (end_ms - offset_ms) % period_ms:
+                return None
+            start_dt = int(convert_epoch_ms_to_int(end_ms - period_ms + 60000))
+            bars = resample_bars(store.get_bars(instrument.order_book_id, start_dt, dt_int), period_ms, offset_ms)
+        if len(bars) == 0 or bars['datetime'][-1] != dt_int:
+            return None
+        return bars[-1]
+
     def get_open_auction_bar(self, instrument, dt):
         """获取集合竞价数据（加密货币没有集合竞价）"""
         day_bar = self.get_bar(instrument, dt, "1d")
@@ -381,7 +854,7 @@ class CryptoDataSource(AbstractDataSource):
         bar = self.get_bar(instrument, date, '1d')
         if bar is None:
             return np.nan
-        return bar.get('settlement', bar['close'])
+        return bar['settlement'] if 'settlement' in bar.dtype.names else bar['close']
     
     def get_ex_cum_factor(self, order_book_id):
         """获取除权因子（加密货币不需要）"""
@@ -391,8 +864,9 @@ class CryptoDataSource(AbstractDataSource):
                      skip_suspended=True, include_now=False,
                      adjust_type='none', adjust_orig=None):
         """获取历史K线数据"""
-        if frequency not in ['1d', '1w']:
-            raise NotImplementedError("Only daily and weekly bars are supported for crypto")
+        period_ms, offset_ms = self._parse_frequency(frequency)
+        if period_ms < DAY_MS:
+            return self._history_minute_bars(instrument, bar_count, period_ms, offset_ms, fields, dt, include_now)
         
         # 加密货币不需要过滤停牌
         bars = self._all_day_bars_of(instrument)
@@ -410,49 +884,129 @@ class CryptoDataSource(AbstractDataSource):
         if len(bars) <= 0:
             return bars
         
-        # 周线重采样
-        if frequency == '1w':
-            return self._resample_week_bars(bars, bar_count, fields, dt, include_now)
+        # 多日/周线重采样
+        if period_ms > DAY_MS:
+            bars = self._history_multi_day_bars(instrument, bar_count, period_ms, offset_ms, dt, include_now)
+            return bars if fields is None else bars[fields]
         
         # 日线数据
-        dt = np.uint64(convert_date_to_int(dt))
-        i = bars['datetime'].searchsorted(dt, side='right')
+        i = self._day_bar_index(instrument).right(dt)
         left = i - bar_count if i >= bar_count else 0
         bars = bars[left:i]
         
         # 加密货币不需要复权
         return bars if fields is None else bars[fields]
     
-    def _resample_week_bars(self, bars, bar_count, fields, dt, include_now):
-        """重采样为周线数据"""
-        df_bars = pd.DataFrame(bars)
-        df_bars['datetime'] = df_bars.apply(lambda x: convert_int_to_datetime(x['datetime']), axis=1)
-        df_bars = df_bars.set_index('datetime')
-        
-        # 重采样规则
-        resample_rules = {
-            'open': 'first',
-            'close': 'last',
-            'high': 'max',
-            'low': 'min',
-            'volume': 'sum',
-            'total_turnover': 'sum'
-        }
-        
-        if fields and isinstance(fields, str):
-            fields = [fields]
-        
-        if fields:
-            resample_rules = {k: v for k, v in resample_rules.items() if k in fields}
-        
-        df_bars = df_bars.resample('W-Fri').agg(resample_rules)
-        df_bars = df_bars.dropna()
-        df_bars = df_bars[-bar_count:]
-        df_bars = df_bars.reset_index()
-        df_bars['datetime'] = df_bars.apply(lambda x: np.uint64(convert_date_to_int(x['datetime'].date())), axis=1)
-        
-        return df_bars.to_records()
-    
+    def _completed_bars(self, key, end, count, load):
+        """
+        标记不晚于 end 的最后 count 根已完成的重采样K线
+
+        已完成的K线按 key 缓存在 nbytes_cache 中，与K线数组一同受 bar_cache_size_mb 限制：end 落在缓存范围内时
+        直接切片，end 前移时只由 load(after, end, None) 读取并重采样 after 之后新完成的周期；
+        无可用缓存时由 load(None, end, count) 读取最后 count 根
+        """
+        key = (resample_bars, self) + key
+        cached = nbytes_cache.get(key)
+        if cached is not None and len(cached[0]) > 0:
+            bars, exhausted = cached
+            dts = bars['datetime']
+            if dts[0] <= end:
+                if end <= dts[-1]:
+                    i = dts.searchsorted(end, side='right')
+                    if i >= count or exhausted:
+                        return bars[max(i - count, 0):i]
+                else:
+                    bars = np.concatenate((bars, load(dts[-1], end, None)))
+                    if len(bars) >= count or exhausted:
+                        if len(bars) > max(count, self.RESAMPLE_CACHE_BARS):
+                            bars, exhausted = bars[-max(count, self.RESAMPLE_CACHE_BARS):], False
+                        nbytes_cache.put(key, (bars, exhausted), bars.nbytes)
+                        return bars[-count:]
+        bars = load(None, end, count)
+        # 不足 count 根说明已读到最早的数据，之后更多的 count 也无需重新读取
+        nbytes_cache.put(key, (bars, len(bars) < count), bars.nbytes)
+        return bars
+
+    def _history_minute_bars(self, instrument, bar_count, period_ms, offset_ms, fields, dt, include_now):
+        """
+        获取截止到 dt 的分钟级K线，只读取所需区间的 1m 分钟线
+
+        5m/15m/4h 等由 1m 分钟线重采样得到，并以周期结束时刻标记；dt 所在的周期尚未结束时，
+        仅在 include_now 为 True 时包含该周期已有分钟线聚合而成的K线。
+        已完成的周期会被缓存，重复调用只重新聚合尚未结束的周期
+        """
+        if not self._are_fields_valid(fields, CRYPTO_MINUTE_DTYPE.names):
+            raise RQInvalidArgument("invalid fields: {}".format(fields))
+        store = self._minute_bars[instrument.type]
+        order_book_id = instrument.order_book_id
+        dt_int = convert_dt_to_int(dt)
+        if period_ms == 60000:
+            bars = store.get_bars_before(order_book_id, dt_int, bar_count)
+            return bars if fields is None else bars[fields]
+
+        dt_ms = int(convert_int_to_epoch_ms(dt_int))
+        end_ms = (dt_ms - offset_ms) // period_ms * period_ms + offset_ms
+        end = int(convert_epoch_ms_to_int(end_ms))
+        forming = np.empty(0, dtype=CRYPTO_MINUTE_DTYPE)
+        if include_now and end_ms < dt_ms:
+            forming = resample_bars(store.get_bars(order_book_id, end + 1, dt_int), period_ms, offset_ms)
+
+        def load(after, end_dt, count):
+            if after is None:
+                # 多读一个周期的分钟线，使最早的一根K线是完整的
+                minutes = (count + 1) * (period_ms // 60000)
+                return resample_bars(store.get_bars_before(order_book_id, end_dt, minutes), period_ms, offset_ms)[-count:]
+            return resample_bars(store.get_bars(order_book_id, int(after) + 1, end_dt), period_ms, offset_ms)
+
+        key = (instrument.type, order_book_id, period_ms, offset_ms)
+        count = bar_count - len(forming)
+        bars = self._completed_bars(key, end, count, load) if count > 0 else forming[:0]
+        if len(forming):
+            bars = np.concatenate((bars, forming))
+        return bars if fields is None else bars[fields]
+
+    def _history_multi_day_bars(self, instrument, bar_count, period_ms, offset_ms, dt, include_now):
+        """
+        由日线重采样得到 3d、1w 等多日K线，与日线一致以周期第一天的日期标记，周线对齐到周一
+
+        dt 当天是所在周期的最后一天时该周期已完成；否则该周期仅在 include_now 为 True 时
+        以截止到 dt 的日线聚合后包含在结果中。已完成的周期会被缓存，重复调用只重新聚合尚未结束的周期
+        """
+        day_bars = self._all_day_bars_of(instrument)
+        dt_ms = int(convert_int_to_epoch_ms(convert_date_to_int(dt)))
+        start_ms = (dt_ms - offset_ms) // period_ms * period_ms + offset_ms
+        if dt_ms + DAY_MS >= start_ms + period_ms:
+            end_ms, forming = start_ms, day_bars[:0]
+        else:
+            end_ms = start_ms - period_ms
+            forming = day_bars[:0]
+            if include_now:
+                left = day_bars['datetime'].searchsorted(convert_epoch_ms_to_int(start_ms))
+                right = day_bars['datetime'].searchsorted(convert_epoch_ms_to_int(dt_ms), side='right')
+                forming = resample_bars(day_bars[left:right], period_ms, offset_ms, label='left')
+        days = period_ms // DAY_MS
+
+        def load(after, end_dt, count):
+            # 标记不晚于 end_dt 的周期，即开始于 end_dt 所在周期结束之前的日线
+            right = day_bars['datetime'].searchsorted(
+                convert_epoch_ms_to_int(int(convert_int_to_epoch_ms(end_dt)) + period_ms)
+            )
+            if after is None:
+                left = max(right - (count + 1) * days, 0)
+                return resample_bars(day_bars[left:right], period_ms, offset_ms, label='left')[-count:]
+            left = day_bars['datetime'].searchsorted(
+                convert_epoch_ms_to_int(int(convert_int_to_epoch_ms(after)) + period_ms)
+            )
+            return resample_bars(day_bars[left:right], period_ms, offset_ms, label='left')
+
+        key = (instrument.type, instrument.order_book_id, period_ms, offset_ms)
+        end = int(convert_epoch_ms_to_int(end_ms))
+        count = bar_count - len(forming)
+        bars = self._completed_bars(key, end, count, load) if count > 0 else forming[:0]
+        if len(forming):
+            bars = np.concatenate((bars, forming))
+        return bars
+
     @staticmethod
     def _are_fields_valid(fields, valid_fields):
         """验证字段是否有效"""
@@ -478,18 +1032,24 @@ class CryptoDataSource(AbstractDataSource):
     
     def available_data_range(self, frequency):
         """获取可用数据范围"""
+        period = parse_frequency(frequency)
+        if period is not None and period[0] < DAY_MS:
+            for store in self._minute_bars.values():
+                order_book_ids = store.get_order_book_ids()
+                if order_book_ids:
+                    start, end = store.get_date_range(order_book_ids[0])
+                    if start is not None:
+                        return convert_int_to_date(start).date(), convert_int_to_date(end).date()
+            return date.min, date.max
         if frequency in ['tick', '1d']:
             # 获取第一个合约的数据范围
             for store in self._day_bars.values():
                 try:
-                    # 直接检查H5文件中的数据集
-                    with h5py.File(store._file_path, 'r') as f:
-                        if len(f.keys()) > 0:
-                            first_symbol = list(f.keys())[0]
-                            date_range = store.get_date_range(first_symbol)
-                            if date_range:
-                                start, end = date_range
-                                return convert_int_to_date(start).date(), convert_int_to_date(end).date()
+                    order_book_ids = store.get_order_book_ids()
+                    if len(order_book_ids) > 0:
+                        start, end = store.get_date_range(order_book_ids[0])
+                        if start is not None:
+                            return convert_int_to_date(start).date(), convert_int_to_date(end).date()
                 except Exception as e:
                     print(f"Error getting date range: {e}")
                     continue
@@ -529,50 +1089,58 @@ class CryptoDataSource(AbstractDataSource):
         bar = self.get_open_auction_bar(instrument, dt)
         return bar.get('volume', 0)
     
-    def update_data(self, symbols: List[str] = None, start_date: date = None, end_date: date = None):
+    def update_data(self, symbols: List[str] = None, start_date: date = None,
+                    end_date: date = None) -> CryptoUpdateReport:
         """
-        更新数据
-        
+        增量更新数据：已有数据的交易对只请求并追加最后一根K线之后的数据
+
         Args:
             symbols: 要更新的交易对列表，None表示更新所有
-            start_date: 开始日期
+            start_date: 尚无数据的交易对的开始日期，默认为30天前
             end_date: 结束日期
+        
+        Returns:
+            CryptoUpdateReport: 写入字节数及节省的请求数等统计
         """
         if start_date is None:
             start_date = date.today() - timedelta(days=30)
-        if end_date is None:
-            end_date = date.today()
         
         if symbols is None:
-            # 获取所有交易对
             spot_symbols = self._binance_provider.get_all_symbols(futures=False)
             futures_symbols = self._binance_provider.get_all_symbols(futures=True)
-            symbols = spot_symbols + futures_symbols
+        else:
+            all_futures = set(self._binance_provider.get_all_symbols(futures=True))
+            futures_symbols = [s for s in symbols if s in all_futures]
+            spot_symbols = [s for s in symbols if s not in all_futures]
         
-        for symbol in symbols:
-            try:
-                # 确定合约类型
-                if symbol in self._binance_provider.get_all_symbols(futures=True):
-                    instrument_type = INSTRUMENT_TYPE.CRYPTO_FUTURE
-                    futures = True
-                else:
-                    instrument_type = INSTRUMENT_TYPE.CRYPTO_SPOT
-                    futures = False
-                
-                # 获取数据
-                df = self._binance_provider.get_price_data(
-                    symbol, start_date, end_date, futures=futures
-                )
-                
-                if not df.empty:
-                    # 转换为numpy数组
-                    df = df.reset_index()
-                    df['datetime'] = df['datetime'].apply(lambda x: convert_date_to_int(x.date()))
-                    bars = df.to_records()
-                    
-                    # 存储数据
-                    self._day_bars[instrument_type].store_bars(symbol, bars)
-                    
-            except Exception as e:
-                print(f"Failed to update data for {symbol}: {e}")
-                continue
+        # 写入前释放缓存中引用数据文件的视图，使写入在原文件上进行，无需复制整个文件；
+        # 更新后这些缓存也已过期，之后按需重新读取
+        self._clear_day_bar_caches()
+        report = CryptoUpdateReport()
+        for instrument_type, futures, type_symbols in (
+                (INSTRUMENT_TYPE.CRYPTO_SPOT, False, spot_symbols),
+                (INSTRUMENT_TYPE.CRYPTO_FUTURE, True, futures_symbols)
+        ):
+            update_crypto_day_bars(self._day_bars[instrument_type], self._binance_provider.api, type_symbols, futures,
+                                   start_date, end_date, report)
+        return report
+
+    def _clear_day_bar_caches(self):
+        # cache_clear 只清除各自函数的条目，由日线派生的缓存需逐一清除
+        self._all_day_bars_of.cache_clear()
+        self._day_bar_index.cache_clear()
+        nbytes_cache.discard(RollingIndicators)
+        self._filtered_day_bars.cache_clear()
+        self.get_bar_panel.cache_clear()
+        # 已完成的多日/周线及 exhausted 标记同样基于更新前的日线
+        nbytes_cache.discard(resample_bars)
+
+
+def _clear_resampled_bars():
+    # 已完成的重采样K线以 (resample_bars, 数据源, ...) 为键放入 nbytes_cache，与函数缓存一同在每次回测前清空，
+    # 避免持有上一次回测的数据源
+    nbytes_cache.discard(resample_bars)
+
+
+_clear_resampled_bars.cache_clear = _clear_resampled_bars
+cached_functions.append(_clear_resampled_bars)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+加密货币合约信息快照
+由 update_crypto_bundle 从 Binance exchangeInfo 生成，与 crypto_spot.h5 放在同一目录；CryptoDataSource 启动时
+直接读取快照，不访问网络。文件为 h5，现货、期货各一个定长的结构化数组数据集，根节点的 version 属性为格式版本。
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import h5py
+import numpy as np
+
+from rqalpha.const import INSTRUMENT_TYPE
+from rqalpha.model.instrument import Instrument
+
+SNAPSHOT_FILE = 'crypto_instruments.h5'
+SNAPSHOT_VERSION = 1
+
+# 日期为 YYYYmmdd 形式的整数，de_listed_date 为 0 表示未退市（永续合约、现货）
+INSTRUMENT_SNAPSHOT_DTYPE = np.dtype([
+    ('order_book_id', 'S32'), ('underlying_symbol', 'S16'), ('quote_currency', 'S16'),
+    ('tick_size', 'f8'), ('lot_size', 'f8'), ('min_qty', 'f8'), ('min_notional', 'f8'),
+    ('contract_multiplier', 'f8'), ('listed_date', 'i4'), ('de_listed_date', 'i4'),
+])
+
+_DATASETS = {INSTRUMENT_TYPE.CRYPTO_SPOT: 'spot', INSTRUMENT_TYPE.CRYPTO_FUTURE: 'futures'}
+_EXCHANGES = {INSTRUMENT_TYPE.CRYPTO_SPOT: 'BINANCE', INSTRUMENT_TYPE.CRYPTO_FUTURE: 'BINANCE_FUTURES'}
+
+
+class SnapshotVersionError(RuntimeError):
+    pass
+
+
+class SnapshotNotFoundError(RuntimeError):
+    pass
+
+
+def _date_to_int(dt):
+    # type: (Optional[datetime]) -> int
+    return 0 if dt is None else dt.year * 10000 + dt.month * 100 + dt.day
+
+
+def _int_to_date(value):
+    # type: (int) -> Optional[datetime]
+    return None if value == 0 else datetime(value // 10000, value // 100 % 100, value % 100)
+
+
+def to_snapshot_array(infos):
+    # type: (Iterable[Dict]) -> np.ndarray
+    """将 BinanceDataProvider.get_instruments_info 返回的合约信息转为快照的结构化数组"""
+    infos = list(infos)
+    arr = np.zeros(len(infos), dtype=INSTRUMENT_SNAPSHOT_DTYPE)
+    for i, info in enumerate(infos):
+        arr[i] = (
+            info['order_book_id'].encode(), info.get('underlying_symbol', '').encode(),
+            info.get('quote_currency', '').encode(), info.get('tick_size', 0.01), info.get('lot_size', 1),
+            info.get('min_qty', 0), info.get('min_notional', 0), info.get('contract_multiplier', 1),
+            _date_to_int(info.get('listed_date')), _date_to_int(info.get('de_listed_date')),
+        )
+    return arr
+
+
+def write_instrument_snapshot(path, spot_infos, futures_infos):
+    # type: (str, Iterable[Dict], Iterable[Dict]) -> str
+    """写入 path 目录下的快照，先写临时文件再替换，读取方不会看到写了一半的文件"""
+    file_path = os.path.join(path, SNAPSHOT_FILE)
+    tmp_path = '{}.{}.tmp'.format(file_path, os.getpid())
+    with h5py.File(tmp_path, 'w') as h5:
+        h5.attrs['version'] = SNAPSHOT_VERSION
+        h5.attrs['created_at'] = int(time.time())
+        h5.create_dataset(_DATASETS[INSTRUMENT_TYPE.CRYPTO_SPOT], data=to_snapshot_array(spot_infos))
+        h5.create_dataset(_DATASETS[INSTRUMENT_TYPE.CRYPTO_FUTURE], data=to_snapshot_array(futures_infos))
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def read_instrument_snapshot(path):
+    # type: (str) -> Optional[Dict[INSTRUMENT_TYPE, np.ndarray]]
+    """读取 path 目录下的快照，不存在时返回 None，版本不符时抛出 SnapshotVersionError"""
+    file_path = os.path.join(path, SNAPSHOT_FILE)
+    if not os.path.exists(file_path):
+        return None
+    with h5py.File(file_path, 'r') as h5:
+        version = int(h5.attrs.get('version', 0))
+        if version != SNAPSHOT_VERSION:
+            raise SnapshotVersionError(
+                "instrument snapshot {} has version {}, expected {}, please run update_crypto_bundle to "
+                "regenerate it".format(file_path, version, SNAPSHOT_VERSION)
+            )
+        return {ins_type: h5[name][:] for ins_type, name in _DATASETS.items() if name in h5}
+
+
+def snapshot_to_instruments(arr, instrument_type):
+    # type: (np.ndarray, INSTRUMENT_TYPE) -> List[Instrument]
+    exchange = _EXCHANGES[instrument_type]
+    instruments = []
+    for row in arr.tolist():
+        order_book_id = row[0].decode()
+        instruments.append(Instrument({
+            'order_book_id': order_book_id,
+            'symbol': order_book_id,
+            'type': instrument_type,
+            'exchange': exchange,
+            'underlying_symbol': row[1].decode(),
+            'quote_currency': row[2].decode(),
+            'tick_size': row[3],
+            'lot_size': row[4],
+            'min_qty': row[5],
+            'min_notional': row[6],
+            'contract_multiplier': row[7],
+            'round_lot': 1,
+            'listed_date': _int_to_date(row[8]),
+            'de_listed_date': _int_to_date(row[9]),
+        }))
+    return instruments
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+加密货币分钟线存储
+按月分区：目录下每个月一个 YYYYmm.h5 文件，文件内每个交易对一个分块压缩的可变长数据集
+"""
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import h5py
+import numpy as np
+
+from rqalpha.utils.datetime_func import convert_epoch_ms_to_int, convert_int_to_epoch_ms
+from rqalpha.utils.functools import lru_cache
+
+# 分钟线以收盘时刻标记，如 datetime 为 20240101000100 的K线对应 00:00:00 - 00:01:00
+CRYPTO_MINUTE_DTYPE = np.dtype([
+    ('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('high', 'f8'), ('low', 'f8'),
+    ('volume', 'f8'), ('total_turnover', 'f8')
+])
+
+# 一天 1440 根分钟线的收盘时刻（00:01 至次日 00:00）相对当天零点的毫秒偏移
+CRYPTO_MINUTE_CLOSE_MS = np.arange(1, 24 * 60 + 1, dtype=np.int64) * 60000
+
+_MONTH_FILE = re.compile(r'^(\d{6})\.h5$')
+
+
+def crypto_minute_datetimes(date_int: int) -> np.ndarray:
+    """date_int（YYYYmmdd000000）当天 1440 根分钟线的 datetime，以收盘时刻标记，最后一根为次日 000000"""
+    return convert_epoch_ms_to_int(int(convert_int_to_epoch_ms(date_int)) + CRYPTO_MINUTE_CLOSE_MS)
+
+
+def _month_of(dt_int):
+    return dt_int // 100000000
+
+
+class CryptoMinuteBarStore:
+    """
+    加密货币分钟线存储
+
+    读取时只打开与查询区间有交集的月份文件，并以各月 datetime 列定位后按切片读取，不加载整个数据集。
+    各月的 datetime 列读取后缓存，写入时清空。
+    """
+
+    # 每块一天的分钟线；lzf 解压远快于 gzip，适合回测中的频繁切片读取
+    CHUNK_ROWS = 1440
+    COMPRESSION = 'lzf'
+
+    def __init__(self, path: str):
+        self._path = path
+        self._handles = {}  # type: Dict[int, h5py.File]
+
+    @property
+    def path(self):
+        return self._path
+
+    @lru_cache(None)
+    def months(self) -> Tuple[int, ...]:
+        """已有数据的月份，YYYYmm 形式的整数，升序"""
+        if not os.path.isdir(self._path):
+            return ()
+        return tuple(sorted(int(m.group(1)) for m in map(_MONTH_FILE.match, os.listdir(self._path)) if m))
+
+    def _file_path(self, month: int) -> str:
+        return os.path.join(self._path, '{}.h5'.format(month))
+
+    def _handle(self, month: int) -> Optional[h5py.File]:
+        h5 = self._handles.get(month)
+        if h5 is None:
+            try:
+                h5 = self._handles[month] = h5py.File(self._file_path(month), 'r')
+            except OSError:
+                return None
+        return h5
+
+    def close(self):
+        for h5 in self._handles.values():
+            h5.close()
+        self._handles.clear()
+        self._datetimes.cache_clear()
+        self.months.cache_clear()
+
+    @lru_cache(None)
+    def _datetimes(self, order_book_id: str, month: int) -> np.ndarray:
+        h5 = self._handle(month)
+        if h5 is None or order_book_id not in h5:
+            return np.empty(0, dtype=np.int64)
+        return h5[order_book_id].fields('datetime')[:]
+
+    def _slice(self, order_book_id: str, month: int, start: int, stop: int) -> np.ndarray:
+        return self._handle(month)[order_book_id][start:stop]
+
+    def get_order_book_ids(self) -> List[str]:
+        months = self.months()
+        if not months:
+            return []
+        h5 = self._handle(months[-1])
+        return list(h5.keys()) if h5 is not None else []
+
+    def get_bars(self, order_book_id: str, start_dt: int = None, end_dt: int = None) -> np.ndarray:
+        """获取 [start_dt, end_dt] 区间（含两端）的分钟线，参数为 YYYYmmddHHMMSS 形式的整数，缺省为不限"""
+        parts = []
+        for month in self.months():
+            if start_dt is not None and month < _month_of(start_dt):
+                continue
+            if end_dt is not None and month > _month_of(end_dt):
+                break
+            dts = self._datetimes(order_book_id, month)
+            if len(dts) == 0:
+                continue
+            left = 0 if start_dt is None else dts.searchsorted(start_dt)
+            right = len(dts) if end_dt is None else dts.searchsorted(end_dt, side='right')
+            if left < right:
+                parts.append(self._slice(order_book_id, month, left, right))
+        if not parts:
+            return np.empty(0, dtype=CRYPTO_MINUTE_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def get_bars_before(self, order_book_id: str, end_dt: int, count: int) -> np.ndarray:
+        """获取截止到 end_dt（含）的最后 count 根分钟线，由最近的月份向前读取"""
+        parts = []
+        remaining = count
+        for month in reversed(self.months()):
+            if remaining <= 0:
+                break
+            if month > _month_of(end_dt):
+                continue
+            dts = self._datetimes(order_book_id, month)
+            right = dts.searchsorted(end_dt, side='right')
+            left = max(right - remaining, 0)
+            if left < right:
+                parts.append(self._slice(order_book_id, month, left, right))
+                remaining -= right - left
+        if not parts:
+            return np.empty(0, dtype=CRYPTO_MINUTE_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts[::-1])
+
+    def get_last_dt(self, order_book_id: str) -> Optional[int]:
+        """最后一根分钟线的 datetime，无数据时返回 None"""
+        for month in reversed(self.months()):
+            dts = self._datetimes(order_book_id, month)
+            if len(dts) > 0:
+                return int(dts[-1])
+        return None
+
+    def get_date_range(self, order_book_id: str):
+        first = None
+        for month in self.months():
+            dts = self._datetimes(order_book_id, month)
+            if len(dts) > 0:
+                first = int(dts[0])
+                break
+        return first, self.get_last_dt(order_book_id)
+
+    def append_bars(self, order_book_id: str, bars: np.ndarray) -> int:
+        """
+        按月追加写入分钟线，返回写入的字节数
+
+        datetime 不早于 bars 首行的已有记录会被覆盖，bars 须按 datetime 升序排列
+        """
+        if len(bars) == 0:
+            return 0
+        self.close()
+        os.makedirs(self._path, exist_ok=True)
+        if bars.dtype != CRYPTO_MINUTE_DTYPE:
+            converted = np.zeros(len(bars), dtype=CRYPTO_MINUTE_DTYPE)
+            for name in CRYPTO_MINUTE_DTYPE.names:
+                if name in bars.dtype.names:
+                    converted[name] = bars[name]
+            bars = converted
+        months = _month_of(bars['datetime'])
+        bounds = np.flatnonzero(np.diff(months)) + 1
+        first = True
+        for part in np.split(bars, bounds):
+            with h5py.File(self._file_path(int(_month_of(part['datetime'][0]))), 'a') as f:
+                if order_book_id not in f:
+                    f.create_dataset(order_book_id, data=part, maxshape=(None,), chunks=(self.CHUNK_ROWS,),
+                                     compression=self.COMPRESSION)
+                    first = False
+                    continue
+                dataset = f[order_book_id]
+                # 只有首个月份可能与已有数据重叠，之后的月份从头覆盖
+                pos = int(np.searchsorted(dataset.fields('datetime')[:], part['datetime'][0])) if first else 0
+                dataset.resize((pos + len(part),))
+                dataset[pos:] = part
+                first = False
+        return bars.nbytes
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+加密货币K线重采样
+以 np.*.reduceat 对按时间排序的结构化K线数组整列聚合，不经过 DataFrame
+"""
+
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+
+from rqalpha.utils.datetime_func import convert_epoch_ms_to_int, convert_int_to_epoch_ms
+
+# 各字段的聚合方式，未列出的字段取桶内最后一根K线的值
+FIRST_FIELDS = ('open', 'prev_close', 'prev_settlement')
+MAX_FIELDS = ('high', 'limit_up')
+MIN_FIELDS = ('low', 'limit_down')
+SUM_FIELDS = ('volume', 'total_turnover')
+
+DAY_MS = 86400000
+# 1970-01-01 为周四，周线以 UTC 周一零点为边界，相对纪元偏移 4 天
+WEEK_OFFSET_MS = 4 * DAY_MS
+
+_FREQUENCY_PATTERN = re.compile(r'^(\d+)([mhdw])$')
+_FREQUENCY_UNIT_MS = {'m': 60000, 'h': 3600000, 'd': DAY_MS, 'w': 7 * DAY_MS}
+
+
+def parse_frequency(frequency: str) -> Optional[Tuple[int, int]]:
+    """
+    将 '5m'、'4h'、'3d'、'1w' 形式的频率解析为 (周期毫秒数, 桶边界相对 UTC 纪元的偏移毫秒数)，无法识别时返回 None
+
+    与币安K线一致，N 天的周期自 1970-01-01 起对齐，周线对齐到周一
+    """
+    m = _FREQUENCY_PATTERN.match(frequency)
+    if m is None or int(m.group(1)) <= 0:
+        return None
+    unit = m.group(2)
+    return int(m.group(1)) * _FREQUENCY_UNIT_MS[unit], WEEK_OFFSET_MS if unit == 'w' else 0
+
+
+def bucket_ends(datetimes: np.ndarray, period_ms: int, offset_ms: int = 0) -> np.ndarray:
+    """
+    计算以收盘时刻标记的K线所属桶的结束时刻（毫秒时间戳）
+
+    桶为 (end - period_ms, end]，end 对齐到 offset_ms + k * period_ms
+    """
+    ms = convert_int_to_epoch_ms(datetimes)
+    return -((offset_ms - ms) // period_ms) * period_ms + offset_ms
+
+
+def bucket_starts(datetimes: np.ndarray, period_ms: int, offset_ms: int = 0) -> np.ndarray:
+    """
+    计算以开盘时刻标记的K线（如日线）所属桶的开始时刻（毫秒时间戳）
+
+    桶为 [start, start + period_ms)，start 对齐到 offset_ms + k * period_ms
+    """
+    ms = convert_int_to_epoch_ms(datetimes)
+    return (ms - offset_ms) // period_ms * period_ms + offset_ms
+
+
+def resample_bars(bars: np.ndarray, period_ms: int, offset_ms: int = 0, label: str = 'right') -> np.ndarray:
+    """
+    将K线重采样为更长周期的K线
+
+    :param bars: 按 datetime 升序排列的结构化数组，datetime 为 YYYYmmddHHMMSS 形式的整数
+    :param period_ms: 目标周期（毫秒）
+    :param offset_ms: 桶边界相对 UTC 纪元的偏移（毫秒）
+    :param label: 'right' 表示K线以收盘时刻标记（如分钟线），结果以桶的结束时刻标记；
+                  'left' 表示K线以开盘时刻标记（如日线），结果以桶的开始时刻标记
+    """
+    if len(bars) == 0:
+        return bars[:0]
+    if label == 'left':
+        labels = bucket_starts(bars['datetime'], period_ms, offset_ms)
+    else:
+        labels = bucket_ends(bars['datetime'], period_ms, offset_ms)
+    starts = np.flatnonzero(np.diff(labels)) + 1
+    starts = np.concatenate(([0], starts))
+    lasts = np.concatenate((starts[1:], [len(bars)])) - 1
+
+    result = np.empty(len(starts), dtype=bars.dtype)
+    for name in bars.dtype.names:
+        column = bars[name]
+        if name == 'datetime':
+            result[name] = convert_epoch_ms_to_int(labels[starts])
+        elif name in FIRST_FIELDS:
+            result[name] = column[starts]
+        elif name in MAX_FIELDS:
+            result[name] = np.maximum.reduceat(column, starts)
+        elif name in MIN_FIELDS:
+            result[name] = np.minimum.reduceat(column, starts)
+        elif name in SUM_FIELDS:
+            result[name] = np.add.reduceat(column, starts)
+        else:
+            result[name] = column[lasts]
+    return result
@@ -29,6 +29,7 @@ from rqalpha.model.bar import BarObject, NANDict, PartialBarObject
 from rqalpha.model.tick import TickObject
 from rqalpha.model.instrument import Instrument
 from rqalpha.model.order import ALGO_ORDER_STYLES
+from rqalpha.utils.exception import RQInvalidArgument
 from rqalpha.utils.functools import lru_cache
 from rqalpha.utils.datetime_func import convert_int_to_datetime, convert_date_to_int
 from rqalpha.utils.typing import DateLike, StrOrIter
@@ -51,6 +52,10 @@ class DataProxy(TradingDatesMixin):
     def __getattr__(self, item):
         return getattr(self._data_source, item)
 
+    def set_price_board(self, price_board):
+        # type: (AbstractPriceBoard) -> None
+        self._price_board = price_board
+
     def get_trading_minutes_for(self, order_book_id, dt):
         instrument = self.instruments(order_book_id)
         minutes = self._data_source.get_trading_minutes_for(instrument, dt)
@@ -169,11 +174,18 @@ class DataProxy(TradingDatesMixin):
         instrument = self.instruments(order_book_id)
         if dt is None:
             return BarObject(instrument, NANDict, dt)
-        bar = self._data_source.get_bar(instrument, dt, frequency)
-        if bar:
+        bar = self.get_bar_data(instrument, dt, frequency)
+        if bar is not None:
             return BarObject(instrument, bar)
         return BarObject(instrument, NANDict, dt)
 
+    def get_bar_data(self, instrument, dt, frequency='1d'):
+        # type: (Instrument, Union[datetime, date], str) -> Optional[Union[np.void, dict]]
+        """
+        获取单根K线的原始数据，通常为数据源缓存的结构化数组中的一行，不构造 BarObject；无数据时返回 None
+        """
+        return self._data_source.get_bar(instrument, dt, frequency)
+
     def get_open_auction_bar(self, order_book_id, dt):
         instrument = self.instruments(order_book_id)
         try:
@@ -212,6 +224,99 @@ class DataProxy(TradingDatesMixin):
                                               skip_suspended=skip_suspended, include_now=include_now,
                                               adjust_type=adjust_type, adjust_orig=adjust_orig)
 
+    def get_rolling_indicator(self, order_book_id, name, window, frequency, dt, field='close'):
+        # type: (str, str, int, str, datetime, str) -> float
+        """
+        截止到 dt 的滚动指标，优先使用数据源预先计算的结果（O(1)），数据源不支持时由 fast_history 的结果计算
+        """
+        instrument = self.instruments(order_book_id)
+        try:
+            return self._data_source.get_rolling_indicator(instrument, name, window, frequency, dt, field)
+        except NotImplementedError:
+            pass
+        if name == 'vwap':
+            bars = self.fast_history(order_book_id, window, frequency, [field, 'volume'], dt)
+            volume = bars['volume'].sum()
+            # 全部停牌
+            return np.dot(bars[field], bars['volume']) / volume if volume != 0 else 0
+        if name == 'ema':
+            # 更早的K线权重不足 e^-20，可忽略
+            values = self.fast_history(order_book_id, window * 10, frequency, field, dt)
+            return pd.Series(values).ewm(span=window, adjust=False).mean().iloc[-1] if len(values) else np.nan
+        values = self.fast_history(order_book_id, window, frequency, field, dt)
+        if len(values) == 0:
+            return np.nan
+        if name == 'mavg':
+            return values.mean()
+        if name == 'std':
+            return values.std()
+        if name == 'max':
+            return values.max()
+        if name == 'min':
+            return values.min()
+        raise RQInvalidArgument("invalid indicator: {}".format(name))
+
+    def history_bars_many(self, order_book_ids, bar_count, frequency, fields, dt,
+                          skip_suspended=True, include_now=False,
+                          adjust_type='pre', adjust_orig=None):
+        # type: (Sequence[str], int, str, Union[str, Sequence[str]], datetime, bool, bool, str, Optional[datetime]) -> Union[np.ndarray, pd.DataFrame]
+        """
+        批量获取多个合约的历史数据，按时间对齐，无数据处为 NaN
+
+        fields 为单个字段时返回形如 (行数, 合约数) 的二维数组；为字段列表时返回以 datetime 为索引、
+        (字段, order_book_id) 为列的 DataFrame
+        """
+        order_book_ids = list(order_book_ids)
+        instruments = {}
+        for ins in self.instruments(order_book_ids):
+            instruments[ins.order_book_id] = ins
+            instruments.setdefault(ins.symbol, ins)
+        instruments = [instruments.get(o) for o in order_book_ids]
+        value_fields = [fields] if isinstance(fields, str) else [f for f in fields if f != 'datetime']
+        if adjust_orig is None:
+            adjust_orig = dt
+        try:
+            datetimes, values = self._data_source.history_bars_many(
+                instruments, bar_count, frequency, value_fields, dt, skip_suspended=skip_suspended,
+                include_now=include_now, adjust_type=adjust_type, adjust_orig=adjust_orig
+            )
+        except NotImplementedError:
+            datetimes, values = self._history_bars_by_instrument(
+                instruments, bar_count, frequency, value_fields, dt, skip_suspended=skip_suspended,
+                include_now=include_now, adjust_type=adjust_type, adjust_orig=adjust_orig
+            )
+        if isinstance(fields, str):
+            return values[0]
+        columns = pd.MultiIndex.from_product([value_fields, order_book_ids])
+        index = pd.DatetimeIndex([convert_int_to_datetime(d) for d in datetimes], name='datetime')
+        return pd.DataFrame(values.transpose(1, 0, 2).reshape(len(datetimes), -1), index=index, columns=columns)
+
+    def _history_bars_by_instrument(self, instruments, bar_count, frequency, fields, dt, **kwargs):
+        all_bars = []
+        for ins in instruments:
+            bars = None if ins is None else self._data_source.history_bars(
+                ins, bar_count, frequency, ['datetime'] + fields, dt, **kwargs
+            )
+            all_bars.append(bars if bars is not None and len(bars) else None)
+        dts = [bars['datetime'] for bars in all_bars if bars is not None]
+        if not dts:
+            return np.empty(0, dtype=np.int64), np.full((len(fields), 0, len(instruments)), np.nan)
+        # 各合约的时间轴一致时（如 7x24 交易的加密货币）直接共用，否则取并集的最后 bar_count 个时间点
+        if all(len(d) == len(dts[0]) and (d == dts[0]).all() for d in dts[1:]):
+            datetimes = dts[0].astype(np.int64)
+        else:
+            datetimes = np.unique(np.concatenate(dts).astype(np.int64))[-bar_count:]
+        values = np.full((len(fields), len(datetimes), len(instruments)), np.nan)
+        for j, bars in enumerate(all_bars):
+            if bars is None:
+                continue
+            pos = datetimes.searchsorted(bars['datetime'].astype(np.int64))
+            matched = pos < len(datetimes)
+            matched[matched] = datetimes[pos[matched]] == bars['datetime'][matched]
+            for i, field in enumerate(fields):
+                values[i, pos[matched], j] = bars[field][matched]
+        return datetimes, values
+
     def history_ticks(self, order_book_id, count, dt):
         instrument = self.instruments(order_book_id)
         return self._data_source.history_ticks(instrument, count, dt)
@@ -233,7 +338,7 @@ class DataProxy(TradingDatesMixin):
         instrument = self.instruments(order_book_id)
         if frequency == '1d':
             bar = self._data_source.get_bar(instrument, dt, '1d')
-            if not bar:
+            if bar is None:
                 return None
             d = {k: bar[k] for k in tick_fields_for(instrument) if k in bar.dtype.names}
             d["last"] = bar["open"] if ExecutionContext.phase() == EXECUTION_PHASE.OPEN_AUCTION else bar["close"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+日线的日期 -> 行号索引
+以公历序数（date.toordinal()）定位日线所在的行，替代逐次 convert_date_to_int + searchsorted
+"""
+
+from datetime import date
+from typing import Union
+
+import numpy as np
+
+# 1970-01-01 的 date.toordinal()
+EPOCH_ORDINAL = 719163
+
+
+def date_ordinals(datetimes: np.ndarray) -> np.ndarray:
+    """将 YYYYmmddHHMMSS 形式的整数数组转换为 date.toordinal() 形式的日期序数"""
+    date_int = np.asarray(datetimes).astype(np.int64) // 1000000
+    year, r = np.divmod(date_int, 10000)
+    month, day = np.divmod(r, 100)
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    return months.astype('datetime64[D]').astype(np.int64) + day - 1 + EPOCH_ORDINAL
+
+
+class DayBarIndex:
+    """
+    单个合约日线的行号索引，所有查询均为 O(1)
+
+    连续无缺口的序列（如 7x24 交易的加密货币）行号即为日期序数与首根K线的差；存在缺口的序列（如股票的
+    交易日、停牌）使用 int32 的查找表，第 k 项为日期序数不大于 first + k 的K线数量，每个自然日 4 字节。
+    要求日线按日期升序且每天至多一根。
+    """
+
+    __slots__ = ("_first", "_length", "_counts")
+
+    def __init__(self, datetimes: np.ndarray):
+        self._length = len(datetimes)
+        self._counts = None
+        if self._length == 0:
+            self._first = 0
+            return
+        ordinals = date_ordinals(datetimes)
+        self._first = int(ordinals[0])
+        span = int(ordinals[-1]) - self._first + 1
+        if span != self._length:
+            counts = np.zeros(span, dtype=np.int32)
+            counts[ordinals - self._first] = 1
+            self._counts = np.cumsum(counts, dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return 0 if self._counts is None else self._counts.nbytes
+
+    @property
+    def gap_free(self):
+        return self._counts is None
+
+    def right(self, dt: Union[date, int]) -> int:
+        """日期不晚于 dt 的K线数量，等价于 searchsorted(dt, side='right')；dt 可为 date/datetime 或日期序数"""
+        k = (dt if isinstance(dt, int) else dt.toordinal()) - self._first
+        if k < 0:
+            return 0
+        if self._counts is None:
+            return k + 1 if k < self._length else self._length
+        return self._counts.item(k) if k < len(self._counts) else self._length
+
+    def left(self, dt: Union[date, int]) -> int:
+        """日期早于 dt 的K线数量，等价于 searchsorted(dt, side='left')"""
+        return self.right((dt if isinstance(dt, int) else dt.toordinal()) - 1)
+
+    def position(self, dt: Union[date, int]) -> int:
+        """dt 当天K线所在的行，当天没有K线时返回 -1"""
+        ordinal = dt if isinstance(dt, int) else dt.toordinal()
+        k = ordinal - self._first
+        if k < 0:
+            return -1
+        if self._counts is None:
+            return k if k < self._length else -1
+        if k >= len(self._counts):
+            return -1
+        right = self._counts.item(k)
+        if k > 0 and self._counts.item(k - 1) == right:
+            return -1
+        return right - 1
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+滚动指标
+对单个合约的一条K线序列预先计算前缀和、稀疏表等中间结果，此后任意截止时间、任意窗口的
+均线、VWAP、标准差、最高/最低值查询均为 O(1)；EMA 按周期整列计算一次后同样为 O(1) 查询
+"""
+
+from typing import Dict, Hashable, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.utils.exception import RQInvalidArgument
+from rqalpha.utils.functools import NBytesLRUCache, cached_functions, nbytes_cache
+
+INDICATORS = ('mavg', 'vwap', 'std', 'max', 'min', 'ema')
+
+
+def _nbytes(array):
+    return sum(a.nbytes for a in array) if isinstance(array, tuple) else array.nbytes
+
+
+def _prefix_sum(values: np.ndarray) -> np.ndarray:
+    result = np.empty(len(values) + 1, dtype=np.float64)
+    result[0] = 0
+    np.cumsum(values, out=result[1:])
+    return result
+
+
+class RollingIndicators:
+    """
+    单个合约一条K线序列上的滚动指标
+
+    窗口为截止到 dt（含）的最后 window 根K线，窗口内存在 NaN 时结果为 NaN，与对 history_bars 的结果
+    直接计算一致。std 为总体标准差（ddof=0）；ema 为 span=window、adjust=False 的指数移动平均，
+    使用截止到 dt 的全部历史。
+
+    传入 cache 时，前缀和、稀疏表等中间结果在首次计算时以 (RollingIndicators, *key, 结果名) 为键放入该缓存并计入
+    其字节数，可与K线数组一同被淘汰，淘汰后按需重新计算；不传入时保存在对象自身
+    """
+
+    def __init__(self, bars: np.ndarray, cache: Optional[NBytesLRUCache] = None, key: Tuple[Hashable, ...] = ()):
+        self._datetimes = bars['datetime']
+        self._bars = bars
+        self._cache = cache
+        self._key = (RollingIndicators, ) + tuple(key)
+        self._arrays = {}  # type: Dict[Tuple, Union[np.ndarray, Tuple[np.ndarray, ...]]]
+
+    @property
+    def nbytes(self):
+        """保存在对象自身的中间结果的字节数"""
+        return sum(_nbytes(v) for v in self._arrays.values())
+
+    def _array(self, key, func):
+        if self._cache is None:
+            array = self._arrays.get(key)
+            if array is None:
+                array = self._arrays[key] = func()
+            return array
+        cache_key = self._key + key
+        array = self._cache.get(cache_key)
+        if array is None:
+            array = func()
+            self._cache.put(cache_key, array, _nbytes(array))
+        return array
+
+    def _values(self, field):
+        return self._bars[field].astype(np.float64)
+
+    def _nan_count(self, field):
+        return self._array(('nan', field), lambda: _prefix_sum(np.isnan(self._values(field))))
+
+    def _sum(self, field):
+        return self._array(('sum', field), lambda: _prefix_sum(np.nan_to_num(self._values(field))))
+
+    def _shifted(self, field):
+        # 平方和以首个有效值为基准，减小大数相减带来的精度损失
+        values = self._values(field)
+        valid = values[~np.isnan(values)]
+        return np.nan_to_num(values - (valid[0] if len(valid) else 0))
+
+    def _shifted_sums(self, field):
+        def build():
+            shifted = self._shifted(field)
+            return np.stack((_prefix_sum(shifted), _prefix_sum(shifted * shifted)))
+        return self._array(('shifted', field), build)
+
+    def _turnover_sum(self, field):
+        return self._array(('turnover', field), lambda: _prefix_sum(
+            np.nan_to_num(self._values(field) * self._values('volume'))
+        ))
+
+    def _sparse_table(self, field, func):
+        # 第 k 层为长度 2**k 的各窗口的最值，任意窗口由两个可重叠的 2**k 窗口合并得到
+        def build():
+            levels = [self._values(field)]
+            width = 1
+            while width * 2 <= len(levels[0]):
+                prev = levels[-1]
+                levels.append(func(prev[:len(prev) - width], prev[width:]))
+                width *= 2
+            return np.concatenate(levels), np.cumsum([0] + [len(level) for level in levels])
+        return self._array(('sparse', field, func.__name__), build)
+
+    def _ema(self, field, window):
+        return self._array(('ema', field, window), lambda: pd.Series(self._values(field)).ewm(
+            span=window, adjust=False
+        ).mean().values)
+
+    def position(self, dt: int) -> int:
+        """截止到 dt（含）的K线数量"""
+        return int(self._datetimes.searchsorted(dt, side='right'))
+
+    def value(self, name: str, window: int, dt: int, field: str = 'close') -> float:
+        """
+        :param name: 指标名，见 INDICATORS
+        :param window: 窗口长度（K线根数），对 ema 为周期
+        :param dt: 截止时间，与K线 datetime 同为 YYYYmmddHHMMSS 形式的整数
+        :param field: 计算所用的字段，vwap 另外使用 volume 字段
+        """
+        if name not in INDICATORS:
+            raise RQInvalidArgument("invalid indicator: {}".format(name))
+        if field not in self._bars.dtype.names:
+            raise RQInvalidArgument("invalid fields: {}".format(field))
+        right = self.position(dt)
+        left = max(right - window, 0)
+        if right == left:
+            return np.nan
+        if name == 'ema':
+            return float(self._ema(field, window)[right - 1])
+
+        nan_count = self._nan_count(field)
+        if nan_count[right] != nan_count[left]:
+            return np.nan
+        n = right - left
+        if name == 'mavg':
+            total = self._sum(field)
+            return (total[right] - total[left]) / n
+        if name == 'vwap':
+            nan_volume = self._nan_count('volume')
+            if nan_volume[right] != nan_volume[left]:
+                return np.nan
+            volume = self._sum('volume')
+            total_volume = volume[right] - volume[left]
+            if total_volume == 0:
+                # 全部停牌
+                return 0
+            turnover = self._turnover_sum(field)
+            return (turnover[right] - turnover[left]) / total_volume
+        if name == 'std':
+            if n == 1:
+                return 0.
+            # 前缀和相减的精度约为 1e-16 * 价格 ** 2 * 序列长度，方差接近 0 时结果会有微小误差
+            s1, s2 = self._shifted_sums(field)
+            mean = (s1[right] - s1[left]) / n
+            return float(np.sqrt(max((s2[right] - s2[left]) / n - mean * mean, 0)))
+        # max / min
+        flat, offsets = self._sparse_table(field, np.maximum if name == 'max' else np.minimum)
+        k = n.bit_length() - 1
+        level = flat[offsets[k]:offsets[k + 1]]
+        a, b = level[left], level[right - (1 << k)]
+        return float(max(a, b) if name == 'max' else min(a, b))
+
+
+def clear_cached_tables():
+    """
+    删除 nbytes_cache 中的滚动指标中间结果。数据源以 (数据源, 合约) 作为键的一部分，
+    与 lru_cache 装饰的函数一同在每次回测前清空，避免累积并持有上一次回测的数据源
+    """
+    nbytes_cache.discard(RollingIndicators)
+
+
+clear_cached_tables.cache_clear = clear_cached_tables
+cached_functions.append(clear_cached_tables)
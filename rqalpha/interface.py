@@ -17,7 +17,7 @@
 
 import abc
 from datetime import datetime, date
-from typing import Any, Union, Optional, Iterable, Dict, List, Sequence, TYPE_CHECKING
+from typing import Any, Union, Optional, Iterable, Dict, List, Sequence, Tuple, TYPE_CHECKING
 if TYPE_CHECKING:
     from rqalpha.portfolio.account import Account
 
@@ -30,7 +30,7 @@ from rqalpha.model.tick import TickObject
 from rqalpha.model.order import Order
 from rqalpha.model.trade import Trade
 from rqalpha.model.instrument import Instrument
-from rqalpha.const import POSITION_DIRECTION, TRADING_CALENDAR_TYPE, INSTRUMENT_TYPE, SIDE
+from rqalpha.const import POSITION_DIRECTION, POSITION_EFFECT, TRADING_CALENDAR_TYPE, INSTRUMENT_TYPE, SIDE
 
 
 class AbstractPosition(with_metaclass(abc.ABCMeta)):
@@ -417,6 +417,35 @@ class AbstractDataSource(object):
         """
         raise NotImplementedError
 
+    def history_bars_many(self, instruments, bar_count, frequency, fields, dt, skip_suspended=True,
+                          include_now=False, adjust_type='pre', adjust_orig=None):
+        """
+        批量获取多个合约的历史数据，未实现时 :class:`DataProxy` 会逐个调用 history_bars
+
+        :param instruments: 合约对象列表，不存在的合约为 None
+        :param list fields: 返回数据字段，不含 datetime
+        其余参数同 history_bars
+
+        :return: (datetimes, values)，datetimes 为各行的 int64 时间戳，
+            values 为形如 (字段数, 行数, 合约数) 的 float64 数组，无数据处为 NaN
+        """
+        raise NotImplementedError
+
+    def get_rolling_indicator(self, instrument, name, window, frequency, dt, field='close'):
+        """
+        获取截止到 dt 的滚动指标，未实现时 :class:`DataProxy` 由 history_bars 的结果直接计算
+
+        :param instrument: 合约对象
+        :param str name: 指标名，'mavg', 'vwap', 'std', 'max', 'min', 'ema' 之一
+        :param int window: 窗口长度（K线根数），对 ema 为周期
+        :param str frequency: 周期频率
+        :param datetime.datetime dt: 时间
+        :param str field: 计算所用的字段
+
+        :return: `float`
+        """
+        raise NotImplementedError
+
     def history_ticks(self, instrument, count, dt):
         # type: (Instrument, int, datetime) -> List[TickObject]
         """
@@ -555,6 +584,25 @@ class AbstractBroker(with_metaclass(abc.ABCMeta)):
         """
         raise NotImplementedError
 
+    def get_frozen_quantity(self, order_book_id, direction):
+        # type: (str, POSITION_DIRECTION) -> Tuple[float, float]
+        """
+        [Optional]
+
+        某标的某持仓方向上未完成的平仓订单冻结的数量，供 Position.closable 等使用。
+
+        :return: (平仓、平今及行权订单的未成交数量之和, 平今订单的未成交数量之和)
+        """
+        close = close_today = 0
+        for order in self.get_open_orders(order_book_id):
+            if order.position_direction != direction:
+                continue
+            if order.position_effect in (POSITION_EFFECT.CLOSE, POSITION_EFFECT.CLOSE_TODAY, POSITION_EFFECT.EXERCISE):
+                close += order.unfilled_quantity
+            if order.position_effect == POSITION_EFFECT.CLOSE_TODAY:
+                close_today += order.unfilled_quantity
+        return close, close_today
+
 
 class AbstractMod(with_metaclass(abc.ABCMeta)):
     """
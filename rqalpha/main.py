@@ -22,6 +22,7 @@ from itertools import chain
 
 import jsonpickle.ext.numpy as jsonpickle_numpy
 import logbook
+import pandas as pd
 import six
 from rqalpha import const
 from rqalpha.core.executor import Executor
@@ -38,6 +39,7 @@ from rqalpha.mod import ModHandler
 from rqalpha.model.bar import BarMap
 from rqalpha.utils import RqAttrDict, create_custom_exception, init_rqdatac_env
 from rqalpha.utils.exception import CustomException, is_user_exc, patch_user_exc
+from rqalpha.utils.functools import set_nbytes_cache_limit
 from rqalpha.utils.i18n import gettext as _
 from rqalpha.utils.log_capture import LogCapture
 from rqalpha.utils.logger import release_print, system_log, user_log, user_system_log
@@ -130,9 +132,34 @@ def init_rqdatac(rqdatac_uri):
             return
 
 
+def create_data_source(config):
+    # 检查是否使用加密货币数据源
+    # 如果数据包路径包含crypto或者账户类型包含CRYPTO，则使用CryptoDataSource
+    use_crypto_ds = (
+        'crypto' in config.base.data_bundle_path.lower() or
+        const.DEFAULT_ACCOUNT_TYPE.CRYPTO in config.base.accounts or
+        'CRYPTO' in config.base.accounts
+    )
+
+    system_log.debug("data source: {} ({})".format(
+        "CryptoDataSource" if use_crypto_ds else "BaseDataSource", config.base.data_bundle_path
+    ))
+    if use_crypto_ds:
+        from rqalpha.data.crypto_data_source import CryptoDataSource
+        return CryptoDataSource(config.base.data_bundle_path)
+    else:
+        return BaseDataSource(
+            config.base.data_bundle_path,
+            getattr(config.base, "future_info", {}),
+            const.DEFAULT_ACCOUNT_TYPE.FUTURE in config.base.accounts and config.base.futures_time_series_trading_parameters,
+            config.base.end_date
+        )
+
+
 def run(config, source_code=None, user_funcs=None):
     env = Environment(config, init_rqdatac(getattr(config.base, 'rqdatac_uri', None)))
     persist_helper = None
+    event_loop_profiler = None
     init_succeed = False
     mod_handler = ModHandler()
 
@@ -147,34 +174,19 @@ def run(config, source_code=None, user_funcs=None):
         mod_handler.start_up()
 
         if not env.data_source:
-            # 检查是否使用加密货币数据源
-            # 如果数据包路径包含crypto或者账户类型包含CRYPTO，则使用CryptoDataSource
-            use_crypto_ds = (
-                'crypto' in config.base.data_bundle_path.lower() or
-                const.DEFAULT_ACCOUNT_TYPE.CRYPTO in config.base.accounts or
-                'CRYPTO' in config.base.accounts
-            )
-            
-            print(f"DEBUG main.py: data_bundle_path = {config.base.data_bundle_path}")
-            print(f"DEBUG main.py: accounts = {config.base.accounts}")
-            print(f"DEBUG main.py: use_crypto_ds = {use_crypto_ds}")
-            
-            if use_crypto_ds:
-                print("DEBUG main.py: Using CryptoDataSource")
-                from rqalpha.data.crypto_data_source import CryptoDataSource
-                env.set_data_source(CryptoDataSource(config.base.data_bundle_path))
-            else:
-                print("DEBUG main.py: Using BaseDataSource")
-                env.set_data_source(BaseDataSource(
-                    config.base.data_bundle_path, 
-                    getattr(config.base, "future_info", {}),
-                    const.DEFAULT_ACCOUNT_TYPE.FUTURE in config.base.accounts and config.base.futures_time_series_trading_parameters,
-                    config.base.end_date
-                ))
+            env.set_data_source(create_data_source(config))
         if env.price_board is None:
             from rqalpha.data.bar_dict_price_board import BarDictPriceBoard
             env.price_board = BarDictPriceBoard()
-        env.set_data_proxy(DataProxy(env.data_source, env.price_board))
+        if env.data_proxy is None:
+            env.set_data_proxy(DataProxy(env.data_source, env.price_board))
+        else:
+            # mod 注入了已预热的 DataProxy（如 walk-forward 的各窗口共用一个），换上本次回测的 price_board
+            env.data_proxy.set_price_board(env.price_board)
+        if getattr(config.extra, "enable_event_loop_profiler", False):
+            event_loop_profiler = enable_event_loop_profiler(env, config)
+        bar_cache_size_mb = getattr(config.base, "bar_cache_size_mb", None)
+        set_nbytes_cache_limit(None if bar_cache_size_mb is None else int(bar_cache_size_mb * 1024 * 1024))
 
         _adjust_start_date(env.config, env.data_proxy)
 
@@ -204,6 +216,8 @@ def run(config, source_code=None, user_funcs=None):
 
         if config.extra.enable_profiler:
             enable_profiler(env, scope)
+        if getattr(config.extra, "enable_event_stats", False):
+            env.event_bus.enable_stats()
 
         ucontext = StrategyContext()
         executor = Executor(env)
@@ -248,6 +262,10 @@ def run(config, source_code=None, user_funcs=None):
 
         if env.profile_deco:
             output_profile_result(env)
+        if getattr(config.extra, "enable_event_stats", False):
+            output_event_stats(env)
+        if event_loop_profiler:
+            output_event_loop_profiler_result(event_loop_profiler)
         release_print(scope)
     except CustomException as e:
         if init_succeed and persist_helper and env.config.base.persist_mode == const.PERSIST_MODE.ON_CRASH:
@@ -269,6 +287,9 @@ def run(config, source_code=None, user_funcs=None):
         result = mod_handler.tear_down(const.EXIT_CODE.EXIT_SUCCESS)
         system_log.debug(_(u"strategy run successfully, normal exit"))
         return result
+    finally:
+        if event_loop_profiler:
+            event_loop_profiler.uninstall()
 
 
 def _exception_handler(e):
@@ -314,6 +335,32 @@ def output_profile_result(env):
     env.event_bus.publish_event(Event(EVENT.ON_LINE_PROFILER_RESULT, result=profile_output))
 
 
+def enable_event_loop_profiler(env, config):
+    from rqalpha.utils.event_loop_profiler import EventLoopProfiler
+    trace_date = getattr(config.extra, "profiler_trace_date", None)
+    if trace_date is not None:
+        trace_date = pd.Timestamp(trace_date).date()
+    profiler = EventLoopProfiler(trace_date, getattr(config.extra, "profiler_trace_file", None))
+    profiler.install(env)
+    return profiler
+
+
+def output_event_loop_profiler_result(profiler):
+    six.print_(profiler.report())
+    trace_file = profiler.dump_trace()
+    if trace_file:
+        six.print_("chrome trace of one trading day written to {}".format(trace_file))
+
+
+def output_event_stats(env):
+    lines = ["{:<28}{:>12}{:>14}{:>14}".format("event", "count", "total(s)", "per call(us)")]
+    for event_type, count, seconds in env.event_bus.dispatch_stats():
+        lines.append("{:<28}{:>12}{:>14.3f}{:>14.2f}".format(
+            getattr(event_type, "name", str(event_type)), count, seconds, seconds / count * 1e6
+        ))
+    six.print_("\n".join(lines))
+
+
 def set_loggers(config):
     from rqalpha.utils.logger import user_log, user_system_log, system_log
     from rqalpha.utils.logger import init_logger
@@ -445,3 +445,39 @@ def order(order_book_id, quantity, price_or_style=None, price=None, style=None):
     if result_order:
         return [result_order]
     return []
+
+
+@export_as_api
+@ExecutionContext.enforce_phase(EXECUTION_PHASE.BEFORE_TRADING,
+                                EXECUTION_PHASE.OPEN_AUCTION,
+                                EXECUTION_PHASE.ON_BAR,
+                                EXECUTION_PHASE.ON_TICK,
+                                EXECUTION_PHASE.AFTER_TRADING,
+                                EXECUTION_PHASE.SCHEDULED)
+@apply_rules(verify_that("bar_count").is_instance_of(int).is_greater_than(0),
+             verify_that("fields").are_valid_fields(
+                 ["open", "close", "high", "low", "prev_close", "volume", "total_turnover",
+                  "settlement", "prev_settlement", "open_interest"], ignore_none=True
+             ))
+def history_panel(order_book_ids, bar_count, fields="close", futures=False):
+    # type: (List[str], int, Optional[Union[str, List[str]]], bool) -> np.ndarray
+    """
+    批量获取多个加密货币交易对的历史日线，横截面计算只需一次数组切片
+
+    Args:
+        order_book_ids: 交易对列表，无数据的交易对对应列为 NaN
+        bar_count: 日线数量
+        fields: 单个字段返回 (bar_count, 交易对数) 的二维数组；字段列表或 None（全部字段）
+            返回 (字段数, bar_count, 交易对数) 的三维数组
+        futures: 是否获取期货数据
+
+    Returns:
+        np.ndarray: 按日期升序排列的行情数组
+    """
+    env = Environment.get_instance()
+    dt = env.calendar_dt
+    if (env.config.base.frequency != "1d" and ExecutionContext.phase() != EXECUTION_PHASE.AFTER_TRADING) or \
+            ExecutionContext.phase() in (EXECUTION_PHASE.BEFORE_TRADING, EXECUTION_PHASE.OPEN_AUCTION):
+        dt = env.data_proxy.get_previous_trading_date(env.trading_dt.date())
+    instrument_type = INSTRUMENT_TYPE.CRYPTO_FUTURE if futures else INSTRUMENT_TYPE.CRYPTO_SPOT
+    return env.data_proxy.history_panel(list(order_book_ids), bar_count, fields, dt, instrument_type)
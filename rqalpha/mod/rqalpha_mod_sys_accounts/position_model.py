@@ -72,9 +72,7 @@ class StockPosition(Position):
     @property
     def closable(self):
         # type: () -> int
-        order_quantity = sum(o.unfilled_quantity for o in self._open_orders if o.position_effect in (
-            POSITION_EFFECT.CLOSE, POSITION_EFFECT.CLOSE_TODAY, POSITION_EFFECT.EXERCISE
-        ))
+        order_quantity, _ = self._env.broker.get_frozen_quantity(self._order_book_id, self._direction)
         if self.t_plus_enabled:
             return self._quantity - order_quantity - self._non_closable
         return self._quantity - order_quantity
@@ -607,9 +605,7 @@ class CryptoPosition(Position):
     @property
     def closable(self):
         """可平仓数量（加密货币T+0交易，所有持仓都可平仓）"""
-        order_quantity = sum(o.unfilled_quantity for o in self._open_orders if o.position_effect in (
-            POSITION_EFFECT.CLOSE, POSITION_EFFECT.CLOSE_TODAY, POSITION_EFFECT.EXERCISE
-        ))
+        order_quantity, _ = self._env.broker.get_frozen_quantity(self._order_book_id, self._direction)
         return self._quantity - order_quantity
 
 
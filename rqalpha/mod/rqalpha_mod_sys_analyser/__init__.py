@@ -28,6 +28,9 @@ __config__ = {
     "benchmark": None,
     # 当不输出 csv/pickle/plot 等内容时，关闭该项可关闭策略运行过程中部分收集数据的逻辑，用以提升性能
     "record": True,
+    # 回测记录的落盘目录；设置后每日净值、账户、持仓及成交记录每写满一块即写入该目录下的临时 h5 文件，回测结束后删除，
+    # 适用于分钟级、长周期或标的较多、内存不足的回测；不设置则全部保存在内存中
+    "record_spill_path": None,
     # 策略名称，可在summary、回测报告，收益图中展示
     "strategy_name": None,
     # 回测结果输出的文件路径，该文件为 pickle 格式，内容为每日净值、头寸、流水及风险指标等；若不设置则不输出该文件
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+向量化的风险指标计算
+与 rqrisk.Risk 的公式一致，沿最后一维计算，可一次传入形状为 (回测数, 期数) 的一批收益率；
+周度、月度收益率由净值在各周、月最后一个交易日的取值得到，日、周、月指标共用同一套计算。
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.const import DAYS_CNT
+
+WEEKS_A_YEAR = 52
+MONTHS_A_YEAR = 12
+
+# 标准正态分布的 5% 分位数，即 scipy.stats.norm.ppf(0.05)
+_NORM_PPF_5 = -1.6448536269514729
+
+
+def _safe_div(dividend, divisor):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(divisor == 0, np.nan, dividend / divisor)
+
+
+def _std(arr, mean=None):
+    # 样本标准差，与 ndarray.std(ddof=1) 一致
+    if mean is None:
+        mean = arr.mean(axis=-1, keepdims=True)
+    return np.sqrt(np.square(arr - mean).sum(axis=-1) / (arr.shape[-1] - 1))
+
+
+def _cum_nav(returns):
+    # 以 1 为起点的累计净值，长度比收益率多 1
+    log_returns = np.log1p(returns)
+    zeros = np.zeros(log_returns.shape[:-1] + (1, ))
+    return np.exp(np.cumsum(np.concatenate([zeros, log_returns], axis=-1), axis=-1))
+
+
+def _max_drawdown(nav):
+    max_nav = np.maximum.accumulate(nav, axis=-1)
+    return np.abs(((nav - max_nav) / max_nav).min(axis=-1))
+
+
+def _ulcer_index(returns):
+    nav = _cum_nav(returns)
+    drawdown_squared = np.square((nav / np.maximum.accumulate(nav, axis=-1) - 1) * 100)
+    return np.sqrt(drawdown_squared.sum(axis=-1) / nav.shape[-1])
+
+
+def _scalar(metrics):
+    return {k: v[()] if isinstance(v, np.ndarray) and v.ndim == 0 else v for k, v in metrics.items()}
+
+
+def risk_metrics(returns, benchmark_returns=None, risk_free_rate=0., annual_factor=DAYS_CNT.DAYS_A_YEAR):
+    # type: (np.ndarray, Optional[np.ndarray], float, float) -> Dict[str, np.ndarray]
+    """
+    计算收益率序列的风险指标，returns 与 benchmark_returns 的形状相同，最后一维为期数；
+    无基准时 benchmark_returns 为 None 或全为 nan，与基准相关的指标为 nan。
+    返回指标名到结果的字典，结果的形状为 returns.shape[:-1]，一维输入时为标量。
+    """
+    p = np.asarray(returns, dtype=float)
+    if benchmark_returns is None:
+        b = np.full(p.shape, np.nan)
+    else:
+        b = np.broadcast_to(np.asarray(benchmark_returns, dtype=float), p.shape)
+    n = p.shape[-1]
+    batch_shape = p.shape[:-1]
+    nan = np.full(batch_shape, np.nan)
+    zero = np.zeros(batch_shape)
+    sqrt_af = np.sqrt(annual_factor)
+    no_benchmark = np.isnan(b).all(axis=-1)
+
+    rf_per_period = (1 + risk_free_rate) ** (1 / annual_factor) - 1
+    mean = p.mean(axis=-1)
+    avg_excess_return = mean - rf_per_period
+    active = p - b
+
+    return_rate = np.expm1(np.log1p(p).sum(axis=-1))
+    benchmark_return = np.expm1(np.log1p(b).sum(axis=-1))
+    if n >= 1:
+        annual_return = (1 + return_rate) ** (annual_factor / n) - 1
+        benchmark_annual_return = (1 + benchmark_return) ** (annual_factor / n) - 1
+        win_rate = (p > 0).sum(axis=-1) / n
+        excess_win_rate = (p > b).sum(axis=-1) / n
+        geometric_excess_drawdown = _max_drawdown(_cum_nav(p) / _cum_nav(b))
+    else:
+        annual_return = benchmark_annual_return = win_rate = excess_win_rate = geometric_excess_drawdown = nan
+
+    if n >= 2:
+        p_dev = p - mean[..., None]
+        b_dev = b - b.mean(axis=-1, keepdims=True)
+        beta = _safe_div((p_dev * b_dev).sum(axis=-1), np.square(b_dev).sum(axis=-1))
+        alpha = annual_return - risk_free_rate - beta * (benchmark_annual_return - risk_free_rate)
+        volatility = _std(p, mean[..., None])
+        tracking_error = np.where(no_benchmark, np.nan, _std(active))
+        excess_volatility = _std(active)
+        residual_std = _std(p - beta[..., None] * b) * sqrt_af
+        with np.errstate(divide="ignore", invalid="ignore"):
+            information_ratio = np.where(
+                residual_std == 0, np.nan, (annual_return - beta * benchmark_annual_return) / residual_std
+            )
+        excess_std = np.sqrt(
+            np.square(p - rf_per_period - avg_excess_return[..., None]).sum(axis=-1) / (n - 1)
+        )
+        sharpe = _safe_div(sqrt_af * avg_excess_return, excess_std)
+        downside = np.minimum(p_dev, 0.)
+        downside_risk = np.sqrt(np.square(downside).sum(axis=-1) / (n - 1))
+    else:
+        beta = alpha = information_ratio = sharpe = nan
+        volatility = downside_risk = excess_volatility = zero
+        tracking_error = np.where(no_benchmark, np.nan, zero)
+
+    annual_downside_risk = downside_risk * sqrt_af
+    with np.errstate(invalid="ignore"):
+        log_returns = np.log1p(p)
+    log_std = log_returns.std(axis=-1)
+    var = np.where(log_std > 0, np.expm1(-(log_returns.mean(axis=-1) + log_std * _NORM_PPF_5)), np.nan)
+
+    ulcer_index = _ulcer_index(p)
+    excess_ulcer_index = _ulcer_index(active)
+
+    return _scalar({
+        "return_rate": return_rate,
+        "annual_return": annual_return,
+        "benchmark_return": benchmark_return,
+        "benchmark_annual_return": benchmark_annual_return,
+        "arithmetic_excess_return": return_rate - benchmark_return,
+        "geometric_excess_return": (1 + return_rate) / (1 + benchmark_return) - 1,
+        "geometric_excess_annual_return": (1 + annual_return) / (1 + benchmark_annual_return) - 1,
+        "alpha": alpha,
+        "beta": beta,
+        "sharpe": sharpe,
+        "excess_sharpe": _safe_div(sqrt_af * active.mean(axis=-1), tracking_error),
+        "information_ratio": information_ratio,
+        "sortino": _safe_div(annual_factor * avg_excess_return, annual_downside_risk),
+        "volatility": volatility,
+        "annual_volatility": volatility * sqrt_af,
+        "excess_annual_volatility": excess_volatility * sqrt_af,
+        "downside_risk": downside_risk,
+        "annual_downside_risk": annual_downside_risk,
+        "tracking_error": tracking_error,
+        "annual_tracking_error": tracking_error * sqrt_af,
+        "max_drawdown": _max_drawdown(_cum_nav(p)),
+        "geometric_excess_drawdown": geometric_excess_drawdown,
+        "var": var,
+        "win_rate": win_rate,
+        "excess_win_rate": excess_win_rate,
+        "ulcer_index": ulcer_index,
+        "ulcer_performance_index": _safe_div(
+            np.expm1(np.log1p(p - rf_per_period).sum(axis=-1)), ulcer_index
+        ),
+        "excess_ulcer_index": excess_ulcer_index,
+        "excess_ulcer_performance_index": _safe_div(
+            np.expm1(np.log1p(active - rf_per_period).sum(axis=-1)), excess_ulcer_index
+        ),
+    })
+
+
+def max_drawdown_duration(nav):
+    # type: (np.ndarray) -> Tuple[np.ndarray, np.ndarray]
+    """
+    最长回撤持续期，返回 (开始下标, 结束下标)。
+    回撤从跌破前高的前一期开始，到再创新高的前一期结束；持续期相同时取最早的一段，
+    期末仍未创新高的回撤只有比已结束的回撤更长时才计入；没有回撤时为 (0, 0)。
+    """
+    nav = np.asarray(nav, dtype=float)
+    n = nav.shape[-1]
+    index = np.arange(n)
+    running_max = np.maximum.accumulate(nav, axis=-1)
+    prev_max = np.concatenate([nav[..., :1], running_max[..., :-1]], axis=-1)
+    new_high = nav > prev_max
+    below = nav < running_max
+
+    # 每期所在的新高区间的起点，及区间内第一次跌破前高的位置
+    segment_start = np.maximum.accumulate(np.where(new_high, index, 0), axis=-1)
+    below_count = np.cumsum(below, axis=-1)
+    first_below = below & (below_count - np.take_along_axis(below_count, segment_start, axis=-1) == 1)
+    next_high = np.minimum.accumulate(np.where(new_high, index, n)[..., ::-1], axis=-1)[..., ::-1]
+
+    start = index - 1
+    closed = next_high < n
+    duration = np.where(closed, next_high - start, n - 1 - start)
+    closed_duration = np.where(first_below & closed, duration, 0)
+    best = closed_duration.argmax(axis=-1)
+    best_duration = np.take_along_axis(closed_duration, best[..., None], axis=-1)[..., 0]
+    best_start = np.where(best_duration > 0, best - 1, 0)
+    best_end = np.where(best_duration > 0, np.take_along_axis(next_high, best[..., None], axis=-1)[..., 0] - 1, 0)
+
+    open_first = first_below & ~closed
+    open_duration = np.where(open_first, duration, 0).max(axis=-1)
+    use_open = (open_duration > best_duration) & below[..., -1]
+    open_start = np.where(open_first, start, 0).max(axis=-1)
+    return np.where(use_open, open_start, best_start), np.where(use_open, n - 1, best_end)
+
+
+def period_end_indices(dates, freq):
+    # type: (pd.DatetimeIndex, str) -> np.ndarray
+    """各周（freq="W"，周日为一周的最后一天）或各月（freq="M"）最后一个交易日的下标，dates 须升序"""
+    periods = pd.DatetimeIndex(dates).to_period(freq).asi8
+    return np.append(np.flatnonzero(periods[1:] != periods[:-1]), len(periods) - 1)
+
+
+def period_returns(nav, ends):
+    # type: (np.ndarray, np.ndarray) -> np.ndarray
+    """由净值在各期末的取值计算各期收益率，第一期相对于初始净值 1"""
+    nav_at_ends = np.asarray(nav, dtype=float)[..., ends]
+    prev = np.concatenate([np.ones(nav_at_ends.shape[:-1] + (1, )), nav_at_ends[..., :-1]], axis=-1)
+    return nav_at_ends / prev - 1
+
+
+def equity_curve_metrics(nav, dates, benchmark_nav=None, risk_free_rate=0., annual_factor=DAYS_CNT.DAYS_A_YEAR):
+    # type: (np.ndarray, pd.DatetimeIndex, Optional[np.ndarray], float, float) -> Dict[str, Dict[str, np.ndarray]]
+    """
+    一批净值曲线的日、周、月风险指标及最长回撤持续期，可脱离回测单独调用，如对参数扫描的结果统一计算。
+    nav 的形状为 (回测数, 交易日数) 或 (交易日数, )，以 1 为初始净值；dates 为对应的交易日。
+    """
+    nav = np.asarray(nav, dtype=float)
+    ones = np.ones(nav.shape[:-1] + (1, ))
+    daily_returns = nav / np.concatenate([ones, nav[..., :-1]], axis=-1) - 1
+    if benchmark_nav is not None:
+        benchmark_nav = np.broadcast_to(np.asarray(benchmark_nav, dtype=float), nav.shape)
+        benchmark_daily_returns = benchmark_nav / np.concatenate([ones, benchmark_nav[..., :-1]], axis=-1) - 1
+    else:
+        benchmark_daily_returns = None
+
+    result = {"daily": risk_metrics(daily_returns, benchmark_daily_returns, risk_free_rate, annual_factor)}
+    for name, freq, factor in (("weekly", "W", WEEKS_A_YEAR), ("monthly", "M", MONTHS_A_YEAR)):
+        ends = period_end_indices(dates, freq)
+        result[name] = risk_metrics(
+            period_returns(nav, ends), None if benchmark_nav is None else period_returns(benchmark_nav, ends),
+            risk_free_rate, factor
+        )
+    start, end = max_drawdown_duration(nav)
+    result["max_drawdown_duration"] = {"start": start, "end": end}
+    return result
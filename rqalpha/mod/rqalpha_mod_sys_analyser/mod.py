@@ -17,7 +17,6 @@
 
 import os
 import re
-import pandas
 import pickle
 import jsonpickle
 import datetime
@@ -27,7 +26,6 @@ from typing import Dict, Optional, List, Tuple, Union, Iterable
 
 import numpy as np
 import pandas as pd
-from rqrisk import Risk, WEEKLY, MONTHLY
 
 from rqalpha.const import EXIT_CODE, DEFAULT_ACCOUNT_TYPE, INSTRUMENT_TYPE, POSITION_DIRECTION
 from rqalpha.core.events import EVENT
@@ -35,12 +33,14 @@ from rqalpha.interface import AbstractMod, AbstractPosition
 from rqalpha.utils.i18n import gettext as _
 from rqalpha.utils import INST_TYPE_IN_STOCK_ACCOUNT
 from rqalpha.utils.datetime_func import convert_int_to_date
+from rqalpha.utils.functools import nbytes_cache
 from rqalpha.utils.logger import user_system_log
-from rqalpha.const import DAYS_CNT
 from rqalpha.api import export_as_api
 from .plot.consts import DefaultPlot, PLOT_TEMPLATE
+from .metrics import WEEKS_A_YEAR, MONTHS_A_YEAR, period_end_indices, period_returns, risk_metrics
 from .plot.utils import max_ddd as _max_ddd
 from .plot_store import PlotStore
+from .recorder import ColumnarTable, SpillFile
 
 
 def _get_yearly_risk_free_rates(
@@ -62,11 +62,12 @@ class AnalyserMod(AbstractMod):
         self._enabled = False
 
         self._orders = []
-        self._trades = []
-        self._total_portfolios = []
+        self._spill = None  # type: Optional[SpillFile]
+        self._trades = self._new_table("trades")
+        self._total_portfolios = self._new_table("portfolio")
         self._total_benchmark_portfolios = []
-        self._sub_accounts = defaultdict(list)
-        self._positions = defaultdict(list)
+        self._sub_accounts = {}  # type: Dict[str, ColumnarTable]
+        self._positions = {}  # type: Dict[str, ColumnarTable]
         self._daily_pnl = []
 
         self._benchmark_daily_returns = []
@@ -80,23 +81,25 @@ class AnalyserMod(AbstractMod):
         return jsonpickle.dumps({
             'benchmark_daily_returns': [float(v) for v in self._benchmark_daily_returns],
             'portfolio_daily_returns': [float(v) for v in self._portfolio_daily_returns],
-            'total_portfolios': self._total_portfolios,
+            'total_portfolios': self._total_portfolios.to_records(),
             'total_benchmark_portfolios': self._total_benchmark_portfolios,
-            'sub_accounts': self._sub_accounts,
-            'positions': self._positions,
+            'sub_accounts': {k: t.to_records() for k, t in self._sub_accounts.items()},
+            'positions': {k: t.to_records() for k, t in self._positions.items()},
             'orders': self._orders,
-            'trades': self._trades,
+            'trades': self._trades.to_records(),
             'daily_pnl': self._daily_pnl
         }).encode('utf-8')
 
     def set_state(self, state):
         value = jsonpickle.loads(state.decode('utf-8'))
         self._portfolio_daily_returns = value["portfolio_daily_returns"]
-        self._total_portfolios = value['total_portfolios']
-        self._sub_accounts = value['sub_accounts']
-        self._positions = value["positions"]
+        self._total_portfolios = self._new_table("portfolio", value['total_portfolios'])
+        self._sub_accounts = {
+            k: self._new_table("accounts/" + k, records) for k, records in value['sub_accounts'].items()
+        }
+        self._positions = {k: self._new_table("positions/" + k, records) for k, records in value["positions"].items()}
         self._orders = value['orders']
-        self._trades = value["trades"]
+        self._trades = self._new_table("trades", value["trades"])
         self._daily_pnl = value.get("daily_pnl", [])
 
     def start_up(self, env, mod_config):
@@ -108,6 +111,11 @@ class AnalyserMod(AbstractMod):
         )
         if self._enabled:
             env.event_bus.add_listener(EVENT.POST_SYSTEM_INIT, self._subscribe_events)
+            if mod_config.record_spill_path:
+                # 落盘目录在 start_up 时才确定，重新创建已有的表
+                self._spill = SpillFile(mod_config.record_spill_path)
+                self._trades = self._new_table("trades")
+                self._total_portfolios = self._new_table("portfolio")
 
             if not mod_config.benchmark:
                 if getattr(env.config.base, "benchmark", None):
@@ -184,6 +192,13 @@ class AnalyserMod(AbstractMod):
         self._env.event_bus.add_listener(EVENT.ORDER_CREATION_PASS, self._collect_order)
         self._env.event_bus.prepend_listener(EVENT.POST_SETTLEMENT, self._collect_daily)
 
+    def _new_table(self, name, records=None):
+        # type: (str, Optional[Iterable[Dict]]) -> ColumnarTable
+        table = ColumnarTable(name, self._spill)
+        if records:
+            table.extend(records)
+        return table
+
     def _collect_trade(self, event):
         self._trades.append(self._to_trade_record(event.trade))
 
@@ -199,13 +214,17 @@ class AnalyserMod(AbstractMod):
         self._daily_pnl.append(portfolio.daily_pnl)
 
         for account_type, account in self._env.portfolio.accounts.items():
+            if account_type not in self._sub_accounts:
+                self._sub_accounts[account_type] = self._new_table("accounts/" + account_type)
+                self._positions[account_type] = self._new_table("positions/" + account_type)
             self._sub_accounts[account_type].append(self._to_account_record(date, account))
             pos_dict = {}
             for pos in account.get_positions():
                 pos_dict.setdefault(pos.order_book_id, {})[pos.direction] = pos
 
+            positions = self._positions[account_type]
             for order_book_id, pos in pos_dict.items():
-                self._positions[account_type].append(self._to_position_record(
+                positions.append(self._to_position_record(
                     date, order_book_id, pos.get(POSITION_DIRECTION.LONG), pos.get(POSITION_DIRECTION.SHORT)
                 ))
 
@@ -324,8 +343,8 @@ class AnalyserMod(AbstractMod):
 
     def _to_trade_record(self, trade):
         return {
-            'datetime': trade.datetime.strftime("%Y-%m-%d %H:%M:%S"),
-            'trading_datetime': trade.trading_datetime.strftime("%Y-%m-%d %H:%M:%S"),
+            'datetime': trade.datetime,
+            'trading_datetime': trade.trading_datetime,
             'order_book_id': trade.order_book_id,
             'symbol': self._symbol(trade.order_book_id),
             'side': trade.side.name,
@@ -340,6 +359,13 @@ class AnalyserMod(AbstractMod):
         }
 
     def tear_down(self, code, exception=None):
+        try:
+            return self._tear_down(code)
+        finally:
+            if self._spill is not None:
+                self._spill.close()
+
+    def _tear_down(self, code):
         if code != EXIT_CODE.EXIT_SUCCESS or not self._enabled:
             return
 
@@ -373,28 +399,31 @@ class AnalyserMod(AbstractMod):
                 summary["benchmark_symbol"] = ",".join(f"{self._env.data_proxy.instrument(o).symbol if o not in self.NULL_OID else 'null'}:{w}" for o, w in self._benchmark)
 
         risk_free_rate = data_proxy.get_risk_free_rate(self._env.config.base.start_date, self._env.config.base.end_date)
-        risk = Risk(
-            np.array(self._portfolio_daily_returns), np.array(self._benchmark_daily_returns), risk_free_rate
+        # 与 Portfolio.annualized_returns 使用相同的年化天数
+        annual_factor = self._env.portfolio.annual_factor
+        risk = risk_metrics(
+            np.array(self._portfolio_daily_returns), np.array(self._benchmark_daily_returns), risk_free_rate,
+            annual_factor
         )
         summary.update({
-            'alpha': risk.alpha,
-            'beta': risk.beta,
-            'sharpe': risk.sharpe,
-            'excess_sharpe': risk.excess_sharpe,
-            'information_ratio': risk.information_ratio,
-            'downside_risk': risk.annual_downside_risk,
-            'tracking_error': risk.annual_tracking_error,
-            'sortino': risk.sortino,
-            'volatility': risk.annual_volatility,
-            'excess_volatility': risk.excess_annual_volatility,
-            'max_drawdown': risk.max_drawdown,
-            'excess_max_drawdown': risk.geometric_excess_drawdown,
-            'excess_returns': risk.geometric_excess_return,
-            'excess_annual_returns': risk.geometric_excess_annual_return,
-            'var': risk.var,
-            "win_rate": risk.win_rate,
-            "excess_win_rate": risk.excess_win_rate,
-            "excess_cum_returns": risk.arithmetic_excess_return,
+            'alpha': risk["alpha"],
+            'beta': risk["beta"],
+            'sharpe': risk["sharpe"],
+            'excess_sharpe': risk["excess_sharpe"],
+            'information_ratio': risk["information_ratio"],
+            'downside_risk': risk["annual_downside_risk"],
+            'tracking_error': risk["annual_tracking_error"],
+            'sortino': risk["sortino"],
+            'volatility': risk["annual_volatility"],
+            'excess_volatility': risk["excess_annual_volatility"],
+            'max_drawdown': risk["max_drawdown"],
+            'excess_max_drawdown': risk["geometric_excess_drawdown"],
+            'excess_returns': risk["geometric_excess_return"],
+            'excess_annual_returns': risk["geometric_excess_annual_return"],
+            'var': risk["var"],
+            "win_rate": risk["win_rate"],
+            "excess_win_rate": risk["excess_win_rate"],
+            "excess_cum_returns": risk["arithmetic_excess_return"],
         })
 
         # 盈亏比
@@ -406,6 +435,15 @@ class AnalyserMod(AbstractMod):
             "profit_loss_rate": np.abs(profit / loss) if loss else np.nan
         })
 
+        # K线数组缓存的使用情况，用于设置 base.bar_cache_size_mb
+        bar_cache_info = nbytes_cache.cache_info()
+        summary.update({
+            'bar_cache_hits': bar_cache_info["hits"],
+            'bar_cache_misses': bar_cache_info["misses"],
+            'bar_cache_evictions': bar_cache_info["evictions"],
+            'bar_cache_peak_mb': bar_cache_info["peak_nbytes"] / 1024 / 1024,
+        })
+
         summary.update({
             'total_value': self._env.portfolio.total_value,
             'cash': self._env.portfolio.cash,
@@ -419,21 +457,23 @@ class AnalyserMod(AbstractMod):
             benchmark_total_returns = (np.array(self._benchmark_daily_returns) + 1.0).prod() - 1.0
             summary['benchmark_total_returns'] = benchmark_total_returns
             date_count = len(self._benchmark_daily_returns)
-            benchmark_annualized_returns = (benchmark_total_returns + 1) ** (DAYS_CNT.TRADING_DAYS_A_YEAR / date_count) - 1
+            benchmark_annualized_returns = (benchmark_total_returns + 1) ** (annual_factor / date_count) - 1
             summary['benchmark_annualized_returns'] = benchmark_annualized_returns
 
-        trades = pd.DataFrame(self._trades)
+        trades = self._trades.to_frame()
         if 'datetime' in trades.columns:
-            trades = trades.set_index(pd.DatetimeIndex(trades['datetime']))
+            index = pd.DatetimeIndex(trades['datetime'], name='datetime')
+            for field in ('datetime', 'trading_datetime'):
+                trades[field] = pd.DatetimeIndex(trades[field]).strftime("%Y-%m-%d %H:%M:%S")
+            trades = trades.set_index(index)
 
-        df = pd.DataFrame(self._total_portfolios)
-        df['date'] = pd.to_datetime(df['date'])
+        df = self._total_portfolios.to_frame()
         total_portfolios = df.set_index('date').sort_index()
-        df.index = df['date']
-        weekly_nav = df.resample("W").last().set_index("date").unit_net_value.dropna()
-        monthly_nav = df.resample("M").last().set_index("date").unit_net_value.dropna()
-        weekly_returns = (weekly_nav / weekly_nav.shift(1).fillna(1)).fillna(0) - 1
-        monthly_returns = (monthly_nav / monthly_nav.shift(1).fillna(1)).fillna(0) - 1
+        # 周度、月度收益率由各周、月最后一个交易日的净值得到
+        nav = total_portfolios.unit_net_value.values
+        weekly_returns = period_returns(nav, period_end_indices(total_portfolios.index, "W"))
+        monthly_returns = period_returns(nav, period_end_indices(total_portfolios.index, "M"))
+        weekly_b_returns = monthly_b_returns = None
 
         # 最长回撤持续期
         max_ddd = _max_ddd(total_portfolios.unit_net_value.values, total_portfolios.index)
@@ -467,11 +507,9 @@ class AnalyserMod(AbstractMod):
             df = pd.DataFrame(self._total_benchmark_portfolios)
             df['date'] = pd.to_datetime(df['date'])
             benchmark_portfolios = df.set_index('date').sort_index()
-            df.index = df['date']
-            weekly_b_nav = df.resample("W").last().set_index("date").unit_net_value.dropna()
-            monthly_b_nav = df.resample("M").last().set_index("date").unit_net_value.dropna()
-            weekly_b_returns = (weekly_b_nav / weekly_b_nav.shift(1).fillna(1)).fillna(0) - 1
-            monthly_b_returns = (monthly_b_nav / monthly_b_nav.shift(1).fillna(1)).fillna(0) - 1
+            b_nav = benchmark_portfolios.unit_net_value.values
+            weekly_b_returns = period_returns(b_nav, period_end_indices(benchmark_portfolios.index, "W"))
+            monthly_b_returns = period_returns(b_nav, period_end_indices(benchmark_portfolios.index, "M"))
             result_dict['benchmark_portfolio'] = benchmark_portfolios
             # 超额收益最长回撤持续期
             ex_returns = total_portfolios.unit_net_value / benchmark_portfolios.unit_net_value - 1
@@ -480,38 +518,35 @@ class AnalyserMod(AbstractMod):
             result_dict["summary"]["excess_max_drawdown_duration_start_date"] = str(max_ddd.start_date)
             result_dict["summary"]["excess_max_drawdown_duration_end_date"] = str(max_ddd.end_date)
             result_dict["summary"]["excess_max_drawdown_duration_days"] = (max_ddd.end_date - max_ddd.start_date).days
-        else:
-            weekly_b_returns = pandas.Series(index=weekly_returns.index)
-            monthly_b_returns = pandas.Series(index=monthly_returns.index)
 
         # 周度风险指标
-        weekly_risk = Risk(weekly_returns, weekly_b_returns, risk_free_rate, WEEKLY)
+        weekly_risk = risk_metrics(weekly_returns, weekly_b_returns, risk_free_rate, WEEKS_A_YEAR)
         summary.update({
-            "weekly_alpha": weekly_risk.alpha,
-            "weekly_beta": weekly_risk.beta,
-            "weekly_sharpe": weekly_risk.sharpe,
-            "weekly_sortino": weekly_risk.sortino,
-            "weekly_information_ratio": weekly_risk.information_ratio,
-            "weekly_tracking_error": weekly_risk.annual_tracking_error,
-            "weekly_max_drawdown": weekly_risk.max_drawdown,
-            "weekly_win_rate": weekly_risk.win_rate,
-            "weekly_volatility": weekly_risk.annual_volatility,
-            "weekly_ulcer_index": weekly_risk.ulcer_index,
-            "weekly_ulcer_performance_index": weekly_risk.ulcer_performance_index,
+            "weekly_alpha": weekly_risk["alpha"],
+            "weekly_beta": weekly_risk["beta"],
+            "weekly_sharpe": weekly_risk["sharpe"],
+            "weekly_sortino": weekly_risk["sortino"],
+            "weekly_information_ratio": weekly_risk["information_ratio"],
+            "weekly_tracking_error": weekly_risk["annual_tracking_error"],
+            "weekly_max_drawdown": weekly_risk["max_drawdown"],
+            "weekly_win_rate": weekly_risk["win_rate"],
+            "weekly_volatility": weekly_risk["annual_volatility"],
+            "weekly_ulcer_index": weekly_risk["ulcer_index"],
+            "weekly_ulcer_performance_index": weekly_risk["ulcer_performance_index"],
         })
 
         # 月度风险指标
-        monthly_risk = Risk(monthly_returns, monthly_b_returns, risk_free_rate, MONTHLY)
+        monthly_risk = risk_metrics(monthly_returns, monthly_b_returns, risk_free_rate, MONTHS_A_YEAR)
         summary.update({
-            "monthly_sharpe": monthly_risk.sharpe,
-            "monthly_volatility": monthly_risk.annual_volatility,
-            "monthly_excess_win_rate": monthly_risk.excess_win_rate,
+            "monthly_sharpe": monthly_risk["sharpe"],
+            "monthly_volatility": monthly_risk["annual_volatility"],
+            "monthly_excess_win_rate": monthly_risk["excess_win_rate"],
         })
 
         if self._benchmark:
             summary.update({
-                "weekly_excess_ulcer_index": weekly_risk.excess_ulcer_index,
-                "weekly_excess_ulcer_performance_index": weekly_risk.excess_ulcer_performance_index,
+                "weekly_excess_ulcer_index": weekly_risk["excess_ulcer_index"],
+                "weekly_excess_ulcer_performance_index": weekly_risk["excess_ulcer_performance_index"],
             })
 
         plots = self._plot_store.get_plots()
@@ -529,16 +564,12 @@ class AnalyserMod(AbstractMod):
 
         for account_type, account in self._env.portfolio.accounts.items():
             account_name = account_type.lower()
-            portfolios_list = self._sub_accounts[account_type]
-            df = pd.DataFrame(portfolios_list)
-            df["date"] = pd.to_datetime(df["date"])
+            df = self._sub_accounts[account_type].to_frame()
             df = df.set_index("date").sort_index()
             result_dict["{}_account".format(account_name)] = df
 
-            positions_list = self._positions[account_type]
-            df = pd.DataFrame(positions_list)
+            df = self._positions[account_type].to_frame()
             if "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"])
                 df = df.set_index("date").sort_index()
             result_dict["{}_positions".format(account_name)] = df
 
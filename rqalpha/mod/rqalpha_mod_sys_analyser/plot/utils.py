@@ -21,6 +21,8 @@ import numpy as np
 from numpy import array
 from pandas import DatetimeIndex, DataFrame, Series, to_datetime
 
+from ..metrics import max_drawdown_duration
+
 IndicatorInfo = namedtuple(
     "IndicatorInfo", ("key", "label", "color", "formatter", "value_font_size", "label_width_multiplier")
 )
@@ -47,32 +49,8 @@ def max_dd(arr: array, index: DatetimeIndex) -> IndexRange:
 
 
 def max_ddd(arr: array, index: DatetimeIndex) -> IndexRange:
-    max_seen = arr[0]
-    ddd_start, ddd_end = 0, 0
-    ddd = 0
-    start = 0
-    in_draw_down = False
-
-    i = 0
-    for i in range(len(arr)):
-        if arr[i] > max_seen:
-            if in_draw_down:
-                in_draw_down = False
-                if i - start > ddd:
-                    ddd = i - start
-                    ddd_start = start
-                    ddd_end = i - 1
-            max_seen = arr[i]
-        elif arr[i] < max_seen:
-            if not in_draw_down:
-                in_draw_down = True
-                start = i - 1
-
-    if arr[i] < max_seen:
-        if i - start > ddd:
-            return IndexRange.new(start, i, index)
-
-    return IndexRange.new(ddd_start, ddd_end, index)
+    start, end = max_drawdown_duration(arr)
+    return IndexRange.new(int(start), int(end), index)
 
 
 def weekly_returns(portfolio: DataFrame) -> Series:
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+AnalyserMod 的按列记录器
+每张表（组合、账户、持仓、成交）按列写入预分配的 numpy 缓冲块，字符串列以类别编码保存；块写满后封存，
+设置了落盘目录时封存的块写入 h5 文件，内存中只保留当前块。回测结束时每列拼接一次即得到 DataFrame，
+不再逐行构造 dict。
+"""
+
+import datetime
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import h5py
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 4096
+
+_FLOAT, _INT, _STR, _DATETIME = "f8", "i8", "str", "M8[ns]"
+_NA = {_FLOAT: np.nan, _STR: -1, _DATETIME: np.datetime64("NaT")}
+_BUFFER_DTYPE = {_FLOAT: "f8", _INT: "i8", _STR: "i4", _DATETIME: "M8[ns]"}
+_DATETIME_TYPES = (datetime.date, np.datetime64)
+# 写入数值列时需转为类别列的取值类型
+_NON_NUMERIC = (str, ) + _DATETIME_TYPES
+
+
+def _kind_of(value):
+    if isinstance(value, str):
+        return _STR
+    if isinstance(value, _DATETIME_TYPES):
+        return _DATETIME
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+        return _INT
+    return _FLOAT
+
+
+class SpillFile(object):
+    """记录器共用的落盘文件，首次写入时在 path 目录下创建，close 时删除"""
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self._path = path
+        self._file_path = None  # type: Optional[str]
+        self._h5 = None  # type: Optional[h5py.File]
+
+    def write(self, key, arrays):
+        # type: (str, Dict[str, np.ndarray]) -> None
+        if self._h5 is None:
+            os.makedirs(self._path, exist_ok=True)
+            fd, self._file_path = tempfile.mkstemp(prefix="analyser_", suffix=".h5", dir=self._path)
+            os.close(fd)
+            self._h5 = h5py.File(self._file_path, "w")
+        group = self._h5.create_group(key)
+        for name, arr in arrays.items():
+            # h5py 不支持 datetime64，按纳秒整数保存
+            group.create_dataset(name, data=arr.view("i8") if arr.dtype.kind == "M" else arr)
+
+    def replace(self, key, name, arr):
+        # type: (str, str, np.ndarray) -> None
+        """替换已写入的某列，用于列类型改变时改写已落盘的块"""
+        group = self._h5[key]
+        del group[name]
+        group.create_dataset(name, data=arr)
+
+    def read(self, key, name):
+        # type: (str, str) -> Optional[np.ndarray]
+        group = self._h5[key]
+        return group[name][:] if name in group else None
+
+    def close(self):
+        if self._h5 is not None:
+            self._h5.close()
+            self._h5 = None
+            os.remove(self._file_path)
+
+
+class _Column(object):
+    __slots__ = ("kind", "categories", "codes")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.categories = []  # type: List[str]
+        self.codes = {}  # type: Dict[str, int]
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.categories)
+            self.categories.append(value)
+        return code
+
+
+class ColumnarTable(object):
+    """
+    按行追加、按列存储的表。列在第一次出现时根据取值确定类型：字符串、日期时间、整数、浮点数；缺失的值记为 nan，
+    整数列出现缺失值或小数时提升为浮点列；数值或日期时间列出现其他类型的值（如首行缺失、之后为字符串）时
+    转为类别列，取出时为 object 列。结果与 pandas.DataFrame(records) 一致。
+    """
+
+    def __init__(self, name, spill=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        # type: (str, Optional[SpillFile], int) -> None
+        self._name = name
+        self._spill = spill
+        self._chunk_size = chunk_size
+
+        self._columns = {}  # type: Dict[str, _Column]
+        self._buffers = {}  # type: Dict[str, np.ndarray]
+        self._row = 0
+        # 已封存的块：内存中的 {列名: 数组}，或落盘时为 None
+        self._chunks = []  # type: List[Optional[Dict[str, np.ndarray]]]
+
+    def __len__(self):
+        return len(self._chunks) * self._chunk_size + self._row
+
+    def _new_buffer(self, kind):
+        if kind == _INT:
+            return np.zeros(self._chunk_size, dtype="i8")
+        return np.full(self._chunk_size, _NA[kind], dtype=_BUFFER_DTYPE[kind])
+
+    def _add_column(self, name, value):
+        kind = _kind_of(value)
+        if kind == _INT and len(self):
+            # 之前的行缺失该列
+            kind = _FLOAT
+        column = self._columns[name] = _Column(kind)
+        self._buffers[name] = self._new_buffer(kind)
+        return column
+
+    def _promote(self, name):
+        self._columns[name].kind = _FLOAT
+        self._buffers[name] = self._buffers[name].astype("f8")
+
+    def _to_category(self, name):
+        """将列转为类别列，已写入的值（包括已封存、已落盘的块）逐个编码，缺失值编码为 -1"""
+        column = self._columns[name]
+        kind = column.kind
+        column.kind = _STR
+
+        def encode(arr):
+            if kind == _DATETIME:
+                # 落盘的日期时间列以纳秒整数保存；转为微秒精度后 tolist 得到 datetime
+                arr = arr.view("M8[ns]").astype("M8[us]")
+            codes = np.full(len(arr), -1, dtype="i4")
+            for i, value in enumerate(arr.tolist()):
+                if value is not None and value == value:
+                    codes[i] = column.encode(value)
+            return codes
+
+        for i, chunk in enumerate(self._chunks):
+            if chunk is None:
+                key = "{}/{}".format(self._name, i)
+                arr = self._spill.read(key, name)
+                if arr is not None:
+                    self._spill.replace(key, name, encode(arr))
+            elif name in chunk:
+                chunk[name] = encode(chunk[name])
+        buffer = self._new_buffer(_STR)
+        buffer[:self._row] = encode(self._buffers[name][:self._row])
+        self._buffers[name] = buffer
+
+    def append(self, record):
+        # type: (Dict) -> None
+        row = self._row
+        columns = self._columns
+        for name, value in record.items():
+            column = columns.get(name)
+            if column is None:
+                column = self._add_column(name, value)
+            kind = column.kind
+            if kind == _FLOAT:
+                if isinstance(value, _NON_NUMERIC):
+                    self._to_category(name)
+                    self._buffers[name][row] = column.encode(value)
+                else:
+                    self._buffers[name][row] = np.nan if value is None else value
+            elif kind == _STR:
+                self._buffers[name][row] = -1 if value is None else column.encode(value)
+            elif kind == _INT:
+                if isinstance(value, _NON_NUMERIC):
+                    self._to_category(name)
+                    self._buffers[name][row] = column.encode(value)
+                    continue
+                if not isinstance(value, (int, np.integer)) or isinstance(value, bool):
+                    self._promote(name)
+                    value = np.nan if value is None else value
+                self._buffers[name][row] = value
+            elif value is None:
+                self._buffers[name][row] = np.datetime64("NaT")
+            elif isinstance(value, _DATETIME_TYPES):
+                self._buffers[name][row] = value
+            else:
+                self._to_category(name)
+                self._buffers[name][row] = column.encode(value)
+        if len(record) != len(columns):
+            for name, column in columns.items():
+                if name not in record and column.kind == _INT:
+                    self._promote(name)
+                    self._buffers[name][row] = np.nan
+        self._row += 1
+        if self._row == self._chunk_size:
+            self._seal()
+
+    def extend(self, records):
+        # type: (Iterable[Dict]) -> None
+        for record in records:
+            self.append(record)
+
+    def _seal(self):
+        buffers = self._buffers
+        if self._spill is not None:
+            self._spill.write("{}/{}".format(self._name, len(self._chunks)), buffers)
+            self._chunks.append(None)
+        else:
+            self._chunks.append(buffers)
+        self._buffers = {name: self._new_buffer(column.kind) for name, column in self._columns.items()}
+        self._row = 0
+
+    def _column_values(self, name, column):
+        dtype = _BUFFER_DTYPE[column.kind]
+        parts = []
+        for i, chunk in enumerate(self._chunks):
+            if chunk is None:
+                arr = self._spill.read("{}/{}".format(self._name, i), name)
+                if arr is not None and column.kind == _DATETIME:
+                    arr = arr.view(dtype)
+            else:
+                arr = chunk.get(name)
+            if arr is None:
+                # 该列出现之前封存的块
+                arr = np.full(self._chunk_size, _NA[column.kind], dtype=dtype)
+            parts.append(arr)
+        parts.append(self._buffers[name][:self._row])
+        values = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        if values.dtype != dtype:
+            values = values.astype(dtype)
+        if column.kind == _STR:
+            categories = np.array(column.categories + [None], dtype=object)
+            # -1 对应末尾的 None
+            return categories[values]
+        return values
+
+    def to_frame(self):
+        # type: () -> pd.DataFrame
+        """每列拼接一次生成 DataFrame，只有一个块时直接使用缓冲区的切片"""
+        if not self._columns:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            name: self._column_values(name, column) for name, column in self._columns.items()
+        }, copy=False)
+
+    def to_records(self):
+        # type: () -> List[Dict]
+        """转为 dict 列表，用于 get_state；缺失的列不出现在对应的行中"""
+        frame = self.to_frame()
+        columns = {}
+        for name in frame.columns:
+            values = frame[name].values
+            if values.dtype.kind == "M":
+                values = values.astype("M8[us]")
+            columns[name] = values.tolist()
+        records = []
+        for i in range(len(frame)):
+            record = {}
+            for name, values in columns.items():
+                value = values[i]
+                if value is None or value != value:
+                    continue
+                record[name] = value
+            records.append(record)
+        return records
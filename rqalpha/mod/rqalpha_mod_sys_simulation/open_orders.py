@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+SimulationBroker 的未完成订单索引
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+from rqalpha.const import POSITION_DIRECTION, POSITION_EFFECT
+from rqalpha.model.order import Order
+from rqalpha.portfolio.account import Account
+
+_CLOSE_EFFECTS = (POSITION_EFFECT.CLOSE, POSITION_EFFECT.CLOSE_TODAY, POSITION_EFFECT.EXERCISE)
+
+
+class OpenOrders(object):
+    """
+    按下单先后保存 (account, order)，并按 order_book_id 建立索引，插入、删除均为 O(1)。
+    撮合时只需遍历有挂单的标的；Position.closable 等读取的冻结数量按 (order_book_id, 持仓方向) 缓存，
+    在该标的的订单增删或成交（TRADE 事件）时失效。同一标的只属于一个账户，索引不再按账户区分。
+    """
+
+    def __init__(self):
+        self._orders = {}  # type: Dict[int, Tuple[Account, Order]]
+        self._by_order_book_id = {}  # type: Dict[str, Dict[int, Tuple[Account, Order]]]
+        self._frozen = {}  # type: Dict[Tuple[str, POSITION_DIRECTION], Tuple[float, float]]
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __iter__(self):
+        # type: () -> Iterator[Tuple[Account, Order]]
+        # 返回快照，遍历时撤单、下单不影响迭代
+        return iter(list(self._orders.values()))
+
+    def __contains__(self, order):
+        return order.order_id in self._orders
+
+    def add(self, account, order):
+        # type: (Account, Order) -> None
+        item = (account, order)
+        self._orders[order.order_id] = item
+        self._by_order_book_id.setdefault(order.order_book_id, {})[order.order_id] = item
+        self.invalidate(order.order_book_id)
+
+    def remove(self, order):
+        # type: (Order) -> bool
+        if self._orders.pop(order.order_id, None) is None:
+            return False
+        orders = self._by_order_book_id[order.order_book_id]
+        del orders[order.order_id]
+        if not orders:
+            del self._by_order_book_id[order.order_book_id]
+        self.invalidate(order.order_book_id)
+        return True
+
+    def clear(self):
+        self._orders.clear()
+        self._by_order_book_id.clear()
+        self._frozen.clear()
+
+    def of(self, order_book_id):
+        # type: (str) -> List[Tuple[Account, Order]]
+        orders = self._by_order_book_id.get(order_book_id)
+        return list(orders.values()) if orders else []
+
+    def order_book_ids(self):
+        # type: () -> List[str]
+        return list(self._by_order_book_id)
+
+    def invalidate(self, order_book_id):
+        # type: (str) -> None
+        self._frozen.pop((order_book_id, POSITION_DIRECTION.LONG), None)
+        self._frozen.pop((order_book_id, POSITION_DIRECTION.SHORT), None)
+
+    def frozen_quantity(self, order_book_id, direction):
+        # type: (str, POSITION_DIRECTION) -> Tuple[float, float]
+        """(平仓、平今及行权订单的未成交数量之和, 平今订单的未成交数量之和)"""
+        key = (order_book_id, direction)
+        try:
+            return self._frozen[key]
+        except KeyError:
+            pass
+        close = close_today = 0
+        for _, order in self._by_order_book_id.get(order_book_id, {}).values():
+            if order.position_direction != direction or order.position_effect not in _CLOSE_EFFECTS:
+                continue
+            close += order.unfilled_quantity
+            if order.position_effect == POSITION_EFFECT.CLOSE_TODAY:
+                close_today += order.unfilled_quantity
+        self._frozen[key] = result = (close, close_today)
+        return result
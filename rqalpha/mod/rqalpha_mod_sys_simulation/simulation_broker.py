@@ -31,6 +31,7 @@ from rqalpha.model.order import Order
 from rqalpha.environment import Environment
 
 from .matcher import DefaultBarMatcher, AbstractMatcher, CounterPartyOfferMatcher, DefaultTickMatcher
+from .open_orders import OpenOrders
 
 
 class SimulationBroker(AbstractBroker, Persistable):
@@ -42,7 +43,7 @@ class SimulationBroker(AbstractBroker, Persistable):
 
         self._match_immediately = mod_config.matching_type in [MATCHING_TYPE.CURRENT_BAR_CLOSE, MATCHING_TYPE.VWAP]
 
-        self._open_orders = []  # type: List[Tuple[Account, Order]]
+        self._open_orders = OpenOrders()
         self._open_auction_orders = []  # type: List[Tuple[Account, Order]]
         self._open_exercise_orders = []  # type: List[Tuple[Account, Order]]
 
@@ -61,6 +62,8 @@ class SimulationBroker(AbstractBroker, Persistable):
         # 该事件会触发策略的after_trading函数
         self._env.event_bus.add_listener(EVENT.AFTER_TRADING, self.after_trading)
         self._env.event_bus.add_listener(EVENT.PRE_SETTLEMENT, self.pre_settlement)
+        # 成交改变了订单的未成交数量，须在账户等处理成交之前使冻结数量的缓存失效
+        self._env.event_bus.prepend_listener(EVENT.TRADE, self._on_trade)
 
     @lru_cache(1024)
     def _get_matcher(self, order_book_id):
@@ -82,8 +85,14 @@ class SimulationBroker(AbstractBroker, Persistable):
         if order_book_id is None:
             return [order for account, order in chain(self._open_orders, self._open_auction_orders)]
         else:
-            return [order for account, order in chain(self._open_orders, self._open_auction_orders) if
-                    order.order_book_id == order_book_id]
+            return [order for account, order in chain(self._open_orders.of(order_book_id), self._open_auction_orders)
+                    if order.order_book_id == order_book_id]
+
+    def get_frozen_quantity(self, order_book_id, direction):
+        if self._open_auction_orders:
+            # 集合竞价阶段的订单很少，不做缓存
+            return super(SimulationBroker, self).get_frozen_quantity(order_book_id, direction)
+        return self._open_orders.frozen_quantity(order_book_id, direction)
 
     def get_state(self):
         return jsonpickle.dumps({
@@ -99,7 +108,9 @@ class SimulationBroker(AbstractBroker, Persistable):
             return account, o
 
         value = jsonpickle.loads(state.decode('utf-8'))
-        self._open_orders = [_account_order_from_state(v) for v in value["open_orders"]]
+        self._open_orders.clear()
+        for v in value["open_orders"]:
+            self._open_orders.add(*_account_order_from_state(v))
         self._open_auction_orders = [_account_order_from_state(v) for v in value.get("open_auction_orders", [])]
 
     def submit_order(self, order):
@@ -115,11 +126,12 @@ class SimulationBroker(AbstractBroker, Persistable):
         if ExecutionContext.phase() == EXECUTION_PHASE.OPEN_AUCTION:
             self._open_auction_orders.append((account, order))
         else:
-            self._open_orders.append((account, order))
+            self._open_orders.add(account, order)
         order.active()
         self._env.event_bus.publish_event(Event(EVENT.ORDER_CREATION_PASS, account=account, order=order))
         if self._match_immediately:
-            self._match()
+            # 其余标的的挂单在本根 bar 上已撮合过，只需撮合新订单所在的标的
+            self._match((order.order_book_id, ))
 
     def cancel_order(self, order):
         account = self._env.get_account(order.order_book_id)
@@ -130,10 +142,7 @@ class SimulationBroker(AbstractBroker, Persistable):
 
         self._env.event_bus.publish_event(Event(EVENT.ORDER_CANCELLATION_PASS, account=account, order=order))
 
-        try:
-            self._open_orders.remove((account, order))
-        except ValueError:
-            pass
+        self._open_orders.remove(order)
 
     def before_trading(self, _):
         for account, order in self._open_orders:
@@ -146,7 +155,7 @@ class SimulationBroker(AbstractBroker, Persistable):
                 order_book_id=order.order_book_id
             ))
             self._env.event_bus.publish_event(Event(EVENT.ORDER_UNSOLICITED_UPDATE, account=account, order=order))
-        self._open_orders = []
+        self._open_orders.clear()
 
     def pre_settlement(self, __):
         for account, order in self._open_exercise_orders:
@@ -156,24 +165,51 @@ class SimulationBroker(AbstractBroker, Persistable):
         self._open_exercise_orders.clear()
 
     def on_bar(self, event):
+        # matcher 按品种类型划分，数量固定，与挂单数无关
         for matcher in self._matchers.values():
             matcher.update(event)
-        self._match()
+        order_book_ids = [o for o in self._open_orders.order_book_ids() if self._has_bar(o)]
+        order_book_ids.extend(order.order_book_id for _, order in self._open_auction_orders)
+        self._match(order_book_ids)
 
     def on_tick(self, event):
         tick = event.tick
         self._get_matcher(tick.order_book_id).update(event)
-        self._match(tick.order_book_id)
+        self._match((tick.order_book_id, ))
+
+    def _on_trade(self, event):
+        self._open_orders.invalidate(event.trade.order_book_id)
 
-    def _match(self, order_book_id=None):
+    def _has_bar(self, order_book_id):
+        # 当前 bar 无行情的标的，其挂单撮合时不会成交，无须遍历；
+        # 日频下算法单、上市首日的订单在无行情时需要撤单，仍参与撮合
+        if self._env.config.base.frequency == "1d" or not self._env.get_bar(order_book_id).isnan:
+            return True
+        return self._env.get_instrument(order_book_id).listed_date.date() == self._env.trading_dt.date()
+
+    def _match(self, order_book_ids=None):
         # 撮合未完成的订单，若指定标的时只撮合指定的标的的订单
-        order_filter = lambda a_and_o: not (a_and_o[1].is_final() or (order_book_id and a_and_o[1].order_book_id != order_book_id))
-        for account, order in filter(order_filter, self._open_orders):
+        final_orders = []
+        if order_book_ids is None:
+            open_orders = self._open_orders
+        else:
+            order_book_ids = dict.fromkeys(order_book_ids)
+            open_orders = chain.from_iterable(self._open_orders.of(o) for o in order_book_ids)
+        for account, order in open_orders:
+            if order.is_final():
+                continue
             self._get_matcher(order.order_book_id).match(account, order, open_auction=False)
-        for account, order in filter(order_filter, self._open_auction_orders):
-            self._get_matcher(order.order_book_id).match(account, order, open_auction=True)
-        final_orders = [(a, o) for a, o in chain(self._open_orders, self._open_auction_orders) if o.is_final()]
-        self._open_orders = [(a, o) for a, o in chain(self._open_orders, self._open_auction_orders) if not o.is_final()]
+            if order.is_final():
+                final_orders.append((account, order))
+                self._open_orders.remove(order)
+        for account, order in self._open_auction_orders:
+            if not (order.is_final() or (order_book_ids is not None and order.order_book_id not in order_book_ids)):
+                self._get_matcher(order.order_book_id).match(account, order, open_auction=True)
+        for account, order in self._open_auction_orders:
+            if order.is_final():
+                final_orders.append((account, order))
+            else:
+                self._open_orders.add(account, order)
         self._open_auction_orders.clear()
 
         for account, order in final_orders:
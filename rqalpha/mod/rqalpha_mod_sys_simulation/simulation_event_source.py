@@ -17,6 +17,8 @@
 
 from datetime import timedelta, datetime, time
 
+import numpy as np
+
 from rqalpha.environment import Environment
 from rqalpha.interface import AbstractEventSource
 from rqalpha.core.events import Event, EVENT
@@ -25,6 +27,12 @@ from rqalpha.utils.datetime_func import convert_int_to_datetime
 from rqalpha.const import DEFAULT_ACCOUNT_TYPE, INSTRUMENT_TYPE
 from rqalpha.utils.i18n import gettext as _
 
+# 加密货币 7x24 交易，分钟线与股票一致以收盘时刻标记，每天 00:01 至次日 00:00 共 1440 个分钟时刻，
+# 相对零点的分钟偏移只计算一次
+CRYPTO_MINUTE_GRID = np.arange(1, 24 * 60 + 1, dtype=np.int64).astype('timedelta64[m]')
+# 网格对应的 timedelta，各天共用，逐分钟只需与当天零点相加
+CRYPTO_MINUTE_DELTAS = tuple(CRYPTO_MINUTE_GRID.tolist())
+
 
 class SimulationEventSource(AbstractEventSource):
     def __init__(self, env):
@@ -80,6 +88,12 @@ class SimulationEventSource(AbstractEventSource):
             trading_minutes.update(self._env.data_proxy.get_trading_minutes_for(order_book_id, trading_date))
         return set([convert_int_to_datetime(minute) for minute in trading_minutes])
 
+    @staticmethod
+    def _get_crypto_trading_minutes(trading_date):
+        # 以 datetime64 整列相加后一次性转为 datetime 列表，不逐分钟构造
+        day = np.datetime64(trading_date.replace(hour=0, minute=0, second=0, microsecond=0), 'm')
+        return (day + CRYPTO_MINUTE_GRID).tolist()
+
     def _get_trading_minutes(self, trading_date):
         trading_minutes = set()
         for account_type in self._config.base.accounts:
@@ -87,7 +101,38 @@ class SimulationEventSource(AbstractEventSource):
                 trading_minutes = trading_minutes.union(self._get_stock_trading_minutes(trading_date))
             elif account_type == DEFAULT_ACCOUNT_TYPE.FUTURE:
                 trading_minutes = trading_minutes.union(self._get_future_trading_minutes(trading_date))
+            elif account_type == DEFAULT_ACCOUNT_TYPE.CRYPTO:
+                trading_minutes = trading_minutes.union(self._get_crypto_trading_minutes(trading_date))
         return sorted(list(trading_minutes))
+
+    def _use_crypto_minute_clock(self):
+        # 股票的交易分钟是全天分钟的子集，且与 universe 无关；有期货账户时夜盘跨自然日，走通用逻辑
+        accounts = self._config.base.accounts
+        return DEFAULT_ACCOUNT_TYPE.CRYPTO.name in accounts and DEFAULT_ACCOUNT_TYPE.FUTURE.name not in accounts
+
+    def _crypto_minute_events(self, trading_dates):
+        """
+        加密货币 7x24 分钟事件
+        每天的分钟时刻由当天零点加上固定的 1440 个分钟偏移得到，交易分钟不依赖 universe，
+        universe 变化时直接从当前分钟继续，不重新计算、排序交易分钟。
+        所有分钟共用同一个 BAR 事件对象，每分钟只更新其 calendar_dt/trading_dt：执行器在取下一个事件前已处理完
+        当前事件，EventBus 分发时也不复制事件，处理函数不应在事件处理结束后继续持有该对象。
+        当天最后一根分钟线收盘于次日 00:00，与期货夜盘一致，其 trading_dt 保留时刻、日期取当天；
+        AFTER_TRADING 仍在当天 23:59:59，盘后查询日线时不包含次日的K线
+        """
+        bar_event = Event(EVENT.BAR, calendar_dt=None, trading_dt=None)
+        for day in trading_dates:
+            date = day.to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0)
+            yield Event(EVENT.BEFORE_TRADING, calendar_dt=date, trading_dt=date)
+            yield Event(EVENT.OPEN_AUCTION, calendar_dt=date, trading_dt=date)
+            for delta in CRYPTO_MINUTE_DELTAS[:-1]:
+                bar_event.calendar_dt = bar_event.trading_dt = date + delta
+                yield bar_event
+            bar_event.calendar_dt, bar_event.trading_dt = date + CRYPTO_MINUTE_DELTAS[-1], date
+            yield bar_event
+            self._universe_changed = False
+            dt_after_trading = date.replace(hour=23, minute=59, second=59)
+            yield Event(EVENT.AFTER_TRADING, calendar_dt=dt_after_trading, trading_dt=dt_after_trading)
     # [END] minute event helper
 
     def events(self, start_date, end_date, frequency):
@@ -105,6 +150,9 @@ class SimulationEventSource(AbstractEventSource):
                 yield Event(EVENT.OPEN_AUCTION, calendar_dt=dt_before_trading, trading_dt=dt_before_trading)
                 yield Event(EVENT.BAR, calendar_dt=dt_bar, trading_dt=dt_bar)
                 yield Event(EVENT.AFTER_TRADING, calendar_dt=dt_after_trading, trading_dt=dt_after_trading)
+        elif frequency == '1m' and self._use_crypto_minute_clock():
+            for event in self._crypto_minute_events(trading_dates):
+                yield event
         elif frequency == '1m':
             for day in trading_dates:
                 before_trading_flag = True
@@ -41,14 +41,16 @@ class PartialBarObject(metaclass=PropertyReprMeta):
     __repr_properties__ = (
         "order_book_id", "datetime", "open", "limit_up", "limit_down", "last"
     )
+    # _data 通常为数据源缓存的结构化数组中的一行（np.void，与原数组共享内存），各字段在访问时读取，不转换为字典；
+    # 使用 __slots__ 减小逐根K线创建对象的开销
+    __slots__ = ("_dt", "_data", "_instrument")
 
     def __init__(self, instrument, data, dt=None):
         self._dt = dt
         self._data = data if data is not None else NANDict
         self._instrument = instrument
-        self._env = Environment.get_instance()
 
-    @cached_property
+    @property
     def datetime(self):
         """
         [datetime.datetime] 时间戳
@@ -60,32 +62,32 @@ class PartialBarObject(metaclass=PropertyReprMeta):
             return dt
         return convert_int_to_datetime(dt)
 
-    @cached_property
+    @property
     def instrument(self):
         return self._instrument
 
-    @cached_property
+    @property
     def order_book_id(self):
         """
         [str] 交易标的代码
         """
         return self._instrument.order_book_id
 
-    @cached_property
+    @property
     def symbol(self):
         """
         [str] 合约简称
         """
         return self._instrument.symbol
 
-    @cached_property
+    @property
     def open(self):
         """
         [float] 开盘价
         """
         return self._data["open"]
 
-    @cached_property
+    @property
     def limit_up(self):
         """
         [float] 涨停价
@@ -96,7 +98,7 @@ class PartialBarObject(metaclass=PropertyReprMeta):
         except (KeyError, ValueError):
             return np.nan
 
-    @cached_property
+    @property
     def limit_down(self):
         """
         [float] 跌停价
@@ -107,28 +109,28 @@ class PartialBarObject(metaclass=PropertyReprMeta):
         except (KeyError, ValueError):
             return np.nan
 
-    @cached_property
+    @property
     def last(self):
         """
         [float] 当前最新价
         """
         return self._data["last"]
 
-    @cached_property
+    @property
     def volume(self):
         """
         [float] 截止到当前的成交量
         """
         return self._data["volume"]
 
-    @cached_property
+    @property
     def total_turnover(self):
         """
         [float] 截止到当前的成交额
         """
         return self._data['total_turnover']
 
-    @cached_property
+    @property
     def prev_close(self):
         """
         [float] 昨日收盘价
@@ -136,9 +138,10 @@ class PartialBarObject(metaclass=PropertyReprMeta):
         try:
             return self._data['prev_close']
         except (ValueError, KeyError):
-            return self._env.data_proxy.get_prev_close(self._instrument.order_book_id, self._env.trading_dt)
+            env = Environment.get_instance()
+            return env.data_proxy.get_prev_close(self._instrument.order_book_id, env.trading_dt)
 
-    @cached_property
+    @property
     def prev_settlement(self):
         """
         [float] 昨日结算价（期货专用）
@@ -146,9 +149,10 @@ class PartialBarObject(metaclass=PropertyReprMeta):
         try:
             return self._data['prev_settlement']
         except (ValueError, KeyError):
-            return self._env.data_proxy.get_prev_settlement(self._instrument.order_book_id, self._env.trading_dt)
+            env = Environment.get_instance()
+            return env.data_proxy.get_prev_settlement(self._instrument.order_book_id, env.trading_dt)
 
-    @cached_property
+    @property
     def isnan(self):
         return np.isnan(self._data['close'])
 
@@ -157,44 +161,45 @@ class BarObject(PartialBarObject):
     __repr_properties__ = (
         "order_book_id", "datetime", "open", "close", "high", "low", "limit_up", "limit_down"
     )
+    __slots__ = ()
 
-    @cached_property
+    @property
     def close(self):
         """
         [float] 收盘价
         """
         return self._data["close"]
 
-    @cached_property
+    @property
     def low(self):
         """
         [float] 最低价
         """
         return self._data["low"]
 
-    @cached_property
+    @property
     def high(self):
         """
         [float] 最高价
         """
         return self._data["high"]
 
-    @cached_property
+    @property
     def last(self):
         """
         [float] 当前最新价
         """
-        return self.close
+        return self._data["close"]
 
-    @cached_property
+    @property
     def discount_rate(self):
         return self._data['discount_rate']
 
-    @cached_property
+    @property
     def acc_net_value(self):
         return self._data['acc_net_value']
 
-    @cached_property
+    @property
     def unit_net_value(self):
         return self._data['unit_net_value']
 
@@ -204,7 +209,7 @@ class BarObject(PartialBarObject):
         'IC': '000905.XSHG',
     }
 
-    @cached_property
+    @property
     def basis_spread(self):
         try:
             return self._data['basis_spread']
@@ -218,32 +223,32 @@ class BarObject(PartialBarObject):
             else:
                 return np.nan
 
-    @cached_property
+    @property
     def settlement(self):
         """
         [float] 结算价（期货专用）
         """
         return self._data['settlement']
 
-    @cached_property
+    @property
     def open_interest(self):
         """
         [float] 截止到当前的持仓量（期货专用）
         """
         return self._data['open_interest']
 
-    @cached_property
+    @property
     def is_trading(self):
         """
         [bool] 是否有成交量
         """
         return self._data['volume'] > 0
 
-    @cached_property
+    @property
     def isnan(self):
         return np.isnan(self._data['close'])
 
-    @cached_property
+    @property
     def suspended(self):
         if self.isnan:
             return True
@@ -263,8 +268,7 @@ class BarObject(PartialBarObject):
         if (env.config.base.frequency == '1m' and frequency == '1d') or ExecutionContext.phase() == EXECUTION_PHASE.BEFORE_TRADING:
             # 在分钟回测获取日线数据, 应该推前一天
             dt = env.data_proxy.get_previous_trading_date(env.calendar_dt.date())
-        bars = env.data_proxy.fast_history(self._instrument.order_book_id, intervals, frequency, 'close', dt)
-        return bars.mean()
+        return env.data_proxy.get_rolling_indicator(self._instrument.order_book_id, 'mavg', intervals, frequency, dt)
 
     def vwap(self, intervals, frequency='1d'):
         if frequency == 'day':
@@ -279,13 +283,7 @@ class BarObject(PartialBarObject):
         if (env.config.base.frequency == '1m' and frequency == '1d') or ExecutionContext.phase() == EXECUTION_PHASE.BEFORE_TRADING:
             # 在分钟回测获取日线数据, 应该推前一天
             dt = env.data_proxy.get_previous_trading_date(env.calendar_dt.date())
-        bars = env.data_proxy.fast_history(self._instrument.order_book_id, intervals, frequency, ['close', 'volume'], dt)
-        sum = bars['volume'].sum()
-        if sum == 0:
-            # 全部停牌
-            return 0
-
-        return np.dot(bars['close'], bars['volume']) / sum
+        return env.data_proxy.get_rolling_indicator(self._instrument.order_book_id, 'vwap', intervals, frequency, dt)
 
     def __repr__(self):
         base = [
@@ -306,12 +304,18 @@ class BarObject(PartialBarObject):
         return "Bar({0})".format(', '.join('{0}: {1}'.format(k, v) for k, v in base))
 
     def __getitem__(self, key):
-        return self.__dict__[key]
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
 
     def __getattr__(self, item):
+        if item.startswith("_"):
+            # 未初始化的 slot 及 copy/pickle 查找的特殊方法，避免经 self._data 无限递归
+            raise AttributeError(item)
         try:
             value = self._data[item]
-        except KeyError:
+        except (KeyError, ValueError):
             raise AttributeError("'{}' object has no attribute '{}'".format(self.__class__.__name__, item))
         else:
             if isinstance(value, bytes):
@@ -320,6 +324,13 @@ class BarObject(PartialBarObject):
 
 
 class BarMap(object):
+    """
+    handle_bar 中的 bar_dict
+
+    同一时刻的 BarObject 按 order_book_id 缓存，时刻推进后清空；BarObject 直接引用数据源缓存的数据行，
+    不复用对象，策略保留的 BarObject（如存入 context）内容保持不变
+    """
+
     def __init__(self, data_proxy, frequency):
         self._dt = None
         self._data_proxy = data_proxy
@@ -348,6 +359,9 @@ class BarMap(object):
     def __getitem__(self, key):
         if not isinstance(key, six.string_types):
             raise patch_user_exc(ValueError('invalid key {} (use order_book_id please)'.format(key)))
+        bar = self._cache.get(key)
+        if bar is not None:
+            return bar
 
         instrument = self._data_proxy.instrument(key)
         if instrument is None:
@@ -363,18 +377,18 @@ class BarMap(object):
                 if ExecutionContext.phase() == EXECUTION_PHASE.OPEN_AUCTION:
                     trading_date = self._dt if self._frequency == "1d" else self._data_proxy.get_trading_dt(self._dt).date()
                     bar = self._data_proxy.get_open_auction_bar(order_book_id, trading_date)
-                else:
-                    bar = self._data_proxy.get_bar(order_book_id, self._dt, self._frequency)
+                    self._cache[order_book_id] = bar
+                    return bar
+                data = self._data_proxy.get_bar_data(instrument, self._dt, self._frequency)
             except PermissionError:
                 raise
             except Exception as e:
                 system_log.exception(e)
                 raise patch_user_exc(KeyError(_(u"id_or_symbols {} does not exist").format(key)))
-            if bar is None:
+            if data is None:
                 return BarObject(instrument, NANDict, self._dt)
-            else:
-                self._cache[order_book_id] = bar
-                return bar
+            bar = self._cache[order_book_id] = BarObject(instrument, data)
+            return bar
 
     @cached_property
     def dt(self):
@@ -194,7 +194,16 @@ class Portfolio(object, metaclass=PropertyReprMeta):
 
         env = Environment.get_instance()
         date_count = float(env.data_proxy.count_trading_dates(env.config.base.start_date, env.trading_dt.date()))
-        return self.unit_net_value ** (DAYS_CNT.TRADING_DAYS_A_YEAR / date_count) - 1
+        return self.unit_net_value ** (self.annual_factor / date_count) - 1
+
+    @property
+    def annual_factor(self):
+        """
+        [int] 年化时每年的交易日数，加密货币全年无休，只有加密货币账户时按自然日计算
+        """
+        if self._accounts and all(account_type == DEFAULT_ACCOUNT_TYPE.CRYPTO for account_type in self._accounts):
+            return DAYS_CNT.DAYS_A_YEAR
+        return DAYS_CNT.TRADING_DAYS_A_YEAR
 
     @property
     def total_value(self):
@@ -15,6 +15,7 @@
 #         在此前提下，对本软件的使用同样需要遵守 Apache 2.0 许可，Apache 2.0 许可与本许可冲突之处，以本许可为准。
 #         详细的授权流程，请联系 public@ricequant.com 获取。
 
+import math
 from itertools import chain
 from datetime import date
 from typing import Callable, Dict, Iterable, List, Optional, Union, Tuple
@@ -34,6 +35,13 @@ from rqalpha.mod.rqalpha_mod_sys_accounts.position_model import FuturePosition
 
 OrderApiType = Callable[[str, Union[int, float], OrderStyle, bool], List[Order]]
 
+# 各持仓对账户汇总值的贡献：市值（空头为负）、权益、多头保证金、空头保证金、昨仓盈亏、交易盈亏、交易费用
+_AGGREGATE_FIELDS = (
+    "market_value", "position_equity", "buy_margin", "sell_margin", "position_pnl", "trading_pnl", "transaction_cost"
+)
+_MARKET_VALUE, _EQUITY, _BUY_MARGIN, _SELL_MARGIN, _POSITION_PNL, _TRADING_PNL, _TRANSACTION_COST = range(7)
+_ZERO = (0, ) * len(_AGGREGATE_FIELDS)
+
 
 class AccountMeta(type):
     def __new__(mcs, *args, **kwargs):
@@ -48,6 +56,9 @@ class Account(metaclass=AccountMeta):
     账户，多种持仓和现金的集合。
 
     不同品种的合约持仓可能归属于不同的账户，如股票、转债、场内基金、ETF 期权归属于股票账户，期货、期货期权归属于期货账户
+
+    市值、权益、保证金、盈亏等汇总值增量维护：成交和价格变化时只更新相关持仓的贡献，盘前、结算等批量变化后整体重算；
+    开启 extra.check_portfolio_aggregates 时每次读取都与整体重算的结果核对。
     """
 
     __abandon_properties__ = [
@@ -71,6 +82,12 @@ class Account(metaclass=AccountMeta):
 
         self._cash_liabilities = 0      # 现金负债
 
+        self._aggregates = list(_ZERO)
+        self._contributions: Dict[Position, tuple] = {}
+        # 为 True 时下次读取前整体重算，持仓贡献中出现 nan 时也保持为 True，此时与逐次求和的行为一致
+        self._aggregates_dirty = False
+        self._check_aggregates = getattr(getattr(self._env.config, "extra", None), "check_portfolio_aggregates", False)
+
         self.register_event()
 
         self._management_fee_calculator_func = lambda account, rate: account.total_value * rate
@@ -137,6 +154,7 @@ class Account(metaclass=AccountMeta):
                     position.set_state(positions_state[direction])
                 else:
                     position.set_state(positions_state[direction.lower()])
+        self._aggregates_dirty = True
 
     def fast_forward(self, orders=None, trades=None):
         if trades:
@@ -215,7 +233,7 @@ class Account(metaclass=AccountMeta):
         """
         [float] 市值
         """
-        return sum(p.market_value * (1 if p.direction == POSITION_DIRECTION.LONG else -1) for p in self._iter_pos())
+        return self._aggregate(_MARKET_VALUE)
 
     @property
     def transaction_cost(self):
@@ -223,7 +241,7 @@ class Account(metaclass=AccountMeta):
         """
         总费用
         """
-        return sum(p.transaction_cost for p in self._iter_pos())
+        return self._aggregate(_TRANSACTION_COST)
 
     @property
     def cash_liabilities(self):
@@ -246,7 +264,7 @@ class Account(metaclass=AccountMeta):
         """
         总保证金
         """
-        return sum(getattr(p, "margin", 0) for p in self._iter_pos())
+        return self._aggregate(_BUY_MARGIN) + self._aggregates[_SELL_MARGIN]
 
     @property
     def buy_margin(self):
@@ -254,7 +272,7 @@ class Account(metaclass=AccountMeta):
         """
         多方向保证金
         """
-        return sum(getattr(p, "margin", 0) for p in self._iter_pos(POSITION_DIRECTION.LONG))
+        return self._aggregate(_BUY_MARGIN)
 
     @property
     def sell_margin(self):
@@ -262,7 +280,7 @@ class Account(metaclass=AccountMeta):
         """
         空方向保证金
         """
-        return sum(getattr(p, "margin", 0) for p in self._iter_pos(POSITION_DIRECTION.SHORT))
+        return self._aggregate(_SELL_MARGIN)
 
     @property
     def daily_pnl(self):
@@ -278,7 +296,7 @@ class Account(metaclass=AccountMeta):
         """
         持仓总权益
         """
-        return sum(p.equity for p in self._iter_pos())
+        return self._aggregate(_EQUITY)
 
     @property
     def total_value(self) -> float:
@@ -304,7 +322,7 @@ class Account(metaclass=AccountMeta):
         """
         昨仓盈亏
         """
-        return sum(p.position_pnl for p in self._iter_pos())
+        return self._aggregate(_POSITION_PNL)
 
     @property
     def trading_pnl(self):
@@ -312,7 +330,7 @@ class Account(metaclass=AccountMeta):
         """
         交易盈亏
         """
-        return sum(p.trading_pnl for p in self._iter_pos())
+        return self._aggregate(_TRADING_PNL)
 
     def _on_before_trading(self, _):
         for order_book_id, positions in list(self._positions.items()):
@@ -327,6 +345,8 @@ class Account(metaclass=AccountMeta):
         for position in self._iter_pos():
             self._total_cash += position.before_trading(trading_date)
 
+        self._aggregates_dirty = True
+
         # 负债自增利息
         if self._cash_liabilities > 0:
             self._cash_liabilities += self.cash_liabilities_interest
@@ -340,6 +360,7 @@ class Account(metaclass=AccountMeta):
                 self._total_cash += delta_cash
 
         self._backward_trade_set.clear()
+        self._aggregates_dirty = True
 
         fee = self._management_fee()
         self._management_fees += fee
@@ -356,6 +377,7 @@ class Account(metaclass=AccountMeta):
                 user_system_log.warn(_("Trigger Forced Liquidation, current total_value is 0"))
             self._positions.clear()
             self._total_cash = 0
+            self._aggregates_dirty = True
     
     def _post_settlement(self, event):
         # type: (EVENT) -> None
@@ -366,6 +388,7 @@ class Account(metaclass=AccountMeta):
             for position in six.itervalues(positions):
                 if isinstance(position, FuturePosition):
                     position.post_settlement()
+        self._aggregates_dirty = True
 
     def _on_order_pending_new(self, event):
         if event.account != self:
@@ -394,15 +417,17 @@ class Account(metaclass=AccountMeta):
             else:
                 self._frozen_cash -= order.init_frozen_cash
         if trade.position_effect == POSITION_EFFECT.MATCH:
-            delta_cash = self._get_or_create_pos(
-                order_book_id, POSITION_DIRECTION.LONG
-            ).apply_trade(trade) + self._get_or_create_pos(
-                order_book_id, POSITION_DIRECTION.SHORT
-            ).apply_trade(trade)
+            long_position = self._get_or_create_pos(order_book_id, POSITION_DIRECTION.LONG)
+            short_position = self._get_or_create_pos(order_book_id, POSITION_DIRECTION.SHORT)
+            delta_cash = long_position.apply_trade(trade) + short_position.apply_trade(trade)
             self._total_cash += delta_cash
+            self._update_aggregates(long_position)
+            self._update_aggregates(short_position)
         else:
-            delta_cash = self._get_or_create_pos(order_book_id, trade.position_direction).apply_trade(trade)
+            position = self._get_or_create_pos(order_book_id, trade.position_direction)
+            delta_cash = position.apply_trade(trade)
             self._total_cash += delta_cash
+            self._update_aggregates(position)
         self._backward_trade_set.add(trade.exec_id)
 
     def _iter_pos(self, direction=None):
@@ -432,6 +457,8 @@ class Account(metaclass=AccountMeta):
                 last_price = self._env.get_last_price(order_book_id)
                 for p in positions.values():
                     p.update_last_price(last_price)
+            for p in positions.values():
+                self._update_aggregates(p)
             if hasattr(positions[direction], "margin") and hasattr(self.__class__, "_margin"):
                 # black magic: improve performance for pure stock strategy
                 setattr(self.__class__, "margin", self.__class__._margin)
@@ -447,14 +474,81 @@ class Account(metaclass=AccountMeta):
         except KeyError:
             return
         for position in positions.values():
-            position.update_last_price(tick.last)
+            if position.update_last_price(tick.last):
+                self._update_aggregates(position)
 
     def _on_bar(self, _):
         for order_book_id, positions in self._positions.items():
+            if not any(p.price_sensitive for p in six.itervalues(positions)):
+                # 已平仓的标的不影响汇总值，最新价推迟到读取时再获取
+                for position in six.itervalues(positions):
+                    position.mark_last_price_stale()
+                continue
             price = self._env.get_last_price(order_book_id)
             if price == price:
                 for position in six.itervalues(positions):
-                    position.update_last_price(price)
+                    if position.update_last_price(price):
+                        self._update_aggregates(position)
+
+    @staticmethod
+    def _contribution_of(position):
+        # type: (Position) -> tuple
+        margin = getattr(position, "margin", 0)
+        if position.direction == POSITION_DIRECTION.LONG:
+            market_value, buy_margin, sell_margin = position.market_value, margin, 0
+        else:
+            market_value, buy_margin, sell_margin = -position.market_value, 0, margin
+        return (
+            market_value, position.equity, buy_margin, sell_margin, position.position_pnl, position.trading_pnl,
+            position.transaction_cost
+        )
+
+    def _update_aggregates(self, position):
+        # type: (Position) -> None
+        """持仓变化后以其新旧贡献之差更新汇总值"""
+        if self._aggregates_dirty:
+            return
+        new = self._contribution_of(position)
+        old = self._contributions.get(position, _ZERO)
+        self._contributions[position] = new
+        if new == old:
+            return
+        aggregates = self._aggregates
+        for i, (n, o) in enumerate(zip(new, old)):
+            aggregates[i] += n - o
+        if any(a != a for a in aggregates):
+            self._aggregates_dirty = True
+
+    def _recompute_aggregates(self):
+        # type: () -> Tuple[List[float], Dict[Position, tuple]]
+        aggregates = [0] * len(_AGGREGATE_FIELDS)
+        contributions = {}
+        for position in self._iter_pos():
+            contribution = contributions[position] = self._contribution_of(position)
+            for i, value in enumerate(contribution):
+                aggregates[i] += value
+        return aggregates, contributions
+
+    def _aggregate(self, index):
+        # type: (int) -> float
+        if self._aggregates_dirty:
+            self._aggregates, self._contributions = self._recompute_aggregates()
+            self._aggregates_dirty = any(a != a for a in self._aggregates)
+        elif self._check_aggregates:
+            self._check_aggregates_consistency()
+        return self._aggregates[index]
+
+    def _check_aggregates_consistency(self):
+        expected, _ = self._recompute_aggregates()
+        mismatches = [
+            "{}: {} != {}".format(field, actual, value)
+            for field, actual, value in zip(_AGGREGATE_FIELDS, self._aggregates, expected)
+            if not math.isclose(actual, value, rel_tol=1e-9, abs_tol=1e-6)
+        ]
+        if mismatches:
+            raise RuntimeError("{} account aggregates diverged from a full recompute: {}".format(
+                self._type, ", ".join(mismatches)
+            ))
 
     def _frozen_cash_of_order(self, order):
         if order.position_effect == POSITION_EFFECT.OPEN:
@@ -89,6 +89,7 @@ class Position(AbstractPosition, metaclass=PositionMeta):
         self._transaction_cost: float = 0
         self._prev_close: Optional[float] = init_price
         self._last_price: Optional[float] = init_price
+        self._last_price_stale = False
 
         self._direction_factor = 1 if direction == POSITION_DIRECTION.LONG else -1
 
@@ -165,6 +166,11 @@ class Position(AbstractPosition, metaclass=PositionMeta):
     @property
     def last_price(self):
         # type: () -> float
+        if self._last_price_stale:
+            self._last_price_stale = False
+            price = self._env.data_proxy.get_last_price(self._order_book_id)
+            if price == price:
+                self._last_price = price
         if not is_valid_price(self._last_price):
             self._last_price = self._env.data_proxy.get_last_price(self._order_book_id)
             if not is_valid_price(self._last_price):
@@ -177,17 +183,14 @@ class Position(AbstractPosition, metaclass=PositionMeta):
         """
         可平仓位
         """
-        order_quantity = sum(o.unfilled_quantity for o in self._open_orders if o.position_effect in (
-            POSITION_EFFECT.CLOSE, POSITION_EFFECT.CLOSE_TODAY, POSITION_EFFECT.EXERCISE
-        ))
+        order_quantity, _ = self._env.broker.get_frozen_quantity(self._order_book_id, self._direction)
         return self._quantity - order_quantity
 
     @property
     def today_closable(self):
         # type: () -> int
-        return self._quantity - self._old_quantity - sum(
-            o.unfilled_quantity for o in self._open_orders if o.position_effect == POSITION_EFFECT.CLOSE_TODAY
-        )
+        _, close_today_quantity = self._env.broker.get_frozen_quantity(self._order_book_id, self._direction)
+        return self._quantity - self._old_quantity - close_today_quantity
 
     def get_state(self):
         """"""
@@ -259,7 +262,22 @@ class Position(AbstractPosition, metaclass=PositionMeta):
         return 0
 
     def update_last_price(self, price):
+        # type: (float) -> bool
+        """更新最新价，返回价格是否变化"""
+        changed = price != self._last_price or self._last_price_stale
         self._last_price = price
+        self._last_price_stale = False
+        return changed
+
+    def mark_last_price_stale(self):
+        """推迟最新价的更新，到下次读取 last_price 时再从行情获取"""
+        self._last_price_stale = True
+
+    @property
+    def price_sensitive(self):
+        # type: () -> bool
+        """既无持仓也无昨仓时，市值、权益、盈亏均与最新价无关"""
+        return bool(self._quantity or self._logical_old_quantity)
 
     def calc_close_today_amount(self, trade_amount, position_effect):
         return 0
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+参数扫描
+对同一策略按参数网格批量回测：每组参数通过 config.extra.context_vars 注入 context，在 fork 出的常驻进程池中
+并行运行，各进程复用父进程中预先构建的数据源，汇总 sys_analyser 的 summary 为一个 DataFrame。
+"""
+
+import copy
+import itertools
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from rqalpha.core.events import EVENT
+from rqalpha.interface import AbstractMod
+from rqalpha.utils.batch_helper import build_config, check_strategy, map_in_processes, preload_data_source, run_backtest
+from rqalpha.utils.logger import system_log
+
+MOD_NAME = "sys_sweep"
+
+# 由父进程在 fork 之前设置，子进程直接继承，不需要序列化策略函数和数据源
+_state = {}  # type: Dict[str, Any]
+
+
+class SweepAborted(RuntimeError):
+    def __init__(self, drawdown, date):
+        super(SweepAborted, self).__init__("drawdown {:.2%} exceeds the threshold on {}".format(drawdown, date))
+        self.drawdown = drawdown
+        self.date = date
+
+
+class SweepMod(AbstractMod):
+    """
+    参数扫描中每次回测自动加载的 mod：注入预先构建的数据源，并在回撤超过 max_drawdown 时中止回测
+    """
+
+    def __init__(self):
+        self._env = None
+        self._max_drawdown = None
+        self._peak = None
+
+    def start_up(self, env, mod_config):
+        self._env = env
+        self._max_drawdown = mod_config.max_drawdown
+        self._peak = None
+        _state["aborted"] = None
+        data_source = _state.get("data_source")
+        if data_source is not None and env.data_source is None:
+            env.set_data_source(data_source)
+        if self._max_drawdown is not None:
+            env.event_bus.add_listener(EVENT.POST_SETTLEMENT, self._check_drawdown)
+
+    def _check_drawdown(self, _):
+        value = self._env.portfolio.total_value
+        self._peak = value if self._peak is None else max(self._peak, value)
+        if self._peak <= 0:
+            return
+        drawdown = 1 - value / self._peak
+        if drawdown > self._max_drawdown:
+            _state["aborted"] = (drawdown, self._env.trading_dt.date())
+            raise SweepAborted(drawdown, self._env.trading_dt.date())
+
+    def tear_down(self, code, exception=None):
+        pass
+
+
+def load_mod():
+    return SweepMod()
+
+
+def expand_grid(param_grid):
+    # type: (Union[Mapping[str, Sequence], Iterable[Mapping[str, Any]]]) -> List[Dict[str, Any]]
+    """
+    展开参数网格：字典为各参数取值列表的笛卡尔积，字典的列表则逐个使用
+
+    >>> expand_grid({"fast": [5, 10], "slow": [30]})
+    [{'fast': 5, 'slow': 30}, {'fast': 10, 'slow': 30}]
+    """
+    if isinstance(param_grid, Mapping):
+        names = list(param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    return [dict(p) for p in param_grid]
+
+
+def _run_one(task):
+    index, params = task
+    config = copy.deepcopy(_state["config"])
+    context_vars = dict(config["extra"].get("context_vars") or {})
+    context_vars.update(params)
+    config["extra"]["context_vars"] = context_vars
+
+    row = {"run": index}
+    row.update(params)
+    _state["aborted"] = None
+    try:
+        result = run_backtest(config, _state["user_funcs"])
+    except Exception as e:
+        system_log.exception("sweep run {} failed", index)
+        result = None
+        row["error"] = repr(e)
+    aborted = _state.get("aborted")
+    row["aborted"] = aborted is not None
+    if aborted is not None:
+        row["abort_drawdown"], row["abort_date"] = aborted
+    summary = (result or {}).get("sys_analyser", {}).get("summary")
+    if summary:
+        row.update((k, v) for k, v in summary.items() if k not in row)
+    elif aborted is None and "error" not in row:
+        row["error"] = "backtest failed, see the log for details"
+    return row
+
+
+def sweep(param_grid, config=None, strategy_file=None, processes=None, max_drawdown=None, preload=True,
+          log_level="error", **user_funcs):
+    # type: (Union[Mapping[str, Sequence], Iterable[Mapping[str, Any]]], Optional[dict], Optional[str], Optional[int], Optional[float], bool, Optional[str], Callable) -> pd.DataFrame
+    """
+    对参数网格中的每组参数运行一次回测，返回每组参数一行的 DataFrame
+
+    :param param_grid: 参数网格，{参数名: 取值列表} 或参数字典的列表；每组参数写入 config.extra.context_vars，
+        在策略中通过 context.<参数名> 读取
+    :param config: 各次回测共用的配置字典，同 run_func
+    :param strategy_file: 策略文件路径；不传时使用以关键字参数传入的 init、handle_bar 等约定函数，同 run_func
+    :param processes: 进程数，默认为 CPU 核数；为 1 或系统不支持 fork 时在当前进程中依次运行
+    :param max_drawdown: 回撤（相对净值最高点）超过该比例时中止该组回测，如 0.3
+    :param preload: 是否在 fork 之前构建数据源供各次回测复用，为 False 时每次回测各自加载 bundle
+    :param log_level: 各次回测默认的日志级别，config 中设置了 extra.log_level 时以 config 为准
+
+    结果包含参数列、run（参数组序号）、aborted、abort_drawdown、abort_date、error 及 sys_analyser summary 的各项。
+    多个进程同时运行时建议先执行 ``rqalpha bundle-cache start``，各进程共享同一份日线数据。
+    """
+    check_strategy(strategy_file, user_funcs)
+    params = expand_grid(param_grid)
+    _state.clear()
+    _state["config"] = build_config(config, strategy_file, log_level, MOD_NAME, __name__, max_drawdown=max_drawdown)
+    _state["user_funcs"] = user_funcs or None
+    if preload:
+        _state["data_source"] = preload_data_source(_state["config"], _state["user_funcs"])
+
+    try:
+        rows = map_in_processes(_run_one, list(enumerate(params)), processes)
+    finally:
+        _state.clear()
+
+    result = pd.DataFrame(rows)
+    return result.set_index("run").sort_index() if len(result) else result
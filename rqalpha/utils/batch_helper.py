@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+批量回测的公共部分
+参数扫描（rqalpha.sweep）与滚动窗口回测（rqalpha.walk_forward）共用的配置构建、数据源预加载和进程池调度。
+"""
+
+import copy
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+USER_FUNC_NAMES = ('init', 'handle_bar', 'handle_tick', 'open_auction', 'before_trading', 'after_trading')
+
+
+def check_strategy(strategy_file, user_funcs):
+    # type: (Optional[str], Dict[str, Callable]) -> None
+    unknown = set(user_funcs) - set(USER_FUNC_NAMES)
+    if unknown:
+        raise TypeError("unexpected keyword arguments: {}".format(", ".join(sorted(unknown))))
+    if strategy_file is None and not user_funcs:
+        raise ValueError("either strategy_file or strategy functions are required")
+
+
+def build_config(config, strategy_file, log_level, mod_name, mod_lib, **mod_config):
+    # type: (Optional[dict], Optional[str], Optional[str], str, str, Any) -> dict
+    """
+    复制各次回测共用的配置：开启 sys_analyser，并加载 mod_lib 中的 mod，mod_config 为该 mod 的配置项
+    """
+    config = copy.deepcopy(config) if config else {}
+    for key in ("base", "extra", "mod"):
+        config.setdefault(key, {})
+    if strategy_file is not None:
+        config["base"]["strategy_file"] = strategy_file
+    if log_level is not None:
+        config["extra"].setdefault("log_level", log_level)
+    config["mod"].setdefault("sys_analyser", {})["enabled"] = True
+    mod_config.update({"enabled": True, "lib": mod_lib})
+    config["mod"][mod_name] = mod_config
+    return config
+
+
+def preload_data_source(config, user_funcs):
+    from rqalpha.main import create_data_source
+    from rqalpha.utils.config import parse_config
+    return create_data_source(parse_config(copy.deepcopy(config), user_funcs=user_funcs))
+
+
+def clear_run_caches():
+    # 与 run_func 相同，每次回测前清空函数缓存；K线数组的 nbytes 缓存只与 bundle 有关，保留以复用已加载的数据
+    from rqalpha.utils.functools import cached_functions, nbytes_cache
+    for func in cached_functions:
+        if getattr(func, "cache", None) is not nbytes_cache:
+            func.cache_clear()
+    nbytes_cache.reset_stats()
+
+
+def run_backtest(config, user_funcs, clear_caches=True):
+    from rqalpha import main
+    from rqalpha.utils.config import parse_config
+    config = parse_config(config, user_funcs=user_funcs)
+    if clear_caches:
+        clear_run_caches()
+    return main.run(config, user_funcs=user_funcs)
+
+
+def map_in_processes(func, tasks, processes=None):
+    # type: (Callable[[T], R], List[T], Optional[int]) -> List[R]
+    """
+    在 fork 出的进程池中运行 func，结果按完成先后返回；进程数为 1、只有一个任务或系统不支持 fork 时在当前进程中依次运行。
+    func 及其读取的模块级状态由子进程直接继承，不需要序列化
+    """
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(tasks) <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [func(task) for task in tasks]
+    with multiprocessing.get_context("fork").Pool(min(processes, len(tasks))) as pool:
+        return list(pool.imap_unordered(func, tasks))
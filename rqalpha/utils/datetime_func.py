@@ -16,6 +16,7 @@ import datetime
 from typing import Union
 from collections import namedtuple
 
+import numpy as np
 import six
 from dateutil.parser import parse
 
@@ -43,6 +44,44 @@ def convert_dt_to_int(dt):
     return t
 
 
+def _convert_epoch_days_to_int(days):
+    d = days.astype('datetime64[D]')
+    m = d.astype('datetime64[M]')
+    y = m.astype('datetime64[Y]')
+    return (y.astype(np.int64) + 1970) * 10000000000 + ((m - y).astype(np.int64) + 1) * 100000000 + \
+        ((d - m).astype(np.int64) + 1) * 1000000
+
+
+def convert_epoch_ms_to_int(ms):
+    """将 UTC 毫秒时间戳（标量或数组）以数组运算转换为 YYYYmmddHHMMSS 形式的 int64"""
+    days, ms_of_day = np.divmod(np.asarray(ms, dtype=np.int64), 86400000)
+    if days.ndim and days.size:
+        first = days.min()
+        span = days.max() - first + 1
+        if span <= days.size:
+            # K线通常跨越的天数远少于条数，只对区间内的每一天计算一次日期
+            date_int = _convert_epoch_days_to_int(np.arange(first, first + span))[days - first]
+        else:
+            date_int = _convert_epoch_days_to_int(days)
+    else:
+        date_int = _convert_epoch_days_to_int(days)
+    hour, r = np.divmod(ms_of_day // 1000, 3600)
+    minute, second = np.divmod(r, 60)
+    return date_int + hour * 10000 + minute * 100 + second
+
+
+def convert_int_to_epoch_ms(dt_int):
+    """convert_epoch_ms_to_int 的逆运算，将 YYYYmmddHHMMSS 形式的整数（标量或数组）转换为 UTC 毫秒时间戳"""
+    date_int, time_int = np.divmod(np.asarray(dt_int, dtype=np.int64), 1000000)
+    year, r = np.divmod(date_int, 10000)
+    month, day = np.divmod(r, 100)
+    months = ((year - 1970) * 12 + month - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]').astype(np.int64) + day - 1
+    hour, r = np.divmod(time_int, 10000)
+    minute, second = np.divmod(r, 100)
+    return days * 86400000 + (hour * 3600 + minute * 60 + second) * 1000
+
+
 def convert_int_to_date(dt_int):
     dt_int = int(dt_int)
     if dt_int > 100000000:
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+事件循环的热点分析
+为 EventBus 的每个处理函数和数据源的每个接口方法加上计时，统计调用次数、累计耗时（含嵌套调用）和自身耗时，
+回测结束后按自身耗时输出；可以将某一个交易日内的所有调用导出为 Chrome trace 格式的 JSON，使用
+chrome://tracing、Perfetto 或 speedscope 查看。
+
+通过 extra.enable_event_loop_profiler 开启，对应 rqalpha run --enable-event-loop-profiler。
+"""
+
+import json
+from datetime import date
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+from rqalpha.core.events import EVENT
+from rqalpha.interface import AbstractDataSource
+
+DATA_SOURCE_METHODS = tuple(sorted(
+    name for name, value in vars(AbstractDataSource).items() if callable(value) and not name.startswith("_")
+))
+
+_MOD_PREFIX = "rqalpha.mod.rqalpha_mod_"
+
+
+def _owner_of(module):
+    # type: (Optional[str]) -> str
+    """处理函数所属的 mod 或模块，如 sys_simulation、rqalpha.portfolio、user"""
+    if not module:
+        return "-"
+    if module.startswith(_MOD_PREFIX):
+        return module[len(_MOD_PREFIX):].split(".", 1)[0]
+    if module.startswith("rqalpha_mod_"):
+        return module[len("rqalpha_mod_"):].split(".", 1)[0]
+    if module == "rqalpha.user_module" or module == "__main__":
+        return "user"
+    return module.rsplit(".", 1)[0] if module.count(".") > 1 else module
+
+
+def _name_of(func):
+    # type: (Callable) -> str
+    obj = getattr(func, "__self__", None)
+    func = getattr(func, "__func__", func)
+    name = getattr(func, "__name__", None) or type(func).__name__
+    if obj is not None:
+        return "{}.{}".format(type(obj).__name__, name)
+    return getattr(func, "__qualname__", name)
+
+
+class EventLoopProfiler(object):
+    """
+    :param trace_date: 导出 trace 的交易日，None 时为回测的第一个交易日
+    :param trace_file: trace 的输出路径，None 时不记录 trace
+    """
+
+    def __init__(self, trace_date=None, trace_file=None):
+        # type: (Optional[date], Optional[str]) -> None
+        self._trace_date = trace_date
+        self._trace_file = trace_file
+        self._stats = {}  # type: Dict[tuple, List]
+        self._stack = []  # type: List[float]
+        self._tracing = False
+        self._traced = False
+        self._trace_events = []  # type: List[dict]
+        self._origin = None
+        self._day_event = None
+        self._env = None
+        self._data_source = None
+
+    def install(self, env):
+        self._env = env
+        self._origin = perf_counter()
+        env.event_bus.set_listener_wrapper(self._wrap_listener)
+        self._data_source = env.data_source
+        for name in DATA_SOURCE_METHODS:
+            method = getattr(self._data_source, name, None)
+            if method is not None and name not in vars(self._data_source):
+                setattr(self._data_source, name, self._timed(
+                    method, ("data_source", "-", type(self._data_source).__name__ + "." + name, "data_source")
+                ))
+
+    def uninstall(self):
+        if self._env is not None:
+            self._env.event_bus.set_listener_wrapper(None)
+        if self._data_source is not None:
+            for name in DATA_SOURCE_METHODS:
+                if getattr(vars(self._data_source).get(name), "__profiled__", False):
+                    delattr(self._data_source, name)
+        self._env = self._data_source = None
+
+    def _wrap_listener(self, event_type, listener, user):
+        func = getattr(listener, "__func__", listener)
+        key = ("user_listener" if user else "listener", event_type.name, _name_of(listener),
+               _owner_of(getattr(func, "__module__", None)))
+        timed = self._timed(listener, key)
+        if event_type is not EVENT.PRE_BEFORE_TRADING:
+            return timed
+
+        @wraps(listener)
+        def day_start(event):
+            if event is not self._day_event:
+                self._day_event = event
+                self._on_day_start()
+            return timed(event)
+
+        day_start.__profiled__ = True
+        return day_start
+
+    def _on_day_start(self):
+        if self._trace_file is None:
+            return
+        trading_date = self._env.trading_dt.date()
+        if self._tracing:
+            self._tracing = False
+            self._traced = True
+        elif not self._traced and (self._trace_date is None or trading_date == self._trace_date):
+            self._tracing = True
+            self._trace_date = trading_date
+
+    def _timed(self, func, key):
+        stat = self._stats.get(key)
+        if stat is None:
+            stat = self._stats[key] = [0, 0., 0.]
+        stack = self._stack
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            stack.append(0.)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                stat[0] += 1
+                stat[1] += elapsed
+                stat[2] += elapsed - children
+                if self._tracing:
+                    self._trace_events.append({
+                        "name": key[2], "cat": "{},{}".format(key[0], key[3]), "ph": "X", "pid": 0, "tid": 0,
+                        "ts": (start - self._origin) * 1e6, "dur": elapsed * 1e6, "args": {"event": key[1]},
+                    })
+
+        wrapper.__profiled__ = True
+        return wrapper
+
+    def stats(self):
+        """
+        按自身耗时降序的统计
+        :return: [(kind, event, name, owner, calls, total_seconds, self_seconds)]
+        """
+        rows = [key + tuple(stat) for key, stat in self._stats.items() if stat[0]]
+        return sorted(rows, key=lambda r: r[6], reverse=True)
+
+    def report(self, limit=50):
+        # type: (Optional[int]) -> str
+        rows = self.stats()
+        lines = ["{:<14}{:<22}{:<44}{:<18}{:>10}{:>11}{:>11}{:>14}".format(
+            "kind", "event", "name", "owner", "calls", "total(s)", "self(s)", "self/call(us)"
+        )]
+        for kind, event, name, owner, calls, total, self_time in rows[:limit]:
+            lines.append("{:<14}{:<22}{:<44}{:<18}{:>10}{:>11.3f}{:>11.3f}{:>14.2f}".format(
+                kind, event, name[:43], owner[:17], calls, total, self_time, self_time / calls * 1e6
+            ))
+        return "\n".join(lines)
+
+    def dump_trace(self):
+        # type: () -> Optional[str]
+        """将记录的 trace 写入 trace_file，没有记录时返回 None"""
+        if self._trace_file is None or not self._trace_events:
+            return None
+        with open(self._trace_file, "w") as f:
+            json.dump({
+                "traceEvents": self._trace_events,
+                "displayTimeUnit": "ms",
+                "otherData": {"trading_date": str(self._trace_date)},
+            }, f)
+        return self._trace_file
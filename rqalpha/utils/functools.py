@@ -15,8 +15,9 @@
 #         在此前提下，对本软件的使用同样需要遵守 Apache 2.0 许可，Apache 2.0 许可与本许可冲突之处，以本许可为准。
 #         详细的授权流程，请联系 public@ricequant.com 获取。
 
+from collections import OrderedDict
 from inspect import signature
-from typing import Callable, Union, Iterable
+from typing import Any, Callable, Hashable, Union, Iterable, Optional
 from functools import wraps, lru_cache as origin_lru_cache
 
 cached_functions = []
@@ -34,6 +35,124 @@ def lru_cache(*args, **kwargs):
 def clear_all_cached_functions():
     for func in cached_functions:
         func.cache_clear()
+    # 命中统计按每次回测计算
+    nbytes_cache.reset_stats()
+
+
+class NBytesLRUCache(object):
+    """
+    按缓存值的 nbytes 计算占用的 LRU 缓存
+    总字节数超过 max_bytes 时淘汰最久未使用的条目，max_bytes 为 None 时不限制；单个超过上限的值不缓存。
+    每个条目记录放入时计入的字节数，淘汰、替换时按记录的字节数扣减，缓存值之后变大也不会使计数偏移。
+    """
+
+    def __init__(self, max_bytes=None):
+        # type: (Optional[int]) -> None
+        self.max_bytes = max_bytes
+        # key -> (value, 放入时计入的字节数)
+        self._data = OrderedDict()
+        self._nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.peak_nbytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def get(self, key, default=None):
+        try:
+            value, _ = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, nbytes=None):
+        # type: (Hashable, Any, Optional[int]) -> None
+        """nbytes 为计入的字节数，默认取 value.nbytes"""
+        if nbytes is None:
+            nbytes = getattr(value, "nbytes", 0)
+        if key in self._data:
+            self._nbytes -= self._data.pop(key)[1]
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+        self._data[key] = (value, nbytes)
+        self._nbytes += nbytes
+        self.shrink()
+        self.peak_nbytes = max(self.peak_nbytes, self._nbytes)
+
+    def shrink(self):
+        if self.max_bytes is None:
+            return
+        while self._nbytes > self.max_bytes:
+            _, (_, nbytes) = self._data.popitem(last=False)
+            self._nbytes -= nbytes
+            self.evictions += 1
+
+    def discard(self, owner):
+        # type: (Any) -> None
+        """删除键的第一个元素为 owner（如被装饰的函数）的所有条目，不影响其他条目及命中统计"""
+        for key in [k for k in self._data if k[0] is owner]:
+            self._nbytes -= self._data.pop(key)[1]
+
+    def cache_clear(self):
+        self._data.clear()
+        self._nbytes = 0
+
+    def reset_stats(self):
+        self.hits = self.misses = self.evictions = 0
+        self.peak_nbytes = self._nbytes
+
+    def cache_info(self):
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "currsize": len(self._data),
+            "nbytes": self._nbytes, "peak_nbytes": self.peak_nbytes, "max_bytes": self.max_bytes,
+        }
+
+
+# K线等大块数组共用的缓存，所有 nbytes_lru_cache 装饰的函数默认共享同一个字节数上限
+nbytes_cache = NBytesLRUCache()
+
+
+def nbytes_lru_cache(cache=None):
+    # type: (Optional[NBytesLRUCache]) -> Callable
+    """
+    与 lru_cache 类似，但以返回值（通常为 numpy 数组）的 nbytes 限制缓存的总字节数，用于缓存大块的K线数组
+
+    默认使用共享的 nbytes_cache，其上限由 set_nbytes_cache_limit 设置；被装饰函数的 cache_clear 只清除该函数的条目
+    """
+    def decorator(func):
+        c = nbytes_cache if cache is None else cache
+        missing = object()
+
+        @wraps(func)
+        def wrapper(*args):
+            key = (func, ) + args
+            value = c.get(key, missing)
+            if value is missing:
+                value = func(*args)
+                c.put(key, value)
+            return value
+
+        wrapper.cache = c
+        wrapper.cache_clear = lambda: c.discard(func)
+        wrapper.cache_info = c.cache_info
+        cached_functions.append(wrapper)
+        return wrapper
+
+    return decorator
+
+
+def set_nbytes_cache_limit(max_bytes):
+    # type: (Optional[int]) -> None
+    """设置共享的 nbytes_cache 的字节数上限，None 为不限制"""
+    nbytes_cache.max_bytes = max_bytes
+    nbytes_cache.shrink()
 
 
 def instype_singledispatch(func):
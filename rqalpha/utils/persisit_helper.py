@@ -17,6 +17,7 @@ from collections import OrderedDict
 
 from rqalpha.const import PERSIST_MODE
 from rqalpha.core.events import EVENT
+from rqalpha.interface import AbstractPersistProvider
 from rqalpha.utils.logger import system_log
 
 
@@ -77,3 +78,25 @@ class PersistHelper(object):
         except Exception:
             system_log.exception('restore failed: key={} state={}'.format(key, state))
         return True
+
+
+class MemoryPersistProvider(AbstractPersistProvider):
+    """
+    在内存中保存状态的持久化服务，用于在同一进程的多次回测之间传递状态，load 只返回构造时传入的状态
+    """
+
+    def __init__(self, states=None):
+        self._loadable = dict(states or {})
+        self.stored = {}
+
+    def store(self, key, value):
+        self.stored[key] = value
+
+    def load(self, key):
+        return self._loadable.get(key)
+
+    def should_resume(self):
+        return False
+
+    def should_run_init(self):
+        return True
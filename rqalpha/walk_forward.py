@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+滚动窗口（walk-forward）回测
+将回测区间切分为连续的窗口依次回测，各窗口可使用不同的参数（如按月重新拟合）。所有窗口共用父进程中预先构建的
+DataProxy；窗口之间通过 Persistable 的 get_state/set_state 传递投资组合和 broker（未成交订单）的状态，不传递状态时
+各窗口相互独立，在 fork 出的进程池中并行运行。结果为各窗口的 sys_analyser summary 及拼接后的净值曲线。
+"""
+
+import copy
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from rqalpha.const import EXIT_CODE
+from rqalpha.interface import AbstractMod
+from rqalpha.utils.batch_helper import build_config, check_strategy, map_in_processes, preload_data_source, run_backtest
+from rqalpha.utils.logger import system_log
+from rqalpha.utils.persisit_helper import MemoryPersistProvider
+
+MOD_NAME = "sys_walk_forward"
+# 在窗口之间传递的持久化对象，策略的 context、g 等由各窗口的 init 重新初始化，以便使用新的参数。
+# executor 不传递：每个窗口结束时已发布最后一天的结算，带入上一窗口的 last_before_trading 会使下一窗口再次结算该日
+CARRY_KEYS = ("portfolio", "broker")
+
+# 由父进程在 fork 之前设置，子进程直接继承
+_state = {}  # type: Dict[str, Any]
+
+Window = Tuple[date, date]
+
+
+class WalkForwardMod(AbstractMod):
+    """
+    walk-forward 中每个窗口自动加载的 mod：注入预热的 DataProxy，载入上一窗口结束时的状态并在回测结束后保存本窗口的状态
+    """
+
+    def __init__(self):
+        self._persist_provider = None
+
+    def start_up(self, env, mod_config):
+        data_proxy = _state.get("data_proxy")
+        if data_proxy is not None and env.data_proxy is None:
+            env.set_data_source(_state["data_source"])
+            env.set_data_proxy(data_proxy)
+        self._persist_provider = None
+        if mod_config.carry_state:
+            self._persist_provider = MemoryPersistProvider(_state.get("carry"))
+            env.set_persist_provider(self._persist_provider)
+
+    def tear_down(self, code, exception=None):
+        if code == EXIT_CODE.EXIT_SUCCESS and self._persist_provider is not None:
+            stored = self._persist_provider.stored
+            _state["carry"] = {k: stored[k] for k in CARRY_KEYS if k in stored}
+
+
+def load_mod():
+    return WalkForwardMod()
+
+
+def split_windows(start_date, end_date, freq="MS"):
+    # type: (Union[str, date], Union[str, date], str) -> List[Window]
+    """
+    按 pandas 的日期频率将 [start_date, end_date] 切分为首尾相接的窗口，freq 为各窗口的起始日，默认为每月月初
+
+    >>> split_windows("2024-01-15", "2024-03-10")  # doctest: +NORMALIZE_WHITESPACE
+    [(datetime.date(2024, 1, 15), datetime.date(2024, 1, 31)),
+     (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)),
+     (datetime.date(2024, 3, 1), datetime.date(2024, 3, 10))]
+    """
+    start, end = pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize()
+    if start > end:
+        raise ValueError("start_date {} is later than end_date {}".format(start_date, end_date))
+    starts = [start] + [d for d in pd.date_range(start, end, freq=freq) if d > start]
+    ends = [d - pd.Timedelta(days=1) for d in starts[1:]] + [end]
+    return [(s.date(), e.date()) for s, e in zip(starts, ends)]
+
+
+def stitch_portfolios(portfolios, chain=False):
+    # type: (Sequence[Tuple[int, pd.DataFrame]], bool) -> pd.DataFrame
+    """
+    按窗口顺序拼接各窗口 sys_analyser 的 portfolio 表
+
+    :param portfolios: (窗口序号, portfolio 表) 的列表
+    :param chain: 各窗口是否从初始资金重新开始；为 True 时将每个窗口的净值和总权益乘以此前各窗口的累计净值，
+        得到连续的曲线
+    """
+    frames = []
+    scale = 1.
+    for index, df in sorted(portfolios, key=lambda p: p[0]):
+        if df is None or len(df) == 0:
+            continue
+        df = df.copy()
+        if chain:
+            df[["unit_net_value", "total_value"]] *= scale
+            scale = df["unit_net_value"].iloc[-1]
+        df.insert(0, "window", index)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames)
+
+
+def _run_window(task):
+    index, (start_date, end_date), params = task
+    config = copy.deepcopy(_state["config"])
+    config["base"]["start_date"] = start_date
+    config["base"]["end_date"] = end_date
+    context_vars = dict(config["extra"].get("context_vars") or {})
+    context_vars.update(params)
+    config["extra"]["context_vars"] = context_vars
+
+    row = {"window": index, "window_start": start_date, "window_end": end_date}
+    row.update(params)
+    try:
+        # 与 run_func 不同，窗口之间不清空函数缓存：所有窗口使用同一个数据源，缓存均以数据源、DataProxy 等对象为键，可以复用
+        result = run_backtest(config, _state["user_funcs"], clear_caches=False)
+    except Exception as e:
+        system_log.exception("walk-forward window {} failed", index)
+        result = None
+        row["error"] = repr(e)
+    analyser = (result or {}).get("sys_analyser", {})
+    summary = analyser.get("summary")
+    if summary:
+        row.update((k, v) for k, v in summary.items() if k not in row)
+    elif "error" not in row:
+        row["error"] = "backtest failed, see the log for details"
+    return row, analyser.get("portfolio")
+
+
+def _build_config(config, strategy_file, carry_state, log_level):
+    config = build_config(config, strategy_file, log_level, MOD_NAME, __name__, carry_state=carry_state)
+    if carry_state:
+        config["base"]["persist"] = True
+        config["base"]["persist_mode"] = "on_normal_exit"
+    return config
+
+
+def _preload_data_proxy(config, user_funcs):
+    from rqalpha.data.data_proxy import DataProxy
+    data_source = preload_data_source(config, user_funcs)
+    # price_board 与每次回测的 Environment 绑定，由 main.run 在各窗口中设置
+    return data_source, DataProxy(data_source, None)
+
+
+def walk_forward(windows, config=None, strategy_file=None, params=None, carry_state=True, processes=None,
+                 preload=True, log_level="error", **user_funcs):
+    # type: (Sequence[Window], Optional[dict], Optional[str], Union[None, Sequence[dict], Callable[[date, date], dict]], bool, Optional[int], bool, Optional[str], Callable) -> Dict[str, pd.DataFrame]
+    """
+    依次对每个窗口运行回测
+
+    :param windows: (start_date, end_date) 的列表，按时间先后排列且互不重叠，可以使用 split_windows 生成
+    :param config: 各窗口共用的配置字典，同 run_func；其中的 start_date、end_date 会被各窗口的起止日期替换
+    :param strategy_file: 策略文件路径；不传时使用以关键字参数传入的 init、handle_bar 等约定函数，同 run_func
+    :param params: 各窗口的参数，写入 config.extra.context_vars；可以是与 windows 等长的字典列表，或以窗口的
+        (start_date, end_date) 为参数、返回参数字典的函数（如用窗口之前的数据拟合参数），在回测开始前依次调用
+    :param carry_state: 是否将上一窗口结束时的投资组合和未成交订单带入下一窗口；为 False 时
+        各窗口均从初始资金开始，相互独立并行运行，净值曲线按窗口首尾相乘拼接
+    :param processes: carry_state 为 False 时的进程数，默认为 CPU 核数
+    :param preload: 是否预先构建数据源和 DataProxy 供各窗口复用
+    :param log_level: 各窗口默认的日志级别，config 中设置了 extra.log_level 时以 config 为准
+
+    返回 {"summary": 每个窗口一行的 sys_analyser summary, "portfolio": 拼接后的每日 portfolio 表}。
+    传递状态时各窗口 summary 中的风险指标基于本窗口的日收益，total_value、unit_net_value 等为累计值；
+    某个窗口失败时后续窗口无法接续状态，不再运行，在 summary 中记录 error。
+    """
+    check_strategy(strategy_file, user_funcs)
+    windows = [(pd.Timestamp(s).date(), pd.Timestamp(e).date()) for s, e in windows]
+    for (_, prev_end), (start, _) in zip(windows, windows[1:]):
+        if start <= prev_end:
+            raise ValueError("walk-forward windows must be sorted and must not overlap: {} <= {}".format(
+                start, prev_end))
+
+    if params is None:
+        params = [{} for _ in windows]
+    elif callable(params):
+        params = [dict(params(s, e)) for s, e in windows]
+    else:
+        params = [dict(p) for p in params]
+        if len(params) != len(windows):
+            raise ValueError("got {} parameter sets for {} windows".format(len(params), len(windows)))
+
+    _state.clear()
+    _state["config"] = _build_config(config, strategy_file, carry_state, log_level)
+    _state["user_funcs"] = user_funcs or None
+    if preload:
+        _state["data_source"], _state["data_proxy"] = _preload_data_proxy(_state["config"], _state["user_funcs"])
+
+    tasks = [(i, w, p) for i, (w, p) in enumerate(zip(windows, params))]
+    results = []
+    try:
+        if carry_state:
+            for i, task in enumerate(tasks):
+                row, portfolio = _run_window(task)
+                results.append((row, portfolio))
+                if "error" in row:
+                    for index, (start, end), p in tasks[i + 1:]:
+                        skipped = {"window": index, "window_start": start, "window_end": end,
+                                   "error": "skipped, window {} failed".format(row["window"])}
+                        skipped.update(p)
+                        results.append((skipped, None))
+                    break
+        else:
+            results = map_in_processes(_run_window, tasks, processes)
+    finally:
+        _state.clear()
+
+    summary = pd.DataFrame([row for row, _ in results])
+    if len(summary):
+        summary = summary.set_index("window").sort_index()
+    portfolio = stitch_portfolios([(row["window"], p) for row, p in results], chain=not carry_state)
+    return {"summary": summary, "portfolio": portfolio}
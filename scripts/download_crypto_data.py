@@ -68,7 +68,7 @@ def validate_bundle(bundle_path):
     print(f"🔍 验证数据包: {bundle_path}")
     
     required_files = [
-        "crypto_instruments.pk",
+        "crypto_instruments.h5",
         "crypto_trading_dates.npy", 
         "crypto_spot.h5",
         "crypto_futures.h5"
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from rqalpha.core.events import EVENT, Event, EventBus
+from rqalpha.core.executor import Executor
+
+
+class EventBusTestCase(TestCase):
+    def test_dispatch(self):
+        bus = EventBus()
+        calls = []
+        bus.add_listener(EVENT.BAR, lambda e: calls.append("system"))
+        bus.add_listener(EVENT.BAR, lambda e: calls.append("user"), user=True)
+        self.assertTrue(bus.has_listeners(EVENT.BAR))
+        self.assertFalse(bus.has_listeners(EVENT.PRE_BAR))
+        bus.publish_event(Event(EVENT.BAR))
+        self.assertEqual(calls, ["system", "user"])
+
+        # 注册新的处理函数后重新编译，返回 True 的系统处理函数阻止后续系统处理函数，用户处理函数仍会执行
+        calls.clear()
+        bus.prepend_listener(EVENT.BAR, lambda e: calls.append("first") or True)
+        bus.publish_event(Event(EVENT.BAR))
+        self.assertEqual(calls, ["first", "user"])
+        bus.add_listener(EVENT.PRE_BAR, lambda e: None)
+        self.assertTrue(bus.has_listeners(EVENT.PRE_BAR))
+
+    def test_stats(self):
+        bus = EventBus()
+        bus.add_listener(EVENT.BAR, lambda e: None)
+        bus.publish_event(Event(EVENT.BAR))
+        self.assertEqual(bus.dispatch_stats(), [])
+        bus.enable_stats()
+        for _ in range(3):
+            bus.publish_event(Event(EVENT.BAR))
+        bus.publish_event(Event(EVENT.TICK))
+        stats = {t: (c, s) for t, c, s in bus.dispatch_stats()}
+        self.assertEqual(stats[EVENT.BAR][0], 3)
+        self.assertEqual(stats[EVENT.TICK][0], 1)
+        self.assertGreaterEqual(stats[EVENT.BAR][1], 0)
+        bus.enable_stats(False)
+        self.assertEqual(bus.dispatch_stats(), [])
+
+    def test_split_and_publish(self):
+        bus = EventBus()
+        seen = []
+        bus.add_listener(EVENT.PRE_BAR, lambda e: seen.append((e.event_type, e)))
+        bus.add_listener(EVENT.BAR, lambda e: seen.append((e.event_type, e)), user=True)
+        env = SimpleNamespace(event_bus=bus, update_time=lambda calendar_dt, trading_dt: None)
+        executor = Executor(env)
+        event = Event(EVENT.BAR, bar_dict={})
+        executor._split_and_publish(event)
+        self.assertEqual([t for t, _ in seen], [EVENT.PRE_BAR, EVENT.BAR])
+        self.assertTrue(all(e is event for _, e in seen))
+        self.assertEqual(event.event_type, EVENT.BAR)
@@ -0,0 +1,78 @@
+from unittest import TestCase
+
+import numpy as np
+
+from rqalpha.utils.functools import NBytesLRUCache, nbytes_lru_cache
+
+
+class NBytesLRUCacheTestCase(TestCase):
+    def test_eviction_by_nbytes(self):
+        cache = NBytesLRUCache(max_bytes=3000)
+        for key in "abc":
+            cache.put(key, np.zeros(100))  # 800 字节
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("d", np.zeros(100))
+        # b 最久未使用，被淘汰
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.nbytes, 2400)
+        cache.put("e", np.zeros(1000))
+        self.assertIsNone(cache.get("e"))
+        info = cache.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["evictions"]), (1, 2, 1))
+        self.assertEqual(info["peak_nbytes"], 3200 - 800)
+
+        cache.max_bytes = 1000
+        cache.shrink()
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.cache_info()["evictions"], 3)
+
+    def test_decorator(self):
+        cache = NBytesLRUCache(max_bytes=40000)
+        calls = []
+
+        @nbytes_lru_cache(cache)
+        def bars_of(order_book_id):
+            calls.append(order_book_id)
+            return np.zeros(1000, dtype=[("datetime", "i8"), ("volume", "f8")])
+
+        symbols = ["S{}USDT".format(i) for i in range(4)]
+        for symbol in symbols + symbols[-2:]:
+            bars_of(symbol)
+        self.assertEqual(calls, symbols)
+        self.assertEqual(cache.cache_info()["evictions"], 2)
+        self.assertEqual(cache.nbytes, 32000)
+        bars_of("S0USDT")
+        self.assertEqual(calls[-1], "S0USDT")
+
+    def test_value_growing_after_put(self):
+        cache = NBytesLRUCache(max_bytes=2000)
+        grown = np.zeros(100)
+        cache.put("a", grown)
+        cache.put("b", np.zeros(100))
+        # 放入后变大的值按放入时的字节数扣减
+        grown.resize(200, refcheck=False)
+        cache.put("c", np.zeros(100))
+        self.assertEqual(cache.nbytes, 1600)
+        self.assertIsNone(cache.get("a"))
+        cache.put("b", np.zeros(50))
+        self.assertEqual(cache.nbytes, 1200)
+
+    def test_cache_clear_per_function(self):
+        cache = NBytesLRUCache()
+
+        @nbytes_lru_cache(cache)
+        def bars_of(order_book_id):
+            return np.zeros(10)
+
+        @nbytes_lru_cache(cache)
+        def index_of(order_book_id):
+            return np.zeros(5)
+
+        bars_of("BTCUSDT")
+        index_of("BTCUSDT")
+        index_of("BTCUSDT")
+        bars_of.cache_clear()
+        self.assertEqual((len(cache), cache.nbytes), (1, 40))
+        self.assertEqual(cache.cache_info()["hits"], 1)
+        cache.reset_stats()
+        self.assertEqual((cache.hits, cache.misses, cache.peak_nbytes), (0, 0, 40))
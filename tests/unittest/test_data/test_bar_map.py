@@ -0,0 +1,71 @@
+import pickle
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.const import EXECUTION_PHASE
+from rqalpha.core.execution_context import ExecutionContext
+from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE
+from rqalpha.data.data_proxy import DataProxy
+from rqalpha.model.bar import BarMap, BarObject
+
+from .test_history_bars_many import _DataSource
+
+
+class _BarDataSource(_DataSource):
+    def get_bar(self, instrument, dt, frequency):
+        bars = self.bars_of[instrument.order_book_id]
+        pos = bars["datetime"].searchsorted(int(dt.strftime("%Y%m%d000000")))
+        if pos >= len(bars) or bars["datetime"][pos] != int(dt.strftime("%Y%m%d000000")):
+            return None
+        return bars[pos]
+
+
+def _bars(dates, close):
+    bars = np.zeros(len(dates), dtype=CRYPTO_SPOT_DTYPE)
+    bars["datetime"] = dates
+    bars["open"] = bars["close"] = close
+    bars["volume"] = 1
+    return bars
+
+
+class BarMapTestCase(TestCase):
+    def setUp(self):
+        dates = np.arange(20240101, 20240106) * 1000000
+        self.bars_of = {
+            "BTCUSDT": _bars(dates, np.arange(5.)),
+            "ETHUSDT": _bars(dates[2:], np.arange(3.) + 100),
+        }
+        self.bar_map = BarMap(DataProxy(_BarDataSource(self.bars_of), None), "1d")
+
+    def test_row_view(self):
+        bar_map = self.bar_map
+        with ExecutionContext(EXECUTION_PHASE.ON_BAR):
+            bar_map.update_dt(pd.Timestamp("2024-01-02"))
+            bar = bar_map["BTCUSDT"]
+            self.assertIs(bar, bar_map["BTCUSDT"])
+            self.assertEqual((bar.close, bar["close"], bar.prev_close), (1, 1, 0))
+            self.assertTrue(np.isnan(bar.limit_up))
+            self.assertEqual(bar.datetime, pd.Timestamp("2024-01-02"))
+            self.assertTrue(bar_map["ETHUSDT"].isnan)
+            with self.assertRaises(KeyError):
+                bar["no_such_field"]
+            self.assertFalse(hasattr(bar, "no_such_field"))
+
+            # 时刻推进后取到新的对象，策略持有的对象不会被修改
+            bar_map.update_dt(pd.Timestamp("2024-01-03"))
+            bar = bar_map["ETHUSDT"]
+            self.assertEqual((bar.order_book_id, bar.close), ("ETHUSDT", 100))
+            bar_map.update_dt(pd.Timestamp("2024-01-04"))
+            self.assertEqual(bar_map["ETHUSDT"].close, 101)
+            self.assertIsNot(bar_map["ETHUSDT"], bar)
+            self.assertEqual((bar.order_book_id, bar.close), ("ETHUSDT", 100))
+
+    def test_slots(self):
+        bar = BarObject(None, {"close": 1., "volume": 2.})
+        with self.assertRaises(AttributeError):
+            bar.foo = 1
+        self.assertFalse(hasattr(bar, "__dict__"))
+        copied = pickle.loads(pickle.dumps(bar))
+        self.assertEqual((copied.close, copied.volume), (1., 2.))
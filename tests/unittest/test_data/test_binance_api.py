@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.binance_api import (
+    BinanceAPI, WeightRateLimiter, fetch_streaming, get_klines_range, parse_klines
+)
+
+
+class _FakeBinanceHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.requests.append(params.get("symbol"))
+            fail = params.get("symbol") in server.fail_once
+            server.fail_once.discard(params.get("symbol"))
+            server.used_weight += 2
+            used_weight = server.used_weight
+        if fail:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        start = pd.Timestamp(int(params["startTime"]), unit="ms")
+        end = pd.Timestamp(int(params["endTime"]), unit="ms")
+        rows = []
+        for t in pd.date_range(start, end, freq="D")[:int(params["limit"])]:
+            ms = int(t.value // 1000000)
+            rows.append([ms, "1", "2", "0.5", str(t.day), "10", ms + 86399999, "0", 1, "0", "0", "0"])
+        body = json.dumps(rows).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-MBX-USED-WEIGHT-1M", str(used_weight))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class BinanceAPITestCase(TestCase):
+    def setUp(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeBinanceHandler)
+        self._server.lock = threading.Lock()
+        self._server.requests = []
+        self._server.fail_once = set()
+        self._server.used_weight = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        url = "http://127.0.0.1:{}".format(self._server.server_address[1])
+        self._api = BinanceAPI(base_url=url, futures_base_url=url, backoff_factor=0)
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_retry_and_used_weight(self):
+        self._server.fail_once.add("BTCUSDT")
+        df = self._api.get_klines("BTCUSDT", "1d", "2024-01-01", "2024-01-05")
+        self.assertEqual(len(df), 5)
+        self.assertEqual(self._server.requests, ["BTCUSDT", "BTCUSDT"])
+        limiter = self._api._limiters[False]
+        self.assertLessEqual(limiter._tokens, limiter.weight_limit - 2)
+
+    def test_concurrent_update(self):
+        from rqalpha.data.crypto_data_source import CryptoDayBarStore, update_crypto_day_bars
+
+        symbols = ["S{}USDT".format(i) for i in range(8)]
+        self._server.fail_once.update(symbols[:2])
+        start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=10)).date()
+        with TemporaryDirectory() as d:
+            store = CryptoDayBarStore(os.path.join(d, "crypto_spot.h5"))
+            report = update_crypto_day_bars(store, self._api, symbols, False, start, concurrency=4)
+            self.assertEqual(report.symbols, 8)
+            self.assertEqual(report.rows_written, 80)
+            for symbol in symbols:
+                self.assertEqual(len(store.get_bars(symbol)), 10)
+        self.assertEqual(len(self._server.requests), 10)
+        self.assertEqual(self._api.request_count, 10)
+
+    def test_klines_range_beyond_page_size(self):
+        df = get_klines_range(self._api, "BTCUSDT", "1d", "2020-01-01", "2025-12-31")
+        self.assertEqual(len(df), 2192)
+        self.assertTrue(df["open_time"].is_monotonic_increasing)
+        self.assertFalse(df["open_time"].duplicated().any())
+        self.assertEqual(len(self._server.requests), 3)
+
+    def test_fetch_streaming_reports_exceptions(self):
+        def func(i):
+            yield i
+            if i == 3:
+                raise ValueError(i)
+            yield i * 2
+
+        for max_workers in (1, 3):
+            values, ends = {}, {}
+            for item, value, e in fetch_streaming(func, range(6), max_workers, max_pending=1):
+                if value is None:
+                    ends[item] = e
+                else:
+                    values.setdefault(item, []).append(value)
+            self.assertEqual(sorted(ends), list(range(6)))
+            self.assertIsInstance(ends[3], ValueError)
+            self.assertIsNone(ends[5])
+            self.assertEqual(values[3], [3])
+            self.assertEqual(values[5], [5, 10])
+
+    def test_fetch_streaming_stops_early(self):
+        started = []
+
+        def func(i):
+            started.append(i)
+            yield i
+
+        for _ in fetch_streaming(func, range(20), 2, max_pending=1):
+            break
+        # 提前停止后排队中的 item 不再发出请求
+        self.assertLessEqual(len(started), 2)
+
+
+class ParseKlinesTestCase(TestCase):
+    def test_parse_body_and_list(self):
+        from rqalpha.data.crypto_data_source import klines_to_bars, CRYPTO_FUTURES_DTYPE
+
+        payload = [
+            [1704067200000, "42283.58", "44184.10", "42180.77", "44179.55", "27174.29", 1704153599999,
+             "1169546834.3", 1056, "13612.25", "585943216.7", "0"],
+            [1704153600000, "44179.55", "45879.63", "44148.34", "44946.91", "65146.40", 1704239999999,
+             "2944325554.2", 2062, "33164.64", "1499210000.0", "0"],
+        ]
+        for body in (json.dumps(payload).encode(), json.dumps(payload, separators=(",", ":")), payload):
+            klines = parse_klines(body)
+            self.assertEqual(klines["open_time"].tolist(), [1704067200000, 1704153600000])
+            self.assertEqual(klines["close"].tolist(), [44179.55, 44946.91])
+        self.assertEqual(len(parse_klines(b"[]")), 0)
+
+        bars = klines_to_bars(klines, CRYPTO_FUTURES_DTYPE)
+        self.assertEqual(bars["datetime"].tolist(), [20240101000000, 20240102000000])
+        self.assertEqual(bars["prev_close"].tolist(), [44179.55, 44179.55])
+        self.assertEqual(bars["prev_settlement"][1], bars["settlement"][0])
+
+
+class WeightRateLimiterTestCase(TestCase):
+    def test_acquire_waits_for_refill(self):
+        now = [0.]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limiter = WeightRateLimiter(60, interval=60, clock=lambda: now[0], sleep=sleep)
+        limiter.update(50)
+        limiter.acquire(10)
+        self.assertEqual(slept, [])
+        limiter.acquire(5)
+        np.testing.assert_allclose(sum(slept), 5)
@@ -0,0 +1,69 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+from rqalpha.data.base_data_source.bundle_cache import (CachedDayBarStore, build_bundle_cache,
+                                                        remove_bundle_cache, with_bundle_cache)
+from rqalpha.data.crypto_data_source import CRYPTO_FUTURES_DTYPE, CRYPTO_SPOT_DTYPE, CryptoDayBarStore
+
+
+def _bars(dtype, start, n):
+    bars = np.zeros(n, dtype=dtype)
+    bars["datetime"] = (np.arange(n) + start) * 1000000
+    bars["close"] = np.arange(n, dtype=float)
+    return bars
+
+
+class BundleCacheTestCase(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._bundle = os.path.join(self._temp_dir.name, "bundle")
+        self._cache_dir = os.path.join(self._temp_dir.name, "cache")
+        os.makedirs(self._bundle)
+        self._spot_path = os.path.join(self._bundle, "crypto_spot.h5")
+        spot = CryptoDayBarStore(self._spot_path)
+        spot.store_bars("BTCUSDT", _bars(CRYPTO_SPOT_DTYPE, 20240101, 5))
+        spot.store_bars("ETHUSDT", _bars(CRYPTO_SPOT_DTYPE, 20240103, 3))
+        futures = CryptoDayBarStore(os.path.join(self._bundle, "crypto_futures.h5"))
+        futures.store_bars("BTCUSDT", _bars(CRYPTO_FUTURES_DTYPE, 20240101, 2))
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _store(self):
+        return with_bundle_cache(CryptoDayBarStore(self._spot_path, keep_open=True), self._spot_path, self._cache_dir)
+
+    def test_attach_and_fallback(self):
+        self.assertIsInstance(self._store(), CryptoDayBarStore)
+
+        files = build_bundle_cache(self._bundle, self._cache_dir)
+        self.assertEqual(sorted(os.path.basename(f) for f in files), ["crypto_futures.bars", "crypto_spot.bars"])
+        store = self._store()
+        self.assertIsInstance(store, CachedDayBarStore)
+        bars = store.get_bars("BTCUSDT")
+        np.testing.assert_array_equal(bars, _bars(CRYPTO_SPOT_DTYPE, 20240101, 5))
+        self.assertFalse(bars.flags.writeable)
+        self.assertIsInstance(bars.base, np.memmap)
+        self.assertEqual(store.get_date_range("ETHUSDT"), (20240103000000, 20240105000000))
+        self.assertEqual(sorted(store.get_order_book_ids()), ["BTCUSDT", "ETHUSDT"])
+        self.assertEqual(len(store.get_bars("XXXUSDT")), 0)
+
+        futures_path = os.path.join(self._bundle, "crypto_futures.h5")
+        futures = with_bundle_cache(CryptoDayBarStore(futures_path), futures_path, self._cache_dir)
+        self.assertEqual(futures.get_bars("BTCUSDT").dtype, CRYPTO_FUTURES_DTYPE)
+
+        # 写入 h5 后缓存失效，退回读取 h5
+        store.append_bars("BTCUSDT", _bars(CRYPTO_SPOT_DTYPE, 20240106, 1))
+        self.assertEqual(len(store.get_bars("BTCUSDT")), 6)
+        self.assertIsInstance(self._store(), CryptoDayBarStore)
+
+        self.assertTrue(remove_bundle_cache(self._bundle, self._cache_dir))
+        self.assertFalse(remove_bundle_cache(self._bundle, self._cache_dir))
+
+    def test_invalid_cache_file(self):
+        os.makedirs(self._cache_dir)
+        with open(os.path.join(self._cache_dir, "crypto_spot.bars"), "wb") as f:
+            f.write(b"not a cache file")
+        self.assertIsInstance(self._store(), CryptoDayBarStore)
@@ -0,0 +1,53 @@
+from datetime import date
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.crypto_bar_panel import CryptoBarPanel
+from rqalpha.utils.exception import RQInvalidArgument
+
+DTYPE = [('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('volume', 'f8')]
+
+
+def _bars(days, closes):
+    bars = np.zeros(len(days), dtype=DTYPE)
+    bars['datetime'] = [(20240100 + d) * 1000000 for d in days]
+    bars['close'] = closes
+    bars['volume'] = 1
+    return bars
+
+
+class CryptoBarPanelTestCase(TestCase):
+    def setUp(self):
+        calendar = pd.date_range("2023-12-01", "2024-02-01", freq="D")
+        self.panel = CryptoBarPanel.build({
+            "BTCUSDT": _bars([1, 2, 3, 4, 5], [1., 2., 3., 4., 5.]),
+            # 缺失 3 日，且晚一天上市
+            "ETHUSDT": _bars([2, 4, 5], [20., 40., 50.]),
+        }, calendar, ["open", "close", "volume", "total_turnover"])
+
+    def test_layout(self):
+        self.assertEqual(self.panel.order_book_ids, ["BTCUSDT", "ETHUSDT"])
+        self.assertEqual(self.panel.dates[0], 20240101000000)
+        self.assertEqual(self.panel.dates[-1], 20240105000000)
+        self.assertEqual(self.panel.field("close").shape, (5, 2))
+        self.assertTrue(np.isnan(self.panel.field("total_turnover")).all())
+
+    def test_history_panel(self):
+        closes = self.panel.history_panel(["ETHUSDT", "BTCUSDT", "XRPUSDT"], 3, "close", date(2024, 1, 4))
+        np.testing.assert_array_equal(closes, [
+            [20., 2., np.nan],
+            [np.nan, 3., np.nan],
+            [40., 4., np.nan],
+        ])
+
+        panel = self.panel.history_panel(["BTCUSDT"], 10, ["close", "volume"], 20240102000000)
+        self.assertEqual(panel.shape, (2, 2, 1))
+        np.testing.assert_array_equal(panel[0, :, 0], [1., 2.])
+
+        self.assertEqual(self.panel.history_panel(["BTCUSDT"], 2, None).shape, (4, 2, 1))
+
+    def test_invalid_fields(self):
+        with self.assertRaises(RQInvalidArgument):
+            self.panel.history_panel(["BTCUSDT"], 2, "settlement")
@@ -0,0 +1,201 @@
+import os
+from tempfile import TemporaryDirectory
+from datetime import timedelta
+from unittest import TestCase
+
+import h5py
+import numpy as np
+
+from rqalpha.data.crypto_data_source import CryptoDayBarStore, update_crypto_day_bars
+
+DTYPE = [('datetime', 'i8'), ('open', 'f8'), ('close', 'f8'), ('volume', 'f8')]
+
+
+def _bars(start, n):
+    bars = np.zeros(n, dtype=DTYPE)
+    bars['datetime'] = [(start + i) * 1000000 for i in range(n)]
+    bars['close'] = np.arange(n, dtype=float) + 1
+    return bars
+
+
+class CryptoDayBarStoreTestCase(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, "crypto_spot.h5")
+        with h5py.File(self._path, "w") as h5:
+            h5.create_dataset("BTCUSDT", data=_bars(20240101, 10))
+            h5.create_dataset("ETHUSDT", data=_bars(20240101, 5))
+            h5.create_dataset("SOLUSDT", data=_bars(20240101, 3), chunks=True, compression="gzip")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_keep_open_returns_views(self):
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        for _ in range(3):
+            btc = store.get_bars("BTCUSDT")
+            eth = store.get_bars("ETHUSDT")
+        np.testing.assert_array_equal(btc, _bars(20240101, 10))
+        np.testing.assert_array_equal(eth, _bars(20240101, 5))
+        self.assertFalse(btc.flags.writeable)
+        self.assertIsNotNone(btc.base)
+        self.assertEqual(store.stats, {"opens": 1, "mmaps": 1, "reads": 0, "views": 6, "copies": 0})
+        self.assertEqual(len(store.get_bars("XRPUSDT")), 0)
+        self.assertEqual(store.get_date_range("ETHUSDT"), (20240101000000, 20240105000000))
+        self.assertEqual(store.stats["opens"], 1)
+
+    def test_keep_open_falls_back_to_read(self):
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        np.testing.assert_array_equal(store.get_bars("SOLUSDT"), _bars(20240101, 3))
+        self.assertEqual(store.stats, {"opens": 1, "mmaps": 0, "reads": 1, "views": 0, "copies": 0})
+
+    def test_store_bars_reopens(self):
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        store.get_bars("BTCUSDT")
+        store.store_bars("BTCUSDT", _bars(20240101, 12))
+        self.assertEqual(len(store.get_bars("BTCUSDT")), 12)
+        self.assertEqual(store.stats["opens"], 2)
+
+    def test_write_keeps_returned_views(self):
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        eth = store.get_bars("ETHUSDT")
+        btc = store.get_bars("BTCUSDT")
+        expected_eth, expected_btc = eth.copy(), btc.copy()
+        # 删除后重建的数据集可能复用原来的空间
+        overwrite = _bars(20240101, 3)
+        overwrite['close'] = 9.
+        store.store_bars("ETHUSDT", overwrite)
+        store.store_bars("XRPUSDT", overwrite)
+        store.append_bars("BTCUSDT", _bars(20240105, 10))
+        np.testing.assert_array_equal(eth, expected_eth)
+        np.testing.assert_array_equal(btc, expected_btc)
+        np.testing.assert_array_equal(store.get_bars("ETHUSDT"), overwrite)
+        self.assertEqual(len(store.get_bars("BTCUSDT")), 14)
+        self.assertFalse(os.path.exists(self._path + ".write"))
+        # 复制后的新文件尚未被映射，之后的写入在原地进行
+        self.assertEqual(store.stats["copies"], 1)
+
+    def test_default_mode_opens_per_read(self):
+        store = CryptoDayBarStore(self._path)
+        store.get_bars("BTCUSDT")
+        store.get_bars("BTCUSDT")
+        self.assertEqual(store.stats["opens"], 2)
+        self.assertEqual(store.stats["reads"], 2)
+        self.assertEqual(sorted(store.get_order_book_ids()), ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+
+
+class _FakeKlinesAPI(object):
+    def __init__(self):
+        self.calls = []
+
+    def get_klines_array(self, symbol, interval, start_time, end_time, limit=1000, futures=False):
+        from rqalpha.data.binance_api import KLINE_DTYPE
+        self.calls.append((symbol, start_time, end_time))
+        day = 86400000
+        open_time = np.arange(start_time // day * day, end_time + 1, day)[:limit]
+        klines = np.zeros(len(open_time), dtype=KLINE_DTYPE)
+        klines["open_time"] = open_time
+        klines["close_time"] = open_time + day - 1
+        for field in ("open", "high", "low", "close"):
+            klines[field] = (open_time // day) % 31 + 1
+        klines["volume"] = 1
+        return klines
+
+
+class CryptoIncrementalUpdateTestCase(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, "crypto_spot.h5")
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_update_appends_missing_bars(self):
+        import pandas as pd
+        from rqalpha.data.crypto_data_source import update_crypto_day_bars, CRYPTO_SPOT_DTYPE
+
+        yesterday = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=1)).date()
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        api = _FakeKlinesAPI()
+
+        report = update_crypto_day_bars(store, api, ["BTCUSDT"], False, yesterday - timedelta(days=9))
+        bars = store.get_bars("BTCUSDT")
+        self.assertEqual(bars.dtype, CRYPTO_SPOT_DTYPE)
+        self.assertEqual(len(bars), 10)
+        self.assertEqual(report.bytes_written, 10 * CRYPTO_SPOT_DTYPE.itemsize)
+        self.assertEqual(report.api_calls, 1)
+
+        # 已是最新数据时不发出请求
+        report = update_crypto_day_bars(store, api, ["BTCUSDT"], False, yesterday - timedelta(days=9))
+        self.assertEqual((report.skipped, report.api_calls, report.api_calls_saved, report.bytes_written), (1, 0, 1, 0))
+
+        # 删去最后三天后只重新请求缺失部分，并覆盖原有的最后一根K线
+        store.store_bars("BTCUSDT", bars[:7])
+        report = update_crypto_day_bars(store, api, ["BTCUSDT"], False, yesterday - timedelta(days=9))
+        self.assertEqual(report.rows_written, 4)
+        updated = store.get_bars("BTCUSDT")
+        np.testing.assert_array_equal(updated, bars)
+        self.assertEqual(updated["prev_close"][7], updated["close"][6])
+        with h5py.File(self._path, "r") as h5:
+            self.assertIsNone(h5["BTCUSDT"].maxshape[0])
+
+    def test_create_streams_pages_and_compacts(self):
+        import pandas as pd
+        from rqalpha.data.crypto_data_source import iter_crypto_day_bar_updates, CryptoUpdateReport
+
+        yesterday = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=1)).date()
+        store = CryptoDayBarStore(self._path)
+        api = _FakeKlinesAPI()
+        report = CryptoUpdateReport()
+        done = list(iter_crypto_day_bar_updates(
+            store, api, ["BTCUSDT", "ETHUSDT"], False, yesterday - timedelta(days=2499), report=report,
+            concurrency=2, create=True, max_in_flight=2
+        ))
+        self.assertEqual(sorted(done), ["BTCUSDT", "ETHUSDT"])
+        self.assertEqual(report.api_calls, 6)
+        bars = store.get_bars("BTCUSDT")
+        self.assertEqual(len(bars), 2500)
+        self.assertTrue((np.diff(bars["datetime"]) > 0).all())
+        self.assertEqual(bars["prev_close"][1000], bars["close"][999])
+        with h5py.File(self._path, "r") as h5:
+            self.assertIsNone(h5["BTCUSDT"].chunks)
+
+    def test_update_data_releases_views_before_writing(self):
+        import pandas as pd
+        from types import SimpleNamespace
+        from rqalpha.const import INSTRUMENT_TYPE
+        from rqalpha.data.crypto_data_source import CryptoDataSource, CRYPTO_SPOT_DTYPE
+
+        class Instrument(object):
+            type = INSTRUMENT_TYPE.CRYPTO_SPOT
+            order_book_id = "BTCUSDT"
+
+        yesterday = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(days=1)).date()
+        bars = np.zeros(5, dtype=CRYPTO_SPOT_DTYPE)
+        bars["datetime"] = [int((yesterday - timedelta(days=9 - i)).strftime("%Y%m%d")) * 1000000 for i in range(5)]
+
+        def write_contiguous():
+            with h5py.File(self._path, "w") as h5:
+                h5.create_dataset("BTCUSDT", data=bars)
+
+        # 调用方仍持有视图时只能复制文件后写入，并在统计中体现
+        write_contiguous()
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        view = store.get_bars("BTCUSDT")
+        report = update_crypto_day_bars(store, _FakeKlinesAPI(), ["BTCUSDT"], False, yesterday - timedelta(days=9))
+        self.assertEqual((report.rows_written, report.file_copies), (6, 1))
+        self.assertEqual(len(view), 5)
+        del view
+
+        write_contiguous()
+        store = CryptoDayBarStore(self._path, keep_open=True)
+        source = object.__new__(CryptoDataSource)
+        source._day_bars = {INSTRUMENT_TYPE.CRYPTO_SPOT: store, INSTRUMENT_TYPE.CRYPTO_FUTURE: store}
+        source._binance_provider = SimpleNamespace(get_all_symbols=lambda futures: [], api=_FakeKlinesAPI())
+        instrument = Instrument()
+        self.assertEqual(len(source._all_day_bars_of(instrument)), 5)
+        self.assertEqual(store.stats["views"], 1)
+        # 数据源缓存的视图在写入前释放，写入在原文件上进行
+        report = source.update_data(["BTCUSDT"], yesterday - timedelta(days=9))
+        self.assertEqual((report.rows_written, report.file_copies, store.stats["copies"]), (6, 0, 0))
+        self.assertEqual(len(source._all_day_bars_of(instrument)), 10)
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+import h5py
+
+from rqalpha.const import INSTRUMENT_TYPE
+from rqalpha.data.binance_api import BinanceDataProvider
+from rqalpha.data.crypto_data_source import CryptoDataSource
+from rqalpha.data.crypto_instrument_snapshot import (
+    SNAPSHOT_FILE, SnapshotNotFoundError, SnapshotVersionError, read_instrument_snapshot, snapshot_to_instruments,
+    write_instrument_snapshot
+)
+
+SPOT = [{
+    "order_book_id": "BTCUSDT", "underlying_symbol": "BTC", "quote_currency": "USDT", "tick_size": 0.01,
+    "lot_size": 0.00001, "min_qty": 0.00001, "min_notional": 5., "listed_date": datetime(2017, 1, 1),
+    "de_listed_date": None,
+}]
+FUTURES = [{
+    "order_book_id": "BTCUSDT_250328", "underlying_symbol": "BTC", "quote_currency": "USDT", "tick_size": 0.1,
+    "lot_size": 0.001, "min_qty": 0.001, "min_notional": 100., "listed_date": datetime(2024, 9, 27),
+    "de_listed_date": datetime(2025, 3, 28),
+}]
+
+
+class CryptoInstrumentSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        self.assertIsNone(read_instrument_snapshot(self.path))
+        write_instrument_snapshot(self.path, SPOT, FUTURES)
+        snapshot = read_instrument_snapshot(self.path)
+
+        spot, = snapshot_to_instruments(snapshot[INSTRUMENT_TYPE.CRYPTO_SPOT], INSTRUMENT_TYPE.CRYPTO_SPOT)
+        self.assertEqual((spot.order_book_id, spot.underlying_symbol, spot.exchange), ("BTCUSDT", "BTC", "BINANCE"))
+        self.assertEqual((spot.tick_size, spot.lot_size, spot.min_notional, spot.round_lot), (0.01, 0.00001, 5., 1))
+        self.assertEqual(spot.listed_date, datetime(2017, 1, 1))
+        self.assertEqual(spot.de_listed_date, spot.DEFAULT_DE_LISTED_DATE)
+
+        future, = snapshot_to_instruments(snapshot[INSTRUMENT_TYPE.CRYPTO_FUTURE], INSTRUMENT_TYPE.CRYPTO_FUTURE)
+        self.assertEqual(future.exchange, "BINANCE_FUTURES")
+        self.assertEqual((future.listed_date, future.de_listed_date), (datetime(2024, 9, 27), datetime(2025, 3, 28)))
+
+        with h5py.File(os.path.join(self.path, SNAPSHOT_FILE), "a") as h5:
+            h5.attrs["version"] = 0
+        with self.assertRaises(SnapshotVersionError):
+            read_instrument_snapshot(self.path)
+
+    def test_data_source_loads_snapshot_offline(self):
+        with patch("rqalpha.data.binance_api.BinanceDataProvider.get_instruments_info",
+                   side_effect=lambda futures=False: FUTURES if futures else SPOT) as fetch:
+            # 没有快照时不访问网络，也不写入数据包
+            with self.assertRaises(SnapshotNotFoundError):
+                CryptoDataSource(self.path)
+            self.assertEqual(fetch.call_count, 0)
+            self.assertFalse(os.path.exists(os.path.join(self.path, SNAPSHOT_FILE)))
+
+            CryptoDataSource(self.path, fetch_missing_instruments=True)
+            self.assertEqual(fetch.call_count, 2)
+            self.assertTrue(os.path.exists(os.path.join(self.path, SNAPSHOT_FILE)))
+
+            data_source = CryptoDataSource(self.path)
+            self.assertEqual(fetch.call_count, 2)
+        future, = data_source.get_instruments(id_or_syms=["BTCUSDT_250328"])
+        self.assertEqual(future.type, INSTRUMENT_TYPE.CRYPTO_FUTURE)
+        self.assertEqual([i.order_book_id for i in data_source.get_instruments(types=[INSTRUMENT_TYPE.CRYPTO_SPOT])],
+                         ["BTCUSDT"])
+
+    def test_instruments_info_filters(self):
+        exchange_info = {"symbols": [{
+            "symbol": "BTCUSDT_250328", "status": "TRADING", "baseAsset": "BTC", "quoteAsset": "USDT",
+            "contractType": "CURRENT_QUARTER", "onboardDate": 1727424000000, "deliveryDate": 1743148800000,
+            "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.1"},
+                        {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001"},
+                        {"filterType": "MIN_NOTIONAL", "notional": "100"}],
+        }, {
+            "symbol": "ETHUSDT", "status": "TRADING", "baseAsset": "ETH", "quoteAsset": "USDT",
+            "contractType": "PERPETUAL", "onboardDate": 1569398400000, "deliveryDate": 4133404800000,
+            "filters": [{"filterType": "PRICE_FILTER", "tickSize": "0.01"}],
+        }, {
+            "symbol": "OLDUSDT", "status": "SETTLING", "baseAsset": "OLD", "quoteAsset": "USDT", "filters": [],
+        }]}
+        provider = BinanceDataProvider()
+        with patch.object(provider.api, "get_exchange_info", return_value=exchange_info):
+            quarter, perpetual = provider.get_instruments_info(futures=True)
+        self.assertEqual((quarter["tick_size"], quarter["lot_size"], quarter["min_notional"]), (0.1, 0.001, 100.))
+        self.assertEqual((quarter["listed_date"], quarter["de_listed_date"]),
+                         (datetime(2024, 9, 27, 8), datetime(2025, 3, 28, 8)))
+        self.assertEqual((perpetual["lot_size"], perpetual["de_listed_date"]), (1., None))
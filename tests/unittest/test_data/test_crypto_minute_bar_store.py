@@ -0,0 +1,111 @@
+import os
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import h5py
+import numpy as np
+
+from rqalpha.const import INSTRUMENT_TYPE
+from rqalpha.data.crypto_minute_bar_store import CRYPTO_MINUTE_DTYPE, CryptoMinuteBarStore
+from rqalpha.utils.datetime_func import convert_epoch_ms_to_int, convert_int_to_epoch_ms
+
+
+def _minute_bars(start_dt, n):
+    bars = np.zeros(n, dtype=CRYPTO_MINUTE_DTYPE)
+    ms = convert_int_to_epoch_ms(start_dt) + np.arange(n) * 60000
+    bars["datetime"] = convert_epoch_ms_to_int(ms)
+    bars["open"] = bars["close"] = np.arange(n, dtype=float)
+    bars["high"] = bars["close"] + 1
+    bars["low"] = bars["close"] - 1
+    bars["volume"] = 1
+    return bars
+
+
+class _Instrument(object):
+    type = INSTRUMENT_TYPE.CRYPTO_SPOT
+    order_book_id = "BTCUSDT"
+
+
+class CryptoMinuteBarStoreTestCase(TestCase):
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._path = os.path.join(self._temp_dir.name, "crypto_spot_1m")
+        self._store = CryptoMinuteBarStore(self._path)
+        # 2024-01-31 23:01 至 2024-02-01 00:59，跨越两个月
+        self._bars = _minute_bars(20240131230100, 119)
+        self._store.append_bars("BTCUSDT", self._bars)
+
+    def tearDown(self):
+        self._store.close()
+        self._temp_dir.cleanup()
+
+    def test_month_partitions_and_slices(self):
+        self.assertEqual(self._store.months(), (202401, 202402))
+        with h5py.File(os.path.join(self._path, "202402.h5"), "r") as h5:
+            self.assertEqual(len(h5["BTCUSDT"]), 60)
+            self.assertEqual(h5["BTCUSDT"].compression, "lzf")
+            self.assertIsNone(h5["BTCUSDT"].maxshape[0])
+
+        np.testing.assert_array_equal(self._store.get_bars("BTCUSDT"), self._bars)
+        np.testing.assert_array_equal(
+            self._store.get_bars("BTCUSDT", 20240131235500, 20240201000500), self._bars[54:65]
+        )
+        np.testing.assert_array_equal(self._store.get_bars_before("BTCUSDT", 20240201000200, 5), self._bars[57:62])
+        self.assertEqual(self._store.get_last_dt("BTCUSDT"), 20240201005900)
+        self.assertEqual(len(self._store.get_bars("ETHUSDT")), 0)
+
+        # 覆盖最后 10 根并追加
+        more = _minute_bars(20240201005000, 20)
+        self._store.append_bars("BTCUSDT", more)
+        bars = self._store.get_bars("BTCUSDT")
+        self.assertEqual(len(bars), 129)
+        np.testing.assert_array_equal(bars[-20:], more)
+
+    def test_history_minute_bars(self):
+        from rqalpha.data.crypto_data_source import CryptoDataSource
+
+        source = object.__new__(CryptoDataSource)
+        source._minute_bars = {INSTRUMENT_TYPE.CRYPTO_SPOT: self._store}
+        ins = _Instrument()
+
+        bars = source.history_bars(ins, 3, "5m", None, datetime(2024, 2, 1, 0, 2))
+        self.assertEqual(bars["datetime"].tolist(), [20240131235000, 20240131235500, 20240201000000])
+        bar = bars[-1]
+        self.assertEqual((bar["open"], bar["close"], bar["high"], bar["low"], bar["volume"]),
+                         (55, 59, 60, 54, 5))
+        bars = source.history_bars(ins, 2, "5m", "close", datetime(2024, 2, 1, 0, 2), include_now=True)
+        self.assertEqual(bars.tolist(), [59, 61])
+
+        self.assertEqual(source.history_bars(ins, 2, "1m", "close", datetime(2024, 2, 1, 0, 2)).tolist(), [60, 61])
+        self.assertEqual(source.get_bar(ins, datetime(2024, 2, 1), "1h")["volume"], 60)
+        self.assertIsNone(source.get_bar(ins, datetime(2024, 2, 1, 0, 2), "15m"))
+
+    def test_minute_update(self):
+        import pandas as pd
+        from rqalpha.data.binance_api import KLINE_DTYPE
+        from rqalpha.data.crypto_data_source import iter_crypto_minute_bar_updates
+
+        class FakeAPI(object):
+            def get_klines_array(self, symbol, interval, start_time, end_time, limit=1000, futures=False):
+                open_time = np.arange(-(-start_time // 60000) * 60000, end_time + 1, 60000)[:limit]
+                klines = np.zeros(len(open_time), dtype=KLINE_DTYPE)
+                klines["open_time"] = open_time
+                klines["close_time"] = open_time + 59999
+                klines["close"] = 1
+                return klines
+
+        store = CryptoMinuteBarStore(os.path.join(self._temp_dir.name, "minutes"))
+        start = (pd.Timestamp.now(tz="UTC") - pd.Timedelta(hours=1)).date()
+        list(iter_crypto_minute_bar_updates(store, FakeAPI(), ["BTCUSDT"], False, start))
+        bars = store.get_bars("BTCUSDT")
+        self.assertGreater(len(bars), 60)
+        self.assertEqual(bars["datetime"][0] % 1000000, 100)
+        self.assertTrue((np.diff(convert_int_to_epoch_ms(bars["datetime"])) == 60000).all())
+
+        # 再次更新只追加最后一根之后的分钟线
+        last = store.get_last_dt("BTCUSDT")
+        list(iter_crypto_minute_bar_updates(store, FakeAPI(), ["BTCUSDT"], False, start))
+        bars = store.get_bars("BTCUSDT")
+        self.assertTrue((np.diff(bars["datetime"]) > 0).all())
+        self.assertGreaterEqual(store.get_last_dt("BTCUSDT"), last)
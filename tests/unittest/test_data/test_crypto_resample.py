@@ -0,0 +1,136 @@
+import os
+from datetime import datetime, timedelta
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from rqalpha.const import INSTRUMENT_TYPE
+from rqalpha.data.crypto_minute_bar_store import CRYPTO_MINUTE_DTYPE, CryptoMinuteBarStore
+from rqalpha.data.crypto_resample import DAY_MS, WEEK_OFFSET_MS, parse_frequency, resample_bars
+from rqalpha.utils.datetime_func import convert_epoch_ms_to_int, convert_int_to_epoch_ms
+from rqalpha.utils.functools import nbytes_cache
+
+
+def _bars(dtype, start_dt, n, step_ms):
+    bars = np.zeros(n, dtype=dtype)
+    bars["datetime"] = convert_epoch_ms_to_int(convert_int_to_epoch_ms(start_dt) + np.arange(n) * step_ms)
+    bars["open"] = bars["close"] = np.arange(n, dtype=float)
+    bars["high"] = bars["close"] + 1
+    bars["low"] = bars["close"] - 1
+    bars["volume"] = 1
+    return bars
+
+
+class _Instrument(object):
+    type = INSTRUMENT_TYPE.CRYPTO_SPOT
+    order_book_id = "BTCUSDT"
+
+
+class _DayBarStore(object):
+    def __init__(self, bars):
+        self._bars = bars
+
+    def get_bars(self, order_book_id):
+        return self._bars
+
+
+class CryptoResampleTestCase(TestCase):
+    def test_parse_frequency(self):
+        self.assertEqual(parse_frequency("4h"), (4 * 3600000, 0))
+        self.assertEqual(parse_frequency("3d"), (3 * DAY_MS, 0))
+        self.assertEqual(parse_frequency("1w"), (7 * DAY_MS, WEEK_OFFSET_MS))
+        self.assertIsNone(parse_frequency("0m"))
+        self.assertIsNone(parse_frequency("tick"))
+
+    def test_week_bars_aligned_to_monday(self):
+        from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE
+
+        # 2024-01-03 为周三，2024-01-08 为周一
+        bars = resample_bars(_bars(CRYPTO_SPOT_DTYPE, 20240103000000, 12, DAY_MS), 7 * DAY_MS, WEEK_OFFSET_MS, "left")
+        self.assertEqual(bars["datetime"].tolist(), [20240101000000, 20240108000000])
+        self.assertEqual(bars["open"].tolist(), [0, 5])
+        self.assertEqual(bars["close"].tolist(), [4, 11])
+        self.assertEqual(bars["volume"].tolist(), [5, 7])
+
+    def _source(self, temp_dir, day_bars):
+        from rqalpha.data.crypto_data_source import CryptoDataSource
+
+        source = object.__new__(CryptoDataSource)
+        minute_store = CryptoMinuteBarStore(os.path.join(temp_dir, "crypto_spot_1m"))
+        source._minute_bars = {INSTRUMENT_TYPE.CRYPTO_SPOT: minute_store}
+        source._day_bars = {INSTRUMENT_TYPE.CRYPTO_SPOT: _DayBarStore(day_bars)}
+        return source, minute_store
+
+    def test_cached_history_matches_full_resample(self):
+        from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE
+
+        day_bars = _bars(CRYPTO_SPOT_DTYPE, 20230101000000, 200, DAY_MS)
+        minute_bars = _bars(CRYPTO_MINUTE_DTYPE, 20240101000100, 3 * 1440, 60000)
+        ins = _Instrument()
+        with TemporaryDirectory() as d:
+            source, minute_store = self._source(d, day_bars)
+            minute_store.append_bars("BTCUSDT", minute_bars)
+
+            for frequency, bars, label, start, step, count in (
+                ("3d", day_bars, "left", datetime(2023, 3, 1), timedelta(days=1), 5),
+                ("1w", day_bars, "left", datetime(2023, 3, 1), timedelta(days=1), 4),
+                ("4h", minute_bars, "right", datetime(2024, 1, 2, 3), timedelta(minutes=7), 6),
+            ):
+                period_ms, offset_ms = parse_frequency(frequency)
+                dt = start
+                for _ in range(60):
+                    for include_now in (False, True):
+                        result = source.history_bars(ins, count, frequency, None, dt, include_now=include_now)
+                        if label == "left":
+                            dt_int = int(dt.strftime("%Y%m%d000000"))
+                            last_day = convert_epoch_ms_to_int(convert_int_to_epoch_ms(dt_int) + DAY_MS)
+                            visible = bars[bars["datetime"] <= dt_int]
+                        else:
+                            dt_int = int(dt.strftime("%Y%m%d%H%M00"))
+                            last_day = dt_int
+                            visible = bars[bars["datetime"] <= dt_int]
+                        expected = resample_bars(visible, period_ms, offset_ms, label)
+                        if not include_now and label == "left":
+                            end = convert_epoch_ms_to_int(convert_int_to_epoch_ms(expected["datetime"]) + period_ms)
+                            expected = expected[end <= last_day]
+                        elif not include_now:
+                            expected = expected[expected["datetime"] <= dt_int]
+                        np.testing.assert_array_equal(result, expected[-count:], err_msg="{} {}".format(frequency, dt))
+                    dt += step
+            # 已完成的K线缓存在 nbytes_cache 中，受其字节数上限约束
+            keys = [k for k in nbytes_cache._data if k[0] is resample_bars and k[1] is source]
+            self.assertEqual(len(keys), 3)
+            nbytes_cache.max_bytes = 0
+            try:
+                nbytes_cache.shrink()
+            finally:
+                nbytes_cache.max_bytes = None
+            self.assertFalse(any(k[0] is resample_bars for k in nbytes_cache._data))
+            minute_store.close()
+
+    def test_update_data_resets_cache(self):
+        from rqalpha.data.crypto_data_source import CRYPTO_SPOT_DTYPE
+
+        day_bars = _bars(CRYPTO_SPOT_DTYPE, 20230101000000, 60, DAY_MS)
+        updated = day_bars.copy()
+        updated["close"] += 100
+        ins = _Instrument()
+        with TemporaryDirectory() as d:
+            source, minute_store = self._source(d, day_bars)
+            source._day_bars[INSTRUMENT_TYPE.CRYPTO_FUTURE] = _DayBarStore(day_bars[:0])
+            source._binance_provider = SimpleNamespace(api=None, get_all_symbols=lambda futures=False: [])
+            dt = datetime(2023, 2, 20)
+            self.assertEqual(source.history_bars(ins, 4, "1w", None, dt)["close"][-1], 49)
+
+            def update(store, *args):
+                store._bars = updated
+
+            with patch("rqalpha.data.crypto_data_source.update_crypto_day_bars", side_effect=update):
+                source.update_data(symbols=[])
+            result = source.history_bars(ins, 4, "1w", None, dt)
+            expected = resample_bars(updated[updated["datetime"] < 20230220000000], 7 * DAY_MS, WEEK_OFFSET_MS, "left")
+            np.testing.assert_array_equal(result, expected[-4:])
+            minute_store.close()
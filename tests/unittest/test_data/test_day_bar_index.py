@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.day_bar_index import DayBarIndex, date_ordinals
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+
+def _datetimes(dates):
+    return np.array([convert_date_to_int(d) for d in dates], dtype=np.uint64)
+
+
+class DayBarIndexTestCase(TestCase):
+    def assert_same_as_searchsorted(self, index, datetimes, queries):
+        for d in queries:
+            dt = np.uint64(convert_date_to_int(d))
+            right = int(datetimes.searchsorted(dt, side="right"))
+            self.assertEqual(index.right(d), right, d)
+            self.assertEqual(index.left(d), int(datetimes.searchsorted(dt, side="left")), d)
+            self.assertEqual(index.position(d), right - 1 if right and datetimes[right - 1] == dt else -1, d)
+
+    def test_date_ordinals(self):
+        dates = [date(1970, 1, 1), date(2000, 2, 29), date(2024, 12, 31)]
+        self.assertEqual(date_ordinals(_datetimes(dates)).tolist(), [d.toordinal() for d in dates])
+
+    def test_gap_free(self):
+        dates = pd.date_range("2023-12-25", "2024-01-10")
+        datetimes = _datetimes(dates)
+        index = DayBarIndex(datetimes)
+        self.assertTrue(index.gap_free)
+        self.assertEqual(index.nbytes, 0)
+        queries = pd.date_range("2023-12-20", "2024-01-15").to_pydatetime()
+        self.assert_same_as_searchsorted(index, datetimes, queries)
+
+    def test_with_gaps(self):
+        dates = pd.bdate_range("2023-12-20", "2024-02-10")
+        dates = dates[np.random.RandomState(0).rand(len(dates)) > 0.3]
+        datetimes = _datetimes(dates)
+        index = DayBarIndex(datetimes)
+        self.assertFalse(index.gap_free)
+        self.assertEqual(index.nbytes, 4 * ((dates[-1] - dates[0]).days + 1))
+        start = date(2023, 12, 15)
+        self.assert_same_as_searchsorted(index, datetimes, [start + timedelta(days=i) for i in range(70)])
+
+    def test_empty(self):
+        index = DayBarIndex(np.array([], dtype=np.uint64))
+        self.assertEqual((index.right(date(2024, 1, 1)), index.position(date(2024, 1, 1))), (0, -1))
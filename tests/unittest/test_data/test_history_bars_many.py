@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.const import INSTRUMENT_TYPE, TRADING_CALENDAR_TYPE
+from rqalpha.data.crypto_bar_panel import CryptoBarPanel
+from rqalpha.data.data_proxy import DataProxy
+from rqalpha.interface import AbstractDataSource
+
+BAR_DTYPE = np.dtype([("datetime", "i8"), ("open", "f8"), ("close", "f8"), ("volume", "f8")])
+
+
+class _Instrument(object):
+    type = INSTRUMENT_TYPE.CRYPTO_SPOT
+
+    def __init__(self, order_book_id):
+        self.order_book_id = self.symbol = order_book_id
+
+
+def _day_bars(dates, close):
+    bars = np.zeros(len(dates), dtype=BAR_DTYPE)
+    bars["datetime"] = dates
+    bars["open"] = bars["close"] = close
+    bars["volume"] = 1
+    return bars
+
+
+class _DataSource(AbstractDataSource):
+    def __init__(self, bars_of):
+        self.bars_of = bars_of
+        self.history_calls = 0
+
+    def get_trading_calendars(self):
+        return {TRADING_CALENDAR_TYPE.CRYPTO: pd.date_range("2024-01-01", "2024-01-10")}
+
+    def get_instruments(self, id_or_syms=None, types=None):
+        return [_Instrument(o) for o in id_or_syms if o in self.bars_of]
+
+    def history_bars(self, instrument, bar_count, frequency, fields, dt, skip_suspended=True,
+                     include_now=False, adjust_type='pre', adjust_orig=None):
+        self.history_calls += 1
+        bars = self.bars_of[instrument.order_book_id]
+        i = bars["datetime"].searchsorted(int(dt.strftime("%Y%m%d000000")), side="right")
+        return bars[max(i - bar_count, 0):i][fields]
+
+
+class HistoryBarsManyTestCase(TestCase):
+    def setUp(self):
+        dates = np.arange(20240101, 20240111) * 1000000
+        self.bars_of = {
+            "BTCUSDT": _day_bars(dates, np.arange(10.)),
+            "ETHUSDT": _day_bars(dates[3:], np.arange(7.) + 100),
+        }
+
+    def test_aligned_by_datetime(self):
+        source = _DataSource(self.bars_of)
+        proxy = DataProxy(source, None)
+        dt = pd.Timestamp("2024-01-05")
+        closes = proxy.history_bars_many(["BTCUSDT", "ETHUSDT", "XXXUSDT"], 3, "1d", "close", dt)
+        np.testing.assert_array_equal(closes, [[2, np.nan, np.nan], [3, 100, np.nan], [4, 101, np.nan]])
+        self.assertEqual(source.history_calls, 2)
+
+        df = proxy.history_bars_many(["ETHUSDT", "BTCUSDT"], 2, "1d", ["datetime", "open", "volume"], dt)
+        self.assertEqual(list(df.index), [pd.Timestamp("2024-01-04"), pd.Timestamp("2024-01-05")])
+        self.assertEqual(df["open"]["ETHUSDT"].tolist(), [100, 101])
+        self.assertEqual(df[("volume", "BTCUSDT")].tolist(), [1, 1])
+
+    def test_crypto_panel(self):
+        from rqalpha.data.crypto_data_source import CryptoDataSource
+
+        panel = CryptoBarPanel.build(self.bars_of, pd.date_range("2024-01-01", "2024-01-10"), ["open", "close"])
+
+        class Source(_DataSource):
+            history_bars_many = CryptoDataSource.history_bars_many
+
+            def get_bar_panel(self, instrument_type):
+                return panel
+
+        source = Source(self.bars_of)
+        proxy = DataProxy(source, None)
+        closes = proxy.history_bars_many(["ETHUSDT", "BTCUSDT"], 2, "1d", "close", pd.Timestamp("2024-01-10"))
+        np.testing.assert_array_equal(closes, [[105, 8], [106, 9]])
+        self.assertEqual(source.history_calls, 0)
+
+        # 面板以外的字段逐个获取
+        volumes = proxy.history_bars_many(["ETHUSDT", "BTCUSDT"], 2, "1d", "volume", pd.Timestamp("2024-01-10"))
+        np.testing.assert_array_equal(volumes, [[1, 1], [1, 1]])
+        self.assertEqual(source.history_calls, 2)
@@ -0,0 +1,102 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.rolling_indicators import RollingIndicators
+from rqalpha.utils.exception import RQInvalidArgument
+from rqalpha.utils.functools import NBytesLRUCache
+
+
+class RollingIndicatorsTestCase(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        n = 300
+        self.bars = np.zeros(n, dtype=[("datetime", "i8"), ("close", "f8"), ("volume", "f8")])
+        self.bars["datetime"] = (pd.date_range("2023-01-01", periods=n).strftime("%Y%m%d").astype(np.int64)
+                                 * 1000000)
+        self.bars["close"] = 30000 + rng.standard_normal(n).cumsum() * 100
+        self.bars["close"][50] = np.nan
+        self.bars["volume"] = rng.randint(0, 100, n)
+        self.bars["volume"][200:210] = 0
+        self.indicators = RollingIndicators(self.bars)
+
+    def _expected(self, name, window, right):
+        window_bars = self.bars[max(right - window, 0):right]
+        close, volume = window_bars["close"], window_bars["volume"]
+        if name == "ema":
+            return pd.Series(self.bars["close"][:right]).ewm(span=window, adjust=False).mean().iloc[-1]
+        if name == "vwap":
+            return np.dot(close, volume) / volume.sum() if volume.sum() != 0 else 0
+        return {"mavg": np.mean, "std": np.std, "max": np.max, "min": np.min}[name](close)
+
+    def test_matches_window_computation(self):
+        for name in ("mavg", "vwap", "std", "max", "min", "ema"):
+            for window in (1, 5, 20, 64):
+                for right in (1, 3, 40, 55, 120, 205, 300):
+                    dt = int(self.bars["datetime"][right - 1])
+                    np.testing.assert_allclose(
+                        self.indicators.value(name, window, dt), self._expected(name, window, right),
+                        rtol=1e-9, atol=1e-4 if name == "std" else 1e-9, err_msg="{} {} {}".format(name, window, right)
+                    )
+        self.assertTrue(np.isnan(self.indicators.value("mavg", 5, 20221231000000)))
+        self.assertGreater(self.indicators.nbytes, 0)
+        with self.assertRaises(RQInvalidArgument):
+            self.indicators.value("mavg", 5, 20230301000000, "open")
+
+    def test_shared_cache(self):
+        cache = NBytesLRUCache(max_bytes=20000)
+        indicators = RollingIndicators(self.bars, cache, ("BTCUSDT", ))
+        dt = int(self.bars["datetime"][-1])
+        expected = self.indicators.value("max", 20, dt)
+        self.assertEqual(indicators.value("max", 20, dt), expected)
+        # 稀疏表等中间结果在计算时计入缓存
+        self.assertGreater(cache.nbytes, 0)
+        self.assertEqual(indicators.nbytes, 0)
+        cache.max_bytes = 0
+        cache.shrink()
+        self.assertEqual(indicators.value("max", 20, dt), expected)
+        cache.max_bytes = None
+        indicators.value("mavg", 5, dt)
+        cache.discard(RollingIndicators)
+        self.assertEqual((len(cache), cache.nbytes), (0, 0))
+
+    def test_cleared_with_cached_functions(self):
+        from rqalpha.utils.functools import clear_all_cached_functions, nbytes_cache
+
+        owner = object()
+        indicators = RollingIndicators(self.bars, nbytes_cache, (owner, "BTCUSDT"))
+        indicators.value("mavg", 5, int(self.bars["datetime"][-1]))
+        self.assertTrue(any(k[0] is RollingIndicators and k[1] is owner for k in nbytes_cache._data))
+        clear_all_cached_functions()
+        self.assertFalse(any(k[0] is RollingIndicators for k in nbytes_cache._data))
+
+    def test_data_proxy_fallback(self):
+        from rqalpha.const import TRADING_CALENDAR_TYPE
+        from rqalpha.data.data_proxy import DataProxy
+        from rqalpha.interface import AbstractDataSource
+
+        bars = self.bars
+
+        class Instrument(object):
+            order_book_id = symbol = "BTCUSDT"
+
+        class DataSource(AbstractDataSource):
+            def get_trading_calendars(self):
+                return {TRADING_CALENDAR_TYPE.CRYPTO: pd.DatetimeIndex(bars["datetime"].astype(str))}
+
+            def get_instruments(self, id_or_syms=None, types=None):
+                return [Instrument()]
+
+            def history_bars(self, instrument, bar_count, frequency, fields, dt, skip_suspended=True,
+                             include_now=False, adjust_type='pre', adjust_orig=None):
+                i = bars["datetime"].searchsorted(int(dt.strftime("%Y%m%d000000")), side="right")
+                return bars[max(i - bar_count, 0):i][fields]
+
+        proxy = DataProxy(DataSource(), None)
+        dt = pd.Timestamp("2023-06-01")
+        for name in ("mavg", "vwap", "std", "max", "min", "ema"):
+            np.testing.assert_allclose(
+                proxy.get_rolling_indicator("BTCUSDT", name, 20, "1d", dt),
+                self.indicators.value(name, 20, 20230601000000), rtol=1e-6, err_msg=name
+            )
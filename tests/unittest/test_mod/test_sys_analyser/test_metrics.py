@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+from rqrisk import Risk, WEEKLY
+
+from rqalpha.mod.rqalpha_mod_sys_analyser.metrics import (
+    WEEKS_A_YEAR, equity_curve_metrics, max_drawdown_duration, period_end_indices, period_returns, risk_metrics
+)
+
+_RQRISK_FIELDS = (
+    "alpha", "beta", "sharpe", "excess_sharpe", "information_ratio", "sortino", "annual_volatility",
+    "annual_downside_risk", "annual_tracking_error", "max_drawdown", "geometric_excess_drawdown", "var",
+    "win_rate", "excess_win_rate", "ulcer_index", "ulcer_performance_index",
+)
+
+
+class RiskMetricsTestCase(TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.returns = rng.normal(0.001, 0.02, size=(3, 120))
+        self.benchmark_returns = rng.normal(0.0005, 0.015, size=(3, 120))
+
+    def test_rqrisk_parity(self):
+        for annual_factor, period in ((252, None), (WEEKS_A_YEAR, WEEKLY)):
+            metrics = risk_metrics(self.returns[0], self.benchmark_returns[0], 0.02, annual_factor)
+            args = (self.returns[0], self.benchmark_returns[0], 0.02) + ((period, ) if period else ())
+            risk = Risk(*args)
+            for field in _RQRISK_FIELDS:
+                self.assertAlmostEqual(metrics[field], getattr(risk, field), delta=1e-10, msg=field)
+
+    def test_batch(self):
+        batch = risk_metrics(self.returns, self.benchmark_returns, 0.02, 365)
+        for i in range(len(self.returns)):
+            single = risk_metrics(self.returns[i], self.benchmark_returns[i], 0.02, 365)
+            for field, value in single.items():
+                np.testing.assert_allclose(batch[field][i], value, rtol=1e-12, err_msg=field)
+
+    def test_no_benchmark(self):
+        metrics = risk_metrics(self.returns[0])
+        self.assertTrue(np.isnan(metrics["beta"]))
+        self.assertTrue(np.isnan(metrics["tracking_error"]))
+        self.assertFalse(np.isnan(metrics["sharpe"]))
+
+
+class MaxDrawdownDurationTestCase(TestCase):
+    def test_known_cases(self):
+        # 回撤从跌破前高的前一期开始，到再创新高的前一期结束
+        self.assertEqual(max_drawdown_duration([1, 1.1, 1.0, 0.9, 1.2, 1.1, 1.15, 1.3]), (1, 3))
+        # 期末仍未恢复且更长的回撤
+        self.assertEqual(max_drawdown_duration([1, 1.1, 1.0, 1.2, 1.1, 1.0, 0.9]), (3, 6))
+        self.assertEqual(max_drawdown_duration([1, 1.1, 1.2]), (0, 0))
+
+    def test_batch(self):
+        nav = np.array([[1, 1.1, 1.0, 0.9, 1.2], [1, 0.9, 0.8, 0.95, 0.99]])
+        start, end = max_drawdown_duration(nav)
+        self.assertEqual((start.tolist(), end.tolist()), ([1, 0], [3, 4]))
+
+
+class EquityCurveMetricsTestCase(TestCase):
+    def test_period_returns(self):
+        dates = pd.date_range("2024-01-01", periods=40)
+        nav = np.linspace(1, 1.39, 40)
+        ends = period_end_indices(dates, "W")
+        # 2024-01-07 为周日
+        self.assertEqual(ends[:2].tolist(), [6, 13])
+        self.assertEqual(ends[-1], 39)
+        returns = period_returns(nav, ends)
+        self.assertAlmostEqual(returns[0], nav[6] - 1)
+        self.assertAlmostEqual(returns[1], nav[13] / nav[6] - 1)
+
+    def test_batch_of_curves(self):
+        rng = np.random.RandomState(0)
+        dates = pd.date_range("2024-01-01", periods=90)
+        nav = np.cumprod(1 + rng.normal(0.001, 0.02, size=(4, 90)), axis=-1)
+        result = equity_curve_metrics(nav, dates)
+        self.assertEqual(result["daily"]["sharpe"].shape, (4, ))
+        self.assertEqual(result["monthly"]["annual_volatility"].shape, (4, ))
+        single = equity_curve_metrics(nav[2], dates)
+        self.assertAlmostEqual(result["weekly"]["sharpe"][2], single["weekly"]["sharpe"])
+        self.assertEqual(result["max_drawdown_duration"]["end"][2], single["max_drawdown_duration"]["end"])
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+from datetime import date, datetime
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.mod.rqalpha_mod_sys_analyser.recorder import ColumnarTable, SpillFile
+
+
+def _records():
+    records = []
+    for i in range(10):
+        record = {"date": date(2024, 1, 1 + i), "order_book_id": "BTCUSDT" if i % 2 else "ETHUSDT",
+                  "quantity": i, "last_price": 1.5 * i}
+        if i >= 4:
+            # 后出现的列
+            record["LONG_pnl"] = float(i)
+        if i == 7:
+            # 整数列出现缺失值
+            del record["quantity"]
+            record["last_price"] = None
+        records.append(record)
+    return records
+
+
+class ColumnarTableTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_matches_records_frame(self):
+        expected = pd.DataFrame(_records())
+        expected["date"] = pd.to_datetime(expected["date"])
+
+        spill = SpillFile(self.path)
+        for table in (ColumnarTable("positions"), ColumnarTable("positions/CRYPTO", spill, chunk_size=3)):
+            table.extend(_records())
+            self.assertEqual(len(table), 10)
+            pd.testing.assert_frame_equal(table.to_frame(), expected)
+        self.assertEqual(len(os.listdir(self.path)), 1)
+        spill.close()
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_records_round_trip(self):
+        table = ColumnarTable("trades", chunk_size=2)
+        table.extend([
+            {"datetime": datetime(2024, 1, 1, 9, 30), "side": "BUY", "exec_id": 1, "last_price": 10.},
+            {"datetime": datetime(2024, 1, 1, 9, 31), "side": "SELL", "exec_id": 2, "last_price": np.nan},
+            {"datetime": datetime(2024, 1, 1, 9, 32), "side": None, "exec_id": 3, "last_price": 11.},
+        ])
+        records = table.to_records()
+        self.assertEqual(records[1], {"datetime": datetime(2024, 1, 1, 9, 31), "side": "SELL", "exec_id": 2})
+        self.assertEqual(records[2]["exec_id"], 3)
+        self.assertNotIn("side", records[2])
+
+        restored = ColumnarTable("trades")
+        restored.extend(records)
+        pd.testing.assert_frame_equal(restored.to_frame(), table.to_frame())
+        self.assertEqual(table.to_frame()["exec_id"].dtype, np.int64)
+
+    def test_mixed_types_become_object_columns(self):
+        records = [
+            {"symbol": None, "price": 1.5, "datetime": datetime(2024, 1, 1), "exec_id": 1},
+            {"symbol": None, "price": 2.5, "datetime": datetime(2024, 1, 2), "exec_id": 2},
+            {"symbol": 2.0, "price": 3.5, "datetime": None, "exec_id": 3},
+            # 数值、日期时间列出现字符串
+            {"symbol": "BTCUSDT", "price": "n/a", "datetime": "pending", "exec_id": "x"},
+            {"symbol": "BTCUSDT", "price": 4.5, "datetime": datetime(2024, 1, 3), "exec_id": 5},
+        ]
+        expected = pd.DataFrame(records)
+        spill = SpillFile(self.path)
+        for table in (ColumnarTable("trades"), ColumnarTable("trades", spill, chunk_size=2)):
+            table.extend(records)
+            frame = table.to_frame()
+            pd.testing.assert_frame_equal(frame, expected)
+            self.assertEqual(frame["datetime"].tolist()[0], datetime(2024, 1, 1))
+        spill.close()
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from rqalpha.const import POSITION_DIRECTION, POSITION_EFFECT
+from rqalpha.mod.rqalpha_mod_sys_simulation.open_orders import OpenOrders
+
+
+def _order(order_id, order_book_id, position_effect=POSITION_EFFECT.CLOSE, quantity=10,
+           direction=POSITION_DIRECTION.LONG):
+    return SimpleNamespace(order_id=order_id, order_book_id=order_book_id, position_effect=position_effect,
+                           position_direction=direction, unfilled_quantity=quantity)
+
+
+class OpenOrdersTestCase(TestCase):
+    def test_index(self):
+        orders = [
+            _order(1, "BTCUSDT"), _order(2, "ETHUSDT"), _order(3, "BTCUSDT", POSITION_EFFECT.OPEN),
+            _order(4, "BTCUSDT", POSITION_EFFECT.CLOSE_TODAY, 3),
+        ]
+        open_orders = OpenOrders()
+        for o in orders:
+            open_orders.add("account", o)
+        self.assertEqual([o.order_id for _, o in open_orders], [1, 2, 3, 4])
+        self.assertEqual([o.order_id for _, o in open_orders.of("BTCUSDT")], [1, 3, 4])
+        self.assertEqual(open_orders.order_book_ids(), ["BTCUSDT", "ETHUSDT"])
+
+        self.assertEqual(open_orders.frozen_quantity("BTCUSDT", POSITION_DIRECTION.LONG), (13, 3))
+        self.assertEqual(open_orders.frozen_quantity("BTCUSDT", POSITION_DIRECTION.SHORT), (0, 0))
+        # 成交后未成交数量变化，失效后重新计算
+        orders[0].unfilled_quantity = 4
+        self.assertEqual(open_orders.frozen_quantity("BTCUSDT", POSITION_DIRECTION.LONG), (13, 3))
+        open_orders.invalidate("BTCUSDT")
+        self.assertEqual(open_orders.frozen_quantity("BTCUSDT", POSITION_DIRECTION.LONG), (7, 3))
+
+        # 遍历的是快照，遍历过程中删除不影响迭代
+        visited = [o.order_id for _, o in open_orders if open_orders.remove(orders[1]) or True]
+        self.assertEqual(visited, [1, 2, 3, 4])
+        self.assertFalse(open_orders.remove(orders[1]))
+        self.assertNotIn(orders[1], open_orders)
+        self.assertEqual(open_orders.order_book_ids(), ["BTCUSDT"])
+        open_orders.remove(orders[3])
+        self.assertEqual(open_orders.frozen_quantity("BTCUSDT", POSITION_DIRECTION.LONG), (4, 0))
+        self.assertEqual(len(open_orders), 2)
+
+        open_orders.clear()
+        self.assertEqual((len(open_orders), open_orders.of("BTCUSDT")), (0, []))
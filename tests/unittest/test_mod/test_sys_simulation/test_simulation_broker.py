@@ -0,0 +1,51 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+from rqalpha.core.events import EVENT, Event
+from rqalpha.mod.rqalpha_mod_sys_simulation.open_orders import OpenOrders
+from rqalpha.mod.rqalpha_mod_sys_simulation.simulation_broker import SimulationBroker
+
+
+class _Order(SimpleNamespace):
+    def is_final(self):
+        return False
+
+
+class _Matcher(object):
+    def __init__(self):
+        self.matched = []
+        self.updates = 0
+
+    def update(self, event):
+        self.updates += 1
+
+    def match(self, account, order, open_auction):
+        self.matched.append(order.order_id)
+
+
+class SimulationBrokerOnBarTestCase(TestCase):
+    def test_skip_instruments_without_bar(self):
+        bars = {"BTCUSDT": False, "ETHUSDT": True, "SOLUSDT": True}
+        listed_date = {"BTCUSDT": date(2020, 1, 1), "ETHUSDT": date(2020, 1, 1), "SOLUSDT": date(2024, 1, 2)}
+        dt = datetime(2024, 1, 2, 10, 30)
+        env = SimpleNamespace(
+            config=SimpleNamespace(base=SimpleNamespace(frequency="1m")), trading_dt=dt,
+            get_bar=lambda o: SimpleNamespace(isnan=bars[o]),
+            get_instrument=lambda o: SimpleNamespace(listed_date=datetime.combine(listed_date[o], datetime.min.time())),
+        )
+        matcher = _Matcher()
+        broker = SimulationBroker.__new__(SimulationBroker)
+        broker._env = env
+        broker._matchers = {"CRYPTO": matcher}
+        broker._open_orders = OpenOrders()
+        broker._open_auction_orders = []
+        broker._get_matcher = lambda order_book_id: matcher
+        for order_id, order_book_id in enumerate(["ETHUSDT", "BTCUSDT", "ETHUSDT", "SOLUSDT", "BTCUSDT"]):
+            broker._open_orders.add("account", _Order(order_id=order_id, order_book_id=order_book_id))
+
+        broker.on_bar(Event(EVENT.BAR, calendar_dt=dt, trading_dt=dt))
+        # ETHUSDT 当前无行情，其挂单不被遍历；SOLUSDT 上市首日缺行情时仍须撮合
+        self.assertEqual(matcher.matched, [1, 4, 3])
+        self.assertEqual(matcher.updates, 1)
+        self.assertEqual(len(broker._open_orders), 5)
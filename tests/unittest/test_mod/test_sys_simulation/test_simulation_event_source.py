@@ -15,6 +15,8 @@
 import os
 import pickle
 from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
 
 from rqalpha.utils.testing import RQAlphaTestCase, DataProxyFixture, UniverseFixture
 from rqalpha.mod.rqalpha_mod_sys_simulation.testing import SimulationEventSourceFixture
@@ -74,3 +76,90 @@ class SimulationEventSourceTestCase(UniverseFixture, SimulationEventSourceFixtur
                 datetime(2018, 9, 14, 9, 14, 3, 500000), datetime(2018, 9, 14, 9, 14, 3, 500000),
                 tick={"order_book_id": "AU1812"}
             )
+
+
+class CryptoMinuteEventsTestCase(TestCase):
+    class _Env(object):
+        def __init__(self, dates):
+            from rqalpha.core.events import EventBus
+            import pandas as pd
+
+            self.config = SimpleNamespace(base=SimpleNamespace(accounts={"CRYPTO": 10000}))
+            self.event_bus = EventBus()
+            self.data_proxy = SimpleNamespace(get_trading_dates=lambda s, e: pd.DatetimeIndex(dates))
+
+    def test_crypto_minute_events(self):
+        from rqalpha.core.events import EVENT, Event
+        from rqalpha.mod.rqalpha_mod_sys_simulation.simulation_event_source import SimulationEventSource
+
+        env = self._Env(["2024-01-01", "2024-01-02"])
+        source = SimulationEventSource(env)
+        events = source.events(datetime(2024, 1, 1), datetime(2024, 1, 2), "1m")
+
+        e = next(events)
+        self.assertEqual((e.event_type, e.calendar_dt), (EVENT.BEFORE_TRADING, datetime(2024, 1, 1)))
+        self.assertEqual(next(events).event_type, EVENT.OPEN_AUCTION)
+        for _ in range(10):
+            e = next(events)
+        self.assertEqual((e.event_type, e.calendar_dt), (EVENT.BAR, datetime(2024, 1, 1, 0, 10)))
+
+        # universe 变化后从下一分钟继续
+        env.event_bus.publish_event(Event(EVENT.POST_UNIVERSE_CHANGED, universe={"BTCUSDT"}))
+        e = next(events)
+        self.assertEqual((e.event_type, e.calendar_dt), (EVENT.BAR, datetime(2024, 1, 1, 0, 11)))
+
+        # 各分钟共用同一个 BAR 事件对象，需在迭代过程中读取
+        self.assertIs(next(events), e)
+        rest = [(e.event_type, e.calendar_dt, e.trading_dt) for e in events]
+        bars = [dt for event_type, dt, _ in rest if event_type == EVENT.BAR]
+        self.assertEqual(len(bars), 1440 - 12 + 1440)
+        self.assertEqual(bars[1428 - 2], datetime(2024, 1, 1, 23, 59))
+        # 当天最后一根分钟线收盘于次日零点，trading_dt 仍属当天
+        self.assertEqual(rest[1428 - 1], (EVENT.BAR, datetime(2024, 1, 2), datetime(2024, 1, 1)))
+        self.assertEqual(rest[1428][:2], (EVENT.AFTER_TRADING, datetime(2024, 1, 1, 23, 59, 59)))
+        self.assertEqual(rest[1431][:2], (EVENT.BAR, datetime(2024, 1, 2, 0, 1)))
+        self.assertEqual(rest[-1][1], datetime(2024, 1, 2, 23, 59, 59))
+        self.assertTrue(all(
+            calendar_dt == trading_dt for event_type, calendar_dt, trading_dt in rest
+            if event_type != EVENT.BAR or calendar_dt.minute or calendar_dt.hour
+        ))
+
+    def test_clock_matches_minute_store(self):
+        import numpy as np
+        import pandas as pd
+        from tempfile import TemporaryDirectory
+
+        from rqalpha.core.events import EVENT
+        from rqalpha.data.binance_api import KLINE_DTYPE
+        from rqalpha.data.crypto_data_source import iter_crypto_minute_bar_updates
+        from rqalpha.data.crypto_minute_bar_store import CryptoMinuteBarStore
+        from rqalpha.mod.rqalpha_mod_sys_simulation.simulation_event_source import SimulationEventSource
+        from rqalpha.utils.datetime_func import convert_dt_to_int
+
+        class FakeAPI(object):
+            # close 为开盘时刻的分钟序号，用于核对每个 BAR 事件取到的分钟线
+            def get_klines_array(self, symbol, interval, start_time, end_time, limit=1000, futures=False):
+                open_time = np.arange(-(-start_time // 60000) * 60000, end_time + 1, 60000)[:limit]
+                klines = np.zeros(len(open_time), dtype=KLINE_DTYPE)
+                klines["open_time"] = open_time
+                klines["close_time"] = open_time + 59999
+                klines["close"] = open_time // 60000
+                return klines
+
+        day = pd.Timestamp.now(tz="UTC").normalize().tz_localize(None) - pd.Timedelta(days=2)
+        with TemporaryDirectory() as path:
+            store = CryptoMinuteBarStore(path)
+            list(iter_crypto_minute_bar_updates(store, FakeAPI(), ["BTCUSDT"], False, day.date()))
+            source = SimulationEventSource(self._Env([day]))
+            opens = [
+                (store.get_bars("BTCUSDT", convert_dt_to_int(e.calendar_dt), convert_dt_to_int(e.calendar_dt))["close"],
+                 e.calendar_dt)
+                for e in source.events(day, day, "1m") if e.event_type == EVENT.BAR
+            ]
+            store.close()
+        self.assertEqual(len(opens), 1440)
+        # 每一分钟都取到以该时刻收盘的分钟线，当天最后一根收盘于次日零点
+        for close, calendar_dt in opens:
+            self.assertEqual(close.tolist(), [(pd.Timestamp(calendar_dt) - day).total_seconds() // 60 - 1
+                                              + day.value // 60000000000])
+        self.assertEqual(opens[-1][1], (day + pd.Timedelta(days=1)).to_pydatetime())
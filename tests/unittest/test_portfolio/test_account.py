@@ -0,0 +1,61 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from rqalpha.const import INSTRUMENT_TYPE, POSITION_DIRECTION, POSITION_EFFECT
+from rqalpha.core.events import EventBus
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model import CryptoPosition  # noqa: 注册加密货币持仓类型
+from rqalpha.portfolio.account import Account
+
+
+class _Env(SimpleNamespace):
+    def get_last_price(self, order_book_id):
+        return self.prices[order_book_id]
+
+
+def _trade(exec_id, order_book_id, price, quantity, position_effect=POSITION_EFFECT.OPEN,
+           direction=POSITION_DIRECTION.LONG):
+    return SimpleNamespace(exec_id=exec_id, order_book_id=order_book_id, last_price=price, last_quantity=quantity,
+                           transaction_cost=1., position_effect=position_effect, position_direction=direction)
+
+
+class AccountAggregatesTestCase(TestCase):
+    def setUp(self):
+        self.prices = {"BTCUSDT": 100., "ETHUSDT": 10.}
+        self.env = _Env(
+            event_bus=EventBus(), prices=self.prices, trading_dt=datetime(2024, 1, 2),
+            config=SimpleNamespace(extra=SimpleNamespace(check_portfolio_aggregates=True)),
+        )
+        self.env.data_proxy = SimpleNamespace(
+            instrument=lambda order_book_id: SimpleNamespace(type=INSTRUMENT_TYPE.CRYPTO_SPOT),
+            get_last_price=self.env.get_last_price,
+        )
+        patcher = patch("rqalpha.environment.Environment.get_instance", return_value=self.env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_incremental_aggregates(self):
+        account = Account("CRYPTO", 10000., {"BTCUSDT": (2, 100.)}, 0)
+        self.assertEqual((account.market_value, account.total_value), (200., 10200.))
+
+        account.apply_trade(_trade(1, "ETHUSDT", 10., 5))
+        self.assertEqual((account.market_value, account.transaction_cost), (250., 1.))
+
+        # 只有价格变化的持仓参与更新，读取时与逐持仓重算的结果核对
+        self.prices["BTCUSDT"] = 110.
+        account._on_bar(None)
+        self.assertEqual((account.market_value, account.total_value), (270., 10219.))
+
+        # 平仓后不再跟随行情，再次开仓时从行情获取最新价
+        account.apply_trade(_trade(2, "ETHUSDT", 10., 5, POSITION_EFFECT.CLOSE))
+        self.prices["ETHUSDT"] = 12.
+        account._on_bar(None)
+        self.assertEqual(account.get_position("ETHUSDT")._last_price, 10.)
+        account.apply_trade(_trade(3, "ETHUSDT", 12., 1))
+        self.assertEqual(account.market_value, 232.)
+
+        account._contributions.clear()
+        account._aggregates[0] += 1
+        with self.assertRaises(RuntimeError):
+            account.market_value
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from rqalpha.const import DAYS_CNT
+from rqalpha.core.events import EventBus
+from rqalpha.portfolio import Portfolio
+
+
+class PortfolioAnnualFactorTestCase(TestCase):
+    def setUp(self):
+        self.env = SimpleNamespace(
+            event_bus=EventBus(), trading_dt=datetime(2024, 1, 31),
+            config=SimpleNamespace(
+                base=SimpleNamespace(start_date=date(2024, 1, 1)),
+                extra=SimpleNamespace(check_portfolio_aggregates=False),
+            ),
+            data_proxy=SimpleNamespace(
+                get_previous_trading_date=lambda d: d,
+                count_trading_dates=lambda start, end: (end - start).days + 1,
+            ),
+        )
+        patcher = patch("rqalpha.environment.Environment.get_instance", return_value=self.env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _portfolio(self, starting_cash):
+        return Portfolio(starting_cash, [], 0, date(2024, 1, 1), self.env.data_proxy, self.env.event_bus)
+
+    def test_annual_factor(self):
+        self.assertEqual(self._portfolio({"CRYPTO": 10000}).annual_factor, DAYS_CNT.DAYS_A_YEAR)
+        self.assertEqual(
+            self._portfolio({"CRYPTO": 10000, "STOCK": 10000}).annual_factor, DAYS_CNT.TRADING_DAYS_A_YEAR
+        )
+
+    def test_annualized_returns(self):
+        portfolio = self._portfolio({"CRYPTO": 10000})
+        with patch.object(Portfolio, "unit_net_value", 1.1):
+            self.assertAlmostEqual(portfolio.annualized_returns, 1.1 ** (365 / 31) - 1)
@@ -0,0 +1,62 @@
+from datetime import date
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from rqalpha.sweep import SweepAborted, SweepMod, _state, expand_grid, sweep
+
+
+def _fake_backtest(config, user_funcs):
+    params = config["extra"]["context_vars"]
+    assert config["mod"]["sys_sweep"]["max_drawdown"] == 0.2
+    if params["fast"] >= params["slow"]:
+        # 模拟 SweepMod 中止回测
+        _state["aborted"] = (0.25, date(2024, 1, 3))
+        return None
+    return {"sys_analyser": {"summary": {"total_returns": params["slow"] - params["fast"], "fast": -1}}}
+
+
+class SweepTestCase(TestCase):
+    def test_expand_grid(self):
+        self.assertEqual(expand_grid({"a": [1, 2], "b": ["x"]}), [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}])
+        self.assertEqual(expand_grid([{"a": 1}, {"a": 3}]), [{"a": 1}, {"a": 3}])
+
+    def test_sweep(self):
+        grid = {"fast": [5, 10, 40], "slow": [20, 30]}
+        for processes in (1, 2):
+            with patch("rqalpha.sweep.run_backtest", _fake_backtest):
+                results = sweep(grid, {"extra": {"context_vars": {"other": 1}}}, strategy_file="strategy.py",
+                                processes=processes, max_drawdown=0.2, preload=False)
+            self.assertEqual(len(results), 6)
+            self.assertEqual(results["fast"].tolist(), [5, 5, 10, 10, 40, 40])
+            self.assertEqual(results["total_returns"].tolist()[:4], [15, 25, 10, 20])
+            self.assertEqual(results["aborted"].tolist(), [False] * 4 + [True] * 2)
+            self.assertEqual(results["abort_date"].tolist()[-1], date(2024, 1, 3))
+            self.assertEqual(_state, {})
+
+        with self.assertRaises(ValueError):
+            sweep(grid)
+
+    def test_drawdown_guard(self):
+        listeners = {}
+        portfolio = SimpleNamespace(total_value=100.)
+        env = SimpleNamespace(
+            data_source=None, portfolio=portfolio, trading_dt=SimpleNamespace(date=lambda: date(2024, 1, 2)),
+            event_bus=SimpleNamespace(add_listener=lambda event, listener: listeners.setdefault(event, listener)),
+            set_data_source=lambda ds: setattr(env, "data_source", ds),
+        )
+        _state["data_source"] = "data source"
+        try:
+            mod = SweepMod()
+            mod.start_up(env, SimpleNamespace(max_drawdown=0.2))
+            self.assertEqual(env.data_source, "data source")
+            check = next(iter(listeners.values()))
+            for value in (100., 120., 97.):
+                portfolio.total_value = value
+                check(None)
+            portfolio.total_value = 95.
+            with self.assertRaises(SweepAborted):
+                check(None)
+            self.assertAlmostEqual(_state["aborted"][0], 1 - 95. / 120.)
+        finally:
+            _state.clear()
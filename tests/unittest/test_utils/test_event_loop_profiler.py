@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import TestCase
+
+from rqalpha.core.events import EVENT, Event, EventBus
+from rqalpha.interface import AbstractDataSource
+from rqalpha.utils.event_loop_profiler import EventLoopProfiler
+
+
+class _DataSource(AbstractDataSource):
+    def get_bar(self, instrument, dt, frequency):
+        return dt
+
+
+class _Broker(object):
+    def __init__(self, event_bus, data_source):
+        self._event_bus = event_bus
+        self._data_source = data_source
+
+    def on_bar(self, event):
+        self._data_source.get_bar(None, event.trading_dt, "1d")
+        self._event_bus.publish_event(Event(EVENT.TRADE))
+
+
+class EventLoopProfilerTestCase(TestCase):
+    def test_profile(self):
+        bus = EventBus()
+        data_source = _DataSource()
+        env = SimpleNamespace(event_bus=bus, data_source=data_source, trading_dt=None)
+        broker = _Broker(bus, data_source)
+        bus.add_listener(EVENT.PRE_BEFORE_TRADING, lambda e: None)
+        bus.add_listener(EVENT.TRADE, lambda e: None, user=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            trace_file = os.path.join(tmp, "trace.json")
+            profiler = EventLoopProfiler(datetime(2024, 1, 2).date(), trace_file)
+            profiler.install(env)
+            # 安装后注册的处理函数同样被计时
+            bus.add_listener(EVENT.BAR, broker.on_bar)
+            for day in (1, 2, 3):
+                env.trading_dt = datetime(2024, 1, day)
+                bus.publish_event(Event(EVENT.PRE_BEFORE_TRADING))
+                for _ in range(2):
+                    bus.publish_event(Event(EVENT.BAR, trading_dt=env.trading_dt))
+
+            stats = {(kind, event, name): (calls, total, self_time)
+                     for kind, event, name, owner, calls, total, self_time in profiler.stats()}
+            calls, total, self_time = stats[("listener", "BAR", "_Broker.on_bar")]
+            self.assertEqual(calls, 6)
+            self.assertLessEqual(self_time, total)
+            self.assertEqual(stats[("data_source", "-", "_DataSource.get_bar")][0], 6)
+            self.assertEqual(stats[("user_listener", "TRADE", "EventLoopProfilerTestCase.test_profile.<locals>.<lambda>")][0], 6)
+            self.assertIn("_Broker.on_bar", profiler.report())
+
+            self.assertEqual(profiler.dump_trace(), trace_file)
+            with open(trace_file) as f:
+                trace = json.load(f)
+            self.assertEqual(trace["otherData"]["trading_date"], "2024-01-02")
+            names = [e["name"] for e in trace["traceEvents"]]
+            self.assertEqual(names.count("_Broker.on_bar"), 2)
+            self.assertEqual(names.count("_DataSource.get_bar"), 2)
+
+            profiler.uninstall()
+            self.assertNotIn("get_bar", vars(data_source))
+            bus.publish_event(Event(EVENT.BAR, trading_dt=env.trading_dt))
+            calls = {name: calls for _, _, name, _, calls, _, _ in profiler.stats()}
+            self.assertEqual(calls["_Broker.on_bar"], 6)
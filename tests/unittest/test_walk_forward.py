@@ -0,0 +1,114 @@
+from datetime import date
+from types import SimpleNamespace
+from unittest import TestCase
+from unittest.mock import patch
+
+import pandas as pd
+
+from rqalpha.const import EXIT_CODE
+from rqalpha.walk_forward import WalkForwardMod, _state, split_windows, stitch_portfolios, walk_forward
+
+
+def _portfolio(start, end, unit_net_values):
+    index = pd.date_range(start, end)[:len(unit_net_values)]
+    return pd.DataFrame({"unit_net_value": unit_net_values,
+                         "total_value": [v * 100 for v in unit_net_values]}, index=index)
+
+
+def _fake_backtest(config, user_funcs, clear_caches=True):
+    base = config["base"]
+    if config["extra"]["context_vars"]["window_param"] == "fail":
+        return None
+    if base.get("persist"):
+        # 模拟 WalkForwardMod：读取上一窗口的状态，结束时保存本窗口的状态
+        last = _state.get("carry", {}).get("portfolio", 1.)
+        value = last * 1.1
+        _state["carry"] = {"portfolio": value}
+    else:
+        last, value = 1., 1.1
+    return {"sys_analyser": {
+        "summary": {"unit_net_value": value, "start_date": str(base["start_date"])},
+        "portfolio": _portfolio(base["start_date"], base["end_date"], [last * 1.05, value]),
+    }}
+
+
+class WalkForwardTestCase(TestCase):
+    def test_split_windows(self):
+        self.assertEqual(split_windows("2024-01-15", "2024-03-10"), [
+            (date(2024, 1, 15), date(2024, 1, 31)),
+            (date(2024, 2, 1), date(2024, 2, 29)),
+            (date(2024, 3, 1), date(2024, 3, 10)),
+        ])
+        self.assertEqual(split_windows("2024-01-01", "2024-01-20", freq="7D"), [
+            (date(2024, 1, 1), date(2024, 1, 7)),
+            (date(2024, 1, 8), date(2024, 1, 14)),
+            (date(2024, 1, 15), date(2024, 1, 20)),
+        ])
+        with self.assertRaises(ValueError):
+            split_windows("2024-02-01", "2024-01-01")
+
+    def test_stitch_portfolios(self):
+        first = _portfolio("2024-01-01", "2024-01-02", [1.1, 1.2])
+        second = _portfolio("2024-01-03", "2024-01-04", [0.9, 1.5])
+        stitched = stitch_portfolios([(1, second), (0, first)], chain=True)
+        self.assertEqual(stitched["window"].tolist(), [0, 0, 1, 1])
+        self.assertEqual(stitched["unit_net_value"].round(6).tolist(), [1.1, 1.2, 1.08, 1.8])
+        self.assertEqual(stitched["total_value"].round(6).tolist(), [110, 120, 108, 180])
+        self.assertEqual(stitch_portfolios([(0, first), (1, second)])["unit_net_value"].tolist(), [1.1, 1.2, 0.9, 1.5])
+
+    def test_walk_forward(self):
+        windows = split_windows("2024-01-01", "2024-03-31")
+        with patch("rqalpha.walk_forward.run_backtest", _fake_backtest):
+            result = walk_forward(windows, strategy_file="strategy.py", preload=False,
+                                  params=lambda s, e: {"window_param": s.month})
+            summary, portfolio = result["summary"], result["portfolio"]
+            self.assertEqual(summary["window_param"].tolist(), [1, 2, 3])
+            self.assertEqual(summary["unit_net_value"].round(6).tolist(), [1.1, 1.21, 1.331])
+            self.assertEqual(portfolio["unit_net_value"].round(6).tolist(), [1.05, 1.1, 1.155, 1.21, 1.2705, 1.331])
+            self.assertEqual(_state, {})
+
+            for processes in (1, 2):
+                result = walk_forward(windows, strategy_file="strategy.py", preload=False, carry_state=False,
+                                      processes=processes, params=[{"window_param": i} for i in range(3)])
+                self.assertEqual(result["summary"]["start_date"].tolist(), ["2024-01-01", "2024-02-01", "2024-03-01"])
+                self.assertEqual(result["portfolio"]["unit_net_value"].round(6).tolist(),
+                                 [1.05, 1.1, 1.155, 1.21, 1.2705, 1.331])
+
+            result = walk_forward(windows, strategy_file="strategy.py", preload=False,
+                                  params=[{"window_param": 1}, {"window_param": "fail"}, {"window_param": 3}])
+            self.assertEqual(result["summary"]["error"].notnull().tolist(), [False, True, True])
+            self.assertEqual(result["summary"]["window_param"].tolist()[-1], 3)
+
+        with self.assertRaises(ValueError):
+            walk_forward(windows[::-1], strategy_file="strategy.py")
+        with self.assertRaises(ValueError):
+            walk_forward(windows, strategy_file="strategy.py", params=[{}])
+
+    def test_state_hand_off(self):
+        def make_env():
+            env = SimpleNamespace(data_source=None, data_proxy=None, persist_provider=None)
+            env.set_data_source = lambda ds: setattr(env, "data_source", ds)
+            env.set_data_proxy = lambda dp: setattr(env, "data_proxy", dp)
+            env.set_persist_provider = lambda p: setattr(env, "persist_provider", p)
+            return env
+
+        _state.update({"data_source": "data source", "data_proxy": "data proxy"})
+        try:
+            mod, env = WalkForwardMod(), make_env()
+            mod.start_up(env, SimpleNamespace(carry_state=True))
+            self.assertEqual((env.data_source, env.data_proxy), ("data source", "data proxy"))
+            self.assertIsNone(env.persist_provider.load("portfolio"))
+            for key in ("portfolio", "broker", "executor", "user_context"):
+                env.persist_provider.store(key, key.encode())
+            mod.tear_down(EXIT_CODE.EXIT_SUCCESS)
+            self.assertEqual(set(_state["carry"]), {"portfolio", "broker"})
+
+            mod, env = WalkForwardMod(), make_env()
+            mod.start_up(env, SimpleNamespace(carry_state=True))
+            self.assertEqual(env.persist_provider.load("portfolio"), b"portfolio")
+            self.assertIsNone(env.persist_provider.load("user_context"))
+            env.persist_provider.store("portfolio", b"new")
+            mod.tear_down(EXIT_CODE.EXIT_USER_ERROR)
+            self.assertEqual(_state["carry"]["portfolio"], b"portfolio")
+        finally:
+            _state.clear()